@@ -0,0 +1,36 @@
+"""add composite indexes for paginated listing queries
+
+Revision ID: 002
+Revises:
+Create Date: 2026-10-16 09:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# Each index matches a listing route's equality filters followed by its
+# keyset sort key, (sort column, id); btree indexes are scanned backwards
+# for the descending order.
+INDEXES = [
+    ('ix_listings_status_category_score', ['status', 'category', 'quantum_score', 'id']),
+    ('ix_listings_status_tier_score', ['status', 'tier', 'quantum_score', 'id']),
+    ('ix_listings_status_score', ['status', 'quantum_score', 'id']),
+    ('ix_listings_status_created_at', ['status', 'created_at', 'id']),
+    ('ix_listings_creator_created_at', ['creator_id', 'created_at', 'id']),
+]
+
+def upgrade():
+    # Build without locking writes on the (large) listings table
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES:
+            op.create_index(name, 'listings', columns, postgresql_concurrently=True, if_not_exists=True)
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, _ in reversed(INDEXES):
+            op.drop_index(name, table_name='listings', postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,45 @@
+"""add full-text search column and indexes to listings
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-16 12:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+# Weights mirror FIELD_WEIGHTS in app/services/listing_search.py
+SEARCH_VECTOR = """
+    setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+    setweight(to_tsvector('english', coalesce(category, '')), 'B') ||
+    setweight(to_tsvector('english', coalesce(description, '')), 'C')
+"""
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    # A generated column keeps the index current on every insert/update
+    op.execute(
+        f"ALTER TABLE listings ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        f"GENERATED ALWAYS AS ({SEARCH_VECTOR}) STORED"
+    )
+    with op.get_context().autocommit_block():
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_listings_search_vector "
+            "ON listings USING gin (search_vector)"
+        )
+        # Typo-tolerant title matching via similarity() / %
+        op.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_listings_title_trgm "
+            "ON listings USING gin (title gin_trgm_ops)"
+        )
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_listings_title_trgm")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_listings_search_vector")
+    op.execute("ALTER TABLE listings DROP COLUMN IF EXISTS search_vector")
@@ -0,0 +1,32 @@
+"""add indexes for the custodianship sweep
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-16 15:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+# The sweep walks active listings by id and aggregates, per chunk, the
+# owners' latest listing update and each listing's purchases.
+INDEXES = [
+    ('ix_listings_status_id', 'listings', ['status', 'id']),
+    ('ix_listings_creator_updated_at', 'listings', ['creator_id', 'updated_at']),
+    ('ix_purchases_listing_created_at', 'purchases', ['listing_id', 'created_at', 'buyer_id']),
+]
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, postgresql_concurrently=True, if_not_exists=True)
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,51 @@
+"""add owner activity and listing sales materialized views
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-16 17:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+# Latest sign of life per owner: a login or an edit to any of their listings
+OWNER_ACTIVITY = """
+    SELECT owner_id, max(activity_at) AS last_activity_at
+    FROM (
+        SELECT creator_id AS owner_id, max(updated_at) AS activity_at
+        FROM listings
+        GROUP BY creator_id
+        UNION ALL
+        SELECT id, last_login_at
+        FROM users
+        WHERE last_login_at IS NOT NULL
+    ) AS activity
+    GROUP BY owner_id
+"""
+
+# A listing's active users are its distinct buyers in the last 30 days
+LISTING_SALES = """
+    SELECT listing_id,
+           count(*) AS total_sales,
+           count(DISTINCT buyer_id) FILTER (WHERE created_at >= now() - interval '30 days') AS active_users,
+           max(created_at) AS last_sale_at,
+           now() AS refreshed_at
+    FROM purchases
+    GROUP BY listing_id
+"""
+
+def upgrade():
+    op.execute(f"CREATE MATERIALIZED VIEW IF NOT EXISTS owner_activity_stats AS {OWNER_ACTIVITY}")
+    op.execute(f"CREATE MATERIALIZED VIEW IF NOT EXISTS listing_sales_stats AS {LISTING_SALES}")
+    # Unique indexes allow REFRESH ... CONCURRENTLY and serve the point lookups
+    op.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_owner_activity_stats_owner ON owner_activity_stats (owner_id)")
+    op.execute("CREATE UNIQUE INDEX IF NOT EXISTS ux_listing_sales_stats_listing ON listing_sales_stats (listing_id)")
+
+def downgrade():
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS listing_sales_stats")
+    op.execute("DROP MATERIALIZED VIEW IF EXISTS owner_activity_stats")
@@ -1,13 +1,23 @@
-from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Query
+from typing import List, Optional
+from sqlalchemy.orm import Session
 from app.core.auth import get_current_active_user, get_admin_user
 from app.models.user import User
-from app.models.custodial import CustodialStatus, CustodialMetadata
+from app.models.custodial import CustodialStatus, CustodialMetadata, CustodialSweepResult
+from app.db.session import SessionLocal, get_db
 from app.services.custodian import CustodianService
 
 router = APIRouter()
 custodian_service = CustodianService()
 
+async def _run_sweep():
+    # The request's session is closed before background tasks run
+    db = SessionLocal()
+    try:
+        await custodian_service.check_listings_for_custodianship(db)
+    finally:
+        db.close()
+
 @router.post("/check", response_model=List[str])
 async def check_listings_for_custodianship(
     background_tasks: BackgroundTasks,
@@ -20,7 +30,7 @@ async def check_listings_for_custodianship(
     """
     try:
         # Run check in background
-        background_tasks.add_task(custodian_service.check_listings_for_custodianship)
+        background_tasks.add_task(_run_sweep)
         return []
     except Exception as e:
         raise HTTPException(
@@ -28,6 +38,25 @@ async def check_listings_for_custodianship(
             detail=f"Failed to initiate custodianship check: {str(e)}"
         )
 
+@router.post("/check/dry-run", response_model=CustodialSweepResult)
+async def dry_run_custodianship_check(
+    max_batches: Optional[int] = Query(None, ge=1),
+    db: Session = Depends(get_db),
+    admin: User = Depends(get_admin_user)
+) -> CustodialSweepResult:
+    """
+    Report how many listings a custodianship check would convert, and how
+    long each phase takes, without changing anything.
+    Admin only endpoint.
+    """
+    try:
+        return await custodian_service.sweep(db, dry_run=True, resume=False, max_batches=max_batches)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to run custodianship dry run: {str(e)}"
+        )
+
 @router.post("/{listing_id}/request-recovery")
 async def request_listing_recovery(
     listing_id: str,
@@ -84,19 +113,23 @@ async def approve_listing_recovery(
 @router.get("/{listing_id}/status")
 async def get_custodial_status(
     listing_id: str,
+    db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ) -> CustodialMetadata:
-    """Get custodial status of a listing."""
+    """
+    Get custodial status of a listing. Listings not under custodianship
+    report whether they are eligible, from the precomputed activity stats.
+    """
     try:
-        listing = await custodian_service._get_listing(listing_id)
+        status = await custodian_service.get_status(db, listing_id)
         
-        if not listing or not hasattr(listing, 'custodial_metadata'):
+        if status is None:
             raise HTTPException(
                 status_code=404,
-                detail="Listing not found or not under custodianship"
+                detail="Listing not found"
             )
             
-        return listing.custodial_metadata
+        return status
     except HTTPException:
         raise
     except Exception as e:
@@ -1,10 +1,11 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query
 from typing import Dict, List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 
 from app.core.auth import get_current_active_user
 from app.models.user import User
+from app.models.quantum_score import EventResolution
 from app.services.quantum_score import QuantumScoreService
 
 router = APIRouter()
@@ -52,22 +53,59 @@ async def get_listing_effects(listing_id: str) -> VisualEffects:
         )
 
 @router.get("/listings/top", response_model=List[Dict])
-async def get_top_listings(limit: int = 10) -> List[Dict]:
-    """Get top listings by quantum score."""
+async def get_top_listings(
+    limit: int = Query(10, ge=1, le=100),
+    offset: int = Query(0, ge=0),
+    category: Optional[str] = None,
+    tier: Optional[int] = None
+) -> List[Dict]:
+    """Get top listings by quantum score, optionally by category or tier."""
+    if category is not None and tier is not None:
+        raise HTTPException(
+            status_code=400,
+            detail="Filter by category or tier, not both"
+        )
     try:
-        return await score_service.get_top_listings(limit)
+        return await score_service.get_top_listings(limit, offset, category, tier)
     except Exception as e:
         raise HTTPException(
             status_code=500,
             detail=f"Failed to get top listings: {str(e)}"
         )
 
+@router.get("/listings/{listing_id}/rank", response_model=Dict)
+async def get_listing_rank(
+    listing_id: str,
+    category: Optional[str] = None,
+    tier: Optional[int] = None
+) -> Dict:
+    """Get a listing's rank on the quantum score leaderboard."""
+    if category is not None and tier is not None:
+        raise HTTPException(
+            status_code=400,
+            detail="Filter by category or tier, not both"
+        )
+    try:
+        rank = await score_service.get_listing_rank(listing_id, category, tier)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to get listing rank: {str(e)}"
+        )
+    if not rank:
+        raise HTTPException(
+            status_code=404,
+            detail="Listing is not ranked"
+        )
+    return rank
+
 @router.get("/listings/{listing_id}/history")
 async def get_listing_history(
     listing_id: str,
     event_type: Optional[str] = None,
     start_time: Optional[float] = None,
-    end_time: Optional[float] = None
+    end_time: Optional[float] = None,
+    resolution: Optional[EventResolution] = None
 ) -> List[Dict]:
     """Get interaction history for a listing."""
     try:
@@ -75,7 +113,8 @@ async def get_listing_history(
             listing_id,
             event_type,
             start_time,
-            end_time
+            end_time,
+            resolution
         )
     except Exception as e:
         raise HTTPException(
@@ -1,16 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import FileResponse
 from typing import Dict, List, Optional
 from pydantic import BaseModel
-from datetime import datetime
+from sqlalchemy.orm import Session
+from datetime import datetime, timedelta
+import os
+import stat
 
 from app.core.auth import get_current_active_user
 from app.models.user import User
-from app.models.listing import InvocationKey, LicenseTier
+from app.db.session import get_db
+from app.models.listing import InvocationKey, Listing, LicenseTier, KeyValidationResult
+from app.models.payload_manifest import PayloadEntry
+from app.models.direct_upload import SignedURL
 from app.services.invocation import InvocationService
+from app.utils.storage import object_store
 
 router = APIRouter()
 invocation_service = InvocationService()
 
+# Payload URLs are single-use in practice; keep them short-lived
+PAYLOAD_URL_TTL = 300
+
 class KeyRequest(BaseModel):
     listing_id: str
     license_tier: LicenseTier
@@ -46,6 +57,51 @@ async def generate_key(
             detail=f"Failed to generate key: {str(e)}"
         )
 
+@router.get("/keys/cache/stats", response_model=Dict)
+async def get_key_cache_stats(
+    current_user: User = Depends(get_current_active_user)
+) -> Dict:
+    """Get hit/miss metrics for this worker's invocation key cache."""
+    return invocation_service.get_cache_stats()
+
+@router.post("/keys/{key_id}/revoke", response_model=Dict)
+async def revoke_key(
+    key_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+) -> Dict:
+    """Revoke an invocation key (key holder or listing creator only)."""
+    try:
+        attributes = await invocation_service.get_key_attributes(key_id)
+        if not attributes:
+            raise HTTPException(
+                status_code=404,
+                detail="Key not found"
+            )
+        
+        if attributes["user_id"] != str(current_user.id):
+            listing = db.query(Listing).filter(Listing.id == attributes["listing_id"]).first()
+            if not listing or str(listing.creator_id) != str(current_user.id):
+                raise HTTPException(
+                    status_code=403,
+                    detail="Not authorized to revoke this key"
+                )
+        
+        if not await invocation_service.revoke_key(key_id):
+            raise HTTPException(
+                status_code=404,
+                detail="Key not found"
+            )
+        
+        return {"status": "success", "key_id": key_id}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to revoke key: {str(e)}"
+        )
+
 @router.get("/keys/{key_id}", response_model=Dict)
 async def get_key_info(
     key_id: str,
@@ -71,6 +127,47 @@ async def get_key_info(
             detail=f"Failed to get key info: {str(e)}"
         )
 
+async def _invoke(
+    request: InvocationRequest,
+    client_request: Request,
+    current_user: Optional[User]
+) -> PayloadEntry:
+    """Validate and consume the key, then resolve the requested payload."""
+    # Get client IP
+    client_ip = client_request.client.host
+    
+    # Validate key
+    result = await invocation_service.validate_key(
+        key_id=request.key_id,
+        listing_id=request.listing_id,
+        user_id=str(current_user.id) if current_user else "anonymous",
+        ip_address=client_ip
+    )
+    
+    if result != KeyValidationResult.VALID:
+        raise HTTPException(
+            status_code=403,
+            detail={
+                "message": "Invalid or expired key",
+                "reason": result.value
+            }
+        )
+    
+    # Resolve payload from the manifest
+    payload = await invocation_service.get_payload(
+        listing_id=request.listing_id,
+        key_id=request.key_id,
+        path_type=request.path_type
+    )
+    
+    if not payload:
+        raise HTTPException(
+            status_code=404,
+            detail="Payload not found"
+        )
+    
+    return payload
+
 @router.post("/invoke", response_model=Dict)
 async def invoke_listing(
     request: InvocationRequest,
@@ -79,40 +176,14 @@ async def invoke_listing(
 ) -> Dict:
     """Invoke a listing with a key."""
     try:
-        # Get client IP
-        client_ip = client_request.client.host
-        
-        # Validate key
-        is_valid = await invocation_service.validate_key(
-            key_id=request.key_id,
-            listing_id=request.listing_id,
-            user_id=str(current_user.id) if current_user else "anonymous",
-            ip_address=client_ip
-        )
-        
-        if not is_valid:
-            raise HTTPException(
-                status_code=403,
-                detail="Invalid or expired key"
-            )
-        
-        # Get payload path
-        payload_path = await invocation_service.get_payload_path(
-            listing_id=request.listing_id,
-            key_id=request.key_id,
-            path_type=request.path_type
-        )
-        
-        if not payload_path:
-            raise HTTPException(
-                status_code=404,
-                detail="Payload not found"
-            )
+        payload = await _invoke(request, client_request, current_user)
         
         # Return payload path (will be handled by middleware for security)
         return {
             "status": "success",
-            "payload_path": payload_path
+            "payload_path": payload.path,
+            "payload_size": payload.size,
+            "payload_sha256": payload.sha256
         }
     except HTTPException:
         raise
@@ -120,4 +191,68 @@ async def invoke_listing(
         raise HTTPException(
             status_code=500,
             detail=f"Failed to invoke listing: {str(e)}"
-        ) 
\ No newline at end of file
+        )
+
+@router.post("/invoke/stream")
+async def invoke_listing_stream(
+    request: InvocationRequest,
+    client_request: Request,
+    current_user: Optional[User] = Depends(get_current_active_user)
+) -> FileResponse:
+    """Invoke a listing with a key and stream the payload itself."""
+    try:
+        payload = await _invoke(request, client_request, current_user)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to invoke listing: {str(e)}"
+        )
+    
+    # Headers come from the manifest entry, which resolve() has just checked
+    # against the file, so it isn't stat'ed again here; servers with the
+    # pathsend extension send it zero-copy
+    stat_result = os.stat_result((
+        stat.S_IFREG | 0o444, 0, 0, 1, 0, 0,
+        payload.size, payload.mtime, payload.mtime, payload.mtime
+    ))
+    return FileResponse(
+        payload.path,
+        stat_result=stat_result,
+        filename=os.path.basename(payload.path),
+        headers={"X-Payload-SHA256": payload.sha256}
+    )
+
+@router.post("/invoke/url", response_model=SignedURL)
+async def invoke_listing_url(
+    request: InvocationRequest,
+    client_request: Request,
+    current_user: Optional[User] = Depends(get_current_active_user)
+) -> SignedURL:
+    """Invoke a listing with a key and get a short-lived URL for the payload."""
+    try:
+        payload = await _invoke(request, client_request, current_user)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to invoke listing: {str(e)}"
+        )
+    
+    # Set by the manifest watcher once it has mirrored the payload
+    if not payload.object_key:
+        raise HTTPException(
+            status_code=409,
+            detail="Payload is not available for direct download yet; use /invoke/stream"
+        )
+    
+    return SignedURL(
+        url=object_store.presign_get(
+            payload.object_key,
+            PAYLOAD_URL_TTL,
+            filename=os.path.basename(payload.path)
+        ),
+        expires_at=datetime.utcnow() + timedelta(seconds=PAYLOAD_URL_TTL)
+    )
@@ -3,15 +3,50 @@ from typing import List, Optional
 from sqlalchemy.orm import Session
 from app.core.auth import get_current_active_user
 from app.models.user import User
-from app.models.listing import ListingCreate, Listing, ListingStatus, ListingCategory, ListingUpdate
+from app.models.listing import ListingCreate, Listing, ListingStatus, ListingCategory, ListingUpdate, ListingSort
 from app.models.listing_template import LISTING_TEMPLATES
 from app.db.session import get_db
-from app.utils.storage import upload_to_s3, delete_from_s3, get_s3_url
+from app.utils.storage import object_store, upload_http_error, get_s3_url
 from app.utils.glyph import generate_spirit_glyph
+from app.utils.pagination import Page, PageParams, decode_cursor, encode_cursor, keyset_paginate, parse_fields
+from app.services.listing_search import ListingSearchService
+from app.services.blob_store import BlobStoreService
+from app.services.direct_upload import DirectUploadService
+from app.models.direct_upload import DirectUpload, DirectUploadComplete, DirectUploadRequest, SignedURL
+from app.services.payload_manifest import PayloadManifestService
+from app.services.quantum_score import QuantumScoreService
+from app.middleware.tier_check import tier_access
 from datetime import datetime
 import secrets
 
 router = APIRouter()
+score_service = QuantumScoreService()
+payload_manifest = PayloadManifestService()
+search_service = ListingSearchService()
+blob_store = BlobStoreService(object_store)
+direct_uploads = DirectUploadService(object_store, blob_store)
+
+LISTING_FIELDS = list(Listing.__fields__)
+
+async def _store_listing_file(file: UploadFile, resume_token: Optional[str], user: User):
+    """Store an uploaded listing file in the blob store, skipping bytes already stored."""
+    try:
+        return await blob_store.put(file, resume_token=resume_token, owner=str(user.id))
+    except Exception as e:
+        raise upload_http_error(e)
+
+def _paginate(query, sort: ListingSort, page: PageParams) -> Page:
+    """Return one keyset page of a listing query with the requested projection."""
+    fields = parse_fields(page.fields, LISTING_FIELDS, required=["id", sort.value])
+    return keyset_paginate(
+        query,
+        Listing,
+        sort.value,
+        fields,
+        limit=page.limit,
+        cursor=page.cursor,
+        include_total=page.include_total
+    )
 
 @router.post("/create", response_model=Listing)
 async def create_listing(
@@ -22,12 +57,15 @@ async def create_listing(
     price: float = Form(...),
     tier: int = Form(...),
     file: UploadFile = File(...),
+    resume_token: Optional[str] = Form(None),
     current_user: User = Depends(get_current_active_user)
 ):
     """Create a new listing."""
     try:
-        # Upload file to S3
-        file_key = await upload_to_s3(file, f"listings/{current_user.id}")
+        # Stream the file to S3 unless identical bytes are already stored;
+        # resume_token continues an interrupted upload
+        blob = await _store_listing_file(file, resume_token, current_user)
+        file_key = blob.key
         
         # Create listing in database
         listing = Listing(
@@ -45,26 +83,141 @@ async def create_listing(
         db.commit()
         db.refresh(listing)
         
+        await payload_manifest.build_manifest(listing.id)
+        
         return listing
+    except HTTPException:
+        # Upload errors (including a resume_token) pass through unchanged
+        raise
     except Exception as e:
-        # Clean up S3 file if database operation fails
+        # Drop the new reference if the database operation fails
         if 'file_key' in locals():
-            await delete_from_s3(file_key)
+            await blob_store.release_key(file_key)
+        raise HTTPException(status_code=400, detail=str(e))
+
+@router.post("/uploads", response_model=DirectUpload)
+async def create_direct_upload(
+    request: DirectUploadRequest,
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get presigned URLs to upload a listing file straight to storage."""
+    try:
+        return await direct_uploads.create(str(current_user.id), request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to create upload: {str(e)}")
+
+@router.post("/uploads/{session_id}/complete", response_model=Listing)
+async def complete_direct_upload(
+    session_id: str,
+    request: DirectUploadComplete,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Verify a direct upload and create the listing for it."""
+    try:
+        blob = await direct_uploads.complete(str(current_user.id), session_id, request.parts)
+    except KeyError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to complete upload: {str(e)}")
+    
+    try:
+        listing = Listing(
+            title=request.title,
+            description=request.description,
+            category=request.category,
+            price=request.price,
+            tier=request.tier,
+            creator_id=current_user.id,
+            file_path=get_s3_url(blob.key),
+            s3_file_key=blob.key
+        )
+        
+        db.add(listing)
+        db.commit()
+        db.refresh(listing)
+        
+        await payload_manifest.build_manifest(listing.id)
+        
+        return listing
+    except Exception as e:
+        await blob_store.release_key(blob.key)
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/me", response_model=List[Listing])
+@router.get("/{listing_id}/download", response_model=SignedURL)
+async def get_listing_download_url(
+    listing_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_active_user)
+):
+    """Get a short-lived URL to download a listing's file from storage."""
+    listing = db.query(Listing).filter(Listing.id == listing_id).first()
+    if not listing:
+        raise HTTPException(status_code=404, detail="Listing not found")
+        
+    # Only allow access to the owner
+    if listing.creator_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not authorized to access this listing")
+    
+    if not listing.s3_file_key:
+        raise HTTPException(status_code=404, detail="Listing has no file")
+    
+    return direct_uploads.signed_get(listing.s3_file_key)
+
+@router.get("/me", response_model=Page)
 async def get_my_listings(
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user),
-    status: Optional[ListingStatus] = None
+    status: Optional[ListingStatus] = None,
+    sort: ListingSort = ListingSort.NEWEST,
+    page: PageParams = Depends()
 ):
-    """Get all listings for the current user."""
+    """Get listings for the current user, one page at a time."""
     query = db.query(Listing).filter(Listing.creator_id == current_user.id)
     
     if status:
         query = query.filter(Listing.status == status)
         
-    return query.all()
+    return _paginate(query, sort, page)
+
+# Fixed single-segment paths go before /{listing_id}, which would match them
+@router.get("/templates", response_model=List[dict])
+async def get_templates():
+    """Get available listing templates"""
+    return list(LISTING_TEMPLATES.values())
+
+@router.get("/search", response_model=Page)
+async def search_listings(
+    *,
+    db: Session = Depends(get_db),
+    q: Optional[str] = None,
+    category: str = None,
+    min_score: float = None,
+    max_score: float = None,
+    tier: int = None,
+    sort: ListingSort = ListingSort.TOP,
+    page: PageParams = Depends()
+):
+    """Search listings with filters; with `q`, rank by text relevance and return facets"""
+    if q and q.strip():
+        return _search(db, q, category, tier, min_score, max_score, page)
+
+    query = db.query(Listing).filter(Listing.status == ListingStatus.ACTIVE)
+    
+    if category:
+        query = query.filter(Listing.category == category)
+    if min_score is not None:
+        query = query.filter(Listing.quantum_score >= min_score)
+    if max_score is not None:
+        query = query.filter(Listing.quantum_score <= max_score)
+    if tier is not None:
+        query = query.filter(Listing.tier == tier)
+        
+    return _paginate(query, sort, page)
 
 @router.get("/{listing_id}", response_model=Listing)
 async def get_listing(
@@ -107,6 +260,17 @@ async def update_listing(
     db.commit()
     db.refresh(listing)
     
+    # Keep the category/tier leaderboards in step with the listing
+    if listing.status == ListingStatus.ACTIVE:
+        await score_service.index_listing(listing.id, listing.category, listing.tier)
+    else:
+        await score_service.remove_listing(listing.id)
+    await search_service.index_listing(db, listing)
+    await tier_access.invalidate_listing(listing.id)
+    
+    # Payload paths may have changed
+    await payload_manifest.build_manifest(listing.id)
+    
     return listing
 
 @router.delete("/{listing_id}")
@@ -124,13 +288,17 @@ async def delete_listing(
     if listing.creator_id != current_user.id:
         raise HTTPException(status_code=403, detail="Not authorized to delete this listing")
         
-    # Delete file from S3
+    # Drop this listing's reference; shared bytes stay until GC finds them orphaned
     if listing.s3_file_key:
-        await delete_from_s3(listing.s3_file_key)
+        await blob_store.release_key(listing.s3_file_key)
         
     # Delete from database
     db.delete(listing)
     db.commit()
+    await score_service.remove_listing(listing_id)
+    await search_service.remove_listing(db, listing_id)
+    await tier_access.invalidate_listing(listing_id)
+    await payload_manifest.remove_manifest(listing_id)
     
     return {"message": "Listing deleted successfully"}
 
@@ -153,22 +321,21 @@ async def archive_listing(
     listing.updated_at = datetime.utcnow()
     db.commit()
     db.refresh(listing)
+    await score_service.remove_listing(listing.id)
+    await search_service.remove_listing(db, listing.id)
     
     return listing
 
-@router.get("/templates", response_model=List[dict])
-async def get_templates():
-    """Get available listing templates"""
-    return list(LISTING_TEMPLATES.values())
-
-@router.get("/", response_model=List[Listing])
+@router.get("/", response_model=Page)
 async def get_listings(
     db: Session = Depends(get_db),
     category: Optional[ListingCategory] = None,
     status: Optional[ListingStatus] = None,
-    creator_id: Optional[str] = None
+    creator_id: Optional[str] = None,
+    sort: ListingSort = ListingSort.NEWEST,
+    page: PageParams = Depends()
 ):
-    """Get all listings with optional filters"""
+    """Get listings with optional filters, one page at a time"""
     query = db.query(Listing)
     
     if category:
@@ -178,7 +345,7 @@ async def get_listings(
     if creator_id:
         query = query.filter(Listing.creator_id == creator_id)
         
-    return query.all()
+    return _paginate(query, sort, page)
 
 @router.put("/{listing_id}/publish")
 async def publish_listing(
@@ -198,12 +365,14 @@ async def publish_listing(
             detail="Listing not found"
         )
         
-    listing.status = ListingStatus.PUBLISHED
+    listing.status = ListingStatus.ACTIVE
     listing.updated_at = datetime.utcnow()
     
     db.add(listing)
     db.commit()
     db.refresh(listing)
+    await score_service.index_listing(listing.id, listing.category, listing.tier)
+    await search_service.index_listing(db, listing)
     return {"status": "success"}
 
 @router.put("/{listing_id}/archive")
@@ -230,26 +399,30 @@ async def archive_listing(
     db.add(listing)
     db.commit()
     db.refresh(listing)
+    await score_service.remove_listing(listing.id)
+    await search_service.remove_listing(db, listing.id)
     return {"status": "success"}
 
-@router.get("/user/{user_id}", response_model=List[Listing])
+@router.get("/user/{user_id}", response_model=Page)
 async def get_user_listings(
     user_id: int,
     db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_user)
+    current_user: User = Depends(get_current_active_user),
+    sort: ListingSort = ListingSort.NEWEST,
+    page: PageParams = Depends()
 ):
-    """Get all listings for a specific user"""
+    """Get listings for a specific user, one page at a time"""
     if current_user.id != user_id:
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not authorized to view these listings"
         )
     
-    listings = db.query(Listing).filter(
+    query = db.query(Listing).filter(
         Listing.creator_id == user_id,
         Listing.status != ListingStatus.ARCHIVED
-    ).all()
-    return listings
+    )
+    return _paginate(query, sort, page)
 
 @router.patch("/update/{listing_id}", response_model=Listing)
 async def update_listing(
@@ -281,6 +454,13 @@ async def update_listing(
     db.add(listing)
     db.commit()
     db.refresh(listing)
+    
+    if listing.status == ListingStatus.ACTIVE:
+        await score_service.index_listing(listing.id, listing.category, listing.tier)
+    else:
+        await score_service.remove_listing(listing.id)
+    await search_service.index_listing(db, listing)
+    await tier_access.invalidate_listing(listing.id)
     return listing
 
 @router.delete("/archive/{listing_id}", response_model=Listing)
@@ -309,47 +489,74 @@ async def archive_listing(
     db.add(listing)
     db.commit()
     db.refresh(listing)
+    await score_service.remove_listing(listing.id)
+    await search_service.remove_listing(db, listing.id)
     return listing
 
-@router.get("/category/{category}", response_model=List[Listing])
+@router.get("/category/{category}", response_model=Page)
 async def get_listings_by_category(
     category: str,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    sort: ListingSort = ListingSort.TOP,
+    page: PageParams = Depends()
 ):
-    """Get all public listings in a specific category"""
-    listings = db.query(Listing).filter(
+    """Get public listings in a specific category, one page at a time"""
+    query = db.query(Listing).filter(
         Listing.category == category,
-        Listing.status == ListingStatus.PUBLISHED
-    ).all()
-    return listings
+        Listing.status == ListingStatus.ACTIVE
+    )
+    return _paginate(query, sort, page)
 
-@router.get("/search", response_model=List[Listing])
-async def search_listings(
-    *,
-    db: Session = Depends(get_db),
-    category: str = None,
-    min_score: float = None,
-    max_score: float = None,
-    tier: int = None
-):
-    """Search listings with filters"""
-    query = db.query(Listing).filter(Listing.status == ListingStatus.PUBLISHED)
+def _search(db: Session, q: str, category, tier, min_score, max_score, page: PageParams) -> Page:
+    """Return one relevance-ranked page of a text search with category/tier facets."""
+    fields = parse_fields(page.fields, LISTING_FIELDS, required=["id"])
     
-    if category:
-        query = query.filter(Listing.category == category)
-    if min_score is not None:
-        query = query.filter(Listing.quantum_score >= min_score)
-    if max_score is not None:
-        query = query.filter(Listing.quantum_score <= max_score)
-    if tier is not None:
-        query = query.filter(Listing.tier == tier)
-        
-    return query.all()
+    # Relevance order has no stable sort key, so the cursor carries an offset
+    offset = 0
+    if page.cursor:
+        offset, _ = decode_cursor(page.cursor, "relevance")
+        if not isinstance(offset, int) or offset < 0:
+            raise HTTPException(status_code=400, detail="Invalid cursor: bad offset")
+    
+    try:
+        result = search_service.search(
+            db, q,
+            category=category,
+            tier=tier,
+            min_score=min_score,
+            max_score=max_score,
+            limit=page.limit,
+            offset=offset
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to search listings: {str(e)}")
+    
+    rows = (
+        db.query(Listing)
+        .filter(Listing.id.in_(result.ids))
+        .with_entities(*[getattr(Listing, f) for f in fields])
+        .all()
+    ) if result.ids else []
+    by_id = {row.id: dict(row._mapping) for row in rows}
+    
+    # Category facet counts already apply every other filter
+    total_estimate = None
+    if page.include_total:
+        counts = result.facets.get("category", {})
+        total_estimate = counts.get(str(category), 0) if category else sum(counts.values())
+    
+    return Page(
+        items=[by_id[i] for i in result.ids if i in by_id],
+        next_cursor=encode_cursor("relevance", offset + page.limit, None) if result.has_more else None,
+        total_estimate=total_estimate,
+        facets=result.facets
+    )
 
 @router.put("/{listing_id}/file")
 async def update_listing_file(
     listing_id: str,
     file: UploadFile = File(...),
+    resume_token: Optional[str] = Form(None),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -364,14 +571,12 @@ async def update_listing_file(
         raise HTTPException(status_code=403, detail="Not authorized to update this listing")
     
     try:
-        # Delete old file from S3
-        if listing.s3_file_key:
-            await delete_from_s3(listing.s3_file_key)
-        
-        # Upload new file to S3
-        file_key = await upload_to_s3(file, f"listings/{current_user.id}")
+        # Upload new file to S3 (deduplicated)
+        blob = await _store_listing_file(file, resume_token, current_user)
+        file_key = blob.key
         
         # Update listing with new file info
+        old_file_key = listing.s3_file_key
         listing.file_path = get_s3_url(file_key)
         listing.s3_file_key = file_key
         listing.updated_at = datetime.utcnow()
@@ -379,9 +584,19 @@ async def update_listing_file(
         db.commit()
         db.refresh(listing)
         
+        # Only drop the old file once the listing points at the new one, so an
+        # interrupted upload leaves the listing intact
+        if old_file_key:
+            await blob_store.release_key(old_file_key)
+        
+        await payload_manifest.build_manifest(listing.id)
+        
         return listing
+    except HTTPException:
+        # Upload errors (including a resume_token) pass through unchanged
+        raise
     except Exception as e:
-        # Clean up S3 file if database operation fails
+        # Drop the new reference if the database operation fails
         if 'file_key' in locals():
-            await delete_from_s3(file_key)
+            await blob_store.release_key(file_key)
         raise HTTPException(status_code=400, detail=str(e)) 
\ No newline at end of file
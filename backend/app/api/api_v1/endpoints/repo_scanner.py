@@ -1,65 +1,72 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, status
+from fastapi.responses import StreamingResponse
 from typing import Optional, List
 from pydantic import BaseModel
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
 
 from app.core.auth import get_current_active_user
 from app.models.user import User
-from app.models.repo_scanner import RepoAnalysis, RepoSource
+from app.models.repo_scanner import RepoAnalysis, RepoSource, ScanJob
+from app.services.repo_cache import RepoCache
 from app.services.repo_scanner import RepoScanner
+from app.services.scan_jobs import ScanJobService
 
 router = APIRouter()
-scanner = RepoScanner()
+scanner = RepoScanner(repo_cache=RepoCache())
+scan_jobs = ScanJobService(scanner)
 
 class ScanGitHubRequest(BaseModel):
     repo_url: str
 
-@router.post("/scan/github", response_model=RepoAnalysis)
-async def scan_github_repository(
-    request: ScanGitHubRequest,
-    current_user: User = Depends(get_current_active_user)
-) -> RepoAnalysis:
-    """Scan a GitHub repository and generate listing suggestions."""
+async def _submit(submit, *args) -> ScanJob:
+    """Queue a scan job, mapping the per-user pending limit to a 429."""
     try:
-        return await scanner.scan_github_repo(request.repo_url)
+        return await submit(*args)
+    except OverflowError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
-            detail=f"Failed to scan repository: {str(e)}"
+            detail=f"Failed to queue scan: {str(e)}"
         )
 
-@router.post("/scan/upload", response_model=RepoAnalysis)
+@router.post("/scan/github", response_model=ScanJob, status_code=status.HTTP_202_ACCEPTED)
+async def scan_github_repository(
+    request: ScanGitHubRequest,
+    current_user: User = Depends(get_current_active_user)
+) -> ScanJob:
+    """Queue a scan of a GitHub repository; poll or stream the returned job."""
+    return await _submit(scan_jobs.submit_github, str(current_user.id), request.repo_url)
+
+@router.post("/scan/upload", response_model=ScanJob, status_code=status.HTTP_202_ACCEPTED)
 async def scan_uploaded_repository(
     file: UploadFile = File(...),
     current_user: User = Depends(get_current_active_user)
-) -> RepoAnalysis:
-    """Scan an uploaded repository (zip file) and generate listing suggestions."""
+) -> ScanJob:
+    """Queue a scan of an uploaded repository (zip file)."""
     if not file.filename.endswith('.zip'):
         raise HTTPException(
             status_code=400,
             detail="Only ZIP files are supported"
         )
         
-    try:
-        # Create temporary directory for the upload
-        import tempfile
-        import os
-        import zipfile
-        import shutil
+    def save() -> tuple:
+        # Copy out of the request's spool (closed after the response) while
+        # hashing, so identical uploads hit the result cache
+        fd, zip_path = tempfile.mkstemp(suffix='.zip')
+        digest = hashlib.sha256()
+        with os.fdopen(fd, 'wb') as out:
+            for chunk in iter(lambda: file.file.read(1024 * 1024), b''):
+                digest.update(chunk)
+                out.write(chunk)
+        return zip_path, digest.hexdigest()
         
-        with tempfile.TemporaryDirectory() as temp_dir:
-            zip_path = os.path.join(temp_dir, file.filename)
-            
-            # Save uploaded file
-            with open(zip_path, 'wb') as f:
-                shutil.copyfileobj(file.file, f)
-                
-            # Extract zip
-            extract_path = os.path.join(temp_dir, 'repo')
-            with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                zip_ref.extractall(extract_path)
-                
-            # Scan the extracted repository
-            return await scanner.scan_local_repo(extract_path)
+    try:
+        zip_path, zip_sha256 = await asyncio.to_thread(save)
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -67,23 +74,52 @@ async def scan_uploaded_repository(
         )
     finally:
         file.file.close()
+    
+    return await _submit(scan_jobs.submit_upload, str(current_user.id), file.filename, zip_path, zip_sha256)
 
-@router.post("/scan/local", response_model=RepoAnalysis)
+@router.post("/scan/local", response_model=ScanJob, status_code=status.HTTP_202_ACCEPTED)
 async def scan_local_repository(
     path: str,
     current_user: User = Depends(get_current_active_user)
-) -> RepoAnalysis:
-    """Scan a local repository path and generate listing suggestions."""
+) -> ScanJob:
+    """Queue a scan of a local repository path."""
     if not os.path.exists(path):
         raise HTTPException(
             status_code=404,
             detail="Repository path not found"
         )
         
-    try:
-        return await scanner.scan_local_repo(path)
-    except Exception as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to scan repository: {str(e)}"
-        ) 
\ No newline at end of file
+    return await _submit(scan_jobs.submit_local, str(current_user.id), path)
+
+async def _get_own_job(job_id: str, current_user: User) -> ScanJob:
+    job = await scan_jobs.get(job_id)
+    if job is None or job.user_id != str(current_user.id):
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return job
+
+@router.get("/scan/jobs/{job_id}", response_model=ScanJob)
+async def get_scan_job(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user)
+) -> ScanJob:
+    """Get a scan job's status, progress and (once completed) its RepoAnalysis."""
+    return await _get_own_job(job_id, current_user)
+
+@router.get("/scan/jobs/{job_id}/events")
+async def stream_scan_job(
+    job_id: str,
+    current_user: User = Depends(get_current_active_user)
+) -> StreamingResponse:
+    """Stream a scan job's progress as server-sent events until it finishes."""
+    await _get_own_job(job_id, current_user)
+    
+    async def event_stream():
+        async for job in scan_jobs.events(job_id):
+            # Progress only; fetch the job for the full result
+            yield f"event: {job.status.value}\ndata: {job.json(exclude={'result'})}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
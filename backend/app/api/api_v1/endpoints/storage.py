@@ -0,0 +1,60 @@
+from fastapi import APIRouter, HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from typing import Optional
+import hashlib
+import os
+
+from app.utils.object_store import LocalObjectStore, run_io
+from app.utils.storage import object_store
+
+router = APIRouter()
+
+# Presigned URLs from LocalObjectStore point here. These routes stand in for
+# S3 in development and offline tests and refuse to serve otherwise.
+
+def _local_store() -> LocalObjectStore:
+    if not isinstance(object_store, LocalObjectStore):
+        raise HTTPException(status_code=404, detail="Local storage is not enabled")
+    return object_store
+
+@router.get("/local/{key:path}")
+async def get_local_object(key: str, expires: int, signature: str):
+    """Serve an object through a presigned local GET URL."""
+    store = _local_store()
+    if not store.verify("GET", key, expires, signature):
+        raise HTTPException(status_code=403, detail="Invalid or expired signature")
+
+    path = store.path(key)
+    if not os.path.isfile(path):
+        raise HTTPException(status_code=404, detail="Object not found")
+    return FileResponse(path)
+
+@router.put("/local/{key:path}")
+async def put_local_object(
+    key: str,
+    request: Request,
+    expires: int,
+    signature: str,
+    sha256: str,
+    upload_id: Optional[str] = None,
+    part_number: Optional[str] = None
+):
+    """Accept an object or part through a presigned local PUT URL."""
+    store = _local_store()
+    conditions = {"sha256": sha256}
+    if upload_id is not None:
+        conditions.update(upload_id=upload_id, part_number=part_number)
+    if not store.verify("PUT", key, expires, signature, **conditions):
+        raise HTTPException(status_code=403, detail="Invalid or expired signature")
+
+    data = await request.body()
+    # Same rule S3 applies to a presigned x-amz-checksum-sha256
+    if await run_io(lambda: hashlib.sha256(data).hexdigest()) != sha256:
+        raise HTTPException(status_code=400, detail="Body does not match the signed checksum")
+
+    if upload_id is not None:
+        etag = await store.upload_part(key, upload_id, int(part_number), data)
+    else:
+        await store.put(key, data)
+        etag = hashlib.md5(data).hexdigest()
+    return Response(status_code=200, headers={"ETag": f'"{etag}"'})
@@ -0,0 +1,53 @@
+"""
+Shared asyncio Redis clients.
+
+Every service gets its client from `get_redis`, which hands out one pooled
+`redis.asyncio` client per URL for the whole process instead of opening a
+connection (or a blocking client) per service instance.
+"""
+from typing import Dict, Optional
+import os
+import redis.asyncio as redis
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379")
+REDIS_MAX_CONNECTIONS = int(os.getenv("REDIS_MAX_CONNECTIONS", "64"))
+REDIS_POOL_TIMEOUT = float(os.getenv("REDIS_POOL_TIMEOUT", "5"))  # wait for a free connection
+REDIS_SOCKET_TIMEOUT = float(os.getenv("REDIS_SOCKET_TIMEOUT", "5"))
+REDIS_CONNECT_TIMEOUT = float(os.getenv("REDIS_CONNECT_TIMEOUT", "2"))
+REDIS_HEALTH_CHECK_INTERVAL = int(os.getenv("REDIS_HEALTH_CHECK_INTERVAL", "30"))
+
+_clients: Dict[str, redis.Redis] = {}
+
+def get_redis(url: Optional[str] = None) -> redis.Redis:
+    """Get the process-wide pooled client for a Redis URL."""
+    url = url or REDIS_URL
+    if url not in _clients:
+        pool = redis.BlockingConnectionPool.from_url(
+            url,
+            max_connections=REDIS_MAX_CONNECTIONS,
+            timeout=REDIS_POOL_TIMEOUT,
+            socket_timeout=REDIS_SOCKET_TIMEOUT,
+            socket_connect_timeout=REDIS_CONNECT_TIMEOUT,
+            socket_keepalive=True,
+            health_check_interval=REDIS_HEALTH_CHECK_INTERVAL,
+            retry_on_timeout=True,
+            decode_responses=True
+        )
+        _clients[url] = redis.Redis(connection_pool=pool)
+    return _clients[url]
+
+async def check_redis(url: Optional[str] = None) -> bool:
+    """Health check for readiness probes."""
+    try:
+        return await get_redis(url).ping()
+    except redis.RedisError:
+        return False
+
+async def close_redis() -> None:
+    """Close all pooled connections (call on application shutdown)."""
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
+
+# Default client, for modules that just need "the" Redis
+redis_client = get_redis()
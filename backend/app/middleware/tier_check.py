@@ -1,11 +1,16 @@
-from fastapi import HTTPException, Depends, status
-from typing import Optional
+from fastapi import HTTPException, Depends, Query, status
+from typing import Dict, List, Optional
 from app.core.auth import get_current_active_user
 from app.models.user import User
-from app.models.listing import Listing
+from app.models.tier_access import TierDecision
 from app.db.session import get_db
+from app.services.tier_access import TierAccessService
 from sqlalchemy.orm import Session
 
+# Shared by every gated route; call tier_access.invalidate_listing/_user
+# when a listing's tier or a user's subscription or quantum score changes
+tier_access = TierAccessService()
+
 async def check_tier_access(
     listing_id: str,
     user: Optional[User] = Depends(get_current_active_user),
@@ -15,62 +20,27 @@ async def check_tier_access(
     Check if a user has sufficient tier access for a listing.
     Returns True if access is granted, raises HTTPException if denied.
     """
-    listing = db.query(Listing).filter(Listing.id == listing_id).first()
-    if not listing:
+    decision = await tier_access.check(db, listing_id, user)
+    if decision is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Listing not found"
         )
-
-    # Always allow access to Tier 1 listings
-    if listing.glyph_tier == 1:
-        return True
-
-    # Must be logged in for Tier 2+
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail={
-                "message": "Authentication required for this content",
-                "required_tier": listing.glyph_tier,
-                "upgrade_options": ["login", "create_account"]
-            }
-        )
-
-    # Tier 2 Access Rules
-    if listing.glyph_tier == 2:
-        if user.is_creator or user.subscription_status == "active":
-            return True
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail={
-                "message": "Creator status or paid account required",
-                "required_tier": 2,
-                "current_tier": 1,
-                "upgrade_options": ["become_creator", "subscribe"]
-            }
-        )
-
-    # Tier 3 Access Rules
-    if listing.glyph_tier == 3:
-        if user.is_admin:
-            return True
-        if user.quantum_score >= 75:  # Threshold for Tier 3
-            return True
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail={
-                "message": "Advanced access required",
-                "required_tier": 3,
-                "current_tier": 2 if user.is_creator else 1,
-                "quantum_score": user.quantum_score,
-                "required_score": 75,
-                "upgrade_options": ["increase_quantum_score", "request_admin_override"]
-            }
-        )
-
+    if not decision.granted:
+        raise HTTPException(status_code=decision.status_code, detail=decision.detail)
     return True
 
+async def check_tier_access_bulk(
+    listing_ids: List[str] = Query(...),
+    user: Optional[User] = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+) -> Dict[str, TierDecision]:
+    """
+    Decide tier access for a page of listings at once, for catalog rendering.
+    Never raises for denials; unknown listing ids are omitted.
+    """
+    return await tier_access.check_many(db, listing_ids, user)
+
 def simulate_tier_check(
     required_tier: int,
     user_tier: int,
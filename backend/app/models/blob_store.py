@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+
+# Content-addressed objects live at blobs/sha256/<first two hex>/<digest>
+BLOB_PREFIX = "blobs/sha256"
+
+class BlobRef(BaseModel):
+    sha256: str
+    size: int
+    key: str  # Object storage key holding the bytes
+    deduplicated: bool = False  # True when the bytes were already stored
+
+class BlobGCResult(BaseModel):
+    scanned: int = 0
+    deleted: int = 0
+    revived: int = 0  # Orphans that gained a reference before the sweep reached them
+    failed: int = 0  # Deletes that failed; requeued for the next sweep
+    bytes_reclaimed: int = 0
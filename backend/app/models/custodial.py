@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Dict, List, Optional
 from enum import Enum
 
 class CustodialStatus(str, Enum):
@@ -15,6 +15,18 @@ class CustodialCriteria(BaseModel):
     min_sales_count: int = Field(5, ge=1)
     min_active_users: int = Field(10, ge=1)
 
+class CustodialSweepResult(BaseModel):
+    dry_run: bool
+    scanned: int = 0  # Active listings examined
+    eligible: int = 0  # Listings meeting the criteria
+    converted: int = 0  # Listings actually converted (always 0 on a dry run)
+    batches: int = 0
+    last_listing_id: Optional[str] = None  # Checkpoint: the sweep resumes after this id
+    resumed: bool = False
+    completed: bool = False  # False if the run stopped at max_batches
+    timings: Dict[str, float] = Field(default_factory=dict)  # Seconds per phase
+    converted_ids: List[str] = Field(default_factory=list)  # This run only
+
 class CustodialMetadata(BaseModel):
     status: CustodialStatus
     original_owner_id: str
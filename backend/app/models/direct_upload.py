@@ -0,0 +1,36 @@
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+from datetime import datetime
+
+from app.models.listing import ListingCategory, ListingTier
+
+class DirectUploadRequest(BaseModel):
+    filename: str
+    size: int = Field(gt=0)
+    sha256: str  # Hex digest of the whole file
+    # For files uploaded in parts: hex digest of each part, in order. Every
+    # part but the last must be exactly part_size bytes.
+    part_sha256s: Optional[List[str]] = None
+    part_size: Optional[int] = None
+
+class DirectUpload(BaseModel):
+    session_id: str
+    expires_at: datetime
+    # Exactly one of these is set: PUT the whole file to `url` (with an
+    # x-amz-checksum-sha256 header), or PUT part i to `part_urls[i - 1]`
+    url: Optional[str] = None
+    part_urls: Optional[List[str]] = None
+    part_size: Optional[int] = None
+
+class DirectUploadComplete(BaseModel):
+    title: str
+    description: str
+    category: ListingCategory
+    price: float = Field(ge=0)
+    tier: ListingTier = ListingTier.BASIC
+    # ETag returned by each part PUT, keyed by part number (multipart only)
+    parts: Optional[Dict[int, str]] = None
+
+class SignedURL(BaseModel):
+    url: str
+    expires_at: datetime
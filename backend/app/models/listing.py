@@ -23,6 +23,12 @@ class ListingCategory(str, Enum):
     PLUGIN = "plugin"
     OTHER = "other"
 
+class ListingSort(str, Enum):
+    # Values are the listing column each order sorts by (descending)
+    NEWEST = "created_at"
+    TOP = "quantum_score"
+    UPDATED = "updated_at"
+
 class InvocationType(str, Enum):
     RUN_ONLY = "run_only"  # Execute in sandbox only
     EMBED_ALLOWED = "embed_allowed"  # Can be embedded in other applications
@@ -45,6 +51,14 @@ class InvocationKey(BaseModel):
     license_tier: LicenseTier
     is_active: bool = True
 
+class KeyValidationResult(str, Enum):
+    VALID = "valid"
+    NOT_FOUND = "not_found"
+    LISTING_MISMATCH = "listing_mismatch"  # Key was issued for another listing
+    INACTIVE = "inactive"  # Revoked or previously exhausted
+    EXPIRED = "expired"
+    QUOTA_EXCEEDED = "quota_exceeded"  # max_invocations reached
+
 class InvocationEvent(BaseModel):
     event_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     key_id: str
@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field
+from typing import Dict, Optional
+from datetime import datetime
+
+# Payload types an invocation can request, and the file each maps to
+PAYLOAD_FILES = {
+    'runtime': 'runtime.py',
+    'module': 'module.py',
+    'script': 'script.py'
+}
+
+class PayloadEntry(BaseModel):
+    path_type: str
+    path: str  # Absolute path in secure storage
+    size: int
+    sha256: str
+    mtime: float
+    mtime_ns: int = 0  # Exact mtime, to detect in-place rewrites
+    object_key: Optional[str] = None  # Copy in object storage, for signed download URLs
+    mirror_pending: bool = False  # Changed where no object store was configured; the watcher uploads it
+
+class PayloadManifest(BaseModel):
+    listing_id: str
+    entries: Dict[str, PayloadEntry] = {}
+    built_at: datetime = Field(default_factory=datetime.utcnow)
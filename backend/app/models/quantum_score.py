@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field
+from enum import Enum
+
+class EventResolution(str, Enum):
+    RAW = "raw"  # Individual events
+    MINUTE = "minute"
+    HOUR = "hour"
+    DAY = "day"
+
+# Bucket width in seconds for each rollup tier
+RESOLUTION_SECONDS = {
+    EventResolution.MINUTE: 60,
+    EventResolution.HOUR: 3600,
+    EventResolution.DAY: 86400
+}
+
+class EventRetention(BaseModel):
+    raw_seconds: int = Field(24 * 3600, ge=60)  # 1 day of individual events
+    minute_seconds: int = Field(2 * 24 * 3600, ge=3600)  # 2 days of minute buckets
+    hour_seconds: int = Field(90 * 24 * 3600, ge=86400)  # 90 days of hour buckets
+    day_seconds: int = Field(2 * 365 * 24 * 3600, ge=86400)  # 2 years of day buckets
+
+    def for_resolution(self, resolution: EventResolution) -> int:
+        """Get the retention window for a tier, in seconds."""
+        return getattr(self, f"{resolution.value}_seconds")
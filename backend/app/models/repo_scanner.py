@@ -1,5 +1,6 @@
 from pydantic import BaseModel, Field
 from typing import List, Dict, Optional
+from datetime import datetime
 from enum import Enum
 
 class RepoSource(str, Enum):
@@ -36,5 +37,33 @@ class RepoAnalysis(BaseModel):
     language_breakdown: Dict[str, float]  # percentage of each language
     package_groups: List[PackageGroup]
     listing_suggestions: List[ListingSuggestion]
+    commit_sha: Optional[str] = None  # Scanned commit, for GitHub scans
     analysis_timestamp: str
-    scan_duration_ms: int 
\ No newline at end of file
+    scan_duration_ms: int 
+
+class ScanJobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+class ScanProgress(BaseModel):
+    phase: str = "queued"  # queued, cloning, walking, reading, analyzing, done
+    files_scanned: int = 0
+    files_total: int = 0
+    bytes_scanned: int = 0
+
+class ScanJob(BaseModel):
+    job_id: str
+    user_id: str
+    source: RepoSource
+    target: str  # Repository URL, local path or uploaded file name
+    status: ScanJobStatus = ScanJobStatus.QUEUED
+    progress: ScanProgress = Field(default_factory=ScanProgress)
+    cached: bool = False  # Result served from the (repo, commit) cache
+    error: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    result: Optional[RepoAnalysis] = None
+
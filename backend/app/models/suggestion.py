@@ -0,0 +1,34 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+from app.models.repo_scanner import PackageGroup
+
+class SuggestionRequest(BaseModel):
+    description: str
+    template: Optional[str] = None
+
+class Suggestion(BaseModel):
+    tags: List[str]
+    category: str
+    glyphTier: int
+    suggestedPrice: float
+    sampleName: Optional[str]
+    sampleBlurb: Optional[str]
+    confidence: float
+
+class BatchSuggestionItem(BaseModel):
+    # Exactly one of description and package_group
+    description: Optional[str] = None
+    package_group: Optional[PackageGroup] = None
+    template: Optional[str] = None
+
+class BatchSuggestionRequest(BaseModel):
+    items: List[BatchSuggestionItem]
+
+class BatchSuggestionResult(BaseModel):
+    index: int  # Position in the request
+    suggestion: Optional[Suggestion] = None
+    error: Optional[str] = None
+
+class BatchSuggestionResponse(BaseModel):
+    results: List[BatchSuggestionResult]  # Same order as the request items
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Any, Optional
+
+# Bump whenever the tier rules change, so decisions cached under the old
+# rules are never served again
+TIER_POLICY_VERSION = 1
+
+# Quantum score that unlocks Tier 3 listings
+TIER3_SCORE_THRESHOLD = 75
+
+class TierDecision(BaseModel):
+    listing_id: str
+    required_tier: int
+    granted: bool
+    status_code: Optional[int] = None  # HTTP status to deny with
+    detail: Optional[Any] = None  # HTTPException detail for the denial
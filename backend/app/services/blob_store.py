@@ -0,0 +1,293 @@
+from typing import Optional
+import hashlib
+import logging
+import time
+import uuid
+
+from fastapi import UploadFile
+
+from app.core.redis import get_redis
+from app.models.blob_store import BLOB_PREFIX, BlobGCResult, BlobRef
+from app.utils.object_store import ObjectStore, StreamingUploader, run_io
+
+BLOB_META_KEY = "blob:{sha}"  # hash: key, size, refs, created_at, state
+BLOB_ORPHANS_KEY = "blob_orphans"  # zset: sha -> time its refs reached zero
+
+HASH_CHUNK_SIZE = 4 * 1024 * 1024
+
+logger = logging.getLogger(__name__)
+
+# Takes a reference on an existing live blob. Returns its key and size, or
+# nothing when the blob is unknown or being garbage collected (the caller
+# then uploads the bytes itself).
+#
+# KEYS[1] blob meta hash, KEYS[2] orphans zset; ARGV[1] sha256
+ACQUIRE_SCRIPT = """
+local meta = redis.call('HMGET', KEYS[1], 'key', 'size', 'state')
+if not meta[1] or meta[3] == 'deleting' then
+    return nil
+end
+redis.call('HINCRBY', KEYS[1], 'refs', 1)
+redis.call('ZREM', KEYS[2], ARGV[1])
+return {meta[1], meta[2]}
+"""
+
+# Records a freshly uploaded blob with one reference. If another upload of
+# the same bytes registered first, takes a reference on that one instead and
+# returns its key so the caller can drop its own copy.
+#
+# KEYS[1] blob meta hash, KEYS[2] orphans zset
+# ARGV[1] sha256, ARGV[2] object key, ARGV[3] size, ARGV[4] now
+REGISTER_SCRIPT = """
+local meta = redis.call('HMGET', KEYS[1], 'key', 'state')
+if meta[1] and meta[2] ~= 'deleting' then
+    redis.call('HINCRBY', KEYS[1], 'refs', 1)
+    redis.call('ZREM', KEYS[2], ARGV[1])
+    return meta[1]
+end
+redis.call('DEL', KEYS[1])
+redis.call('HSET', KEYS[1], 'key', ARGV[2], 'size', ARGV[3], 'refs', 1, 'created_at', ARGV[4])
+redis.call('ZREM', KEYS[2], ARGV[1])
+return ARGV[2]
+"""
+
+# Drops one reference; a blob reaching zero refs is queued for GC rather
+# than deleted, so a re-publish shortly after a delete is still deduplicated.
+#
+# KEYS[1] blob meta hash, KEYS[2] orphans zset; ARGV[1] sha256, ARGV[2] now
+RELEASE_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return -1
+end
+local refs = redis.call('HINCRBY', KEYS[1], 'refs', -1)
+if refs <= 0 then
+    redis.call('HSET', KEYS[1], 'refs', 0)
+    redis.call('ZADD', KEYS[2], ARGV[2], ARGV[1])
+    return 0
+end
+return refs
+"""
+
+# Marks an orphan for deletion if it is still unreferenced. Returns its key,
+# size and orphaned-at score, or nothing if it was revived (or already
+# collected).
+#
+# KEYS[1] blob meta hash, KEYS[2] orphans zset; ARGV[1] sha256
+CLAIM_ORPHAN_SCRIPT = """
+local orphaned_at = redis.call('ZSCORE', KEYS[2], ARGV[1])
+if not orphaned_at then
+    return nil
+end
+redis.call('ZREM', KEYS[2], ARGV[1])
+local meta = redis.call('HMGET', KEYS[1], 'key', 'size', 'refs')
+if not meta[1] or tonumber(meta[3]) > 0 then
+    return nil
+end
+redis.call('HSET', KEYS[1], 'state', 'deleting')
+return {meta[1], meta[2], orphaned_at}
+"""
+
+# Puts back a claimed orphan whose object could not be deleted, so uploads
+# of the same bytes are accepted again and a later sweep retries it.
+#
+# KEYS[1] blob meta hash, KEYS[2] orphans zset
+# ARGV[1] sha256, ARGV[2] claimed object key, ARGV[3] orphaned-at score
+RESTORE_ORPHAN_SCRIPT = """
+local meta = redis.call('HMGET', KEYS[1], 'key', 'state')
+if meta[1] ~= ARGV[2] or meta[2] ~= 'deleting' then
+    return 0
+end
+redis.call('HDEL', KEYS[1], 'state')
+redis.call('ZADD', KEYS[2], ARGV[3], ARGV[1])
+return 1
+"""
+
+# Forgets a collected blob, unless a new upload re-registered it (under a
+# different key) while its old object was being deleted.
+#
+# KEYS[1] blob meta hash; ARGV[1] deleted object key
+FINALIZE_SCRIPT = """
+local meta = redis.call('HMGET', KEYS[1], 'key', 'state')
+if meta[1] == ARGV[1] and meta[2] == 'deleting' then
+    redis.call('DEL', KEYS[1])
+    return 1
+end
+return 0
+"""
+
+class BlobStoreService:
+    """
+    Content-addressed storage for listing files.
+
+    Bytes are stored once per SHA-256 under `blobs/sha256/...` with a
+    reference count in Redis. An upload whose hash is already stored is not
+    transferred at all; deleting a listing only drops a reference, and gc()
+    reclaims blobs that have stayed unreferenced past a grace period.
+    """
+
+    def __init__(self, store: ObjectStore, redis_url: Optional[str] = None):
+        self.store = store
+        self.uploader = StreamingUploader(store)
+        self.redis = get_redis(redis_url)
+        self._acquire_script = self.redis.register_script(ACQUIRE_SCRIPT)
+        self._register_script = self.redis.register_script(REGISTER_SCRIPT)
+        self._release_script = self.redis.register_script(RELEASE_SCRIPT)
+        self._claim_orphan_script = self.redis.register_script(CLAIM_ORPHAN_SCRIPT)
+        self._finalize_script = self.redis.register_script(FINALIZE_SCRIPT)
+        self._restore_orphan_script = self.redis.register_script(RESTORE_ORPHAN_SCRIPT)
+
+    async def put(self, file: UploadFile, resume_token: Optional[str] = None, owner: str = "") -> BlobRef:
+        """
+        Store an uploaded file and take one reference on its blob.
+
+        The request body is already spooled locally by the framework, so it
+        is hashed first and only sent to object storage if the blob is new.
+        """
+        size, sha256 = await self._hash_upload(file)
+
+        existing = await self.acquire(sha256)
+        if existing is not None:
+            return existing
+
+        # A blob mid-GC keeps its key until the delete finishes; upload
+        # beside it rather than racing the delete
+        key = self.blob_key(sha256)
+        if await self.exists(sha256):
+            key = f"{key}.{uuid.uuid4().hex[:8]}"
+
+        uploaded = await self.uploader.upload(file, key, resume_token=resume_token, owner=owner)
+        if uploaded.sha256 != sha256:
+            await self.store.delete(uploaded.key)
+            raise ValueError("File changed while it was being uploaded")
+        return await self.register(sha256, uploaded.key, uploaded.size)
+
+    async def acquire(self, sha256: str) -> Optional[BlobRef]:
+        """Take a reference on an already-stored blob, if there is one."""
+        found = await self._acquire_script(
+            keys=[BLOB_META_KEY.format(sha=sha256), BLOB_ORPHANS_KEY],
+            args=[sha256]
+        )
+        if not found:
+            return None
+        key, size = found
+        return BlobRef(sha256=sha256, size=int(size), key=key, deduplicated=True)
+
+    async def register(self, sha256: str, key: str, size: int) -> BlobRef:
+        """Record bytes just written to `key` as the blob for `sha256`, with one reference."""
+        stored_key = await self._register_script(
+            keys=[BLOB_META_KEY.format(sha=sha256), BLOB_ORPHANS_KEY],
+            args=[sha256, key, size, time.time()]
+        )
+        if stored_key != key:
+            # Lost a race with an identical upload; keep theirs
+            await self.store.delete(key)
+            return BlobRef(sha256=sha256, size=size, key=stored_key, deduplicated=True)
+        return BlobRef(sha256=sha256, size=size, key=key)
+
+    async def exists(self, sha256: str) -> bool:
+        """Whether the blob is known (live, orphaned or mid-GC)."""
+        return bool(await self.redis.exists(BLOB_META_KEY.format(sha=sha256)))
+
+    async def release(self, sha256: str) -> int:
+        """Drop one reference; returns the remaining count (-1 if the blob is unknown)."""
+        return await self._release_script(
+            keys=[BLOB_META_KEY.format(sha=sha256), BLOB_ORPHANS_KEY],
+            args=[sha256, time.time()]
+        )
+
+    async def release_key(self, key: str) -> bool:
+        """
+        Release the file behind a listing's storage key.
+
+        Keys from before content addressing are not shared, so they are
+        deleted outright as before.
+        """
+        sha256 = self.sha_from_key(key)
+        if sha256 is None:
+            return await self.store.delete(key)
+        await self.release(sha256)
+        return True
+
+    async def gc(self, grace_seconds: float = 24 * 3600, batch_size: int = 100,
+                 dry_run: bool = False) -> BlobGCResult:
+        """Delete blobs that have had no references for at least `grace_seconds`."""
+        result = BlobGCResult()
+        cutoff = time.time() - grace_seconds
+        failed = []
+
+        try:
+            await self._collect_orphans(result, cutoff, batch_size, dry_run, failed)
+        finally:
+            # Restored after the sweep so they aren't picked up again in this run
+            for sha256, key, orphaned_at in failed:
+                await self._restore_orphan_script(
+                    keys=[BLOB_META_KEY.format(sha=sha256), BLOB_ORPHANS_KEY],
+                    args=[sha256, key, orphaned_at]
+                )
+
+        return result
+
+    async def _collect_orphans(self, result: BlobGCResult, cutoff: float, batch_size: int,
+                               dry_run: bool, failed: list) -> None:
+        start = 0
+        while True:
+            orphans = await self.redis.zrangebyscore(
+                BLOB_ORPHANS_KEY, "-inf", cutoff, start=start, num=batch_size
+            )
+            if not orphans:
+                break
+            result.scanned += len(orphans)
+
+            if dry_run:
+                start += len(orphans)
+                for sha256 in orphans:
+                    size = await self.redis.hget(BLOB_META_KEY.format(sha=sha256), "size")
+                    result.bytes_reclaimed += int(size or 0)
+                continue
+
+            for sha256 in orphans:
+                meta_key = BLOB_META_KEY.format(sha=sha256)
+                claimed = await self._claim_orphan_script(keys=[meta_key, BLOB_ORPHANS_KEY], args=[sha256])
+                if not claimed:
+                    result.revived += 1
+                    continue
+                key, size, orphaned_at = claimed
+                try:
+                    # Stores report a missing object as not deleted; only an
+                    # object that is still there is a failure
+                    if not await self.store.delete(key) and await self.store.head(key) is not None:
+                        raise RuntimeError("object still present after delete")
+                except Exception as e:
+                    logger.error(f"Failed to delete blob {sha256} at {key}: {str(e)}")
+                    failed.append((sha256, key, orphaned_at))
+                    result.failed += 1
+                    continue
+                await self._finalize_script(keys=[meta_key], args=[key])
+                result.deleted += 1
+                result.bytes_reclaimed += int(size)
+
+    @staticmethod
+    def blob_key(sha256: str) -> str:
+        return f"{BLOB_PREFIX}/{sha256[:2]}/{sha256}"
+
+    @staticmethod
+    def sha_from_key(key: str) -> Optional[str]:
+        """The digest a content-addressed key was stored under, or None for legacy keys."""
+        if not key or not key.startswith(BLOB_PREFIX + "/"):
+            return None
+        return key.rsplit("/", 1)[-1].split(".", 1)[0]
+
+    @staticmethod
+    async def _hash_upload(file: UploadFile):
+        """Hash a spooled upload off the event loop and rewind it."""
+        def digest(f):
+            f.seek(0)
+            sha256 = hashlib.sha256()
+            size = 0
+            for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                sha256.update(block)
+                size += len(block)
+            f.seek(0)
+            return size, sha256.hexdigest()
+
+        return await run_io(digest, file.file)
@@ -1,118 +1,381 @@
 from datetime import datetime, timedelta
 from typing import List, Optional, Dict
+from dataclasses import dataclass
+import asyncio
+import json
+import logging
+import time
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
 from app.models.custodial import (
     CustodialStatus,
     CustodialCriteria,
     CustodialMetadata,
-    CustodialAsset
+    CustodialAsset,
+    CustodialSweepResult
 )
-from app.models.listing import Listing
+from app.models.listing import Listing, ListingStatus
 from app.core.config import NIBIRU_SYSTEM_ID
 from app.core.email import send_email_template
 from app.core.notifications import create_notification
+from app.core.redis import get_redis
 from enum import Enum
 
+logger = logging.getLogger(__name__)
+
+SWEEP_CHECKPOINT_KEY = "custodian:sweep:checkpoint"
+SWEEP_LOCK_KEY = "custodian:sweep:lock"
+SWEEP_LOCK_TTL = 600  # Refreshed after every chunk
+
+# Owner notifications sent at once after a batch commits
+NOTIFY_CONCURRENCY = 20
+
+# Listings in these states are never (re)converted
+EXCLUDED_STATUSES = "('custodial', 'recovery_requested')"
+
+# Precomputed per-owner last activity and per-listing sales/active users
+# (distinct buyers in the last 30 days), see migration 005. Refreshing
+# concurrently keeps them readable while they are rebuilt.
+STATS_VIEWS = ["owner_activity_stats", "listing_sales_stats"]
+
+# One keyset chunk of active listings joined with their precomputed
+# stats and filtered by CustodialCriteria; every join is a primary key
+# lookup, so each chunk costs the same however large the catalog is. The
+# bounds row comes back even when nothing in the chunk is eligible, so
+# the checkpoint can still advance.
+SWEEP_CHUNK_QUERY = f"""
+WITH chunk AS (
+    SELECT id, creator_id, title, quantum_score, custodial_metadata
+    FROM listings
+    WHERE status = :status AND id > :after
+    ORDER BY id
+    LIMIT :batch_size
+),
+bounds AS (
+    SELECT count(*) AS scanned, max(id) AS last_id FROM chunk
+),
+eligible AS (
+    SELECT c.id,
+           c.creator_id AS owner_id,
+           c.title,
+           u.email AS owner_email,
+           a.last_activity_at AS last_activity,
+           c.quantum_score,
+           coalesce(s.total_sales, 0) AS total_sales,
+           coalesce(s.active_users, 0) AS active_users
+    FROM chunk c
+    JOIN owner_activity_stats a ON a.owner_id = c.creator_id
+    LEFT JOIN users u ON u.id = c.creator_id
+    LEFT JOIN listing_sales_stats s ON s.listing_id = c.id
+    WHERE (c.custodial_metadata IS NULL
+           OR c.custodial_metadata->>'status' NOT IN {EXCLUDED_STATUSES})
+      AND a.last_activity_at <= :inactive_before
+      AND (c.quantum_score >= :min_quantum_score
+           OR coalesce(s.total_sales, 0) >= :min_sales
+           OR coalesce(s.active_users, 0) >= :min_active_users)
+)
+SELECT b.scanned, b.last_id, e.*
+FROM bounds b
+LEFT JOIN eligible e ON true
+ORDER BY e.id
+"""
+
+# Converts a whole batch in one statement. The status checks are repeated
+# so a listing converted or recovered since the chunk was read is skipped,
+# and so is one whose owner logged in or edited it since the stats refresh.
+CONVERT_BATCH_QUERY = f"""
+UPDATE listings AS l
+SET creator_id = :system_id,
+    custodial_metadata = v.metadata,
+    universal_access = true,
+    base_price = :base_price,
+    has_sigil = true,
+    donation_allocation = CAST(:donation_allocation AS jsonb),
+    custodial_message = :custodial_message
+FROM unnest(CAST(:ids AS text[]), CAST(:metadata AS jsonb[])) AS v(id, metadata)
+WHERE l.id = v.id
+  AND l.status = :status
+  AND (l.custodial_metadata IS NULL
+       OR l.custodial_metadata->>'status' NOT IN {EXCLUDED_STATUSES})
+  AND l.updated_at <= :inactive_before
+  AND NOT EXISTS (
+      SELECT 1 FROM users u
+      WHERE u.id = l.creator_id AND u.last_login_at > :inactive_before
+  )
+RETURNING l.id
+"""
+
+# A single listing's stored custodial state and precomputed stats
+LISTING_STATUS_QUERY = """
+SELECT l.creator_id,
+       l.quantum_score,
+       l.custodial_metadata,
+       coalesce(a.last_activity_at, l.updated_at) AS last_activity,
+       coalesce(s.total_sales, 0) AS total_sales,
+       coalesce(s.active_users, 0) AS active_users
+FROM listings l
+LEFT JOIN owner_activity_stats a ON a.owner_id = l.creator_id
+LEFT JOIN listing_sales_stats s ON s.listing_id = l.id
+WHERE l.id = :listing_id
+"""
+
 class RecoveryStep(str, Enum):
     REQUESTED = "requested"
     EMAIL_VERIFIED = "email_verified"
     GLYPH_CONFIRMED = "glyph_confirmed"
     COMPLETED = "completed"
 
+@dataclass
+class CustodialCandidate:
+    id: str
+    owner_id: str
+    title: str
+    owner_email: Optional[str]
+    last_activity: datetime
+    quantum_score: float
+    total_sales: int
+    active_users: int
+
 class CustodianService:
-    def __init__(self):
+    def __init__(self, redis_url: Optional[str] = None, batch_size: int = 1000):
         self.criteria = CustodialCriteria()
+        self.redis = get_redis(redis_url)
+        self.batch_size = batch_size
     
-    async def check_listings_for_custodianship(self) -> List[str]:
+    async def check_listings_for_custodianship(self, db: Session) -> List[str]:
         """
         Periodic check for listings that meet custodianship criteria.
         Returns list of listing IDs that were converted to custodial status.
         """
-        converted_listings = []
-        
-        # Get all active listings
-        active_listings = await self._get_active_listings()
-        
-        for listing in active_listings:
-            if await self._should_convert_to_custodial(listing):
-                await self._convert_to_custodial(listing)
-                converted_listings.append(listing.id)
-                
-        return converted_listings
-    
-    async def _should_convert_to_custodial(self, listing: Listing) -> bool:
-        """Check if a listing meets criteria for custodianship."""
-        # Skip if already custodial or in recovery
-        if hasattr(listing, 'custodial_metadata'):
-            if listing.custodial_metadata.status in [
-                CustodialStatus.CUSTODIAL,
-                CustodialStatus.RECOVERY_REQUESTED
-            ]:
-                return False
-        
-        # Get last activity timestamp
-        last_activity = await self._get_last_owner_activity(listing)
-        days_inactive = (datetime.utcnow() - last_activity).days
-        
-        # Get listing metrics
-        quantum_score = await self._get_quantum_score(listing)
-        sales_count = await self._get_sales_count(listing)
-        active_users = await self._get_active_users_count(listing)
-        
-        # Check against criteria
-        meets_criteria = (
-            days_inactive >= self.criteria.inactivity_threshold_days and
-            (quantum_score >= self.criteria.quantum_score_threshold or
-             sales_count >= self.criteria.min_sales_count or
-             active_users >= self.criteria.min_active_users)
+        result = await self.sweep(db)
+        return result.converted_ids
+
+    async def sweep(
+        self,
+        db: Session,
+        dry_run: bool = False,
+        resume: bool = True,
+        max_batches: Optional[int] = None,
+        batch_size: Optional[int] = None,
+        refresh_stats: bool = True
+    ) -> CustodialSweepResult:
+        """
+        Convert eligible active listings, one keyset chunk of listings at a time.
+
+        Each chunk is one query over the precomputed stats plus at most one
+        batched UPDATE, committed before the checkpoint advances, so an
+        interrupted sweep picks up after the last finished chunk (redoing a
+        chunk is harmless). A fresh sweep refreshes the stats first; the
+        activity cutoff is fixed then and kept in the checkpoint. A dry run
+        reads the stats as they are and writes nothing.
+        """
+        started = time.monotonic()
+        batch_size = batch_size or self.batch_size
+        timings = {"refresh": 0.0, "query": 0.0, "update": 0.0, "notify": 0.0}
+        result = CustodialSweepResult(dry_run=dry_run)
+
+        if not dry_run and not await self.redis.set(SWEEP_LOCK_KEY, "1", nx=True, ex=SWEEP_LOCK_TTL):
+            raise RuntimeError("A custodianship sweep is already running")
+        try:
+            checkpoint = await self._load_checkpoint() if resume else None
+            if checkpoint:
+                result.resumed = True
+                for field in ("scanned", "eligible", "converted", "batches"):
+                    setattr(result, field, checkpoint[field])
+                result.last_listing_id = checkpoint["after"]
+                inactive_before = datetime.fromisoformat(checkpoint["inactive_before"])
+            else:
+                if refresh_stats and not dry_run:
+                    t = time.monotonic()
+                    await asyncio.to_thread(self.refresh_stats, db)
+                    timings["refresh"] = time.monotonic() - t
+                inactive_before = datetime.utcnow() - timedelta(days=self.criteria.inactivity_threshold_days)
+
+            params = {
+                "status": ListingStatus.ACTIVE.value,
+                "after": result.last_listing_id or "",
+                "batch_size": batch_size,
+                "inactive_before": inactive_before,
+                "min_quantum_score": self.criteria.quantum_score_threshold,
+                "min_sales": self.criteria.min_sales_count,
+                "min_active_users": self.criteria.min_active_users
+            }
+            batches_run = 0
+            while max_batches is None or batches_run < max_batches:
+                t = time.monotonic()
+                rows = await asyncio.to_thread(self._fetch_chunk, db, params)
+                timings["query"] += time.monotonic() - t
+
+                scanned = rows[0]["scanned"]
+                if not scanned:
+                    result.completed = True
+                    break
+                candidates = [
+                    CustodialCandidate(**{k: row[k] for k in CustodialCandidate.__dataclass_fields__})
+                    for row in rows if row["id"] is not None
+                ]
+                batches_run += 1
+                result.batches += 1
+                result.scanned += scanned
+                result.eligible += len(candidates)
+                result.last_listing_id = params["after"] = rows[0]["last_id"]
+
+                if not dry_run:
+                    if candidates:
+                        t = time.monotonic()
+                        converted = await asyncio.to_thread(self._convert_batch, db, candidates, inactive_before)
+                        timings["update"] += time.monotonic() - t
+
+                        converted_candidates = [c for c in candidates if c.id in converted]
+                        result.converted += len(converted_candidates)
+                        result.converted_ids.extend(c.id for c in converted_candidates)
+
+                        t = time.monotonic()
+                        await self._notify_converted(converted_candidates)
+                        timings["notify"] += time.monotonic() - t
+                    await self._save_checkpoint(result, inactive_before)
+                    await self.redis.expire(SWEEP_LOCK_KEY, SWEEP_LOCK_TTL)
+
+                if scanned < batch_size:
+                    result.completed = True
+                    break
+
+            if result.completed and not dry_run:
+                await self.redis.delete(SWEEP_CHECKPOINT_KEY)
+        finally:
+            if not dry_run:
+                await self.redis.delete(SWEEP_LOCK_KEY)
+
+        timings["total"] = time.monotonic() - started
+        result.timings = {phase: round(seconds, 3) for phase, seconds in timings.items()}
+        logger.info(
+            f"Custodianship sweep{' (dry run)' if dry_run else ''}: "
+            f"{result.scanned} scanned, {result.eligible} eligible, {result.converted} converted "
+            f"in {result.timings['total']}s"
         )
-        
-        if meets_criteria:
-            # Update status to eligible if not already
-            if not hasattr(listing, 'custodial_metadata'):
-                await self._mark_as_eligible(listing, last_activity)
-            return True
-            
-        return False
-    
-    async def _convert_to_custodial(self, listing: Listing):
-        """Convert a listing to custodial status."""
-        # Create custodial metadata
-        metadata = CustodialMetadata(
-            status=CustodialStatus.CUSTODIAL,
-            original_owner_id=listing.owner_id,
-            custodial_since=datetime.utcnow(),
-            last_owner_activity=await self._get_last_owner_activity(listing),
-            recovery_requested_at=None,
-            quantum_score=await self._get_quantum_score(listing),
-            total_sales=await self._get_sales_count(listing),
-            active_users=await self._get_active_users_count(listing)
+        return result
+
+    async def get_status(self, db: Session, listing_id: str) -> Optional[CustodialMetadata]:
+        """
+        Custodial state of a listing, from its stored metadata and the
+        precomputed stats; None if the listing does not exist.
+
+        Listings not held in custody report ACTIVE or ELIGIBLE against the
+        current criteria, as of the last stats refresh.
+        """
+        row = db.execute(text(LISTING_STATUS_QUERY), {"listing_id": listing_id}).mappings().first()
+        if row is None:
+            return None
+
+        stored = row["custodial_metadata"]
+        if stored and stored.get("status") in (CustodialStatus.CUSTODIAL, CustodialStatus.RECOVERY_REQUESTED):
+            return CustodialMetadata.parse_obj(stored)
+
+        inactive_before = datetime.utcnow() - timedelta(days=self.criteria.inactivity_threshold_days)
+        eligible = row["last_activity"] <= inactive_before and (
+            row["quantum_score"] >= self.criteria.quantum_score_threshold or
+            row["total_sales"] >= self.criteria.min_sales_count or
+            row["active_users"] >= self.criteria.min_active_users
         )
-        
-        # Create custodial asset
-        custodial_asset = CustodialAsset(
-            listing_id=listing.id,
-            metadata=metadata,
-            universal_access=True,
-            base_price=1.0,
-            has_sigil=True
+        return CustodialMetadata(
+            status=CustodialStatus.ELIGIBLE if eligible else CustodialStatus.ACTIVE,
+            original_owner_id=row["creator_id"],
+            custodial_since=None,
+            last_owner_activity=row["last_activity"],
+            recovery_requested_at=None,
+            quantum_score=row["quantum_score"],
+            total_sales=row["total_sales"],
+            active_users=row["active_users"]
         )
-        
-        # Update listing
-        await self._update_listing(listing.id, {
-            'owner_id': NIBIRU_SYSTEM_ID,
-            'custodial_metadata': metadata.dict(),
-            'universal_access': True,
-            'base_price': custodial_asset.base_price,
-            'has_sigil': True,
-            'donation_allocation': custodial_asset.donation_allocation,
-            'custodial_message': custodial_asset.custodial_message
-        })
-        
-        # Set up donation handling
-        await self._setup_donation_handling(listing.id)
-        
-        # Notify original owner
-        await self._notify_owner_of_custodianship(listing)
+
+    @staticmethod
+    def refresh_stats(db: Session) -> None:
+        """Rebuild the owner activity and listing sales views."""
+        for view in STATS_VIEWS:
+            db.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view}"))
+        db.commit()
+
+    async def reset_sweep(self) -> None:
+        """Forget the checkpoint so the next sweep starts from the first listing."""
+        await self.redis.delete(SWEEP_CHECKPOINT_KEY)
+
+    @staticmethod
+    def _fetch_chunk(db: Session, params: Dict) -> List[Dict]:
+        return db.execute(text(SWEEP_CHUNK_QUERY), params).mappings().all()
+
+    def _convert_batch(
+        self,
+        db: Session,
+        candidates: List[CustodialCandidate],
+        inactive_before: datetime
+    ) -> set:
+        """Convert a batch in one UPDATE and commit; returns the ids actually converted."""
+        now = datetime.utcnow()
+        metadata = [
+            CustodialMetadata(
+                status=CustodialStatus.CUSTODIAL,
+                original_owner_id=c.owner_id,
+                custodial_since=now,
+                last_owner_activity=c.last_activity,
+                recovery_requested_at=None,
+                quantum_score=c.quantum_score,
+                total_sales=c.total_sales,
+                active_users=c.active_users
+            )
+            for c in candidates
+        ]
+        # Everything but the metadata is the same for every conversion
+        asset = CustodialAsset(listing_id=candidates[0].id, metadata=metadata[0])
+        try:
+            converted = db.execute(text(CONVERT_BATCH_QUERY), {
+                "system_id": NIBIRU_SYSTEM_ID,
+                "status": ListingStatus.ACTIVE.value,
+                "inactive_before": inactive_before,
+                "ids": [c.id for c in candidates],
+                "metadata": [m.json() for m in metadata],
+                "base_price": asset.base_price,
+                "donation_allocation": json.dumps(asset.donation_allocation),
+                "custodial_message": asset.custodial_message
+            }).scalars().all()
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return set(converted)
+
+    async def _notify_converted(self, candidates: List[CustodialCandidate]) -> None:
+        """Set up donations and notify owners; a failure is logged, not retried."""
+        slots = asyncio.Semaphore(NOTIFY_CONCURRENCY)
+
+        async def notify(candidate: CustodialCandidate):
+            async with slots:
+                try:
+                    await self._setup_donation_handling(candidate.id)
+                    await self._notify_owner_of_custodianship(candidate)
+                except Exception as e:
+                    logger.error(f"Failed to notify owner of custodial listing {candidate.id}: {str(e)}")
+
+        await asyncio.gather(*(notify(c) for c in candidates))
+
+    async def _load_checkpoint(self) -> Optional[Dict]:
+        data = await self.redis.get(SWEEP_CHECKPOINT_KEY)
+        return json.loads(data) if data else None
+
+    async def _save_checkpoint(
+        self,
+        result: CustodialSweepResult,
+        inactive_before: datetime
+    ) -> None:
+        await self.redis.set(SWEEP_CHECKPOINT_KEY, json.dumps({
+            "after": result.last_listing_id,
+            "inactive_before": inactive_before.isoformat(),
+            "scanned": result.scanned,
+            "eligible": result.eligible,
+            "converted": result.converted,
+            "batches": result.batches
+        }))
     
     async def _setup_donation_handling(self, listing_id: str):
         """Configure donation handling for custodial listing."""
@@ -227,11 +490,6 @@ class CustodianService:
         pass
     
     # Database interaction methods (to be implemented)
-    async def _get_active_listings(self) -> List[Listing]:
-        """Get all active listings from database."""
-        # TODO: Implement database query
-        pass
-    
     async def _get_listing(self, listing_id: str) -> Optional[Listing]:
         """Get listing by ID from database."""
         # TODO: Implement database query
@@ -242,62 +500,26 @@ class CustodianService:
         # TODO: Implement database update
         pass
     
-    async def _get_last_owner_activity(self, listing: Listing) -> datetime:
-        """Get timestamp of last owner activity."""
-        # TODO: Implement activity check
-        pass
-    
-    async def _get_quantum_score(self, listing: Listing) -> float:
-        """Get current quantum score for listing."""
-        # TODO: Implement score calculation
-        pass
-    
-    async def _get_sales_count(self, listing: Listing) -> int:
-        """Get total sales count for listing."""
-        # TODO: Implement sales query
-        pass
-    
-    async def _get_active_users_count(self, listing: Listing) -> int:
-        """Get count of active users for listing."""
-        # TODO: Implement user count query
-        pass
-    
-    async def _mark_as_eligible(self, listing: Listing, last_activity: datetime):
-        """Mark listing as eligible for custodianship."""
-        metadata = CustodialMetadata(
-            status=CustodialStatus.ELIGIBLE,
-            original_owner_id=listing.owner_id,
-            custodial_since=None,
-            last_owner_activity=last_activity,
-            recovery_requested_at=None,
-            quantum_score=await self._get_quantum_score(listing),
-            total_sales=await self._get_sales_count(listing),
-            active_users=await self._get_active_users_count(listing)
-        )
-        
-        await self._update_listing(listing.id, {
-            'custodial_metadata': metadata.dict()
-        })
-    
-    async def _notify_owner_of_custodianship(self, listing: Listing):
+    async def _notify_owner_of_custodianship(self, listing: CustodialCandidate):
         """Send notification when listing enters custodianship."""
         # Email notification
-        await send_email_template(
-            template="custodial_status",
-            to_email=listing.owner.email,
-            context={
-                "listing_name": listing.name,
-                "custodial_date": datetime.utcnow().strftime("%Y-%m-%d"),
-                "recovery_link": f"/recover/{listing.id}"
-            }
-        )
+        if listing.owner_email:
+            await send_email_template(
+                template="custodial_status",
+                to_email=listing.owner_email,
+                context={
+                    "listing_name": listing.title,
+                    "custodial_date": datetime.utcnow().strftime("%Y-%m-%d"),
+                    "recovery_link": f"/recover/{listing.id}"
+                }
+            )
         
         # In-app notification
         await create_notification(
             user_id=listing.owner_id,
             type="custodial_status",
             title="Listing Now Under NIBIRU Protection",
-            message=f"Your listing '{listing.name}' is now under NIBIRU's protection.",
+            message=f"Your listing '{listing.title}' is now under NIBIRU's protection.",
             metadata={
                 "listing_id": listing.id,
                 "status": "custodial",
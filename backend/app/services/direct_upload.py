@@ -0,0 +1,160 @@
+from typing import Dict, Optional
+from datetime import datetime, timedelta
+import json
+import math
+import re
+import uuid
+
+from app.core.redis import get_redis
+from app.models.blob_store import BlobRef
+from app.models.direct_upload import DirectUpload, DirectUploadRequest, SignedURL
+from app.services.blob_store import BlobStoreService
+from app.utils.object_store import MIN_PART_SIZE, ObjectStore, composite_checksum, hex_to_b64
+
+UPLOAD_SESSION_KEY = "upload_session:{session_id}"
+
+# S3's limits for a single PUT and for the number of parts
+MAX_SINGLE_PUT_SIZE = 5 * 1024 ** 3
+MAX_PARTS = 10000
+
+SHA256_RE = re.compile(r"^[0-9a-f]{64}$")
+
+class DirectUploadService:
+    """
+    Presigned uploads and downloads that bypass the API workers.
+
+    A client asks for an upload session and PUTs the bytes straight to
+    object storage under a staging key, then calls complete(). Every URL is
+    signed with the SHA-256 the client declared (per part for multipart), so
+    storage itself rejects a body that does not match; complete() then
+    checks the size and checksum storage reports before moving the object
+    into the blob store under its whole-file SHA-256.
+
+    Storage has no full-object SHA-256 for multipart uploads, only a
+    composite of the part digests, so for those the whole-file SHA-256 is
+    the one the client declared alongside its parts. complete() never reads
+    the object back to hash it.
+    """
+
+    def __init__(self, store: ObjectStore, blob_store: BlobStoreService,
+                 redis_url: Optional[str] = None, url_ttl: int = 900):
+        self.store = store
+        self.blob_store = blob_store
+        self.redis = get_redis(redis_url)
+        self.url_ttl = url_ttl
+
+    async def create(self, user_id: str, request: DirectUploadRequest) -> DirectUpload:
+        """Open an upload session and presign its PUT URL(s)."""
+        digests = [request.sha256, *(request.part_sha256s or [])]
+        if not all(SHA256_RE.match(d) for d in digests):
+            raise ValueError("Digests must be lowercase hex SHA-256")
+
+        session_id = uuid.uuid4().hex
+        key = f"uploads/{user_id}/{session_id}"
+        expires_at = datetime.utcnow() + timedelta(seconds=self.url_ttl)
+        session = {
+            "user_id": user_id,
+            "key": key,
+            "filename": request.filename,
+            "size": request.size,
+            "sha256": request.sha256,
+        }
+
+        if request.part_sha256s and len(request.part_sha256s) > 1:
+            part_size = request.part_size or 0
+            if part_size < MIN_PART_SIZE:
+                raise ValueError(f"part_size must be at least {MIN_PART_SIZE} bytes")
+            if len(request.part_sha256s) != math.ceil(request.size / part_size):
+                raise ValueError("part_sha256s does not match size / part_size")
+            if len(request.part_sha256s) > MAX_PARTS:
+                raise ValueError(f"At most {MAX_PARTS} parts are allowed")
+
+            upload_id = await self.store.create_checked_multipart(key)
+            session.update(upload_id=upload_id, part_sha256s=request.part_sha256s)
+            upload = DirectUpload(
+                session_id=session_id,
+                expires_at=expires_at,
+                part_size=part_size,
+                part_urls=[
+                    self.store.presign_part(key, upload_id, n, self.url_ttl, sha256)
+                    for n, sha256 in enumerate(request.part_sha256s, start=1)
+                ]
+            )
+        else:
+            if request.size > MAX_SINGLE_PUT_SIZE:
+                raise ValueError("Files over 5 GiB must be uploaded in parts")
+            upload = DirectUpload(
+                session_id=session_id,
+                expires_at=expires_at,
+                url=self.store.presign_put(key, self.url_ttl, request.sha256)
+            )
+
+        # Outlive the URLs so an upload finishing at the deadline can complete
+        await self.redis.set(
+            UPLOAD_SESSION_KEY.format(session_id=session_id),
+            json.dumps(session),
+            ex=self.url_ttl + 3600
+        )
+        return upload
+
+    async def complete(self, user_id: str, session_id: str,
+                       parts: Optional[Dict[int, str]] = None) -> BlobRef:
+        """
+        Verify an uploaded object and take a blob reference on it.
+
+        Raises KeyError for an unknown session and ValueError when the object
+        is missing or does not match what was declared.
+        """
+        session_key = UPLOAD_SESSION_KEY.format(session_id=session_id)
+        data = await self.redis.get(session_key)
+        if not data:
+            raise KeyError("Upload session not found or expired")
+        session = json.loads(data)
+        if session["user_id"] != user_id:
+            raise KeyError("Upload session not found or expired")
+
+        key = session["key"]
+        part_sha256s = session.get("part_sha256s")
+        if part_sha256s:
+            if not parts or sorted(parts) != list(range(1, len(part_sha256s) + 1)):
+                raise ValueError("An ETag is required for every part")
+            await self.store.complete_multipart(
+                key, session["upload_id"], parts,
+                part_sha256s=dict(enumerate(part_sha256s, start=1))
+            )
+            # Storage checked each part against its declared digest; the
+            # composite confirms the object is exactly those parts, in order
+            expected = composite_checksum(part_sha256s)
+        else:
+            expected = hex_to_b64(session["sha256"])
+        blob_id = session["sha256"]
+
+        info = await self.store.head(key)
+        if info is None:
+            raise ValueError("Nothing was uploaded for this session")
+        if info.size != session["size"] or info.checksum_sha256 != expected:
+            await self._discard(key, session_key)
+            raise ValueError("Uploaded object does not match the declared size and checksum")
+
+        blob = await self.blob_store.acquire(blob_id)
+        if blob is None:
+            target = self.blob_store.blob_key(blob_id)
+            if await self.blob_store.exists(blob_id):
+                # Previous copy is being garbage collected; write beside it
+                target = f"{target}.{session_id[:8]}"
+            await self.store.copy(key, target)
+            blob = await self.blob_store.register(blob_id, target, info.size)
+        await self.store.delete(key)
+        await self.redis.delete(session_key)
+        return blob
+
+    async def _discard(self, key: str, session_key: str) -> None:
+        await self.store.delete(key)
+        await self.redis.delete(session_key)
+
+    def signed_get(self, key: str, filename: Optional[str] = None) -> SignedURL:
+        """A short-lived download URL for an object."""
+        return SignedURL(
+            url=self.store.presign_get(key, self.url_ttl, filename=filename),
+            expires_at=datetime.utcnow() + timedelta(seconds=self.url_ttl)
+        )
@@ -1,20 +1,82 @@
 from typing import Optional, List, Dict
-import redis
+import asyncio
 import json
 from datetime import datetime, timedelta
-from pathlib import Path
-import shutil
-import os
 import hashlib
-from fastapi import HTTPException
 
-from app.models.listing import InvocationKey, InvocationEvent, LicenseTier
-from app.core.config import settings
+from app.models.listing import InvocationKey, InvocationEvent, LicenseTier, KeyValidationResult
+from app.models.payload_manifest import PayloadEntry
+from app.core.redis import get_redis
+from app.services.payload_manifest import PayloadManifestService
+from app.utils.cache import TTLCache
+
+# Revocations are broadcast here so every worker drops its cached copy
+KEY_INVALIDATION_CHANNEL = "invocation_keys:invalidate"
+
+# Key attributes that never change after generation and are safe to cache
+# in-process. The counter and active flag always stay in Redis.
+IMMUTABLE_KEY_FIELDS = [
+    "key_id",
+    "listing_id",
+    "user_id",
+    "created_at",
+    "expires_at",
+    "max_invocations",
+    "license_tier"
+]
+
+# Validates a key and consumes one invocation atomically, so concurrent
+# invocations can neither both pass the quota check nor lose an increment.
+# Expired or exhausted keys are deactivated in place. On success the
+# invocation event is written to both event sets in the same call.
+#
+# KEYS[1] key hash, KEYS[2] key events zset, KEYS[3] listing events zset
+# ARGV[1] listing id, ARGV[2] current timestamp, ARGV[3] event json
+VALIDATE_KEY_SCRIPT = """
+local key = redis.call('HMGET', KEYS[1],
+    'listing_id', 'is_active', 'expires_at_ts', 'max_invocations', 'current_invocations')
+local now = tonumber(ARGV[2])
+
+if not key[1] then
+    return 'not_found'
+end
+if key[1] ~= ARGV[1] then
+    return 'listing_mismatch'
+end
+if key[2] ~= '1' then
+    return 'inactive'
+end
+
+local expires_at = tonumber(key[3])
+if expires_at and now > expires_at then
+    redis.call('HSET', KEYS[1], 'is_active', '0')
+    return 'expired'
+end
+
+local max_invocations = tonumber(key[4])
+if max_invocations and max_invocations > 0 and (tonumber(key[5]) or 0) >= max_invocations then
+    redis.call('HSET', KEYS[1], 'is_active', '0')
+    return 'quota_exceeded'
+end
+
+redis.call('HINCRBY', KEYS[1], 'current_invocations', 1)
+redis.call('ZADD', KEYS[2], now, ARGV[3])
+redis.call('ZADD', KEYS[3], now, ARGV[3])
+return 'valid'
+"""
 
 class InvocationService:
-    def __init__(self, redis_url: str = "redis://localhost:6379"):
-        self.redis = redis.Redis.from_url(redis_url, decode_responses=True)
-        self.secure_storage = Path(settings.SECURE_STORAGE_PATH)
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        key_cache_size: int = 10000,
+        key_cache_ttl: float = 300.0
+    ):
+        self.redis = get_redis(redis_url)
+        self._validate_key_script = self.redis.register_script(VALIDATE_KEY_SCRIPT)
+        self.key_cache = TTLCache(maxsize=key_cache_size, ttl=key_cache_ttl)
+        self._invalidation_task: Optional[asyncio.Task] = None
+        self.payload_manifest = PayloadManifestService(redis_url)
         
     async def generate_key(
         self,
@@ -44,35 +106,18 @@ class InvocationService:
         listing_id: str,
         user_id: str,
         ip_address: str
-    ) -> bool:
-        """Validate an invocation key and record the attempt."""
-        key_data = await self._get_key(key_id)
-        if not key_data:
-            return False
-            
-        key = InvocationKey(**key_data)
-        
-        # Check if key matches listing and is active
-        if not (key.listing_id == listing_id and key.is_active):
-            return False
-            
-        # Check expiration
-        if key.expires_at and datetime.utcnow() > key.expires_at:
-            key.is_active = False
-            await self._store_key(key)
-            return False
-            
-        # Check invocation limit
-        if key.max_invocations and key.current_invocations >= key.max_invocations:
-            key.is_active = False
-            await self._store_key(key)
-            return False
-            
-        # Record invocation
-        key.current_invocations += 1
-        await self._store_key(key)
+    ) -> KeyValidationResult:
+        """Validate an invocation key, consume one invocation and record the event.
+
+        Runs as a single atomic script (one round trip); returns the reason
+        the key was rejected, or VALID.
+        """
+        # Keys never move between listings, so a cached mismatch can be
+        # rejected without touching Redis
+        attributes = self.key_cache.get(key_id)
+        if attributes and attributes["listing_id"] != listing_id:
+            return KeyValidationResult.LISTING_MISMATCH
         
-        # Record event
         event = InvocationEvent(
             key_id=key_id,
             listing_id=listing_id,
@@ -81,9 +126,34 @@ class InvocationService:
             glyph_seed=self._generate_glyph_seed(key_id, ip_address),
             success=True
         )
-        await self._store_event(event)
         
-        return True
+        result = await self._validate_key_script(
+            keys=[
+                f"invocation_key:{key_id}",
+                f"invocation_events:{key_id}",
+                f"listing_events:{listing_id}"
+            ],
+            args=[
+                listing_id,
+                event.timestamp.timestamp(),
+                event.json()
+            ]
+        )
+        
+        return KeyValidationResult(result)
+    
+    async def get_payload(
+        self,
+        listing_id: str,
+        key_id: str,
+        path_type: str
+    ) -> Optional[PayloadEntry]:
+        """Get the manifest entry (path, size, hash) for a runtime payload."""
+        attributes = await self._get_key_attributes(key_id)
+        if not attributes or attributes["listing_id"] != listing_id:
+            return None
+        
+        return await self.payload_manifest.resolve(listing_id, path_type)
     
     async def get_payload_path(
         self,
@@ -92,31 +162,34 @@ class InvocationService:
         path_type: str
     ) -> Optional[str]:
         """Get secure path to runtime payload."""
-        key_data = await self._get_key(key_id)
-        if not key_data:
-            return None
-            
-        # Validate key and get listing data
-        # TODO: Get listing data from database
-        listing_path = self.secure_storage / listing_id
-        if not listing_path.exists():
-            return None
-            
-        # Map path type to actual file
-        path_map = {
-            'runtime': 'runtime.py',
-            'module': 'module.py',
-            'script': 'script.py'
-        }
+        payload = await self.get_payload(listing_id, key_id, path_type)
+        return payload.path if payload else None
+    
+    async def revoke_key(self, key_id: str) -> bool:
+        """Deactivate a key and drop it from every worker's cache."""
+        if not await self.redis.exists(f"invocation_key:{key_id}"):
+            return False
         
-        if path_type not in path_map:
-            return None
-            
-        file_path = listing_path / path_map[path_type]
-        if not file_path.exists():
-            return None
-            
-        return str(file_path)
+        pipe = self.redis.pipeline()
+        pipe.hset(f"invocation_key:{key_id}", "is_active", "0")
+        pipe.publish(KEY_INVALIDATION_CHANNEL, key_id)
+        await pipe.execute()
+        
+        self.key_cache.invalidate(key_id)
+        return True
+    
+    async def get_key_attributes(self, key_id: str) -> Optional[Dict[str, str]]:
+        """Get a key's immutable attributes (listing, holder, tier, expiry)."""
+        return await self._get_key_attributes(key_id)
+    
+    def get_cache_stats(self) -> Dict:
+        """Hit/miss metrics for the in-process key cache."""
+        return {
+            **self.key_cache.stats(),
+            "invalidation_listener": bool(
+                self._invalidation_task and not self._invalidation_task.done()
+            )
+        }
     
     async def get_key_info(self, key_id: str) -> Optional[Dict]:
         """Get information about an invocation key."""
@@ -141,35 +214,87 @@ class InvocationService:
     
     async def _store_key(self, key: InvocationKey) -> None:
         """Store key data in Redis."""
-        key_data = json.dumps(key.dict())
-        self.redis.set(f"invocation_key:{key.key_id}", key_data)
+        pipe = self.redis.pipeline()
+        pipe.delete(f"invocation_key:{key.key_id}")
+        pipe.hset(f"invocation_key:{key.key_id}", mapping=self._serialize_key(key))
+        await pipe.execute()
     
     async def _get_key(self, key_id: str) -> Optional[Dict]:
         """Retrieve key data from Redis."""
-        key_data = self.redis.get(f"invocation_key:{key_id}")
+        key_data = await self.redis.hgetall(f"invocation_key:{key_id}")
         if not key_data:
             return None
-        return json.loads(key_data)
+        return self._deserialize_key(key_data)
     
-    async def _store_event(self, event: InvocationEvent) -> None:
-        """Store invocation event in Redis."""
-        event_data = json.dumps(event.dict())
+    async def _get_key_attributes(self, key_id: str) -> Optional[Dict[str, str]]:
+        """Get a key's immutable attributes, from the local cache when possible."""
+        self._ensure_invalidation_listener()
         
-        # Store in time series
-        self.redis.zadd(
-            f"invocation_events:{event.key_id}",
-            {event_data: event.timestamp.timestamp()}
-        )
+        attributes = self.key_cache.get(key_id)
+        if attributes is None:
+            values = await self.redis.hmget(f"invocation_key:{key_id}", IMMUTABLE_KEY_FIELDS)
+            if values[0] is None:
+                # Don't cache misses; the key may be generated a moment later
+                return None
+            attributes = dict(zip(IMMUTABLE_KEY_FIELDS, values))
+            self.key_cache.set(key_id, attributes)
         
-        # Store in listing events
-        self.redis.zadd(
-            f"listing_events:{event.listing_id}",
-            {event_data: event.timestamp.timestamp()}
-        )
+        return attributes
+    
+    def _ensure_invalidation_listener(self) -> None:
+        """(Re)start the pub/sub listener that evicts revoked keys."""
+        if self._invalidation_task and not self._invalidation_task.done():
+            return
+        if self._invalidation_task is not None:
+            # Revocations may have been missed while the listener was down
+            self.key_cache.clear()
+        self._invalidation_task = asyncio.create_task(self._listen_for_invalidations())
+    
+    async def _listen_for_invalidations(self) -> None:
+        """Evict keys from the local cache as revocations are published."""
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(KEY_INVALIDATION_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    self.key_cache.invalidate(message["data"])
+        finally:
+            await pubsub.aclose()
+    
+    @staticmethod
+    def _serialize_key(key: InvocationKey) -> Dict[str, str]:
+        """Flatten a key into hash fields the validation script can read."""
+        return {
+            "key_id": key.key_id,
+            "listing_id": key.listing_id,
+            "user_id": key.user_id,
+            "created_at": key.created_at.isoformat(),
+            "expires_at": key.expires_at.isoformat() if key.expires_at else "",
+            "expires_at_ts": str(key.expires_at.timestamp()) if key.expires_at else "",
+            "max_invocations": str(key.max_invocations or ""),
+            "current_invocations": str(key.current_invocations),
+            "license_tier": key.license_tier.value,
+            "is_active": "1" if key.is_active else "0"
+        }
+    
+    @staticmethod
+    def _deserialize_key(key_data: Dict[str, str]) -> Dict:
+        """Turn hash fields back into InvocationKey kwargs."""
+        return {
+            "key_id": key_data["key_id"],
+            "listing_id": key_data["listing_id"],
+            "user_id": key_data["user_id"],
+            "created_at": datetime.fromisoformat(key_data["created_at"]),
+            "expires_at": datetime.fromisoformat(key_data["expires_at"]) if key_data.get("expires_at") else None,
+            "max_invocations": int(key_data["max_invocations"]) if key_data.get("max_invocations") else None,
+            "current_invocations": int(key_data.get("current_invocations") or 0),
+            "license_tier": key_data["license_tier"],
+            "is_active": key_data.get("is_active") == "1"
+        }
     
     async def _get_key_events(self, key_id: str) -> List[InvocationEvent]:
         """Get all events for a key."""
-        events_data = self.redis.zrange(
+        events_data = await self.redis.zrange(
             f"invocation_events:{key_id}",
             0,
             -1,
@@ -0,0 +1,452 @@
+from typing import Dict, List, Optional, Set
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+import asyncio
+import json
+import math
+import re
+import threading
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.core.redis import get_redis
+from app.models.listing import Listing, ListingStatus
+
+# Relevance is multiplied by (1 + SCORE_BLEND * ln(1 + quantum_score)), so a
+# popular listing outranks an equally relevant obscure one without letting
+# score drown out the text match
+SCORE_BLEND = 0.15
+
+# Discounts for query terms that only matched by prefix or by one typo
+PREFIX_WEIGHT = 0.6
+TYPO_WEIGHT = 0.4
+
+# Terms shorter than this are matched exactly (typos) or not expanded (prefixes)
+MIN_TYPO_LENGTH = 4
+MIN_PREFIX_LENGTH = 2
+MAX_EXPANSIONS = 50
+
+# Field weights for the embedded index; mirror the tsvector weights in migration 003
+FIELD_WEIGHTS = {"title": 3.0, "category": 2.0, "description": 1.0}
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+FACET_FIELDS = ("category", "tier")
+
+# Embedded index changes are broadcast so every worker's copy stays current
+INDEX_UPDATE_CHANNEL = "listing_search:updates"
+
+def tokenize(value: Optional[str]) -> List[str]:
+    """Lowercase alphanumeric tokens of a string."""
+    return TOKEN_RE.findall(value.lower()) if value else []
+
+@dataclass
+class SearchResult:
+    ids: List[str]
+    facets: Dict[str, Dict[str, int]]
+    has_more: bool
+
+class InvertedIndex:
+    """
+    Embedded inverted index over published listings.
+
+    Postings map each term to {listing_id: weighted term frequency}. A sorted
+    vocabulary answers prefix queries with a bisect, and a deletes index (every
+    term with one character removed) answers single-typo queries without
+    scanning the vocabulary.
+    """
+
+    def __init__(self):
+        self._postings: Dict[str, Dict[str, float]] = defaultdict(dict)
+        self._docs: Dict[str, dict] = {}
+        self._doc_terms: Dict[str, Set[str]] = {}
+        self._total_length = 0.0
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+        self._deletes: Dict[str, Set[str]] = defaultdict(set)
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def upsert(self, listing_id: str, title: str, description: str,
+               category: str, tier: int, quantum_score: float) -> None:
+        """Add or replace one listing."""
+        weighted = Counter()
+        for field, value in (("title", title), ("description", description), ("category", category)):
+            for token in tokenize(value):
+                weighted[token] += FIELD_WEIGHTS[field]
+
+        with self._lock:
+            self._remove_locked(listing_id)
+            for term, tf in weighted.items():
+                if term not in self._postings:
+                    self._add_term(term)
+                self._postings[term][listing_id] = tf
+            length = sum(weighted.values())
+            self._docs[listing_id] = {
+                "category": str(category),
+                "tier": str(int(tier)),
+                "quantum_score": float(quantum_score or 0.0),
+                "length": length,
+            }
+            self._doc_terms[listing_id] = set(weighted)
+            self._total_length += length
+
+    def remove(self, listing_id: str) -> None:
+        """Drop a listing; a no-op when it is not indexed."""
+        with self._lock:
+            self._remove_locked(listing_id)
+
+    def _remove_locked(self, listing_id: str) -> None:
+        doc = self._docs.pop(listing_id, None)
+        if doc is None:
+            return
+        self._total_length -= doc["length"]
+        for term in self._doc_terms.pop(listing_id):
+            postings = self._postings[term]
+            postings.pop(listing_id, None)
+            if not postings:
+                del self._postings[term]
+                self._drop_term(term)
+
+    def _add_term(self, term: str) -> None:
+        self._vocabulary_dirty = True
+        if len(term) >= MIN_TYPO_LENGTH:
+            for variant in self._deletions(term):
+                self._deletes[variant].add(term)
+
+    def _drop_term(self, term: str) -> None:
+        self._vocabulary_dirty = True
+        if len(term) >= MIN_TYPO_LENGTH:
+            for variant in self._deletions(term):
+                terms = self._deletes.get(variant)
+                if terms is not None:
+                    terms.discard(term)
+                    if not terms:
+                        del self._deletes[variant]
+
+    @staticmethod
+    def _deletions(term: str) -> Set[str]:
+        return {term} | {term[:i] + term[i + 1:] for i in range(len(term))}
+
+    def _expand(self, token: str, is_last: bool) -> Dict[str, float]:
+        """Map a query token to the indexed terms it matches and their weights."""
+        matches: Dict[str, float] = {}
+        if token in self._postings:
+            matches[token] = 1.0
+
+        # Treat the last token as still being typed
+        if is_last and len(token) >= MIN_PREFIX_LENGTH:
+            if self._vocabulary_dirty:
+                self._vocabulary = sorted(self._postings)
+                self._vocabulary_dirty = False
+            start = bisect_left(self._vocabulary, token)
+            for term in self._vocabulary[start:start + MAX_EXPANSIONS]:
+                if not term.startswith(token):
+                    break
+                matches.setdefault(term, PREFIX_WEIGHT)
+
+        if len(token) >= MIN_TYPO_LENGTH and not matches:
+            candidates: Set[str] = set()
+            for variant in self._deletions(token):
+                candidates |= self._deletes.get(variant, set())
+            for term in list(candidates)[:MAX_EXPANSIONS]:
+                if _within_one_edit(token, term):
+                    matches.setdefault(term, TYPO_WEIGHT)
+
+        return matches
+
+    def search(self, q: str, filters: Dict[str, Optional[str]], min_score: Optional[float],
+               max_score: Optional[float], limit: int, offset: int) -> SearchResult:
+        tokens = list(dict.fromkeys(tokenize(q)))
+        if not tokens:
+            return SearchResult(ids=[], facets={f: {} for f in FACET_FIELDS}, has_more=False)
+
+        with self._lock:
+            n_docs = len(self._docs) or 1
+            avg_length = self._total_length / n_docs or 1.0
+
+            # Every token must match (through any of its expansions)
+            scores: Optional[Dict[str, float]] = None
+            for i, token in enumerate(tokens):
+                token_scores: Dict[str, float] = defaultdict(float)
+                for term, weight in self._expand(token, i == len(tokens) - 1).items():
+                    postings = self._postings[term]
+                    idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for listing_id, tf in postings.items():
+                        length = self._docs[listing_id]["length"]
+                        norm = tf * (BM25_K1 + 1) / (
+                            tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                        )
+                        token_scores[listing_id] = max(token_scores[listing_id], weight * idf * norm)
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {d: s + token_scores[d] for d, s in scores.items() if d in token_scores}
+                if not scores:
+                    break
+
+            matched = []
+            for listing_id, relevance in (scores or {}).items():
+                doc = self._docs[listing_id]
+                if min_score is not None and doc["quantum_score"] < min_score:
+                    continue
+                if max_score is not None and doc["quantum_score"] > max_score:
+                    continue
+                matched.append((listing_id, relevance, doc))
+
+        # Disjunctive facets: each facet's counts ignore its own filter so the
+        # client can show the alternatives to the current selection
+        facets = {field: Counter() for field in FACET_FIELDS}
+        results = []
+        for listing_id, relevance, doc in matched:
+            failed = [f for f in FACET_FIELDS if filters.get(f) is not None and doc[f] != filters[f]]
+            for field in FACET_FIELDS:
+                if not failed or failed == [field]:
+                    facets[field][doc[field]] += 1
+            if not failed:
+                blended = relevance * (1 + SCORE_BLEND * math.log1p(max(doc["quantum_score"], 0.0)))
+                results.append((blended, listing_id))
+
+        results.sort(key=lambda r: (-r[0], r[1]))
+        page = results[offset:offset + limit + 1]
+        return SearchResult(
+            ids=[listing_id for _, listing_id in page[:limit]],
+            facets={field: dict(counts) for field, counts in facets.items()},
+            has_more=len(page) > limit
+        )
+
+def _within_one_edit(a: str, b: str) -> bool:
+    """Levenshtein distance of at most one between two terms."""
+    if abs(len(a) - len(b)) > 1:
+        return False
+    if len(a) > len(b):
+        a, b = b, a
+    i = j = edits = 0
+    while i < len(a) and j < len(b):
+        if a[i] != b[j]:
+            edits += 1
+            if edits > 1:
+                return False
+            if len(a) == len(b):
+                i += 1
+            j += 1
+        else:
+            i += 1
+            j += 1
+    return edits + (len(b) - j) <= 1
+
+# The generated `search_vector` column and its GIN index come from migration 003
+PG_MATCH = """
+    FROM listings
+    WHERE status = :status
+      AND (search_vector @@ to_tsquery('english', :tsquery)
+           OR title % :q)
+      AND (CAST(:min_score AS double precision) IS NULL OR quantum_score >= :min_score)
+      AND (CAST(:max_score AS double precision) IS NULL OR quantum_score <= :max_score)
+"""
+
+PG_SEARCH = """
+    SELECT id
+""" + PG_MATCH + """
+      AND (CAST(:category AS text) IS NULL OR category = :category)
+      AND (CAST(:tier AS integer) IS NULL OR tier = :tier)
+    ORDER BY
+        (ts_rank_cd(search_vector, to_tsquery('english', :tsquery), 32)
+         + :typo_weight * similarity(title, :q))
+        * (1 + :score_blend * ln(1 + greatest(quantum_score, 0))) DESC,
+        id
+    LIMIT :limit OFFSET :offset
+"""
+
+PG_FACET = """
+    SELECT {field}::text AS value, count(*) AS n
+""" + PG_MATCH + """
+      AND {other_filter}
+    GROUP BY {field}
+"""
+
+class ListingSearchService:
+    """
+    Full-text search over published listings.
+
+    On PostgreSQL queries run against the `search_vector` tsvector column
+    (GIN-indexed, kept current by the database as a generated column) with
+    pg_trgm similarity on the title for typo tolerance. Other databases fall
+    back to an in-process InvertedIndex, loaded on first use and kept current
+    by the listing routes through index_listing/remove_listing, which publish
+    each change so every worker applies it to its own copy.
+    """
+
+    def __init__(self, redis_url: Optional[str] = None):
+        self.redis = get_redis(redis_url)
+        self.index = InvertedIndex()
+        self._loaded = False
+        self._load_lock = threading.Lock()
+        self._update_task: Optional[asyncio.Task] = None
+
+    def search(
+        self,
+        db: Session,
+        q: str,
+        category: Optional[str] = None,
+        tier: Optional[int] = None,
+        min_score: Optional[float] = None,
+        max_score: Optional[float] = None,
+        limit: int = 50,
+        offset: int = 0
+    ) -> SearchResult:
+        """Return one page of ranked listing ids plus category/tier facet counts."""
+        if db.bind.dialect.name == "postgresql":
+            return self._search_postgres(db, q, category, tier, min_score, max_score, limit, offset)
+
+        self._ensure_loaded(db)
+        filters = {
+            "category": str(category) if category is not None else None,
+            "tier": str(int(tier)) if tier is not None else None,
+        }
+        return self.index.search(q, filters, min_score, max_score, limit, offset)
+
+    async def index_listing(self, db: Session, listing) -> None:
+        """Reflect a created/updated/published listing in the embedded index."""
+        if listing.status != ListingStatus.ACTIVE:
+            await self.remove_listing(db, listing.id)
+            return
+        await self._publish_update(db, {
+            "op": "upsert",
+            "id": listing.id,
+            "title": listing.title,
+            "description": listing.description,
+            "category": getattr(listing.category, "value", listing.category),
+            "tier": int(listing.tier),
+            "quantum_score": listing.quantum_score,
+        })
+
+    async def remove_listing(self, db: Session, listing_id: str) -> None:
+        """Drop an archived or deleted listing from the embedded index."""
+        await self._publish_update(db, {"op": "remove", "id": listing_id})
+
+    async def _publish_update(self, db: Session, update: dict) -> None:
+        # PostgreSQL keeps search_vector current itself; no worker holds an index
+        if db.bind.dialect.name == "postgresql":
+            return
+        self._apply_update(update)
+        await self.redis.publish(INDEX_UPDATE_CHANNEL, json.dumps(update))
+
+    def _apply_update(self, update: dict) -> None:
+        # Not loaded yet: the first search reads the change from the database
+        if not self._loaded:
+            return
+        if update["op"] == "remove":
+            self.index.remove(update["id"])
+        else:
+            self.index.upsert(
+                update["id"], update["title"], update["description"],
+                update["category"], update["tier"], update["quantum_score"]
+            )
+
+    def _ensure_update_listener(self) -> None:
+        """(Re)start the pub/sub listener that applies other workers' changes."""
+        if self._update_task and not self._update_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._update_task is not None:
+            # Updates may have been missed while the listener was down
+            self._loaded = False
+        self._update_task = loop.create_task(self._listen_for_updates())
+
+    async def _listen_for_updates(self) -> None:
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(INDEX_UPDATE_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    self._apply_update(json.loads(message["data"]))
+        finally:
+            await pubsub.aclose()
+
+    def rebuild(self, db: Session, batch_size: int = 5000) -> int:
+        """Reload the embedded index from the database."""
+        index = InvertedIndex()
+        query = (
+            db.query(Listing)
+            .filter(Listing.status == ListingStatus.ACTIVE)
+            .with_entities(
+                Listing.id, Listing.title, Listing.description,
+                Listing.category, Listing.tier, Listing.quantum_score
+            )
+            .yield_per(batch_size)
+        )
+        for row in query:
+            index.upsert(*row)
+        self.index = index
+        self._loaded = True
+        return len(index)
+
+    def _ensure_loaded(self, db: Session) -> None:
+        self._ensure_update_listener()
+        if self._loaded:
+            return
+        with self._load_lock:
+            if not self._loaded:
+                self.rebuild(db)
+
+    @staticmethod
+    def _to_tsquery(q: str) -> Optional[str]:
+        # AND of all tokens, the last one as a prefix match
+        tokens = tokenize(q)
+        if not tokens:
+            return None
+        tokens[-1] += ":*"
+        return " & ".join(tokens)
+
+    def _search_postgres(
+        self,
+        db: Session,
+        q: str,
+        category: Optional[str],
+        tier: Optional[int],
+        min_score: Optional[float],
+        max_score: Optional[float],
+        limit: int,
+        offset: int
+    ) -> SearchResult:
+        tsquery = self._to_tsquery(q)
+        if tsquery is None:
+            return SearchResult(ids=[], facets={f: {} for f in FACET_FIELDS}, has_more=False)
+
+        params = {
+            "status": ListingStatus.ACTIVE.value,
+            "q": q,
+            "tsquery": tsquery,
+            "category": category,
+            "tier": tier,
+            "min_score": min_score,
+            "max_score": max_score,
+            "typo_weight": TYPO_WEIGHT,
+            "score_blend": SCORE_BLEND,
+            "limit": limit + 1,
+            "offset": offset,
+        }
+        ids = db.execute(text(PG_SEARCH), params).scalars().all()
+
+        # Disjunctive facets: filter on every facet except the one being counted
+        other_filters = {
+            "category": "(CAST(:tier AS integer) IS NULL OR tier = :tier)",
+            "tier": "(CAST(:category AS text) IS NULL OR category = :category)",
+        }
+        facets = {}
+        for field in FACET_FIELDS:
+            sql = PG_FACET.format(field=field, other_filter=other_filters[field])
+            facets[field] = {row.value: row.n for row in db.execute(text(sql), params)}
+
+        return SearchResult(ids=list(ids[:limit]), facets=facets, has_more=len(ids) > limit)
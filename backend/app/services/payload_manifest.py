@@ -0,0 +1,204 @@
+from typing import Dict, Optional
+import asyncio
+import hashlib
+import logging
+import os
+from datetime import datetime
+from pathlib import Path
+
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.models.payload_manifest import PayloadEntry, PayloadManifest, PAYLOAD_FILES
+from app.utils.cache import TTLCache
+from app.utils.object_store import ObjectStore
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILENAME = ".manifest.json"
+
+class PayloadManifestService:
+    """
+    Index of the runtime payloads in secure storage.
+
+    Each listing's manifest records the resolved path, size, hash and mtime of
+    its payload files. It is written next to the payloads and mirrored into
+    Redis, so invocations resolve a payload with a cache or Redis lookup
+    alone, instead of walking and hashing the listing directory. Entries are
+    checked against the files when a manifest is rebuilt and by the watcher,
+    never on the invocation path.
+
+    Given an object store, it also mirrors each payload there under
+    `payloads/<listing>/<type>/<sha256>` so invocations can hand out signed
+    URLs; this runs in the manifest watcher, not in API workers. A manifest
+    an API worker rebuilds marks new or changed payloads `mirror_pending`,
+    and a mirroring watcher treats those manifests as stale.
+    """
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        storage_path: Optional[str] = None,
+        cache_ttl: float = 30.0,
+        object_store: Optional[ObjectStore] = None
+    ):
+        self.redis = get_redis(redis_url)
+        self.secure_storage = Path(storage_path or settings.SECURE_STORAGE_PATH)
+        self.object_store = object_store
+        # Short TTL so workers pick up manifests rebuilt by the watcher
+        self.cache = TTLCache(maxsize=10000, ttl=cache_ttl)
+
+    async def resolve(self, listing_id: str, path_type: str) -> Optional[PayloadEntry]:
+        """Resolve a listing's payload from the manifest, without touching the filesystem.
+
+        A payload rewritten since the manifest was built is picked up when
+        the watcher rebuilds the manifest.
+        """
+        if path_type not in PAYLOAD_FILES:
+            return None
+
+        manifest = self.cache.get(listing_id)
+        if manifest is None:
+            manifest = await self._load_manifest(listing_id)
+            if manifest is None:
+                # Listing has never been indexed; build it once
+                manifest = await self.build_manifest(listing_id)
+            self.cache.set(listing_id, manifest)
+
+        return manifest.entries.get(path_type)
+
+    async def build_manifest(self, listing_id: str) -> PayloadManifest:
+        """Hash and stat a listing's payloads and publish the manifest."""
+        listing_path = self.secure_storage / listing_id
+        manifest = await asyncio.to_thread(self._scan_listing, listing_id, listing_path)
+        await self._mirror_payloads(manifest)
+
+        if listing_path.is_dir():
+            await asyncio.to_thread(
+                (listing_path / MANIFEST_FILENAME).write_text, manifest.json()
+            )
+        await self.redis.set(f"payload_manifest:{listing_id}", manifest.json())
+        self.cache.set(listing_id, manifest)
+
+        return manifest
+
+    async def remove_manifest(self, listing_id: str) -> None:
+        """Forget a listing's manifest (listing deleted)."""
+        await self.redis.delete(f"payload_manifest:{listing_id}")
+        self.cache.invalidate(listing_id)
+
+    async def watch(self, interval: float = 30.0) -> None:
+        """Rebuild manifests for listings whose payload directory changed.
+
+        Polls directory mtimes under secure storage (adding, replacing or
+        removing a payload updates its listing directory's mtime) and the
+        size and mtime of each indexed payload (rewriting a file in place
+        does not touch the directory), which works on network mounts where
+        inotify events are not delivered.
+        """
+        while True:
+            try:
+                rebuilt = await self.refresh_changed()
+                if rebuilt:
+                    logger.info(f"Rebuilt payload manifests for {len(rebuilt)} listings")
+            except Exception as e:
+                logger.error(f"Payload manifest refresh failed: {str(e)}")
+            await asyncio.sleep(interval)
+
+    async def refresh_changed(self) -> list:
+        """Rebuild every stale or missing manifest. Returns the rebuilt listing ids."""
+        stale = await asyncio.to_thread(self._find_stale_listings)
+        for listing_id in stale:
+            await self.build_manifest(listing_id)
+        return stale
+
+    def _find_stale_listings(self) -> list:
+        """List listing directories or payloads modified since their manifest was written."""
+        if not self.secure_storage.is_dir():
+            return []
+
+        stale = []
+        with os.scandir(self.secure_storage) as listings:
+            for entry in listings:
+                if not entry.is_dir():
+                    continue
+                manifest_path = os.path.join(entry.path, MANIFEST_FILENAME)
+                try:
+                    manifest_mtime = os.stat(manifest_path).st_mtime
+                except FileNotFoundError:
+                    stale.append(entry.name)
+                    continue
+                # Writing the manifest itself bumps the directory mtime
+                if entry.stat().st_mtime > manifest_mtime:
+                    stale.append(entry.name)
+                    continue
+                try:
+                    manifest = PayloadManifest.parse_file(manifest_path)
+                except (OSError, ValueError):
+                    stale.append(entry.name)
+                    continue
+                if not all(self._entry_is_current(payload) for payload in manifest.entries.values()):
+                    stale.append(entry.name)
+                elif self.object_store is not None and any(
+                    payload.mirror_pending for payload in manifest.entries.values()
+                ):
+                    stale.append(entry.name)
+        return stale
+
+    @staticmethod
+    def _entry_is_current(entry: PayloadEntry) -> bool:
+        """Check a manifest entry against the file's current size and mtime."""
+        try:
+            stat = os.stat(entry.path)
+        except FileNotFoundError:
+            return False
+        return stat.st_size == entry.size and stat.st_mtime_ns == entry.mtime_ns
+
+    async def _mirror_payloads(self, manifest: PayloadManifest) -> None:
+        """Carry over or create the object storage copy of each payload."""
+        previous = await self._load_manifest(manifest.listing_id)
+        for path_type, entry in manifest.entries.items():
+            old = previous.entries.get(path_type) if previous else None
+            if old and old.sha256 == entry.sha256 and old.object_key:
+                entry.object_key = old.object_key
+            elif self.object_store is not None:
+                key = f"payloads/{manifest.listing_id}/{path_type}/{entry.sha256}"
+                await self.object_store.upload_path(entry.path, key)
+                entry.object_key = key
+            else:
+                # Left for the watcher to upload
+                entry.mirror_pending = True
+
+    async def _load_manifest(self, listing_id: str) -> Optional[PayloadManifest]:
+        data = await self.redis.get(f"payload_manifest:{listing_id}")
+        return PayloadManifest.parse_raw(data) if data else None
+
+    @staticmethod
+    def _scan_listing(listing_id: str, listing_path: Path) -> PayloadManifest:
+        entries: Dict[str, PayloadEntry] = {}
+
+        for path_type, filename in PAYLOAD_FILES.items():
+            file_path = listing_path / filename
+            try:
+                stat = file_path.stat()
+            except (FileNotFoundError, NotADirectoryError):
+                continue
+
+            digest = hashlib.sha256()
+            with open(file_path, 'rb') as f:
+                for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                    digest.update(chunk)
+
+            entries[path_type] = PayloadEntry(
+                path_type=path_type,
+                path=str(file_path),
+                size=stat.st_size,
+                sha256=digest.hexdigest(),
+                mtime=stat.st_mtime,
+                mtime_ns=stat.st_mtime_ns
+            )
+
+        return PayloadManifest(
+            listing_id=listing_id,
+            entries=entries,
+            built_at=datetime.utcnow()
+        )
@@ -1,11 +1,196 @@
 from typing import Dict, List, Optional
-import redis
 import json
+import math
+import os
 from datetime import datetime, timedelta
 
+from app.core.redis import get_redis
+from app.models.quantum_score import EventResolution, EventRetention, RESOLUTION_SECONDS
+
+# 90% retention per month, expressed as a per-second exponential rate
+SCORE_DECAY_PER_SECOND = math.log(0.9) / (30 * 24 * 3600)
+
+# Leaderboard sorted sets. Every listing decays at the same rate, so ranking
+# by the score normalized to a fixed epoch is the same as ranking by the
+# score decayed to "now", and members never need to be rescored over time.
+LEADERBOARD_KEY = "leaderboard:listings"
+LEADERBOARD_EPOCH = 1704067200.0  # 2024-01-01T00:00:00Z
+
+# Weighted total of a listing's event counters. Listings recorded before
+# the incremental engine have counters but no accumulator; their score is
+# this total as of their last interaction.
+SEED_SCORE_LUA = """
+local function seed_score(counts_key, weights_json)
+    local weights = cjson.decode(weights_json)
+    local counts = redis.call('HGETALL', counts_key)
+    local total = 0
+    for i = 1, #counts, 2 do
+        total = total + tonumber(counts[i + 1]) * (weights[counts[i]] or 1)
+    end
+    return total
+end
+"""
+
+# Seeds a listing's accumulator from its counters unless it already has one,
+# so the backfill can run while events are being recorded without dropping
+# or double-counting history.
+#
+# KEYS[1] counts hash, KEYS[2] meta hash
+# ARGV[1] event weights json, ARGV[2] fallback reference timestamp
+BACKFILL_SCORE_SCRIPT = SEED_SCORE_LUA + """
+if redis.call('HEXISTS', KEYS[2], 'score_acc') == 1 then
+    return 0
+end
+local acc = seed_score(KEYS[1], ARGV[1])
+if acc <= 0 then
+    return 0
+end
+local ref = redis.call('HGET', KEYS[2], 'last_interaction') or ARGV[2]
+redis.call('HSET', KEYS[2], 'score_acc', tostring(acc), 'score_ref', ref)
+return 1
+"""
+
+# Records an event and folds its weight into the decayed running score.
+# The accumulator is stored as (score_acc, score_ref): the score value at
+# the reference timestamp. Anything newer decays the accumulator forward
+# to its own timestamp before adding, anything older (clock skew between
+# workers) is decayed back to the reference instead.
+#
+# The epoch-normalized score is written to the global leaderboard and to
+# the category/tier leaderboards the listing was indexed under, but only
+# while the listing is ranked (published and not since archived/deleted).
+#
+# Events are kept raw (one sorted set per event type, trimmed to the raw
+# retention window on every write) and counted into minute/hour/day
+# rollup hashes keyed by bucket start, so older history never needs the
+# raw events.
+#
+# KEYS[1] raw events zset for the type, KEYS[2] counts hash,
+# KEYS[3] meta hash, KEYS[4] global leaderboard zset,
+# KEYS[5..7] minute/hour/day rollup hashes for the type,
+# KEYS[8] event types set
+# ARGV[1] event json, ARGV[2] timestamp, ARGV[3] event type,
+# ARGV[4] event weight, ARGV[5] decay rate per second,
+# ARGV[6] leaderboard epoch, ARGV[7] listing id,
+# ARGV[8..10] minute/hour/day bucket, ARGV[11] raw retention cutoff,
+# ARGV[12] event weights json
+RECORD_EVENT_SCRIPT = SEED_SCORE_LUA + """
+local ts = tonumber(ARGV[2])
+local weight = tonumber(ARGV[4])
+local rate = tonumber(ARGV[5])
+local epoch = tonumber(ARGV[6])
+local listing_id = ARGV[7]
+
+local state = redis.call('HMGET', KEYS[3], 'score_acc', 'score_ref', 'last_interaction', 'category', 'tier', 'ranked')
+local acc = tonumber(state[1])
+local ref = tonumber(state[2]) or ts
+local last = tonumber(state[3]) or 0
+
+-- First event on the incremental path: start from the listing's history
+if acc == nil then
+    acc = seed_score(KEYS[2], ARGV[12])
+    if acc > 0 and last > 0 then
+        ref = last
+    end
+end
+
+redis.call('ZADD', KEYS[1], ts, ARGV[1])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', '(' .. ARGV[11])
+redis.call('HINCRBY', KEYS[5], ARGV[8], 1)
+redis.call('HINCRBY', KEYS[6], ARGV[9], 1)
+redis.call('HINCRBY', KEYS[7], ARGV[10], 1)
+redis.call('SADD', KEYS[8], ARGV[3])
+redis.call('HINCRBY', KEYS[2], ARGV[3], 1)
+
+if ts >= ref then
+    acc = acc * math.exp(rate * (ts - ref)) + weight
+    ref = ts
+else
+    acc = acc + weight * math.exp(rate * (ref - ts))
+end
+
+if ts > last then
+    last = ts
+end
+
+redis.call('HSET', KEYS[3],
+    'score_acc', tostring(acc),
+    'score_ref', tostring(ref),
+    'quantum_score', tostring(acc),
+    'last_interaction', tostring(last))
+
+if state[6] == '1' then
+    local ranked = acc * math.exp(-rate * (ref - epoch))
+    redis.call('ZADD', KEYS[4], ranked, listing_id)
+    if state[4] then
+        redis.call('ZADD', KEYS[4] .. ':category:' .. state[4], ranked, listing_id)
+    end
+    if state[5] then
+        redis.call('ZADD', KEYS[4] .. ':tier:' .. state[5], ranked, listing_id)
+    end
+end
+
+return tostring(acc)
+"""
+
+ROLLUP_RESOLUTIONS = [EventResolution.MINUTE, EventResolution.HOUR, EventResolution.DAY]
+
+# Moves the oldest chunk of a pre-tiering `listing:{id}:events` set into
+# the rollups and raw sets and removes it from the legacy set in the same
+# call, so an interrupted migration never counts a chunk twice on rerun.
+#
+# KEYS[1] legacy events zset
+# ARGV[1] listing key prefix, ARGV[2] chunk size, ARGV[3] raw retention
+# cutoff, ARGV[4..] resolution name and bucket width pairs
+# Returns {events migrated, events dropped from raw storage}
+MIGRATE_LEGACY_CHUNK_SCRIPT = """
+local events = redis.call('ZRANGE', KEYS[1], 0, tonumber(ARGV[2]) - 1, 'WITHSCORES')
+local prefix = ARGV[1]
+local cutoff = tonumber(ARGV[3])
+local dropped = 0
+
+for i = 1, #events, 2 do
+    local event_data = events[i]
+    local ts = tonumber(events[i + 1])
+    local ok, event = pcall(cjson.decode, event_data)
+    local event_type = (ok and type(event) == 'table' and event['type']) or 'unknown'
+    for j = 4, #ARGV, 2 do
+        local width = tonumber(ARGV[j + 1])
+        local bucket = string.format('%d', math.floor(ts / width) * width)
+        redis.call('HINCRBY', prefix .. ':rollup:' .. ARGV[j] .. ':' .. event_type, bucket, 1)
+    end
+    if ts >= cutoff then
+        redis.call('ZADD', prefix .. ':events:' .. event_type, ts, event_data)
+    else
+        dropped = dropped + 1
+    end
+    redis.call('SADD', prefix .. ':event_types', event_type)
+end
+
+if #events > 0 then
+    redis.call('ZREMRANGEBYRANK', KEYS[1], 0, #events / 2 - 1)
+end
+return {#events / 2, dropped}
+"""
+
+# Retention windows, e.g. EVENT_RETENTION_RAW_SECONDS=86400. The write path
+# and scripts/compact_listing_events.py both trim with these.
+EVENT_RETENTION = EventRetention(**{
+    f"{resolution.value}_seconds": int(os.environ[f"EVENT_RETENTION_{resolution.name}_SECONDS"])
+    for resolution in EventResolution
+    if os.getenv(f"EVENT_RETENTION_{resolution.name}_SECONDS")
+})
+
 class QuantumScoreService:
-    def __init__(self, redis_url: str = "redis://localhost:6379"):
-        self.redis = redis.Redis.from_url(redis_url, decode_responses=True)
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        retention: Optional[EventRetention] = None
+    ):
+        self.redis = get_redis(redis_url)
+        self._record_event_script = self.redis.register_script(RECORD_EVENT_SCRIPT)
+        self._migrate_legacy_chunk_script = self.redis.register_script(MIGRATE_LEGACY_CHUNK_SCRIPT)
+        self.retention = retention or EVENT_RETENTION
         
         # Event weights for score calculation
         self.EVENT_WEIGHTS = {
@@ -38,63 +223,103 @@ class QuantumScoreService:
         }
 
     async def record_event(self, listing_id: str, event_type: str, user_id: Optional[str] = None) -> None:
-        """Record an interaction event for a listing."""
+        """Record an interaction event for a listing.
+
+        The event, its counter and the decayed running score are all updated
+        by a single server-side script, so this costs one round trip.
+        """
         timestamp = datetime.utcnow().timestamp()
         
-        # Store event in time series
-        event_key = f"listing:{listing_id}:events"
         event_data = json.dumps({
             'type': event_type,
             'timestamp': timestamp,
             'user_id': user_id
         })
         
-        # Use Redis pipeline for atomic operations
-        pipe = self.redis.pipeline()
-        
-        # Add event to time series
-        pipe.zadd(event_key, {event_data: timestamp})
-        
-        # Increment event counter
-        pipe.hincrby(f"listing:{listing_id}:counts", event_type, 1)
-        
-        # Update last interaction timestamp
-        pipe.hset(f"listing:{listing_id}:meta", "last_interaction", timestamp)
-        
-        # Execute pipeline
-        pipe.execute()
-        
-        # Recalculate score asynchronously
-        await self.calculate_score(listing_id)
+        await self._record_event_script(
+            keys=[
+                self._raw_events_key(listing_id, event_type),
+                f"listing:{listing_id}:counts",
+                f"listing:{listing_id}:meta",
+                LEADERBOARD_KEY,
+                *(self._rollup_key(listing_id, resolution, event_type)
+                  for resolution in ROLLUP_RESOLUTIONS),
+                f"listing:{listing_id}:event_types"
+            ],
+            args=[
+                event_data,
+                timestamp,
+                event_type,
+                self.EVENT_WEIGHTS.get(event_type, 1),
+                SCORE_DECAY_PER_SECOND,
+                LEADERBOARD_EPOCH,
+                listing_id,
+                *(self._bucket(timestamp, resolution) for resolution in ROLLUP_RESOLUTIONS),
+                timestamp - self.retention.raw_seconds,
+                json.dumps(self.EVENT_WEIGHTS)
+            ]
+        )
 
     async def calculate_score(self, listing_id: str) -> float:
-        """Calculate quantum score based on weighted events and time decay."""
-        # Get event counts
-        counts = self.redis.hgetall(f"listing:{listing_id}:counts")
-        if not counts:
+        """Get the current quantum score, decayed to now.
+
+        Scores are maintained incrementally by `record_event`; this only reads
+        the accumulator and applies the decay since its reference timestamp.
+        """
+        acc, ref = await self.redis.hmget(f"listing:{listing_id}:meta", "score_acc", "score_ref")
+        return self._decay_score(acc, ref)
+
+    @staticmethod
+    def _raw_events_key(listing_id: str, event_type: str) -> str:
+        return f"listing:{listing_id}:events:{event_type}"
+
+    @staticmethod
+    def _rollup_key(listing_id: str, resolution: EventResolution, event_type: str) -> str:
+        return f"listing:{listing_id}:rollup:{resolution.value}:{event_type}"
+
+    @staticmethod
+    def _bucket(timestamp: float, resolution: EventResolution) -> int:
+        """Get the start of the rollup bucket containing `timestamp`."""
+        width = RESOLUTION_SECONDS[resolution]
+        return int(timestamp // width) * width
+
+    @staticmethod
+    def _ranked_score(acc: float, ref: float) -> float:
+        """Normalize an accumulator to the leaderboard epoch."""
+        return acc * math.exp(-SCORE_DECAY_PER_SECOND * (ref - LEADERBOARD_EPOCH))
+
+    @staticmethod
+    def _unrank_score(ranked: float, now: Optional[float] = None) -> float:
+        """Convert an epoch-normalized leaderboard score to the score at `now`."""
+        now = now if now is not None else datetime.utcnow().timestamp()
+        return ranked * math.exp(SCORE_DECAY_PER_SECOND * (now - LEADERBOARD_EPOCH))
+
+    @staticmethod
+    def _leaderboard_key(category: Optional[str] = None, tier: Optional[int] = None) -> str:
+        """Get the leaderboard key for an optional category or tier filter."""
+        if category is not None and tier is not None:
+            raise ValueError("Leaderboards can be filtered by category or tier, not both")
+        if category is not None:
+            return f"{LEADERBOARD_KEY}:category:{category}"
+        if tier is not None:
+            return f"{LEADERBOARD_KEY}:tier:{tier}"
+        return LEADERBOARD_KEY
+
+    @staticmethod
+    def _decay_score(acc: Optional[str], ref: Optional[str], now: Optional[float] = None) -> float:
+        """Decay a stored accumulator from its reference timestamp to `now`."""
+        if not acc:
             return 0.0
-            
-        # Calculate base score from event weights
-        base_score = sum(
-            int(count) * self.EVENT_WEIGHTS.get(event_type, 1)
-            for event_type, count in counts.items()
-        )
-        
-        # Apply time decay (90% retention per month)
-        last_interaction = float(self.redis.hget(f"listing:{listing_id}:meta", "last_interaction") or 0)
-        if last_interaction:
-            months_since = (datetime.utcnow().timestamp() - last_interaction) / (30 * 24 * 3600)
-            time_multiplier = 0.9 ** months_since
-            base_score *= time_multiplier
-        
-        # Store calculated score
-        self.redis.hset(f"listing:{listing_id}:meta", "quantum_score", base_score)
-        
-        return base_score
+        score = float(acc)
+        if ref:
+            now = now if now is not None else datetime.utcnow().timestamp()
+            elapsed = max(now - float(ref), 0.0)
+            score *= math.exp(SCORE_DECAY_PER_SECOND * elapsed)
+        return score
 
     async def get_visual_effects(self, listing_id: str) -> Dict:
         """Get visual effects based on quantum score."""
-        score = float(self.redis.hget(f"listing:{listing_id}:meta", "quantum_score") or 0)
+        score = await self.calculate_score(listing_id)
         
         effects = {
             'score': score,
@@ -120,53 +345,279 @@ class QuantumScoreService:
         
         return effects
 
-    async def get_top_listings(self, limit: int = 10) -> List[Dict]:
-        """Get top listings by quantum score."""
-        # Scan all listing meta keys
-        listings = []
-        pattern = "listing:*:meta"
+    async def index_listing(self, listing_id: str, category: str, tier: int) -> None:
+        """Register a listing's category and tier for the filtered leaderboards.
+
+        Called when a listing is published or its category/tier changes; moves
+        the listing between leaderboards if it was indexed elsewhere before.
+        """
+        category = getattr(category, "value", category)
+        tier = int(tier)
+        meta_key = f"listing:{listing_id}:meta"
+        acc, ref, old_category, old_tier = await self.redis.hmget(
+            meta_key, "score_acc", "score_ref", "category", "tier"
+        )
+        ranked = self._ranked_score(float(acc), float(ref)) if acc and ref else 0.0
+
+        pipe = self.redis.pipeline()
+        if old_category and old_category != str(category):
+            pipe.zrem(self._leaderboard_key(category=old_category), listing_id)
+        if old_tier and old_tier != str(tier):
+            pipe.zrem(self._leaderboard_key(tier=old_tier), listing_id)
+        pipe.hset(meta_key, mapping={"category": category, "tier": tier, "ranked": 1})
+        pipe.zadd(LEADERBOARD_KEY, {listing_id: ranked})
+        pipe.zadd(self._leaderboard_key(category=category), {listing_id: ranked})
+        pipe.zadd(self._leaderboard_key(tier=tier), {listing_id: ranked})
+        await pipe.execute()
+
+    async def remove_listing(self, listing_id: str) -> None:
+        """Remove a listing from all leaderboards (archive/delete).
+
+        The listing stays unranked, so later events keep its score current
+        without putting it back on the leaderboards until it is indexed again.
+        """
+        meta_key = f"listing:{listing_id}:meta"
+        category, tier = await self.redis.hmget(meta_key, "category", "tier")
+        pipe = self.redis.pipeline()
+        pipe.hset(meta_key, "ranked", 0)
+        pipe.zrem(LEADERBOARD_KEY, listing_id)
+        if category:
+            pipe.zrem(self._leaderboard_key(category=category), listing_id)
+        if tier:
+            pipe.zrem(self._leaderboard_key(tier=tier), listing_id)
+        await pipe.execute()
+
+    async def get_top_listings(
+        self,
+        limit: int = 10,
+        offset: int = 0,
+        category: Optional[str] = None,
+        tier: Optional[int] = None
+    ) -> List[Dict]:
+        """Get top listings by quantum score, optionally by category or tier."""
+        entries = await self.redis.zrevrange(
+            self._leaderboard_key(category, tier),
+            offset,
+            offset + limit - 1,
+            withscores=True
+        )
         
-        for key in self.redis.scan_iter(match=pattern):
-            listing_id = key.split(":")[1]
-            score = float(self.redis.hget(key, "quantum_score") or 0)
-            listings.append({
+        now = datetime.utcnow().timestamp()
+        return [
+            {
                 'listing_id': listing_id,
-                'score': score
-            })
+                'score': self._unrank_score(ranked, now),
+                'rank': offset + i + 1
+            }
+            for i, (listing_id, ranked) in enumerate(entries)
+        ]
+
+    async def get_listing_rank(
+        self,
+        listing_id: str,
+        category: Optional[str] = None,
+        tier: Optional[int] = None
+    ) -> Optional[Dict]:
+        """Get a listing's 1-based rank and score, or None if it isn't ranked."""
+        key = self._leaderboard_key(category, tier)
+        pipe = self.redis.pipeline()
+        pipe.zrevrank(key, listing_id)
+        pipe.zscore(key, listing_id)
+        pipe.zcard(key)
+        rank, ranked, total = await pipe.execute()
         
-        # Sort by score and return top N
-        return sorted(listings, key=lambda x: x['score'], reverse=True)[:limit]
+        if rank is None:
+            return None
+        return {
+            'listing_id': listing_id,
+            'rank': rank + 1,
+            'score': self._unrank_score(ranked),
+            'total': total
+        }
 
     async def get_event_history(
         self, 
         listing_id: str, 
         event_type: Optional[str] = None,
         start_time: Optional[float] = None,
-        end_time: Optional[float] = None
+        end_time: Optional[float] = None,
+        resolution: Optional[EventResolution] = None
     ) -> List[Dict]:
-        """Get event history for a listing with optional filters."""
-        event_key = f"listing:{listing_id}:events"
+        """Get event history for a listing with optional filters.
+
+        Served from the finest tier whose retention still covers `start_time`
+        unless a resolution is given: individual events from the raw tier,
+        otherwise `{type, timestamp, count, resolution}` buckets.
+        """
+        now = datetime.utcnow().timestamp()
         
         # Get time range
         if not start_time:
             start_time = 0
         if not end_time:
-            end_time = datetime.utcnow().timestamp()
+            end_time = now
         
-        # Get events within time range
-        events = self.redis.zrangebyscore(
-            event_key,
-            start_time,
-            end_time,
-            withscores=True
+        if resolution is None:
+            resolution = self._pick_resolution(start_time, now)
+        
+        if event_type:
+            event_types = [event_type]
+        else:
+            event_types = sorted(await self.redis.smembers(f"listing:{listing_id}:event_types"))
+        
+        if resolution == EventResolution.RAW:
+            return await self._get_raw_events(listing_id, event_types, start_time, end_time)
+        return await self._get_rollup_buckets(
+            listing_id, event_types, resolution, start_time, end_time, now
         )
+
+    def _pick_resolution(self, start_time: float, now: float) -> EventResolution:
+        """Pick the finest tier that still holds data from `start_time`."""
+        for resolution in [EventResolution.RAW, *ROLLUP_RESOLUTIONS]:
+            if start_time >= now - self.retention.for_resolution(resolution):
+                return resolution
+        return EventResolution.DAY
+
+    async def _get_raw_events(
+        self,
+        listing_id: str,
+        event_types: List[str],
+        start_time: float,
+        end_time: float
+    ) -> List[Dict]:
+        """Read individual events for the given types from the raw tier."""
+        pipe = self.redis.pipeline(transaction=False)
+        for event_type in event_types:
+            pipe.zrangebyscore(
+                self._raw_events_key(listing_id, event_type),
+                start_time,
+                end_time,
+                withscores=True
+            )
         
-        # Parse and filter events
         result = []
-        for event_data, timestamp in events:
-            event = json.loads(event_data)
-            if not event_type or event['type'] == event_type:
+        for events in await pipe.execute():
+            for event_data, timestamp in events:
+                event = json.loads(event_data)
                 event['timestamp'] = timestamp
                 result.append(event)
         
-        return result 
\ No newline at end of file
+        return sorted(result, key=lambda event: event['timestamp'])
+
+    async def _get_rollup_buckets(
+        self,
+        listing_id: str,
+        event_types: List[str],
+        resolution: EventResolution,
+        start_time: float,
+        end_time: float,
+        now: float
+    ) -> List[Dict]:
+        """Read bucketed counts for the given types from a rollup tier."""
+        width = RESOLUTION_SECONDS[resolution]
+        earliest = now - self.retention.for_resolution(resolution)
+        first = self._bucket(max(start_time, earliest), resolution)
+        last = self._bucket(min(end_time, now), resolution)
+        buckets = list(range(first, last + width, width))
+        if not buckets:
+            return []
+        
+        pipe = self.redis.pipeline(transaction=False)
+        for event_type in event_types:
+            pipe.hmget(self._rollup_key(listing_id, resolution, event_type), buckets)
+        
+        result = []
+        for event_type, counts in zip(event_types, await pipe.execute()):
+            for bucket, count in zip(buckets, counts):
+                if count:
+                    result.append({
+                        'type': event_type,
+                        'timestamp': bucket,
+                        'count': int(count),
+                        'resolution': resolution.value
+                    })
+        
+        return sorted(result, key=lambda event: event['timestamp'])
+
+    async def compact_events(self, listing_id: str) -> Dict[str, int]:
+        """Apply retention to a listing's event tiers.
+
+        Trims raw events and rollup buckets that have aged out, and folds any
+        legacy `listing:{id}:events` sorted set into the tiered layout.
+        Returns the number of entries removed per tier.
+        """
+        now = datetime.utcnow().timestamp()
+        removed = {EventResolution.RAW.value: 0, **{r.value: 0 for r in ROLLUP_RESOLUTIONS}}
+        
+        removed[EventResolution.RAW.value] += await self._migrate_legacy_events(listing_id, now)
+        
+        event_types = sorted(await self.redis.smembers(f"listing:{listing_id}:event_types"))
+        
+        pipe = self.redis.pipeline(transaction=False)
+        for event_type in event_types:
+            pipe.zremrangebyscore(
+                self._raw_events_key(listing_id, event_type),
+                "-inf",
+                f"({now - self.retention.raw_seconds}"
+            )
+            for resolution in ROLLUP_RESOLUTIONS:
+                pipe.hkeys(self._rollup_key(listing_id, resolution, event_type))
+        results = iter(await pipe.execute())
+        
+        pipe = self.redis.pipeline(transaction=False)
+        for event_type in event_types:
+            removed[EventResolution.RAW.value] += next(results)
+            for resolution in ROLLUP_RESOLUTIONS:
+                cutoff = now - self.retention.for_resolution(resolution)
+                expired = [bucket for bucket in next(results) if float(bucket) < cutoff]
+                if expired:
+                    pipe.hdel(self._rollup_key(listing_id, resolution, event_type), *expired)
+                    removed[resolution.value] += len(expired)
+        await pipe.execute()
+        
+        return removed
+
+    async def _migrate_legacy_events(self, listing_id: str, now: float, chunk_size: int = 1000) -> int:
+        """Fold a pre-tiering `listing:{id}:events` set into rollups and raw sets.
+
+        Counters and scores already include these events, so only the rollups
+        and the still-retained raw events are written. Each chunk is moved
+        atomically, so an interrupted migration resumes where it stopped.
+        Returns the number of events dropped from raw storage.
+        """
+        legacy_key = f"listing:{listing_id}:events"
+        if await self.redis.type(legacy_key) != "zset":
+            return 0
+        
+        raw_cutoff = now - self.retention.raw_seconds
+        buckets = [
+            arg
+            for resolution in ROLLUP_RESOLUTIONS
+            for arg in (resolution.value, RESOLUTION_SECONDS[resolution])
+        ]
+        dropped = 0
+        while True:
+            migrated, chunk_dropped = await self._migrate_legacy_chunk_script(
+                keys=[legacy_key],
+                args=[f"listing:{listing_id}", chunk_size, raw_cutoff, *buckets]
+            )
+            dropped += int(chunk_dropped)
+            if not int(migrated):
+                break
+        
+        await self.redis.delete(legacy_key)
+        return dropped
+
+    async def compact_all(self, batch_size: int = 500) -> Dict[str, int]:
+        """Run `compact_events` for every listing with recorded events."""
+        listing_ids = set()
+        for pattern in ("listing:*:event_types", "listing:*:events"):
+            async for key in self.redis.scan_iter(match=pattern, count=batch_size):
+                listing_ids.add(key.split(":")[1])
+        
+        totals: Dict[str, int] = {}
+        for listing_id in sorted(listing_ids):
+            for tier, count in (await self.compact_events(listing_id)).items():
+                totals[tier] = totals.get(tier, 0) + count
+        totals['listings'] = len(listing_ids)
+        return totals
@@ -0,0 +1,158 @@
+from typing import AsyncIterator, Dict, List, Optional, Set
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+import asyncio
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import git
+
+REPO_CACHE_DIR = os.getenv("REPO_CACHE_DIR", os.path.join(tempfile.gettempdir(), "nibiru-repo-cache"))
+
+@dataclass
+class RepoCheckout:
+    path: str  # Working tree at commit_sha
+    commit_sha: str
+    previous_sha: Optional[str] = None
+    # Paths changed since previous_sha; None means everything must be scanned
+    changed: Optional[Set[str]] = None
+    # Per-file stats saved at previous_sha, as plain dicts keyed by path
+    records: Dict[str, dict] = field(default_factory=dict)
+
+class RepoCache:
+    """
+    Persistent clones of scanned repositories, keyed by URL.
+
+    Each repository is kept as a shallow, blob-filtered bare clone plus one
+    linked worktree. A rescan fetches only the new tip commit, checks it out
+    in place (which downloads just the changed blobs) and reports which paths
+    changed, so the scanner can reuse the per-file stats saved last time.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir or REPO_CACHE_DIR
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _base(self, repo_url: str) -> str:
+        name = repo_url.rstrip('/').split('/')[-1].removesuffix('.git')
+        digest = hashlib.sha256(repo_url.encode()).hexdigest()[:16]
+        return os.path.join(self.cache_dir, f"{name}-{digest}")
+
+    @asynccontextmanager
+    async def checkout(self, repo_url: str) -> AsyncIterator[RepoCheckout]:
+        """
+        Update the cached clone to the remote HEAD and hold it for scanning.
+
+        The worktree is locked (across processes too) until the block exits.
+        """
+        base = self._base(repo_url)
+        lock = self._locks.setdefault(base, asyncio.Lock())
+        async with lock:
+            lock_file = await asyncio.to_thread(self._acquire_file_lock, base + ".lock")
+            try:
+                yield await asyncio.to_thread(self._update, repo_url, base)
+            finally:
+                await asyncio.to_thread(lock_file.close)
+
+    async def remote_head(self, repo_url: str) -> str:
+        """The commit the remote HEAD points at, without fetching anything."""
+        output = await asyncio.to_thread(git.cmd.Git().ls_remote, repo_url, "HEAD")
+        if not output:
+            raise ValueError(f"Remote has no HEAD: {repo_url}")
+        return output.split()[0]
+
+    async def save_records(self, repo_url: str, commit_sha: str, records: List[dict]) -> None:
+        """Store the per-file stats for commit_sha, for the next rescan to reuse."""
+        def write():
+            path = self._base(repo_url) + ".records.json"
+            with open(path + ".tmp", "w") as f:
+                json.dump({"commit_sha": commit_sha, "records": records}, f)
+            os.replace(path + ".tmp", path)
+
+        await asyncio.to_thread(write)
+
+    def prune(self, max_age_seconds: float) -> int:
+        """Delete cached repositories not scanned within max_age_seconds; returns how many."""
+        cutoff = time.time() - max_age_seconds
+        removed = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(".lock") or entry.stat().st_mtime >= cutoff:
+                continue
+            base = entry.path[:-len(".lock")]
+            with open(entry.path, "a") as lock_file:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue  # Being scanned right now
+                shutil.rmtree(base + ".git", ignore_errors=True)
+                shutil.rmtree(base + ".work", ignore_errors=True)
+                if os.path.exists(base + ".records.json"):
+                    os.remove(base + ".records.json")
+                os.remove(entry.path)
+            removed += 1
+        return removed
+
+    @staticmethod
+    def _acquire_file_lock(path: str):
+        lock_file = open(path, "a")
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        os.utime(path)  # Last-used time, for prune()
+        return lock_file
+
+    def _update(self, repo_url: str, base: str) -> RepoCheckout:
+        bare_path, work_path = base + ".git", base + ".work"
+
+        if not os.path.isdir(bare_path):
+            shutil.rmtree(work_path, ignore_errors=True)
+            repo = git.Repo.clone_from(repo_url, bare_path, bare=True, depth=1, filter="blob:none")
+            commit_sha = repo.git.rev_parse("HEAD")
+        else:
+            repo = git.Repo(bare_path)
+            repo.git.fetch("origin", "HEAD", depth=1, filter="blob:none")
+            commit_sha = repo.git.rev_parse("FETCH_HEAD")
+
+        if os.path.isdir(work_path):
+            git.Repo(work_path).git.checkout("--detach", "--force", commit_sha)
+        else:
+            repo.git.worktree("prune")
+            repo.git.worktree("add", "--detach", work_path, commit_sha)
+
+        checkout = RepoCheckout(path=work_path, commit_sha=commit_sha)
+        previous = self._load_records(base + ".records.json")
+        if previous is None:
+            return checkout
+
+        previous_sha, records = previous
+        if previous_sha == commit_sha:
+            checkout.previous_sha, checkout.changed, checkout.records = previous_sha, set(), records
+            return checkout
+        try:
+            # Tree-only diff: needs no blobs from the filtered clone
+            output = repo.git.diff("--name-only", "--no-renames", "-z", previous_sha, commit_sha)
+        except git.GitCommandError:
+            # Previous commit no longer reachable (e.g. force-push); scan everything
+            return checkout
+
+        checkout.previous_sha = previous_sha
+        checkout.changed = {p for p in output.split("\0") if p}
+        checkout.records = records
+        return checkout
+
+    @staticmethod
+    def _load_records(path: str):
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        records = {
+            (item["name"] if item["rel_dir"] == "." else f"{item['rel_dir']}/{item['name']}"): item
+            for item in data.get("records", [])
+        }
+        return data.get("commit_sha"), records
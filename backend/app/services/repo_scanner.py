@@ -2,8 +2,11 @@ import os
 import git
 import shutil
 import tempfile
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass, field
 from datetime import datetime
-from typing import List, Dict, Optional
+from typing import Callable, List, Dict, Optional, Set, Tuple
 from pathlib import Path
 import re
 import json
@@ -15,10 +18,145 @@ from app.models.repo_scanner import (
     ListingSuggestion,
     RepoAnalysis
 )
+from app.models.suggestion import BatchSuggestionItem
+from app.services.repo_cache import RepoCache
+from app.services.suggestions import SuggestionEngine
+from app.utils.gitignore import GitIgnore, load_root
+
+# Files read for framework/library tags
+MANIFEST_FILES = {'requirements.txt', 'package.json', 'cargo.toml'}
+
+READ_CHUNK_SIZE = 1024 * 1024
+# A NUL byte in the first block marks a file as binary, as git does
+SNIFF_SIZE = 8192
+
+# Below this many files a process pool costs more than it saves
+PARALLEL_THRESHOLD = 2000
+
+# Called as progress(phase, files_scanned, files_total, bytes_scanned);
+# phases run cloning -> walking -> reading -> analyzing
+ProgressCallback = Callable[[str, int, int, int], None]
+
+def _no_progress(phase: str, files_scanned: int, files_total: int, bytes_scanned: int) -> None:
+    pass
+
+@dataclass
+class FileRecord:
+    """Everything the analysis needs from one file, gathered in a single read."""
+    rel_dir: str  # '.' for the repository root
+    name: str
+    size: int
+    lines: int = 0
+    is_text: bool = False
+    packages: List[str] = field(default_factory=list)  # From manifest files
+
+    @property
+    def ext(self) -> str:
+        return os.path.splitext(self.name)[1].lower()
+
+    @property
+    def rel_path(self) -> str:
+        return self.name if self.rel_dir == '.' else f"{self.rel_dir}/{self.name}"
+
+def _skip_name(name: str) -> bool:
+    return name.startswith('.') or name.startswith('__')
+
+def walk_repo(repo_path: str) -> List[Tuple[str, List[str]]]:
+    """
+    List (relative dir, file names) for every directory worth scanning.
+
+    One top-down os.scandir pass that skips hidden and dunder entries and
+    prunes anything the repository's .gitignore files exclude.
+    """
+    found: List[Tuple[str, List[str]]] = []
+    stack: List[Tuple[str, GitIgnore]] = [("", load_root(repo_path))]
+
+    while stack:
+        rel_dir, ignore = stack.pop()
+        abs_dir = os.path.join(repo_path, rel_dir)
+        if rel_dir:
+            ignore = ignore.child(rel_dir, os.path.join(abs_dir, ".gitignore"))
+
+        files, subdirs = [], []
+        try:
+            entries = list(os.scandir(abs_dir))
+        except OSError:
+            continue
+        for entry in entries:
+            if _skip_name(entry.name):
+                continue
+            rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if ignore.ignored(rel_path, is_dir):
+                continue
+            if is_dir:
+                subdirs.append(rel_path)
+            elif entry.is_file():
+                files.append(entry.name)
+
+        if files:
+            found.append((rel_dir or '.', sorted(files)))
+        stack.extend((d, ignore) for d in sorted(subdirs, reverse=True))
+
+    return found
+
+def scan_file(repo_path: str, rel_dir: str, name: str) -> Optional[FileRecord]:
+    """Read one file once: size, binary sniff, line count and manifest packages."""
+    path = os.path.join(repo_path, rel_dir, name)
+    is_manifest = name.lower() in MANIFEST_FILES
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(SNIFF_SIZE)
+            record = FileRecord(rel_dir=rel_dir, name=name, size=0)
+            if b'\0' in head:
+                record.size = os.fstat(f.fileno()).st_size
+                return record
+
+            size = len(head)
+            newlines = head.count(b'\n')
+            last = head[-1:]
+            manifest = [head] if is_manifest else None
+            for chunk in iter(lambda: f.read(READ_CHUNK_SIZE), b''):
+                size += len(chunk)
+                newlines += chunk.count(b'\n')
+                last = chunk[-1:]
+                if manifest is not None:
+                    manifest.append(chunk)
+    except OSError:
+        return None
+
+    record.size = size
+    record.is_text = True
+    # Same count as len(readlines()): a trailing partial line counts too
+    record.lines = newlines + (1 if size and last != b'\n' else 0)
+    if manifest is not None:
+        content = b''.join(manifest).decode('utf-8', errors='replace')
+        record.packages = re.findall(r'[\w-]+(?==|@|:)', content)[:5]
+    return record
+
+def scan_batch(repo_path: str, batch: List[Tuple[str, str]]) -> List[FileRecord]:
+    """Process-pool entry point: scan a batch of (relative dir, name) files."""
+    records = []
+    for rel_dir, name in batch:
+        record = scan_file(repo_path, rel_dir, name)
+        if record is not None:
+            records.append(record)
+    return records
 
 class RepoScanner:
-    def __init__(self, temp_dir: Optional[str] = None):
+    def __init__(
+        self,
+        temp_dir: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        batch_size: int = 500,
+        repo_cache: Optional[RepoCache] = None,
+        suggestion_engine: Optional[SuggestionEngine] = None
+    ):
         self.temp_dir = temp_dir or tempfile.mkdtemp()
+        self.max_workers = max_workers or min(8, os.cpu_count() or 1)
+        self.batch_size = batch_size
+        self.repo_cache = repo_cache
+        self.suggestion_engine = suggestion_engine or SuggestionEngine()
         self.common_dirs = {
             "source": ["src", "lib", "core", "app"],
             "tests": ["tests", "test"],
@@ -28,74 +166,169 @@ class RepoScanner:
             "examples": ["examples", "samples", "demo"]
         }
         
-    async def scan_github_repo(self, repo_url: str) -> RepoAnalysis:
-        """Clone and scan a GitHub repository."""
+    async def scan_github_repo(
+        self,
+        repo_url: str,
+        progress: Optional[ProgressCallback] = None
+    ) -> RepoAnalysis:
+        """
+        Clone and scan a GitHub repository.
+
+        With a repo cache, the clone persists between scans: a rescan fetches
+        only the new tip commit and re-reads only the files it changed.
+        Without one, a shallow blob-filtered clone is made and discarded.
+        """
         start_time = time.time()
+        progress = progress or _no_progress
+        progress("cloning", 0, 0, 0)
+        
+        if self.repo_cache is not None:
+            async with self.repo_cache.checkout(repo_url) as checkout:
+                previous = {path: FileRecord(**item) for path, item in checkout.records.items()}
+                records = await self.scan_files(
+                    checkout.path, previous=previous, changed=checkout.changed, progress=progress
+                )
+                await self.repo_cache.save_records(repo_url, checkout.commit_sha, [asdict(r) for r in records])
+                return await self._analyze_repo(
+                    repo_path=checkout.path,
+                    repo_url=repo_url,
+                    source=RepoSource.GITHUB,
+                    start_time=start_time,
+                    records=records,
+                    commit_sha=checkout.commit_sha,
+                    progress=progress
+                )
+        
         repo_path = os.path.join(self.temp_dir, self._get_repo_name(repo_url))
         
         try:
-            # Clone repo
-            git.Repo.clone_from(repo_url, repo_path)
+            # History and unneeded blobs are never downloaded
+            repo = await asyncio.to_thread(
+                git.Repo.clone_from, repo_url, repo_path, depth=1, filter="blob:none"
+            )
             
             # Perform analysis
             analysis = await self._analyze_repo(
                 repo_path=repo_path,
                 repo_url=repo_url,
-                source=RepoSource.GITHUB
+                source=RepoSource.GITHUB,
+                start_time=start_time,
+                commit_sha=repo.head.commit.hexsha,
+                progress=progress
             )
             
             return analysis
         finally:
             # Cleanup
             if os.path.exists(repo_path):
-                shutil.rmtree(repo_path)
+                await asyncio.to_thread(shutil.rmtree, repo_path)
                 
-    async def scan_local_repo(self, repo_path: str) -> RepoAnalysis:
+    async def scan_local_repo(
+        self,
+        repo_path: str,
+        progress: Optional[ProgressCallback] = None
+    ) -> RepoAnalysis:
         """Scan a local repository."""
         start_time = time.time()
         return await self._analyze_repo(
             repo_path=repo_path,
-            source=RepoSource.LOCAL
+            source=RepoSource.LOCAL,
+            start_time=start_time,
+            progress=progress
         )
         
+    async def scan_files(
+        self,
+        repo_path: str,
+        previous: Optional[Dict[str, FileRecord]] = None,
+        changed: Optional[Set[str]] = None,
+        progress: Optional[ProgressCallback] = None
+    ) -> List[FileRecord]:
+        """
+        Walk the repository once and read each file once.
+
+        Given the records of an earlier scan and the paths changed since,
+        only new or changed files are read; the rest reuse their records.
+        Large trees are read in batches on a bounded process pool (line
+        counting is CPU-bound byte scanning); small ones in a single thread.
+        """
+        progress = progress or _no_progress
+        progress("walking", 0, 0, 0)
+        directories = await asyncio.to_thread(walk_repo, repo_path)
+        
+        records: List[FileRecord] = []
+        files: List[Tuple[str, str]] = []
+        for rel_dir, names in directories:
+            for name in names:
+                rel_path = name if rel_dir == '.' else f"{rel_dir}/{name}"
+                record = previous.get(rel_path) if previous and changed is not None else None
+                if record is not None and rel_path not in changed:
+                    records.append(record)
+                else:
+                    files.append((rel_dir, name))
+
+        total = len(records) + len(files)
+        scanned_bytes = sum(r.size for r in records)
+        progress("reading", len(records), total, scanned_bytes)
+
+        batches = [files[i:i + self.batch_size] for i in range(0, len(files), self.batch_size)]
+        if len(files) < PARALLEL_THRESHOLD or self.max_workers == 1:
+            for batch in batches:
+                batch_records = await asyncio.to_thread(scan_batch, repo_path, batch)
+                records.extend(batch_records)
+                scanned_bytes += sum(r.size for r in batch_records)
+                progress("reading", len(records), total, scanned_bytes)
+            return records
+
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(max_workers=self.max_workers) as pool:
+            pending = [loop.run_in_executor(pool, scan_batch, repo_path, batch) for batch in batches]
+            for future in asyncio.as_completed(pending):
+                batch_records = await future
+                records.extend(batch_records)
+                scanned_bytes += sum(r.size for r in batch_records)
+                progress("reading", len(records), total, scanned_bytes)
+        return records
+        
     async def _analyze_repo(
         self,
         repo_path: str,
         repo_url: Optional[str] = None,
-        source: RepoSource = RepoSource.LOCAL
+        source: RepoSource = RepoSource.LOCAL,
+        start_time: Optional[float] = None,
+        records: Optional[List[FileRecord]] = None,
+        commit_sha: Optional[str] = None,
+        progress: Optional[ProgressCallback] = None
     ) -> RepoAnalysis:
         """Analyze a repository and generate suggestions."""
-        # Get file statistics
+        start_time = start_time or time.time()
+        progress = progress or _no_progress
+        if records is None:
+            records = await self.scan_files(repo_path, progress=progress)
+        
+        progress("analyzing", len(records), len(records), sum(r.size for r in records))
+        
+        # Get file statistics (text files only, as before)
         total_files = 0
         total_lines = 0
         language_stats: Dict[str, int] = {}
         
-        for root, _, files in os.walk(repo_path):
-            for file in files:
-                if file.startswith('.') or file.startswith('__'):
-                    continue
-                    
-                file_path = os.path.join(root, file)
-                ext = os.path.splitext(file)[1].lower()
-                
-                try:
-                    with open(file_path, 'r', encoding='utf-8') as f:
-                        lines = len(f.readlines())
-                        total_lines += lines
-                        total_files += 1
-                        language_stats[ext] = language_stats.get(ext, 0) + lines
-                except:
-                    continue
+        for record in records:
+            if not record.is_text:
+                continue
+            total_files += 1
+            total_lines += record.lines
+            language_stats[record.ext] = language_stats.get(record.ext, 0) + record.lines
                     
         # Calculate language percentages
         total = sum(language_stats.values())
         language_breakdown = {
             lang: count/total * 100 
             for lang, count in language_stats.items()
-        }
+        } if total else {}
         
         # Identify package groups
-        package_groups = await self._identify_package_groups(repo_path)
+        package_groups = await self._identify_package_groups(records)
         
         # Generate listing suggestions
         listing_suggestions = await self._generate_listing_suggestions(
@@ -112,23 +345,23 @@ class RepoScanner:
             language_breakdown=language_breakdown,
             package_groups=package_groups,
             listing_suggestions=listing_suggestions,
+            commit_sha=commit_sha,
             analysis_timestamp=datetime.utcnow().isoformat(),
             scan_duration_ms=int((time.time() - start_time) * 1000)
         )
         
-    async def _identify_package_groups(self, repo_path: str) -> List[PackageGroup]:
-        """Identify logical package groups in the repository."""
+    async def _identify_package_groups(self, records: List[FileRecord]) -> List[PackageGroup]:
+        """Identify logical package groups from the scanned file records."""
         groups: List[PackageGroup] = []
         
-        for root, dirs, files in os.walk(repo_path):
-            rel_path = os.path.relpath(root, repo_path)
+        by_dir: Dict[str, List[FileRecord]] = {}
+        for record in records:
+            by_dir.setdefault(record.rel_dir, []).append(record)
+        
+        for rel_path, group_records in by_dir.items():
             if rel_path == '.':
                 continue
                 
-            # Skip hidden directories
-            if any(part.startswith('.') for part in rel_path.split(os.sep)):
-                continue
-                
             # Determine group type
             group_type = next(
                 (key for key, patterns in self.common_dirs.items()
@@ -136,30 +369,19 @@ class RepoScanner:
                 "other"
             )
             
-            # Get files in this directory
-            group_files = [
-                f for f in files
-                if not f.startswith('.') and not f.startswith('__')
-            ]
-            
-            if not group_files:
-                continue
+            group_files = [r.name for r in group_records]
                 
             # Calculate complexity score based on file types and sizes
-            complexity_score = await self._calculate_complexity(
-                root, group_files
-            )
+            complexity_score = await self._calculate_complexity(group_records)
             
             # Generate suggested tags
-            suggested_tags = await self._generate_tags(
-                root, group_files, group_type
-            )
+            suggested_tags = await self._generate_tags(group_records, group_type)
             
             groups.append(PackageGroup(
-                name=os.path.basename(root),
-                path=rel_path,
+                name=os.path.basename(rel_path),
+                path=rel_path.replace('/', os.sep),
                 files=group_files,
-                description=await self._generate_description(root, group_files),
+                description=await self._generate_description(group_files),
                 suggested_tier=min(3, max(1, int(complexity_score * 3))),
                 suggested_tags=suggested_tags,
                 type=group_type,
@@ -176,6 +398,14 @@ class RepoScanner:
         """Generate listing suggestions based on package groups."""
         suggestions: List[ListingSuggestion] = []
         
+        # Add the suggestion engine's tags to every group in one in-process batch
+        results = await self.suggestion_engine.suggest_batch(
+            [BatchSuggestionItem(package_group=group) for group in package_groups]
+        )
+        for group, result in zip(package_groups, results):
+            if result.suggestion is not None:
+                group.suggested_tags = list(dict.fromkeys(group.suggested_tags + result.suggestion.tags))
+        
         # Group packages by type
         type_groups: Dict[str, List[PackageGroup]] = {}
         for group in package_groups:
@@ -230,25 +460,12 @@ class RepoScanner:
         """Capitalize and format type name."""
         return ' '.join(word.capitalize() for word in type_name.split('_'))
         
-    async def _calculate_complexity(
-        self,
-        root: str,
-        files: List[str]
-    ) -> float:
+    async def _calculate_complexity(self, records: List[FileRecord]) -> float:
         """Calculate complexity score for a group of files."""
-        total_size = 0
-        total_lines = 0
-        
-        for file in files:
-            file_path = os.path.join(root, file)
-            try:
-                size = os.path.getsize(file_path)
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    lines = len(f.readlines())
-                total_size += size
-                total_lines += lines
-            except:
-                continue
+        # Binary files were never counted (they failed the text read), so
+        # assets don't push a group into a higher tier
+        total_size = sum(r.size for r in records if r.is_text)
+        total_lines = sum(r.lines for r in records if r.is_text)
                 
         # Normalize to 0-1 range (assuming most files < 1MB and 1000 lines)
         size_score = min(1.0, total_size / (1024 * 1024))
@@ -258,38 +475,22 @@ class RepoScanner:
         
     async def _generate_tags(
         self,
-        root: str,
-        files: List[str],
+        records: List[FileRecord],
         group_type: str
     ) -> List[str]:
         """Generate suggested tags based on files and group type."""
         tags = set([group_type])  # Start with group type
         
-        # Add language tags
-        for file in files:
-            ext = os.path.splitext(file)[1].lower()
-            if ext:
-                tags.add(ext[1:])  # Remove dot
-                
-        # Add framework/library tags based on common patterns
-        for file in files:
-            if file.lower() in ['requirements.txt', 'package.json', 'cargo.toml']:
-                try:
-                    with open(os.path.join(root, file), 'r') as f:
-                        content = f.read()
-                        # Extract package names and add as tags
-                        packages = re.findall(r'[\w-]+(?==|@|:)', content)
-                        tags.update(packages[:5])  # Limit to top 5 packages
-                except:
-                    continue
+        for record in records:
+            # Add language tags
+            if record.ext:
+                tags.add(record.ext[1:])  # Remove dot
+            # Framework/library tags, parsed from manifests during the scan
+            tags.update(record.packages)
                     
         return list(tags)
         
-    async def _generate_description(
-        self,
-        root: str,
-        files: List[str]
-    ) -> str:
+    async def _generate_description(self, files: List[str]) -> str:
         """Generate a description for a package group."""
         file_types = set(os.path.splitext(f)[1].lower() for f in files)
         file_count = len(files)
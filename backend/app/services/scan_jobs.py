@@ -0,0 +1,342 @@
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+from datetime import datetime
+import asyncio
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+import time
+import uuid
+import zipfile
+
+from app.core.redis import get_redis
+from app.models.repo_scanner import (
+    RepoAnalysis,
+    RepoSource,
+    ScanJob,
+    ScanJobStatus,
+    ScanProgress
+)
+from app.services.repo_cache import RepoCache
+from app.services.repo_scanner import ProgressCallback, RepoScanner
+
+logger = logging.getLogger(__name__)
+
+SCAN_JOB_KEY = "scan_job:{job_id}"
+SCAN_JOB_CHANNEL = "scan_job:{job_id}:events"
+SCAN_JOB_HEARTBEAT_KEY = "scan_job:{job_id}:heartbeat"
+SCAN_RESULT_KEY = "scan_result:{cache_key}"
+# Per-user zsets of job ids scored by lease deadline, shared by all workers
+SCAN_PENDING_KEY = "scan_jobs:pending:{user_id}"
+SCAN_RUNNING_KEY = "scan_jobs:running:{user_id}"
+
+SCAN_JOB_TTL = 24 * 3600
+SCAN_RESULT_TTL = 7 * 24 * 3600
+
+# A job whose worker hasn't renewed its lease for this long is considered lost
+SCAN_JOB_LEASE = 30.0
+HEARTBEAT_INTERVAL = SCAN_JOB_LEASE / 3
+USER_SLOT_POLL_INTERVAL = 0.5
+
+TERMINAL_STATUSES = {ScanJobStatus.COMPLETED, ScanJobStatus.FAILED}
+
+# Takes one of `limit` leases in a per-user set, after dropping leases whose
+# worker stopped renewing them. Renewing a lease already held always succeeds.
+#
+# KEYS[1] lease zset; ARGV[1] job id, ARGV[2] now, ARGV[3] lease deadline,
+# ARGV[4] limit, ARGV[5] set ttl in seconds
+ACQUIRE_LEASE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[2])
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) or redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[4]) then
+    redis.call('ZADD', KEYS[1], ARGV[3], ARGV[1])
+    redis.call('EXPIRE', KEYS[1], ARGV[5])
+    return 1
+end
+return 0
+"""
+
+Runner = Callable[[ProgressCallback], Awaitable[RepoAnalysis]]
+
+class ScanJobService:
+    """
+    Runs repository scans as background jobs.
+
+    Jobs are kept in Redis, so any worker can report on them, and every
+    state change is published for progress streams. At most
+    `max_concurrent` scans run per process. The per-user limits (at most
+    `per_user_limit` running and `max_pending_per_user` queued or running)
+    are leases in Redis, so they hold across all workers; further jobs wait
+    their turn. The worker running a job renews its leases and heartbeat,
+    and a job whose heartbeat lapses (its worker died) reads as failed.
+    Results are cached by (repository URL, commit) or by upload hash, and
+    identical scans already running are shared rather than repeated.
+    """
+
+    def __init__(
+        self,
+        scanner: RepoScanner,
+        redis_url: Optional[str] = None,
+        max_concurrent: int = 4,
+        per_user_limit: int = 2,
+        max_pending_per_user: int = 10,
+        progress_interval: float = 0.5
+    ):
+        self.scanner = scanner
+        self.repo_cache = scanner.repo_cache or RepoCache()
+        self.redis = get_redis(redis_url)
+        self.max_pending_per_user = max_pending_per_user
+        self.progress_interval = progress_interval
+        self._slots = asyncio.Semaphore(max_concurrent)
+        self._per_user_limit = per_user_limit
+        self._acquire_lease_script = self.redis.register_script(ACQUIRE_LEASE_SCRIPT)
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self._tasks: set = set()
+
+    async def submit_github(self, user_id: str, repo_url: str) -> ScanJob:
+        """Queue a scan of a remote repository."""
+        async def resolve_cache_key() -> str:
+            commit_sha = await self.repo_cache.remote_head(repo_url)
+            return f"github:{hashlib.sha256(repo_url.encode()).hexdigest()}:{commit_sha}"
+
+        return await self._submit(
+            ScanJob(job_id=uuid.uuid4().hex, user_id=user_id, source=RepoSource.GITHUB, target=repo_url),
+            lambda progress: self.scanner.scan_github_repo(repo_url, progress=progress),
+            resolve_cache_key
+        )
+
+    async def submit_upload(self, user_id: str, filename: str, zip_path: str, zip_sha256: str) -> ScanJob:
+        """Queue a scan of an uploaded zip; the job owns and removes `zip_path`."""
+        async def scan(progress: ProgressCallback) -> RepoAnalysis:
+            extract_path = tempfile.mkdtemp()
+            try:
+                await asyncio.to_thread(_extract_zip, zip_path, extract_path)
+                return await self.scanner.scan_local_repo(extract_path, progress=progress)
+            finally:
+                await asyncio.to_thread(shutil.rmtree, extract_path, True)
+
+        async def resolve_cache_key() -> str:
+            return f"zip:{zip_sha256}"
+
+        return await self._submit(
+            ScanJob(job_id=uuid.uuid4().hex, user_id=user_id, source=RepoSource.ZIP, target=filename),
+            scan,
+            resolve_cache_key,
+            cleanup=lambda: os.remove(zip_path)
+        )
+
+    async def submit_local(self, user_id: str, path: str) -> ScanJob:
+        """Queue a scan of a local path (never cached: the tree can change in place)."""
+        return await self._submit(
+            ScanJob(job_id=uuid.uuid4().hex, user_id=user_id, source=RepoSource.LOCAL, target=path),
+            lambda progress: self.scanner.scan_local_repo(path, progress=progress)
+        )
+
+    async def get(self, job_id: str) -> Optional[ScanJob]:
+        pipe = self.redis.pipeline(transaction=False)
+        pipe.get(SCAN_JOB_KEY.format(job_id=job_id))
+        pipe.exists(SCAN_JOB_HEARTBEAT_KEY.format(job_id=job_id))
+        data, alive = await pipe.execute()
+        if not data:
+            return None
+        job = ScanJob.parse_raw(data)
+        if job.status not in TERMINAL_STATUSES and not alive:
+            # The worker that owned it restarted or died; nobody will finish it
+            job.status = ScanJobStatus.FAILED
+            job.error = "Scan worker stopped before the job finished"
+            job.finished_at = job.finished_at or datetime.utcnow()
+        return job
+
+    async def events(self, job_id: str) -> AsyncIterator[ScanJob]:
+        """Yield the job's current state, then every change until it finishes."""
+        pubsub = self.redis.pubsub()
+        # Subscribe before reading the state so no update falls in between
+        await pubsub.subscribe(SCAN_JOB_CHANNEL.format(job_id=job_id))
+        try:
+            job = await self.get(job_id)
+            if job is None:
+                return
+            yield job
+            if job.status in TERMINAL_STATUSES:
+                return
+            while True:
+                message = await pubsub.get_message(
+                    ignore_subscribe_messages=True, timeout=SCAN_JOB_LEASE
+                )
+                if message is None:
+                    # Quiet for a whole lease: check the job's worker is alive
+                    job = await self.get(job_id)
+                    if job is None or job.status in TERMINAL_STATUSES:
+                        if job is not None:
+                            yield job
+                        return
+                    continue
+                job = ScanJob.parse_raw(message["data"])
+                yield job
+                if job.status in TERMINAL_STATUSES:
+                    return
+        finally:
+            await pubsub.aclose()
+
+    async def _submit(
+        self,
+        job: ScanJob,
+        runner: Runner,
+        resolve_cache_key: Optional[Callable[[], Awaitable[str]]] = None,
+        cleanup: Optional[Callable[[], None]] = None
+    ) -> ScanJob:
+        pending_key = SCAN_PENDING_KEY.format(user_id=job.user_id)
+        if not await self._acquire_lease(pending_key, job.job_id, self.max_pending_per_user):
+            if cleanup:
+                await asyncio.to_thread(cleanup)
+            raise OverflowError(f"At most {self.max_pending_per_user} scans may be pending per user")
+
+        await self.redis.set(SCAN_JOB_HEARTBEAT_KEY.format(job_id=job.job_id), 1, ex=int(SCAN_JOB_LEASE))
+        await self._save(job)
+        task = asyncio.create_task(self._run(job, runner, resolve_cache_key, cleanup))
+        # Keep a reference so the task is not garbage collected mid-scan
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return job
+
+    async def _run(
+        self,
+        job: ScanJob,
+        runner: Runner,
+        resolve_cache_key: Optional[Callable[[], Awaitable[str]]],
+        cleanup: Optional[Callable[[], None]]
+    ) -> None:
+        heartbeat = asyncio.create_task(self._heartbeat(job))
+        try:
+            cache_key = await resolve_cache_key() if resolve_cache_key else None
+            if cache_key is not None:
+                cached = await self.redis.get(SCAN_RESULT_KEY.format(cache_key=cache_key))
+                if cached:
+                    job.cached = True
+                    await self._finish(job, RepoAnalysis.parse_raw(cached))
+                    return
+                if cache_key in self._in_flight:
+                    # Same repository and commit already being scanned here
+                    job.cached = True
+                    await self._finish(job, await asyncio.shield(self._in_flight[cache_key]))
+                    return
+                shared = asyncio.get_running_loop().create_future()
+                # Mark a failure as retrieved even when no duplicate was waiting
+                shared.add_done_callback(lambda f: f.cancelled() or f.exception())
+                self._in_flight[cache_key] = shared
+
+            try:
+                result = await self._execute(job, runner)
+            except Exception as e:
+                if cache_key is not None:
+                    self._in_flight.pop(cache_key).set_exception(e)
+                raise
+
+            if cache_key is not None:
+                await self.redis.set(
+                    SCAN_RESULT_KEY.format(cache_key=cache_key), result.json(), ex=SCAN_RESULT_TTL
+                )
+                self._in_flight.pop(cache_key).set_result(result)
+            await self._finish(job, result)
+        except Exception as e:
+            logger.error(f"Scan job {job.job_id} failed: {str(e)}")
+            job.status = ScanJobStatus.FAILED
+            job.error = str(e)
+            job.finished_at = datetime.utcnow()
+            await self._save(job)
+        finally:
+            heartbeat.cancel()
+            try:
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.zrem(SCAN_PENDING_KEY.format(user_id=job.user_id), job.job_id)
+                pipe.delete(SCAN_JOB_HEARTBEAT_KEY.format(job_id=job.job_id))
+                await pipe.execute()
+            finally:
+                if cleanup:
+                    await asyncio.to_thread(cleanup)
+
+    async def _execute(self, job: ScanJob, runner: Runner) -> RepoAnalysis:
+        """Run the scan once both a per-user and a global slot are free."""
+        running_key = SCAN_RUNNING_KEY.format(user_id=job.user_id)
+        while not await self._acquire_lease(running_key, job.job_id, self._per_user_limit):
+            await asyncio.sleep(USER_SLOT_POLL_INTERVAL)
+        try:
+            async with self._slots:
+                return await self._scan(job, runner)
+        finally:
+            await self.redis.zrem(running_key, job.job_id)
+
+    async def _scan(self, job: ScanJob, runner: Runner) -> RepoAnalysis:
+        """Run the scan, publishing throttled progress updates."""
+        job.status = ScanJobStatus.RUNNING
+        job.started_at = datetime.utcnow()
+        await self._save(job)
+
+        last_sent = 0.0
+        publishing: Optional[asyncio.Task] = None
+
+        def report(phase: str, files_scanned: int, files_total: int, bytes_scanned: int) -> None:
+            nonlocal last_sent, publishing
+            phase_changed = phase != job.progress.phase
+            job.progress = ScanProgress(
+                phase=phase,
+                files_scanned=files_scanned,
+                files_total=files_total,
+                bytes_scanned=bytes_scanned
+            )
+            # Throttle updates; _finish always saves the final state
+            now = time.monotonic()
+            if phase_changed or now - last_sent >= self.progress_interval:
+                if publishing is None or publishing.done():
+                    last_sent = now
+                    publishing = asyncio.create_task(self._save(job))
+
+        result = await runner(report)
+        if publishing is not None:
+            await publishing
+        return result
+
+    async def _acquire_lease(self, key: str, job_id: str, limit: int) -> bool:
+        now = time.time()
+        return bool(await self._acquire_lease_script(
+            keys=[key],
+            args=[job_id, now, now + SCAN_JOB_LEASE, limit, SCAN_JOB_TTL]
+        ))
+
+    async def _heartbeat(self, job: ScanJob) -> None:
+        """Renew the job's heartbeat and its per-user leases while it is alive here."""
+        while True:
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+            try:
+                deadline = time.time() + SCAN_JOB_LEASE
+                pipe = self.redis.pipeline(transaction=False)
+                pipe.set(SCAN_JOB_HEARTBEAT_KEY.format(job_id=job.job_id), 1, ex=int(SCAN_JOB_LEASE))
+                pipe.zadd(SCAN_PENDING_KEY.format(user_id=job.user_id), {job.job_id: deadline}, xx=True)
+                pipe.zadd(SCAN_RUNNING_KEY.format(user_id=job.user_id), {job.job_id: deadline}, xx=True)
+                await pipe.execute()
+            except Exception as e:
+                logger.error(f"Heartbeat for scan job {job.job_id} failed: {str(e)}")
+
+    async def _finish(self, job: ScanJob, result: RepoAnalysis) -> None:
+        job.status = ScanJobStatus.COMPLETED
+        job.progress = ScanProgress(
+            phase="done",
+            files_scanned=result.total_files,
+            files_total=result.total_files,
+            bytes_scanned=job.progress.bytes_scanned
+        )
+        job.result = result
+        job.finished_at = datetime.utcnow()
+        await self._save(job)
+
+    async def _save(self, job: ScanJob) -> None:
+        """Store the job and publish its new state (without the result body)."""
+        await self.redis.set(SCAN_JOB_KEY.format(job_id=job.job_id), job.json(), ex=SCAN_JOB_TTL)
+        await self.redis.publish(
+            SCAN_JOB_CHANNEL.format(job_id=job.job_id),
+            job.json(exclude={"result"})
+        )
+
+def _extract_zip(zip_path: str, extract_path: str) -> None:
+    with zipfile.ZipFile(zip_path, 'r') as zip_ref:
+        zip_ref.extractall(extract_path)
@@ -0,0 +1,272 @@
+from typing import Dict, List, Optional, Set, Tuple
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+import asyncio
+import json
+import logging
+import os
+import string
+import threading
+import time
+
+from app.models.repo_scanner import PackageGroup
+from app.models.suggestion import BatchSuggestionItem, BatchSuggestionResult, Suggestion
+
+logger = logging.getLogger(__name__)
+
+TEMPLATES_PATH = Path(__file__).parent.parent / "data" / "templates.json"
+
+DEFAULT_CATEGORY = "Quantum Application"
+
+# Tag -> keywords that suggest it
+TAG_KEYWORDS = {
+    'quantum': ['quantum', 'qubit', 'superposition'],
+    'ai': ['ai', 'ml', 'neural', 'model'],
+    'optimization': ['optimization', 'solver', 'algorithm'],
+    'tooling': ['tool', 'plugin', 'extension'],
+    'data': ['data', 'processing', 'analysis'],
+    'security': ['security', 'encryption', 'privacy']
+}
+
+# Whole words that raise a description's complexity
+TECHNICAL_TERMS = ['quantum', 'algorithm', 'neural', 'optimization', 'compiler']
+
+# Punctuation splits words like whitespace does ("ai-powered", "quantum_codec")
+WORD_SEPARATORS = str.maketrans({c: " " for c in string.punctuation})
+
+# Keywords this short only count as whole words ("ai" is not in "email")
+SHORT_KEYWORD_LENGTH = 3
+
+BASE_PRICES = {
+    1: 29.99,
+    2: 99.99,
+    3: 299.99
+}
+
+TEMPLATE_PRICE_MULTIPLIERS = {
+    'ai_model': 1.5,
+    'toolchain': 1.2,
+    'quantum_codec': 1.3,
+    'glyph_generator': 0.8,
+    'data_processing': 1.1,
+    'saphira_script': 0.9
+}
+
+# A template is inferred for its category once this many of its suggested
+# tags appear in a description that names no template
+MIN_TEMPLATE_MATCHES = 2
+
+_NOT_LOADED = object()
+
+@dataclass(frozen=True)
+class KeywordInfo:
+    tags: Tuple[str, ...]
+    technical: bool
+    templates: Tuple[str, ...]  # Templates listing this keyword as a suggested tag
+
+@dataclass(frozen=True)
+class CompiledVocabulary:
+    """Every vocabulary folded into one prefix index; swapped whole on reload."""
+    # First two letters -> the keywords starting with them
+    prefix_index: Dict[str, Tuple[Tuple[str, KeywordInfo], ...]]
+    templates: Dict[str, dict]
+
+def compile_vocabulary(templates: Dict[str, dict]) -> CompiledVocabulary:
+    """Build the single-pass matcher for the tag, technical-term and template vocabularies."""
+    tags: Dict[str, Set[str]] = {}
+    for tag, words in TAG_KEYWORDS.items():
+        for word in words:
+            tags.setdefault(word, set()).add(tag)
+    template_words: Dict[str, Set[str]] = {}
+    for name, template in templates.items():
+        for word in template.get('suggested_tags', []):
+            template_words.setdefault(word.lower(), set()).add(name)
+
+    prefix_index: Dict[str, list] = {}
+    for word in sorted(set(tags) | set(TECHNICAL_TERMS) | set(template_words)):
+        if len(word) < 2:
+            continue
+        info = KeywordInfo(
+            tags=tuple(sorted(tags.get(word, ()))),
+            technical=word in TECHNICAL_TERMS,
+            templates=tuple(sorted(template_words.get(word, ())))
+        )
+        prefix_index.setdefault(word[:2], []).append((word, info))
+    return CompiledVocabulary(
+        prefix_index={prefix: tuple(entries) for prefix, entries in prefix_index.items()},
+        templates=templates
+    )
+
+def suggest_tier(complexity: float) -> int:
+    """Suggest glyph tier based on complexity."""
+    if complexity > 0.8:
+        return 3
+    elif complexity > 0.4:
+        return 2
+    return 1
+
+def suggest_price(tier: int, template: Optional[str]) -> float:
+    """Suggest price based on tier and template."""
+    base_price = BASE_PRICES[tier]
+    if template and template in TEMPLATE_PRICE_MULTIPLIERS:
+        return round(base_price * TEMPLATE_PRICE_MULTIPLIERS[template], 2)
+    return base_price
+
+def package_group_text(group: PackageGroup) -> str:
+    """The text a package group is judged by: its name, type, description, tags and files."""
+    return " ".join([
+        group.name,
+        group.type,
+        group.description,
+        " ".join(group.suggested_tags),
+        " ".join(group.files)
+    ])
+
+class SuggestionEngine:
+    """
+    Listing suggestions from a description in one pass over its text.
+
+    The vocabularies are compiled into a single keyword index when the
+    engine is created. templates.json is re-read when its modification time changes
+    (checked at most every `reload_interval` seconds), so templates can be
+    edited without a restart; a template file that fails to parse leaves
+    the previous vocabulary in place.
+    """
+
+    def __init__(self, templates_path: Path = TEMPLATES_PATH, reload_interval: float = 1.0):
+        self.templates_path = Path(templates_path)
+        self.reload_interval = reload_interval
+        self._lock = threading.Lock()
+        self._mtime: object = _NOT_LOADED
+        self._checked_at = 0.0
+        self.vocabulary = compile_vocabulary({})
+        self.reload()
+
+    @property
+    def templates(self) -> Dict[str, dict]:
+        return self.vocabulary.templates
+
+    def reload(self) -> bool:
+        """Re-read and recompile the templates; returns whether anything changed."""
+        with self._lock:
+            self._checked_at = time.monotonic()
+            try:
+                mtime = os.stat(self.templates_path).st_mtime
+            except FileNotFoundError:
+                mtime = None
+            if mtime == self._mtime:
+                return False
+
+            templates: Dict[str, dict] = {}
+            if mtime is not None:
+                try:
+                    with open(self.templates_path) as f:
+                        templates = json.load(f)
+                except ValueError as e:
+                    # Keep serving the old vocabulary until the file changes again
+                    self._mtime = mtime
+                    logger.error(f"Failed to reload suggestion templates: {str(e)}")
+                    return False
+            self.vocabulary = compile_vocabulary(templates)
+            self._mtime = mtime
+            return True
+
+    def suggest(self, description: str, template: Optional[str] = None) -> Suggestion:
+        """Tags, category, tier, price and confidence for one description."""
+        if time.monotonic() - self._checked_at >= self.reload_interval:
+            self.reload()
+        vocabulary = self.vocabulary
+
+        words = description.split()
+        avg_word_length = sum(map(len, words)) / len(words) if words else 0
+
+        # One pass to split out the distinct words and count them (all in C);
+        # only distinct words whose first two letters start a keyword reach
+        # the Python loop. Keywords match at the start of a word.
+        found_tags: Set[str] = set()
+        template_hits: Dict[str, Set[str]] = {}
+        technical_terms = 0
+        prefix_index = vocabulary.prefix_index
+        for token, count in Counter(description.lower().translate(WORD_SEPARATORS).split()).items():
+            entries = prefix_index.get(token[:2])
+            if entries is None:
+                continue
+            for word, info in entries:
+                if not token.startswith(word):
+                    continue
+                whole = len(token) == len(word)
+                if whole and info.technical:
+                    technical_terms += count
+                if whole or len(word) > SHORT_KEYWORD_LENGTH:
+                    found_tags.update(info.tags)
+                    for name in info.templates:
+                        template_hits.setdefault(name, set()).add(word)
+
+        complexity = min(max(((avg_word_length * 0.3) + (technical_terms * 0.7)) / 10, 0), 1)
+        tier = suggest_tier(complexity)
+
+        template_data = vocabulary.templates.get(template, {}) if template else {}
+        category = template_data.get('category')
+        if category is None:
+            category = self._infer_category(vocabulary, template_hits)
+
+        return Suggestion(
+            tags=sorted(found_tags),
+            category=category,
+            glyphTier=tier,
+            suggestedPrice=suggest_price(tier, template),
+            sampleName=template_data.get('name_template', '').replace(
+                '{type}', template_data.get('type', 'Quantum')
+            ) if template else None,
+            sampleBlurb=template_data.get('blurb_template', '') if template else None,
+            confidence=min(
+                (len(found_tags) * 0.2) + (complexity * 0.5) + (0.3 if template else 0),
+                1.0
+            ) * 100
+        )
+
+    @staticmethod
+    def _infer_category(vocabulary: CompiledVocabulary, template_hits: Dict[str, Set[str]]) -> str:
+        """Category of the template whose suggested tags the text matches most."""
+        best = max(template_hits.items(), key=lambda item: (len(item[1]), item[0]), default=None)
+        if best is None or len(best[1]) < MIN_TEMPLATE_MATCHES:
+            return DEFAULT_CATEGORY
+        return vocabulary.templates[best[0]].get('category', DEFAULT_CATEGORY)
+
+    def suggest_many(self, items: List[Tuple[int, str, Optional[str]]]) -> List[BatchSuggestionResult]:
+        """Suggestions for (index, text, template) items; a failure stays with its item."""
+        results = []
+        for index, text, template in items:
+            try:
+                results.append(BatchSuggestionResult(index=index, suggestion=self.suggest(text, template)))
+            except Exception as e:
+                results.append(BatchSuggestionResult(index=index, error=str(e)))
+        return results
+
+    async def suggest_batch(self, items: List[BatchSuggestionItem]) -> List[BatchSuggestionResult]:
+        """
+        Suggestions for many descriptions and package groups, in request order.
+
+        Invalid items and items that fail get an error instead of failing
+        the batch. The batch runs on one thread with the engine's compiled
+        vocabulary: at a few hundred microseconds per item, a process pool
+        spends more on start-up and pickling than it saves (see
+        scripts/bench_suggestions.py --batch).
+        """
+        results: List[Optional[BatchSuggestionResult]] = [None] * len(items)
+        work: List[Tuple[int, str, Optional[str]]] = []
+        for index, item in enumerate(items):
+            if (item.description is None) == (item.package_group is None):
+                results[index] = BatchSuggestionResult(
+                    index=index,
+                    error="Exactly one of description and package_group is required"
+                )
+            elif item.package_group is not None:
+                work.append((index, package_group_text(item.package_group), item.template))
+            else:
+                work.append((index, item.description, item.template))
+
+        for result in await asyncio.to_thread(self.suggest_many, work):
+            results[result.index] = result
+        return results
@@ -0,0 +1,229 @@
+from typing import Dict, Iterable, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from fastapi import status
+from sqlalchemy.orm import Session
+
+from app.core.redis import get_redis
+from app.models.listing import Listing
+from app.models.tier_access import TIER3_SCORE_THRESHOLD, TIER_POLICY_VERSION, TierDecision
+from app.models.user import User
+from app.utils.cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Invalidations are broadcast here ("listing:<id>" or "user:<id>") so every
+# worker stops serving the affected decisions
+TIER_INVALIDATION_CHANNEL = "tier_access:invalidate"
+
+def decide(listing_id: str, required_tier: int, user: Optional[User]) -> TierDecision:
+    """Apply the tier rules to one listing and user."""
+    # Always allow access to Tier 1 listings
+    if required_tier == 1:
+        return TierDecision(listing_id=listing_id, required_tier=1, granted=True)
+
+    # Must be logged in for Tier 2+
+    if not user:
+        return TierDecision(
+            listing_id=listing_id,
+            required_tier=required_tier,
+            granted=False,
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail={
+                "message": "Authentication required for this content",
+                "required_tier": required_tier,
+                "upgrade_options": ["login", "create_account"]
+            }
+        )
+
+    # Tier 2 Access Rules
+    if required_tier == 2:
+        if user.is_creator or user.subscription_status == "active":
+            return TierDecision(listing_id=listing_id, required_tier=2, granted=True)
+        return TierDecision(
+            listing_id=listing_id,
+            required_tier=2,
+            granted=False,
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail={
+                "message": "Creator status or paid account required",
+                "required_tier": 2,
+                "current_tier": 1,
+                "upgrade_options": ["become_creator", "subscribe"]
+            }
+        )
+
+    # Tier 3 Access Rules
+    if required_tier == 3:
+        if user.is_admin or user.quantum_score >= TIER3_SCORE_THRESHOLD:
+            return TierDecision(listing_id=listing_id, required_tier=3, granted=True)
+        return TierDecision(
+            listing_id=listing_id,
+            required_tier=3,
+            granted=False,
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail={
+                "message": "Advanced access required",
+                "required_tier": 3,
+                "current_tier": 2 if user.is_creator else 1,
+                "quantum_score": user.quantum_score,
+                "required_score": TIER3_SCORE_THRESHOLD,
+                "upgrade_options": ["increase_quantum_score", "request_admin_override"]
+            }
+        )
+
+    return TierDecision(listing_id=listing_id, required_tier=required_tier, granted=True)
+
+class TierAccessService:
+    """
+    Tier-access decisions with an in-process cache.
+
+    Decisions are cached per (user, listing, policy version) for a short
+    TTL, and each listing's required tier is cached alongside so a hit
+    needs no database query. When a listing's tier or a user's
+    subscription or quantum score changes, call `invalidate_listing` or
+    `invalidate_user`: every worker then ignores decisions made before
+    that moment, without having to find and delete them.
+    """
+
+    def __init__(
+        self,
+        redis_url: Optional[str] = None,
+        cache_size: int = 50000,
+        ttl: float = 30.0
+    ):
+        self.redis = get_redis(redis_url)
+        self.ttl = ttl
+        self.decisions = TTLCache(maxsize=cache_size, ttl=ttl)
+        self.tiers = TTLCache(maxsize=cache_size, ttl=ttl)
+        # Monotonic time of the last invalidation per "listing:<id>"/"user:<id>".
+        # Marks older than the TTL can only shadow expired entries, so they
+        # are pruned rather than evicted (evicting one early would revive
+        # stale decisions).
+        self._invalidated: Dict[str, float] = {}
+        self._invalidation_task: Optional[asyncio.Task] = None
+
+    async def check(self, db: Session, listing_id: str, user: Optional[User]) -> Optional[TierDecision]:
+        """Decide access to one listing; None if the listing does not exist."""
+        return (await self.check_many(db, [listing_id], user)).get(listing_id)
+
+    async def check_many(
+        self,
+        db: Session,
+        listing_ids: Iterable[str],
+        user: Optional[User]
+    ) -> Dict[str, TierDecision]:
+        """
+        Decide access to a page of listings in one call.
+
+        Tiers missing from the cache are loaded with a single query; ids of
+        listings that do not exist are left out of the result.
+        """
+        self._ensure_invalidation_listener()
+        user_id = str(user.id) if user else None
+
+        decisions: Dict[str, TierDecision] = {}
+        misses: List[str] = []
+        for listing_id in dict.fromkeys(listing_ids):
+            decision = self._get_decision(user_id, listing_id)
+            if decision is None:
+                misses.append(listing_id)
+            else:
+                decisions[listing_id] = decision
+        if not misses:
+            return decisions
+
+        now = time.monotonic()
+        tiers = self._load_tiers(db, misses)
+        for listing_id, required_tier in tiers.items():
+            decision = decide(listing_id, required_tier, user)
+            self.decisions.set((user_id, listing_id, TIER_POLICY_VERSION), (decision, now))
+            decisions[listing_id] = decision
+        return decisions
+
+    async def invalidate_listing(self, listing_id: str) -> None:
+        """Forget decisions for a listing (e.g. its tier changed) on every worker."""
+        await self._invalidate(f"listing:{listing_id}")
+
+    async def invalidate_user(self, user_id: str) -> None:
+        """Forget decisions for a user (e.g. subscription or quantum score changed)."""
+        await self._invalidate(f"user:{user_id}")
+
+    def get_cache_stats(self) -> Dict:
+        """Hit/miss metrics for the decision and tier caches."""
+        return {
+            "decisions": self.decisions.stats(),
+            "tiers": self.tiers.stats(),
+            "invalidation_marks": len(self._invalidated),
+            "invalidation_listener": bool(
+                self._invalidation_task and not self._invalidation_task.done()
+            )
+        }
+
+    def _get_decision(self, user_id: Optional[str], listing_id: str) -> Optional[TierDecision]:
+        entry = self.decisions.get((user_id, listing_id, TIER_POLICY_VERSION))
+        if entry is None:
+            return None
+        decision, decided_at = entry
+        if (decided_at <= self._invalidated.get(f"listing:{listing_id}", -1.0) or
+                decided_at <= self._invalidated.get(f"user:{user_id}", -1.0)):
+            return None
+        return decision
+
+    def _load_tiers(self, db: Session, listing_ids: List[str]) -> Dict[str, int]:
+        """Required tiers, from the cache or one query for just that column."""
+        tiers: Dict[str, int] = {}
+        missing: List[str] = []
+        for listing_id in listing_ids:
+            tier = self.tiers.get(listing_id)
+            if tier is None:
+                missing.append(listing_id)
+            else:
+                tiers[listing_id] = tier
+        if missing:
+            rows: List[Tuple[str, int]] = (
+                db.query(Listing.id, Listing.glyph_tier)
+                .filter(Listing.id.in_(missing))
+                .all()
+            )
+            # Misses are not cached; the listing may be created a moment later
+            for listing_id, tier in rows:
+                self.tiers.set(listing_id, tier)
+                tiers[listing_id] = tier
+        return tiers
+
+    async def _invalidate(self, mark: str) -> None:
+        self._mark_invalidated(mark)
+        await self.redis.publish(TIER_INVALIDATION_CHANNEL, mark)
+
+    def _mark_invalidated(self, mark: str) -> None:
+        now = time.monotonic()
+        self._invalidated[mark] = now
+        if mark.startswith("listing:"):
+            self.tiers.invalidate(mark[len("listing:"):])
+        # Prune marks that can no longer shadow a live entry
+        if len(self._invalidated) > 1024:
+            cutoff = now - self.ttl
+            self._invalidated = {k: t for k, t in self._invalidated.items() if t >= cutoff}
+
+    def _ensure_invalidation_listener(self) -> None:
+        """(Re)start the pub/sub listener that applies other workers' invalidations."""
+        if self._invalidation_task and not self._invalidation_task.done():
+            return
+        if self._invalidation_task is not None:
+            # Invalidations may have been missed while the listener was down
+            self.decisions.clear()
+            self.tiers.clear()
+        self._invalidation_task = asyncio.create_task(self._listen_for_invalidations())
+
+    async def _listen_for_invalidations(self) -> None:
+        pubsub = self.redis.pubsub()
+        await pubsub.subscribe(TIER_INVALIDATION_CHANNEL)
+        try:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    self._mark_invalidated(message["data"])
+        finally:
+            await pubsub.aclose()
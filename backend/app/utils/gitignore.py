@@ -0,0 +1,102 @@
+from typing import List, Optional, Pattern, Tuple
+import os
+import re
+
+Rule = Tuple[str, Pattern, bool, bool, bool]  # base dir, regex, negated, dir only, anchored
+
+def _translate(pattern: str) -> str:
+    """Translate a gitignore glob into a regex over '/'-separated paths."""
+    i, out = 0, []
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == len(pattern):
+            out.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            out.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            out.append("[^/]")
+            i += 1
+        elif pattern[i] == "[":
+            end = pattern.find("]", i + 1)
+            if end == -1:
+                out.append(re.escape("["))
+                i += 1
+            else:
+                body = pattern[i + 1:end].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end + 1
+        else:
+            out.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(out) + r"\Z"
+
+class GitIgnore:
+    """
+    The subset of .gitignore semantics a scanner needs.
+
+    Rules are scoped to the directory of the .gitignore that declared them
+    and are checked in order with the last match winning, including `!`
+    negation, trailing-slash directory rules and `**`. Callers walk top-down
+    and prune ignored directories, so (as in git) files under an excluded
+    directory cannot be re-included.
+    """
+
+    def __init__(self, rules: Optional[List[Rule]] = None):
+        self.rules: List[Rule] = rules or []
+
+    def child(self, rel_dir: str, gitignore_path: str) -> "GitIgnore":
+        """A matcher that also applies the .gitignore found in `rel_dir`, if any."""
+        try:
+            with open(gitignore_path, "r", encoding="utf-8", errors="replace") as f:
+                lines = f.read().splitlines()
+        except OSError:
+            return self
+
+        rules = list(self.rules)
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            if line.startswith("\\"):
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            anchored = "/" in line
+            line = line.lstrip("/")
+            rules.append((rel_dir, re.compile(_translate(line)), negated, dir_only, anchored))
+        return GitIgnore(rules)
+
+    def ignored(self, rel_path: str, is_dir: bool) -> bool:
+        """Whether a repo-relative ('/'-separated) path is ignored."""
+        result = False
+        name = rel_path.rsplit("/", 1)[-1]
+        for base, regex, negated, dir_only, anchored in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if base:
+                if not rel_path.startswith(base + "/"):
+                    continue
+                sub = rel_path[len(base) + 1:]
+            else:
+                sub = rel_path
+            if regex.match(sub if anchored else name):
+                result = not negated
+        return result
+
+def load_root(repo_path: str) -> GitIgnore:
+    """Matcher for a repository root's .gitignore."""
+    return GitIgnore().child("", os.path.join(repo_path, ".gitignore"))
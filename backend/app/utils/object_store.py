@@ -0,0 +1,633 @@
+from typing import Dict, List, Optional, Tuple
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import os
+import posixpath
+import secrets
+import shutil
+import time
+import uuid
+from urllib.parse import quote, urlencode
+
+from fastapi import UploadFile
+
+# S3 requires every part but the last to be at least 5 MiB
+MIN_PART_SIZE = 5 * 1024 * 1024
+UPLOAD_PART_SIZE = int(os.getenv("UPLOAD_PART_SIZE", str(8 * 1024 * 1024)))
+UPLOAD_CONCURRENCY = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+STORAGE_IO_THREADS = int(os.getenv("STORAGE_IO_THREADS", "16"))
+
+# Signs local stand-in URLs and upload resume tokens. Every worker must use
+# the same value; see require_storage_secret()
+LOCAL_STORAGE_SECRET = os.getenv("LOCAL_STORAGE_SECRET", "")
+
+# How long an interrupted multipart upload can be resumed before the sweep
+# aborts it and its token stops being accepted
+UPLOAD_RESUME_TTL = int(os.getenv("UPLOAD_RESUME_TTL", str(7 * 24 * 3600)))
+
+# Blocking SDK and file calls run here so they never stall the event loop
+_io_executor = ThreadPoolExecutor(max_workers=STORAGE_IO_THREADS, thread_name_prefix="storage-io")
+
+async def run_io(func, *args, **kwargs):
+    """Run a blocking storage call on the shared I/O pool."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, partial(func, *args, **kwargs))
+
+def require_storage_secret(allow_ephemeral: bool = False) -> None:
+    """
+    Fail unless LOCAL_STORAGE_SECRET is configured. With `allow_ephemeral`
+    (single-process local runs) a random secret is used instead, so tokens
+    and URLs it signs are only valid in this process.
+    """
+    global LOCAL_STORAGE_SECRET
+    if LOCAL_STORAGE_SECRET:
+        return
+    if not allow_ephemeral:
+        raise RuntimeError(
+            "LOCAL_STORAGE_SECRET is not set; it signs upload resume tokens, "
+            "which every worker must be able to verify"
+        )
+    LOCAL_STORAGE_SECRET = secrets.token_hex(32)
+
+@dataclass
+class UploadResult:
+    key: str
+    size: int
+    sha256: str
+
+@dataclass
+class ObjectInfo:
+    size: int
+    # Base64 SHA-256 verified by the store: of the whole object for a single
+    # put, or S3's composite "<sha256 of part digests>-<parts>" for multipart
+    checksum_sha256: Optional[str] = None
+
+def composite_checksum(part_sha256s: List[str]) -> str:
+    """The checksum S3 reports for a multipart object from its parts' hex SHA-256s."""
+    combined = hashlib.sha256(b"".join(bytes.fromhex(h) for h in part_sha256s)).digest()
+    return f"{base64.b64encode(combined).decode()}-{len(part_sha256s)}"
+
+def hex_to_b64(sha256_hex: str) -> str:
+    return base64.b64encode(bytes.fromhex(sha256_hex)).decode()
+
+class UploadInterrupted(Exception):
+    """A multipart upload failed part-way; `resume_token` lets the client resume it."""
+
+    def __init__(self, key: str, upload_id: str, owner: str, cause: Exception):
+        super().__init__(f"Upload of {key} interrupted: {cause}")
+        self.key = key
+        self.upload_id = upload_id
+        self.resume_token = encode_resume_token(key, upload_id, owner)
+
+def _sign_resume_token(body: str) -> str:
+    return hmac.new(LOCAL_STORAGE_SECRET.encode(), body.encode(), hashlib.sha256).hexdigest()
+
+def encode_resume_token(key: str, upload_id: str, owner: str) -> str:
+    """Sign a token that lets `owner`, and only them, resume this upload."""
+    payload = json.dumps(
+        {"k": key, "u": upload_id, "o": owner, "t": int(time.time())},
+        separators=(",", ":")
+    )
+    body = base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+    return f"{body}.{_sign_resume_token(body)}"
+
+def decode_resume_token(token: str, owner: str, prefix: str) -> Tuple[str, str]:
+    """
+    Decode a resume token into (key, upload_id).
+
+    Raises ValueError unless the token was signed here, was issued to
+    `owner`, has not expired and names a key under `prefix`.
+    """
+    body, _, signature = token.partition(".")
+    if not hmac.compare_digest(_sign_resume_token(body), signature):
+        raise ValueError("Invalid resume token: bad signature")
+    try:
+        padded = body + "=" * (-len(body) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        key, upload_id, token_owner, issued = payload["k"], payload["u"], payload["o"], payload["t"]
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Invalid resume token: {str(e)}")
+    if token_owner != owner:
+        raise ValueError("Invalid resume token: issued to another user")
+    if issued + UPLOAD_RESUME_TTL < time.time():
+        raise ValueError("Invalid resume token: expired")
+    if not key.startswith(prefix.rstrip("/") + "/"):
+        raise ValueError("Invalid resume token: key outside the upload prefix")
+    return key, upload_id
+
+async def abort_stale_uploads(store: "ObjectStore", max_age: float = UPLOAD_RESUME_TTL,
+                              dry_run: bool = False) -> int:
+    """Abort multipart uploads started more than `max_age` seconds ago. Returns how many."""
+    cutoff = time.time() - max_age
+    aborted = 0
+    for key, upload_id, initiated in await store.list_multipart_uploads():
+        if initiated >= cutoff:
+            continue
+        if not dry_run:
+            await store.abort_multipart(key, upload_id)
+        aborted += 1
+    return aborted
+
+class ObjectStore(ABC):
+    """
+    Async multipart object storage.
+
+    Part ETags are the hex MD5 of the part body (as on S3 for unencrypted
+    objects), which lets a resumed upload skip parts that already landed.
+    """
+
+    @abstractmethod
+    async def create_multipart(self, key: str) -> str:
+        ...
+
+    @abstractmethod
+    async def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        ...
+
+    @abstractmethod
+    async def list_parts(self, key: str, upload_id: str) -> Dict[int, str]:
+        ...
+
+    @abstractmethod
+    async def complete_multipart(self, key: str, upload_id: str, parts: Dict[int, str],
+                                 part_sha256s: Optional[Dict[int, str]] = None) -> None:
+        """Assemble the parts; `part_sha256s` is required for checked uploads."""
+
+    @abstractmethod
+    async def abort_multipart(self, key: str, upload_id: str) -> None:
+        ...
+
+    @abstractmethod
+    async def list_multipart_uploads(self) -> List[Tuple[str, str, float]]:
+        """In-progress multipart uploads as (key, upload_id, initiated timestamp)."""
+
+    @abstractmethod
+    async def put(self, key: str, data: bytes) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def head(self, key: str) -> Optional[ObjectInfo]:
+        ...
+
+    @abstractmethod
+    async def copy(self, source_key: str, key: str) -> None:
+        ...
+
+    @abstractmethod
+    async def upload_path(self, path: str, key: str) -> None:
+        """Upload a local file (used by background jobs, not request handlers)."""
+
+    @abstractmethod
+    async def create_checked_multipart(self, key: str) -> str:
+        """Start a multipart upload whose parts must carry SHA-256 checksums."""
+
+    @abstractmethod
+    def presign_get(self, key: str, expires_in: int, filename: Optional[str] = None) -> str:
+        ...
+
+    @abstractmethod
+    def presign_put(self, key: str, expires_in: int, sha256: str) -> str:
+        """URL for a single PUT that the store rejects unless the body hashes to `sha256`."""
+
+    @abstractmethod
+    def presign_part(self, key: str, upload_id: str, part_number: int,
+                     expires_in: int, sha256: str) -> str:
+        ...
+
+    @abstractmethod
+    def url(self, key: str) -> str:
+        ...
+
+class S3ObjectStore(ObjectStore):
+    """S3 (or any S3-compatible endpoint such as MinIO) through boto3, off-loop."""
+
+    def __init__(self, client, bucket: str, region: str):
+        self.client = client
+        self.bucket = bucket
+        self.region = region
+
+    async def create_multipart(self, key: str) -> str:
+        response = await run_io(self.client.create_multipart_upload, Bucket=self.bucket, Key=key)
+        return response["UploadId"]
+
+    async def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        response = await run_io(
+            self.client.upload_part,
+            Bucket=self.bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=data
+        )
+        return response["ETag"].strip('"')
+
+    async def list_parts(self, key: str, upload_id: str) -> Dict[int, str]:
+        parts: Dict[int, str] = {}
+        paginator = self.client.get_paginator("list_parts")
+
+        def collect():
+            for page in paginator.paginate(Bucket=self.bucket, Key=key, UploadId=upload_id):
+                for part in page.get("Parts", []):
+                    parts[part["PartNumber"]] = part["ETag"].strip('"')
+
+        await run_io(collect)
+        return parts
+
+    async def complete_multipart(self, key: str, upload_id: str, parts: Dict[int, str],
+                                 part_sha256s: Optional[Dict[int, str]] = None) -> None:
+        completed = []
+        for n in sorted(parts):
+            part = {"PartNumber": n, "ETag": parts[n]}
+            if part_sha256s:
+                part["ChecksumSHA256"] = hex_to_b64(part_sha256s[n])
+            completed.append(part)
+        await run_io(
+            self.client.complete_multipart_upload,
+            Bucket=self.bucket,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": completed}
+        )
+
+    async def abort_multipart(self, key: str, upload_id: str) -> None:
+        await run_io(self.client.abort_multipart_upload, Bucket=self.bucket, Key=key, UploadId=upload_id)
+
+    async def list_multipart_uploads(self) -> List[Tuple[str, str, float]]:
+        uploads = []
+        paginator = self.client.get_paginator("list_multipart_uploads")
+
+        def collect():
+            for page in paginator.paginate(Bucket=self.bucket):
+                for upload in page.get("Uploads", []):
+                    uploads.append((upload["Key"], upload["UploadId"], upload["Initiated"].timestamp()))
+
+        await run_io(collect)
+        return uploads
+
+    async def put(self, key: str, data: bytes) -> None:
+        await run_io(self.client.put_object, Bucket=self.bucket, Key=key, Body=data)
+
+    async def delete(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+        try:
+            await run_io(self.client.delete_object, Bucket=self.bucket, Key=key)
+            return True
+        except ClientError:
+            return False
+
+    async def head(self, key: str) -> Optional[ObjectInfo]:
+        from botocore.exceptions import ClientError
+        try:
+            response = await run_io(
+                self.client.head_object, Bucket=self.bucket, Key=key, ChecksumMode="ENABLED"
+            )
+        except ClientError:
+            return None
+        return ObjectInfo(size=response["ContentLength"], checksum_sha256=response.get("ChecksumSHA256"))
+
+    async def copy(self, source_key: str, key: str) -> None:
+        # Managed copy: server-side, multipart above 5 GB
+        await run_io(self.client.copy, {"Bucket": self.bucket, "Key": source_key}, self.bucket, key)
+
+    async def upload_path(self, path: str, key: str) -> None:
+        await run_io(self.client.upload_file, path, self.bucket, key)
+
+    async def create_checked_multipart(self, key: str) -> str:
+        response = await run_io(
+            self.client.create_multipart_upload,
+            Bucket=self.bucket, Key=key, ChecksumAlgorithm="SHA256"
+        )
+        return response["UploadId"]
+
+    # Presigning is local HMAC work in botocore, so it stays on the loop
+
+    def presign_get(self, key: str, expires_in: int, filename: Optional[str] = None) -> str:
+        params = {"Bucket": self.bucket, "Key": key}
+        if filename:
+            params["ResponseContentDisposition"] = f'attachment; filename="{filename}"'
+        return self.client.generate_presigned_url("get_object", Params=params, ExpiresIn=expires_in)
+
+    def presign_put(self, key: str, expires_in: int, sha256: str) -> str:
+        return self.client.generate_presigned_url(
+            "put_object",
+            Params={"Bucket": self.bucket, "Key": key, "ChecksumSHA256": hex_to_b64(sha256)},
+            ExpiresIn=expires_in
+        )
+
+    def presign_part(self, key: str, upload_id: str, part_number: int,
+                     expires_in: int, sha256: str) -> str:
+        return self.client.generate_presigned_url(
+            "upload_part",
+            Params={
+                "Bucket": self.bucket,
+                "Key": key,
+                "UploadId": upload_id,
+                "PartNumber": part_number,
+                "ChecksumSHA256": hex_to_b64(sha256),
+            },
+            ExpiresIn=expires_in
+        )
+
+    def url(self, key: str) -> str:
+        return f"https://{self.bucket}.s3.{self.region}.amazonaws.com/{key}"
+
+class LocalObjectStore(ObjectStore):
+    """
+    Filesystem stand-in for S3, for development and offline tests.
+
+    Objects live at `root/<key>`; in-progress multipart uploads keep one file
+    per part under `root/.multipart/<upload_id>/` until completed. Presigned
+    URLs are HMAC-signed links to the local storage routes under `base_url`,
+    which check the same expiry and checksum conditions S3 would.
+    """
+
+    def __init__(self, root: str, base_url: Optional[str] = None):
+        self.root = os.path.abspath(root)
+        self.base_url = base_url
+        os.makedirs(self.root, exist_ok=True)
+
+    def sign(self, method: str, key: str, expires: int, **conditions) -> str:
+        message = json.dumps([method, key, expires, conditions], sort_keys=True)
+        return hmac.new(LOCAL_STORAGE_SECRET.encode(), message.encode(), hashlib.sha256).hexdigest()
+
+    def verify(self, method: str, key: str, expires: int, signature: str, **conditions) -> bool:
+        """Check a presigned request made against the local storage routes."""
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self.sign(method, key, expires, **conditions), signature)
+
+    def _presign(self, method: str, key: str, expires_in: int, **conditions) -> str:
+        expires = int(time.time()) + expires_in
+        query = {**conditions, "expires": expires, "signature": self.sign(method, key, expires, **conditions)}
+        return f"{(self.base_url or '').rstrip('/')}/{quote(key)}?{urlencode(query)}"
+
+    def presign_get(self, key: str, expires_in: int, filename: Optional[str] = None) -> str:
+        return self._presign("GET", key, expires_in)
+
+    def presign_put(self, key: str, expires_in: int, sha256: str) -> str:
+        return self._presign("PUT", key, expires_in, sha256=sha256)
+
+    def presign_part(self, key: str, upload_id: str, part_number: int,
+                     expires_in: int, sha256: str) -> str:
+        return self._presign("PUT", key, expires_in, upload_id=upload_id,
+                             part_number=str(part_number), sha256=sha256)
+
+    def path(self, key: str) -> str:
+        """Filesystem path of an object (for the local storage routes)."""
+        return self._path(key)
+
+    def _path(self, key: str) -> str:
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise ValueError(f"Key escapes storage root: {key}")
+        return path
+
+    def _upload_dir(self, upload_id: str) -> str:
+        if not upload_id.isalnum():
+            raise ValueError(f"Invalid upload id: {upload_id}")
+        return os.path.join(self.root, ".multipart", upload_id)
+
+    async def create_multipart(self, key: str) -> str:
+        upload_id = uuid.uuid4().hex
+        upload_dir = self._upload_dir(upload_id)
+
+        def create():
+            os.makedirs(upload_dir)
+            # Remembered so abandoned uploads can be listed like on S3
+            with open(os.path.join(upload_dir, "key"), "w") as f:
+                f.write(key)
+
+        await run_io(create)
+        return upload_id
+
+    async def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        part_path = os.path.join(self._upload_dir(upload_id), f"{part_number:05d}")
+
+        def write():
+            with open(part_path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(part_path + ".tmp", part_path)
+            return hashlib.md5(data).hexdigest()
+
+        return await run_io(write)
+
+    async def create_checked_multipart(self, key: str) -> str:
+        return await self.create_multipart(key)
+
+    async def list_parts(self, key: str, upload_id: str) -> Dict[int, str]:
+        upload_dir = self._upload_dir(upload_id)
+
+        def collect():
+            parts = {}
+            for name in os.listdir(upload_dir):
+                if name.isdigit():
+                    digest = hashlib.md5()
+                    with open(os.path.join(upload_dir, name), "rb") as f:
+                        for block in iter(lambda: f.read(1024 * 1024), b""):
+                            digest.update(block)
+                    parts[int(name)] = digest.hexdigest()
+            return parts
+
+        if not os.path.isdir(upload_dir):
+            raise KeyError(f"No such upload: {upload_id}")
+        return await run_io(collect)
+
+    async def complete_multipart(self, key: str, upload_id: str, parts: Dict[int, str],
+                                 part_sha256s: Optional[Dict[int, str]] = None) -> None:
+        upload_dir = self._upload_dir(upload_id)
+        path = self._path(key)
+
+        def assemble():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            part_sha256s = []
+            with open(path + ".tmp", "wb") as out:
+                for n in sorted(parts):
+                    with open(os.path.join(upload_dir, f"{n:05d}"), "rb") as part:
+                        data = part.read()
+                    part_sha256s.append(hashlib.sha256(data).hexdigest())
+                    out.write(data)
+            os.replace(path + ".tmp", path)
+            # Record the composite checksum S3 would report for this object
+            with open(path + ".checksum", "w") as f:
+                f.write(composite_checksum(part_sha256s))
+            shutil.rmtree(upload_dir, ignore_errors=True)
+
+        await run_io(assemble)
+
+    async def abort_multipart(self, key: str, upload_id: str) -> None:
+        await run_io(shutil.rmtree, self._upload_dir(upload_id), ignore_errors=True)
+
+    async def list_multipart_uploads(self) -> List[Tuple[str, str, float]]:
+        multipart_root = os.path.join(self.root, ".multipart")
+
+        def collect():
+            uploads = []
+            if not os.path.isdir(multipart_root):
+                return uploads
+            with os.scandir(multipart_root) as entries:
+                for entry in entries:
+                    if not entry.is_dir():
+                        continue
+                    try:
+                        with open(os.path.join(entry.path, "key")) as f:
+                            key = f.read()
+                    except FileNotFoundError:
+                        key = ""
+                    uploads.append((key, entry.name, entry.stat().st_mtime))
+            return uploads
+
+        return await run_io(collect)
+
+    async def put(self, key: str, data: bytes) -> None:
+        path = self._path(key)
+
+        def write():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", "wb") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+
+        await run_io(write)
+
+    async def delete(self, key: str) -> bool:
+        path = self._path(key)
+        try:
+            await run_io(os.remove, path)
+        except FileNotFoundError:
+            return False
+        if os.path.exists(path + ".checksum"):
+            await run_io(os.remove, path + ".checksum")
+        return True
+
+    async def head(self, key: str) -> Optional[ObjectInfo]:
+        path = self._path(key)
+
+        def stat():
+            try:
+                size = os.path.getsize(path)
+            except FileNotFoundError:
+                return None
+            try:
+                with open(path + ".checksum") as f:
+                    return ObjectInfo(size=size, checksum_sha256=f.read().strip())
+            except FileNotFoundError:
+                pass
+            digest = hashlib.sha256()
+            with open(path, "rb") as f:
+                for block in iter(lambda: f.read(1024 * 1024), b""):
+                    digest.update(block)
+            return ObjectInfo(size=size, checksum_sha256=base64.b64encode(digest.digest()).decode())
+
+        return await run_io(stat)
+
+    async def copy(self, source_key: str, key: str) -> None:
+        source, path = self._path(source_key), self._path(key)
+
+        def copy():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            shutil.copyfile(source, path + ".tmp")
+            os.replace(path + ".tmp", path)
+            if os.path.exists(source + ".checksum"):
+                shutil.copyfile(source + ".checksum", path + ".checksum")
+
+        await run_io(copy)
+
+    async def upload_path(self, path: str, key: str) -> None:
+        target = self._path(key)
+
+        def copy():
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copyfile(path, target + ".tmp")
+            os.replace(target + ".tmp", target)
+
+        await run_io(copy)
+
+    def url(self, key: str) -> str:
+        if self.base_url:
+            return f"{self.base_url.rstrip('/')}/{key}"
+        return f"file://{self._path(key)}"
+
+class StreamingUploader:
+    """
+    Stream an UploadFile into an ObjectStore as a multipart upload.
+
+    Parts are read sequentially (the SHA-256 has to see the bytes in order)
+    while up to `concurrency` part uploads are in flight, so memory stays
+    bounded at roughly (concurrency + 1) * part_size. Files smaller than one
+    part go up in a single put.
+    """
+
+    def __init__(self, store: ObjectStore, part_size: int = UPLOAD_PART_SIZE,
+                 concurrency: int = UPLOAD_CONCURRENCY):
+        self.store = store
+        self.part_size = max(part_size, MIN_PART_SIZE)
+        self.concurrency = concurrency
+
+    async def upload(self, file: UploadFile, key: str, resume_token: Optional[str] = None,
+                     owner: str = "") -> UploadResult:
+        """
+        Upload `file` to `key`, or resume the upload named by `resume_token`.
+
+        A resume token is only accepted from the `owner` it was issued to and
+        for a key under the same prefix as `key`. When resuming, the file is
+        re-read from the start to rebuild the hash, but parts whose MD5
+        matches what the store already holds are not sent again. Raises
+        UploadInterrupted (keeping the parts) if a part fails.
+        """
+        sha256 = hashlib.sha256()
+        first = await file.read(self.part_size)
+        await run_io(sha256.update, first)
+
+        if resume_token is None and len(first) < self.part_size:
+            await self.store.put(key, first)
+            return UploadResult(key=key, size=len(first), sha256=sha256.hexdigest())
+
+        if resume_token is not None:
+            key, upload_id = decode_resume_token(resume_token, owner, posixpath.dirname(key))
+            existing = await self.store.list_parts(key, upload_id)
+        else:
+            upload_id = await self.store.create_multipart(key)
+            existing = {}
+
+        parts: Dict[int, str] = {}
+        in_flight: List[asyncio.Task] = []
+        slots = asyncio.Semaphore(self.concurrency)
+        size = 0
+
+        async def send(part_number: int, data: bytes):
+            try:
+                etag = existing.get(part_number)
+                if etag is None or etag != await run_io(lambda: hashlib.md5(data).hexdigest()):
+                    etag = await self.store.upload_part(key, upload_id, part_number, data)
+                parts[part_number] = etag
+            finally:
+                slots.release()
+
+        try:
+            chunk, part_number = first, 1
+            while chunk:
+                size += len(chunk)
+                await slots.acquire()
+                in_flight.append(asyncio.create_task(send(part_number, chunk)))
+                # Surface a failed part before reading further
+                for task in [t for t in in_flight if t.done()]:
+                    task.result()
+                chunk = await file.read(self.part_size)
+                if chunk:
+                    await run_io(sha256.update, chunk)
+                part_number += 1
+            await asyncio.gather(*in_flight)
+            await self.store.complete_multipart(key, upload_id, parts)
+        except Exception as e:
+            for task in in_flight:
+                task.cancel()
+            raise UploadInterrupted(key, upload_id, owner, e)
+
+        return UploadResult(key=key, size=size, sha256=sha256.hexdigest())
@@ -0,0 +1,130 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+from datetime import datetime
+import base64
+import json
+
+from fastapi import HTTPException, Query, status
+from pydantic import BaseModel
+from sqlalchemy import orm, tuple_
+
+class Page(BaseModel):
+    items: List[Dict[str, Any]]
+    next_cursor: Optional[str] = None
+    total_estimate: Optional[int] = None
+    facets: Optional[Dict[str, Dict[str, int]]] = None
+
+class PageParams:
+    """Common query parameters for cursor-paginated list endpoints."""
+
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+        limit: int = Query(50, ge=1, le=200),
+        fields: Optional[str] = Query(None, description="Comma-separated columns to return"),
+        include_total: bool = Query(False, description="Include an estimated total match count")
+    ):
+        self.cursor = cursor
+        self.limit = limit
+        self.fields = fields
+        self.include_total = include_total
+
+def encode_cursor(sort: str, value: Any, row_id: Any) -> str:
+    """Encode the last row's sort key as an opaque cursor."""
+    if isinstance(value, datetime):
+        value = value.isoformat()
+    payload = json.dumps({"s": sort, "v": value, "id": row_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str) -> Tuple[Any, Any]:
+    """Decode a cursor issued for the same sort order into (value, id)."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded))
+        if payload["s"] != sort:
+            raise ValueError("cursor was issued for a different sort order")
+        return payload["v"], payload["id"]
+    except (ValueError, KeyError, TypeError) as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid cursor: {str(e)}"
+        )
+
+def parse_fields(fields: Optional[str], allowed: Sequence[str], required: Sequence[str]) -> List[str]:
+    """Parse a `fields=a,b,c` projection, always keeping the required columns."""
+    if not fields:
+        return list(allowed)
+
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in allowed]
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Unknown fields: {', '.join(unknown)}"
+        )
+    return list(dict.fromkeys([*required, *requested]))
+
+def keyset_paginate(
+    query: orm.Query,
+    model: Any,
+    sort: str,
+    fields: List[str],
+    limit: int,
+    cursor: Optional[str] = None,
+    include_total: bool = False
+) -> Page:
+    """
+    Fetch one page of `query` ordered by (sort column, id) descending.
+
+    Pages continue from the row encoded in `cursor` using a row-value
+    comparison, so every page is an index range scan no matter how deep,
+    and concurrent inserts never shift or duplicate rows between pages.
+    """
+    sort_column = getattr(model, sort)
+
+    total_estimate = estimate_count(query) if include_total else None
+
+    if cursor:
+        value, row_id = decode_cursor(cursor, sort)
+        if sort_column.type.python_type is datetime:
+            value = datetime.fromisoformat(value)
+        query = query.filter(tuple_(sort_column, model.id) < tuple_(value, row_id))
+
+    rows = (
+        query
+        .with_entities(*[getattr(model, f) for f in fields])
+        .order_by(sort_column.desc(), model.id.desc())
+        .limit(limit + 1)
+        .all()
+    )
+
+    items = [dict(row._mapping) for row in rows[:limit]]
+    next_cursor = None
+    if len(rows) > limit:
+        last = items[-1]
+        next_cursor = encode_cursor(sort, last[sort], last["id"])
+
+    return Page(items=items, next_cursor=next_cursor, total_estimate=total_estimate)
+
+def estimate_count(query: orm.Query) -> int:
+    """
+    Estimate the number of rows a query matches.
+
+    On PostgreSQL this reads the planner's row estimate instead of running a
+    COUNT(*) over the whole match; other databases fall back to an exact count.
+    """
+    session = query.session
+    if session.bind.dialect.name != "postgresql":
+        return query.order_by(None).count()
+
+    # Search strings stay bound parameters; inlining them would let ":word"
+    # in user input be parsed as a bind and put user input into raw SQL
+    compiled = query.order_by(None).statement.compile(
+        dialect=session.bind.dialect,
+        compile_kwargs={"render_postcompile": True}
+    )
+    plan = session.connection().exec_driver_sql(
+        f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params
+    ).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
@@ -1,57 +1,100 @@
 import boto3
-from botocore.exceptions import ClientError
 from fastapi import UploadFile, HTTPException
+from typing import Optional
 from app.core.config import settings
+from app.utils.object_store import (
+    LocalObjectStore,
+    ObjectStore,
+    S3ObjectStore,
+    StreamingUploader,
+    UploadInterrupted,
+    UploadResult,
+    require_storage_secret
+)
 import os
 from datetime import datetime
 import uuid
 
+# "s3" in production; "local" stores objects under LOCAL_STORAGE_ROOT for offline use
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3")
+LOCAL_STORAGE_ROOT = os.getenv("LOCAL_STORAGE_ROOT", "storage/objects")
+# Where the local storage routes are mounted, for presigned local URLs
+LOCAL_STORAGE_URL = os.getenv("LOCAL_STORAGE_URL", "http://localhost:8000/api/v1/storage/local")
+
 s3_client = boto3.client(
     's3',
     aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
     aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-    region_name=settings.AWS_REGION
+    region_name=settings.AWS_REGION,
+    # Optional custom endpoint, e.g. a local MinIO
+    endpoint_url=os.getenv("S3_ENDPOINT_URL") or None
 )
 
-async def upload_to_s3(file: UploadFile, prefix: str) -> str:
+def _create_store() -> ObjectStore:
+    # Only an offline local setup may run without a configured signing secret
+    require_storage_secret(allow_ephemeral=STORAGE_BACKEND == "local")
+    if STORAGE_BACKEND == "local":
+        return LocalObjectStore(LOCAL_STORAGE_ROOT, base_url=LOCAL_STORAGE_URL)
+    return S3ObjectStore(s3_client, settings.AWS_BUCKET_NAME, settings.AWS_REGION)
+
+object_store = _create_store()
+uploader = StreamingUploader(object_store)
+
+def _new_key(prefix: str, filename: str) -> str:
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    unique_id = str(uuid.uuid4())[:8]
+    file_ext = os.path.splitext(filename or "")[1]
+    return f"{prefix}/{timestamp}_{unique_id}{file_ext}"
+
+def upload_http_error(e: Exception) -> HTTPException:
+    """Map a failed upload to the HTTP error returned to the client."""
+    if isinstance(e, HTTPException):
+        return e
+    if isinstance(e, UploadInterrupted):
+        return HTTPException(
+            status_code=500,
+            detail={"message": f"Failed to upload file: {str(e)}", "resume_token": e.resume_token}
+        )
+    if isinstance(e, (KeyError, ValueError)):
+        return HTTPException(status_code=400, detail=f"Cannot resume upload: {str(e)}")
+    return HTTPException(
+        status_code=500,
+        detail=f"Failed to upload file to S3: {str(e)}"
+    )
+
+async def stream_upload(file: UploadFile, prefix: str, resume_token: Optional[str] = None,
+                        owner: str = "") -> UploadResult:
     """
-    Upload a file to S3 and return the file key
+    Stream a file to object storage and return its key, size and SHA-256.
+
+    A failed upload raises a 500 whose detail carries a `resume_token`; the
+    same `owner` can pass it back to continue the multipart upload.
     """
     try:
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        unique_id = str(uuid.uuid4())[:8]
-        file_ext = os.path.splitext(file.filename)[1]
-        file_key = f"{prefix}/{timestamp}_{unique_id}{file_ext}"
-        
-        # Upload file to S3
-        s3_client.upload_fileobj(
-            file.file,
-            settings.AWS_BUCKET_NAME,
-            file_key
-        )
-        
-        return file_key
-    except ClientError as e:
-        raise HTTPException(
-            status_code=500,
-            detail=f"Failed to upload file to S3: {str(e)}"
+        return await uploader.upload(
+            file, _new_key(prefix, file.filename), resume_token=resume_token, owner=owner
         )
+    except Exception as e:
+        raise upload_http_error(e)
+
+async def upload_to_s3(file: UploadFile, prefix: str) -> str:
+    """
+    Upload a file to S3 and return the file key
+    """
+    result = await stream_upload(file, prefix)
+    return result.key
 
 async def delete_from_s3(file_key: str) -> bool:
     """
     Delete a file from S3
     """
     try:
-        s3_client.delete_object(
-            Bucket=settings.AWS_BUCKET_NAME,
-            Key=file_key
-        )
-        return True
-    except ClientError:
+        return await object_store.delete(file_key)
+    except Exception:
         return False
 
 def get_s3_url(file_key: str) -> str:
     """
     Get the S3 URL for a file
     """
-    return f"https://{settings.AWS_BUCKET_NAME}.s3.{settings.AWS_REGION}.amazonaws.com/{file_key}" 
\ No newline at end of file
+    return object_store.url(file_key)
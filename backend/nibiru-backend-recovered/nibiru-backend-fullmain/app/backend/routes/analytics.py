@@ -51,6 +51,21 @@ async def get_aggregate_metrics(
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.get("/percentiles")
+async def get_metric_percentiles(
+    time_range: int = Query(24, description="Time range in hours"),
+    backend: Optional[str] = Query(None, description="Limit to one backend"),
+    current_user: User = Depends(get_current_user)
+) -> Dict:
+    """Get duration, wait time and quantum score percentiles per backend"""
+    try:
+        return analytics_service.get_metric_percentiles(
+            time_range=timedelta(hours=time_range),
+            backend=backend
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @router.get("/costs")
 async def get_cost_analytics(
     time_range: int = Query(30, description="Time range in days"),
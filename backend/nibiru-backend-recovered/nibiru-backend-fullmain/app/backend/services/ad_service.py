@@ -1,6 +1,5 @@
 from typing import List, Optional, Dict, Any
 from datetime import datetime, time
-import redis
 import json
 import logging
 import uuid
@@ -12,6 +11,7 @@ from ..models.constellation import (
     TimeTargeting,
     UserBehavior
 )
+from ..utils.redis_pool import get_redis
 from ..config import settings
 from .ad_db_service import AdDBService
 
@@ -19,11 +19,8 @@ logger = logging.getLogger(__name__)
 
 class AdService:
     def __init__(self):
-        self.redis_client = redis.Redis(
-            host=settings.REDIS_HOST,
-            port=settings.REDIS_PORT,
-            db=0,
-            decode_responses=True
+        self.redis_client = get_redis(
+            f"redis://{settings.REDIS_HOST}:{settings.REDIS_PORT}/0"
         )
         self.cache_ttl = 300  # 5 minutes
         self.db_service = AdDBService()
@@ -311,7 +308,7 @@ class AdService:
             # Invalidate user-specific caches
             if ad.targeting.target_affinity:
                 pattern = f"user_ads:*"
-                keys = await self.redis_client.keys(pattern)
+                keys = [key async for key in self.redis_client.scan_iter(match=pattern)]
                 if keys:
                     await self.redis_client.delete(*keys)
         except Exception as e:
@@ -1,13 +1,16 @@
 from typing import Dict, List, Optional, Tuple, Set
 from datetime import datetime, timedelta
-from dataclasses import dataclass
-import json
 from pathlib import Path
+import asyncio
 import logging
 from collections import defaultdict
 import numpy as np
 from .cost_analytics import CostAnalyticsService
 from .resource_monitor import ResourceMonitorService
+from .job_metrics_store import EPOCH, NOT_SET, JobColumns, JobMetrics, MICROS_PER_DAY, get_job_metrics_store
+from .job_rollups import ALL, get_job_rollups
+from .metric_sketches import get_metric_sketches
+from ..utils.log_sink import get_log_sink
 from ..models.constellation import (
     UserConstellationData,
     LeaderboardUser,
@@ -27,34 +30,44 @@ from ..models.constellation import (
 
 logger = logging.getLogger(__name__)
 
-@dataclass
-class JobMetrics:
-    job_id: str
-    script_id: str
-    backend: str
-    user_id: str
-    status: str
-    created_at: datetime
-    completed_at: Optional[datetime]
-    duration: Optional[float]
-    retry_count: int
-    retry_reasons: List[str]
-    resource_usage: Dict[str, float]
-    quantum_score: float
+# Jobs older than this are dropped from the metrics store
+METRICS_RETENTION = timedelta(days=365)
+# 1970-01-01, day 0 of created_at, was a Thursday
+EPOCH_WEEKDAY = 3
+# Metrics kept as percentile sketches per backend and hour
+SKETCH_METRICS = ("duration", "wait_time", "quantum_score")
+# Lower bounds of the fair, good and excellent quantum score bands
+SCORE_BANDS = np.array([0.5, 0.7, 0.9])
 
 class AnalyticsService:
     def __init__(self):
         self.cost_analytics = CostAnalyticsService()
         self.resource_monitor = ResourceMonitorService()
-        self.job_metrics: Dict[str, JobMetrics] = {}
+        self.metrics_store = get_job_metrics_store(
+            Path("data/analytics/job_metrics"),
+            retention=METRICS_RETENTION
+        )
+        self.rollups = get_job_rollups(
+            Path("data/analytics/job_rollups"),
+            self.metrics_store,
+            retention=METRICS_RETENTION
+        )
+        self.sketches = get_metric_sketches(
+            Path("data/analytics/sketches"),
+            retention=METRICS_RETENTION
+        )
         
-        # Create logs directory if it doesn't exist
         self.logs_dir = Path("logs/analytics")
-        self.logs_dir.mkdir(parents=True, exist_ok=True)
+        self.log_sink = get_log_sink(self.logs_dir)
 
     def record_job_metrics(self, metrics: JobMetrics):
         """Record metrics for a job"""
-        self.job_metrics[metrics.job_id] = metrics
+        replaced = self.metrics_store.append(metrics)
+        self.rollups.record(metrics, replaced)
+        if replaced is not None:
+            self._retract_sketches(replaced)
+        for metric, value in self._sketch_values(metrics).items():
+            self.sketches.add(metric, metrics.backend, metrics.created_at, value)
         self._write_metrics_log(metrics)
 
     def get_success_failure_trends(
@@ -63,53 +76,32 @@ class AnalyticsService:
         group_by: str = "backend"
     ) -> Dict:
         """Get success/failure trends over time"""
-        cutoff = datetime.now() - time_range
-        relevant_jobs = [
-            job for job in self.job_metrics.values()
-            if job.created_at >= cutoff
-        ]
+        since = datetime.now() - time_range
+        if group_by == "user":
+            # About one cell per job, so per-user counts come from the raw columns
+            return self._user_trends(since)
+
+        dimension = group_by if group_by in ("backend", "script") else ALL
+        daily = defaultdict(dict)
+        failures = defaultdict(int)
+        for day, cells in self.rollups.cells("status", dimension, since).items():
+            for (group, status), count in cells.items():
+                counts = daily[group].setdefault(day, [0, 0])
+                counts[1] += count
+                if status == "completed":
+                    counts[0] += count
+                elif status == "failed":
+                    failures[group] += count
 
-        # Group jobs by specified dimension
-        grouped_jobs = defaultdict(list)
-        for job in relevant_jobs:
-            if group_by == "backend":
-                key = job.backend
-            elif group_by == "script":
-                key = job.script_id
-            elif group_by == "user":
-                key = job.user_id
-            else:
-                key = "all"
-            grouped_jobs[key].append(job)
-
-        # Calculate trends for each group
         trends = {}
-        for group, jobs in grouped_jobs.items():
-            # Sort jobs by date
-            jobs.sort(key=lambda x: x.created_at)
-            
-            # Calculate daily success rates
-            daily_rates = defaultdict(lambda: {"success": 0, "total": 0})
-            for job in jobs:
-                date = job.created_at.date()
-                daily_rates[date]["total"] += 1
-                if job.status == "completed":
-                    daily_rates[date]["success"] += 1
-
-            # Convert to list format for charting
-            dates = sorted(daily_rates.keys())
-            success_rates = [
-                (daily_rates[date]["success"] / daily_rates[date]["total"] * 100)
-                if daily_rates[date]["total"] > 0 else 0
-                for date in dates
-            ]
-
+        for group, days in daily.items():
+            dates = sorted(days)
             trends[group] = {
-                "dates": [date.isoformat() for date in dates],
-                "success_rates": success_rates,
-                "total_jobs": len(jobs),
-                "success_count": sum(1 for j in jobs if j.status == "completed"),
-                "failure_count": sum(1 for j in jobs if j.status == "failed")
+                "dates": [(EPOCH + timedelta(days=day)).date().isoformat() for day in dates],
+                "success_rates": [days[day][0] / days[day][1] * 100 for day in dates],
+                "total_jobs": sum(days[day][1] for day in dates),
+                "success_count": sum(days[day][0] for day in dates),
+                "failure_count": failures[group]
             }
 
         return trends
@@ -120,43 +112,29 @@ class AnalyticsService:
         dimension: str = "backend"
     ) -> Dict:
         """Generate retry heatmap data"""
-        cutoff = datetime.now() - time_range
-        relevant_jobs = [
-            job for job in self.job_metrics.values()
-            if job.created_at >= cutoff and job.retry_count > 0
-        ]
+        since = datetime.now() - time_range
+        dimension = dimension if dimension in ("backend", "script") else ALL
+
+        # A 24x7 matrix of hourly retry density per group
+        matrices = {}
+        for day, cells in self.rollups.cells("retries", dimension, since).items():
+            weekday = (day + EPOCH_WEEKDAY) % 7
+            for (group, hour), retries in cells.items():
+                if group not in matrices:
+                    matrices[group] = np.zeros((24, 7))
+                matrices[group][hour, weekday] += retries
+
+        reasons = defaultdict(lambda: defaultdict(int))
+        for cells in self.rollups.cells("reasons", dimension, since).values():
+            for (group, reason), count in cells.items():
+                reasons[group][reason] += count
 
-        # Group jobs by specified dimension
-        grouped_jobs = defaultdict(list)
-        for job in relevant_jobs:
-            if dimension == "backend":
-                key = job.backend
-            elif dimension == "script":
-                key = job.script_id
-            else:
-                key = "all"
-            grouped_jobs[key].append(job)
-
-        # Calculate retry density
         heatmap_data = {}
-        for group, jobs in grouped_jobs.items():
-            # Create a 24x7 matrix for hourly retry density
-            matrix = np.zeros((24, 7))
-            
-            for job in jobs:
-                hour = job.created_at.hour
-                day = job.created_at.weekday()
-                matrix[hour, day] += job.retry_count
-
-            # Normalize the matrix
-            max_retries = np.max(matrix)
-            if max_retries > 0:
-                matrix = matrix / max_retries
-
+        for group, matrix in matrices.items():
             heatmap_data[group] = {
-                "matrix": matrix.tolist(),
-                "total_retries": sum(job.retry_count for job in jobs),
-                "retry_reasons": self._aggregate_retry_reasons(jobs)
+                "matrix": (matrix / matrix.max()).tolist(),
+                "total_retries": int(matrix.sum()),
+                "retry_reasons": dict(reasons[group])
             }
 
         return heatmap_data
@@ -166,55 +144,126 @@ class AnalyticsService:
         time_range: timedelta = timedelta(days=30)
     ) -> Dict:
         """Get aggregate metrics across all jobs"""
-        cutoff = datetime.now() - time_range
-        relevant_jobs = [
-            job for job in self.job_metrics.values()
-            if job.created_at >= cutoff
-        ]
+        jobs = self.metrics_store.select(
+            datetime.now() - time_range,
+            columns=["status", "backend", "user_id", "quantum_score"]
+        )
 
         # Calculate basic metrics
-        total_jobs = len(relevant_jobs)
-        success_count = sum(1 for j in relevant_jobs if j.status == "completed")
-        failure_count = sum(1 for j in relevant_jobs if j.status == "failed")
+        total_jobs = len(jobs)
+        success_count = int(self._status_mask(jobs, "completed").sum())
         success_rate = (success_count / total_jobs * 100) if total_jobs > 0 else 0
 
         # Calculate backend usage
-        backend_usage = defaultdict(int)
-        for job in relevant_jobs:
-            backend_usage[job.backend] += 1
-
-        # Calculate quantum score efficiency
-        quantum_scores = [job.quantum_score for job in relevant_jobs if job.quantum_score > 0]
-        avg_quantum_score = sum(quantum_scores) / len(quantum_scores) if quantum_scores else 0
-
-        # Get cost metrics
-        cost_breakdown = self.cost_analytics.get_cost_breakdown(
-            relevant_jobs[0].user_id if relevant_jobs else None,
-            time_range
-        )
+        backends = list(jobs.vocabularies["backend"].values)
+        usage = np.bincount(jobs.columns["backend"], minlength=len(backends))
+        backend_usage = {backends[code]: int(usage[code]) for code in np.flatnonzero(usage)}
+
+        # Calculate quantum score efficiency and percentiles across backends
+        quantum_scores = jobs.columns["quantum_score"]
+        quantum_scores = quantum_scores[quantum_scores > 0]
+        avg_quantum_score = float(quantum_scores.mean()) if len(quantum_scores) else 0
+
+        # Get cost metrics for the earliest job's user
+        first_user = None
+        if total_jobs:
+            first = int(np.argmin(jobs.columns["created_at"]))
+            first_user = jobs.vocabularies["user_id"].values[jobs.columns["user_id"][first]]
+        cost_breakdown = self.cost_analytics.get_cost_breakdown(first_user, time_range)
+
+        percentiles = {}
+        for metric in SKETCH_METRICS:
+            combined = None
+            for sketch in self.sketches.query(metric, datetime.now() - time_range).values():
+                if combined is None:
+                    combined = sketch
+                else:
+                    combined.merge(sketch)
+            if combined is not None:
+                percentiles[metric] = combined.summary()
 
         return {
             "total_jobs": total_jobs,
             "success_rate": success_rate,
-            "backend_usage": dict(backend_usage),
+            "backend_usage": backend_usage,
             "quantum_score": {
                 "average": avg_quantum_score,
-                "distribution": self._calculate_score_distribution(quantum_scores)
+                "distribution": self._calculate_score_distribution(quantum_scores),
+                "percentiles": percentiles.get("quantum_score", {})
             },
+            "duration": percentiles.get("duration", {}),
+            "wait_time": percentiles.get("wait_time", {}),
             "cost_metrics": cost_breakdown
         }
 
-    def _aggregate_retry_reasons(self, jobs: List[JobMetrics]) -> Dict[str, int]:
-        """Aggregate retry reasons across jobs"""
-        reasons = defaultdict(int)
-        for job in jobs:
-            for reason in job.retry_reasons:
-                reasons[reason] += 1
-        return dict(reasons)
+    def get_metric_percentiles(
+        self,
+        time_range: timedelta = timedelta(days=1),
+        backend: Optional[str] = None
+    ) -> Dict:
+        """Get p50/p95/p99 of job duration, wait time and quantum score per backend"""
+        since = datetime.now() - time_range
+        percentiles = defaultdict(dict)
+        for metric in SKETCH_METRICS:
+            for group, sketch in self.sketches.query(metric, since, group=backend).items():
+                percentiles[group][metric] = sketch.summary()
+
+        return dict(percentiles)
+
+    def _user_trends(self, since: datetime) -> Dict:
+        """Daily success rates per user, grouped directly over the store's columns"""
+        jobs = self.metrics_store.select(since, columns=["status", "user_id"])
+        if not len(jobs):
+            return {}
+
+        groups = jobs.columns["user_id"].astype(np.int64)
+        names = list(jobs.vocabularies["user_id"].values)
+        days = jobs.columns["created_at"] // MICROS_PER_DAY
+        first_day = int(days.min())
+        day_index = days - first_day
+        n_days = int(day_index.max()) + 1
+        completed = self._status_mask(jobs, "completed")
+        failed = self._status_mask(jobs, "failed")
+
+        # Daily totals and successes for every user in one pass
+        cells = groups * n_days + day_index
+        size = len(names) * n_days
+        totals = np.bincount(cells, minlength=size).reshape(len(names), n_days)
+        successes = np.bincount(cells, weights=completed, minlength=size).reshape(len(names), n_days)
+        failures = np.bincount(groups, weights=failed, minlength=len(names))
+
+        # Non-empty (user, day) cells come out grouped and date ordered;
+        # convert them to lists once and slice per user
+        active = np.flatnonzero(totals.ravel())
+        day_labels = np.arange(first_day, first_day + n_days).astype("datetime64[D]").astype(str).astype(object)
+        dates = day_labels[active % n_days].tolist()
+        rates = (successes.ravel()[active] / totals.ravel()[active] * 100).tolist()
+        bounds = np.searchsorted(active // n_days, np.arange(len(names) + 1)).tolist()
+        group_totals = totals.sum(axis=1).tolist()
+        group_successes = successes.sum(axis=1).tolist()
+        failures = failures.tolist()
+
+        trends = {}
+        for group in np.flatnonzero(group_totals).tolist():
+            lo, hi = bounds[group], bounds[group + 1]
+            trends[names[group]] = {
+                "dates": dates[lo:hi],
+                "success_rates": rates[lo:hi],
+                "total_jobs": group_totals[group],
+                "success_count": int(group_successes[group]),
+                "failure_count": int(failures[group])
+            }
+
+        return trends
+
+    @staticmethod
+    def _status_mask(jobs: JobColumns, status: str) -> np.ndarray:
+        code = jobs.vocabularies["status"].codes.get(status, -1)
+        return jobs.columns["status"] == code
 
-    def _calculate_score_distribution(self, scores: List[float]) -> Dict[str, float]:
+    def _calculate_score_distribution(self, scores: np.ndarray) -> Dict[str, float]:
         """Calculate distribution of quantum scores"""
-        if not scores:
+        if not len(scores):
             return {
                 "excellent": 0,
                 "good": 0,
@@ -222,16 +271,55 @@ class AnalyticsService:
                 "poor": 0
             }
 
+        # Band every score in one pass: 0 poor, 1 fair, 2 good, 3 excellent
+        bands = np.bincount(np.searchsorted(SCORE_BANDS, scores, side="right"), minlength=4)
+        poor, fair, good, excellent = (bands / len(scores) * 100).tolist()
         return {
-            "excellent": sum(1 for s in scores if s >= 0.9) / len(scores) * 100,
-            "good": sum(1 for s in scores if 0.7 <= s < 0.9) / len(scores) * 100,
-            "fair": sum(1 for s in scores if 0.5 <= s < 0.7) / len(scores) * 100,
-            "poor": sum(1 for s in scores if s < 0.5) / len(scores) * 100
+            "excellent": excellent,
+            "good": good,
+            "fair": fair,
+            "poor": poor
         }
 
+    @staticmethod
+    def _sketch_values(metrics: JobMetrics) -> Dict[str, float]:
+        """The sketched values of a job; wait time is what the job spent outside its run"""
+        values = {}
+        if metrics.duration is not None:
+            values["duration"] = metrics.duration
+            if metrics.completed_at is not None:
+                elapsed = (metrics.completed_at - metrics.created_at).total_seconds()
+                values["wait_time"] = max(elapsed - metrics.duration, 0.0)
+        if metrics.quantum_score > 0:
+            values["quantum_score"] = metrics.quantum_score
+        return values
+
+    def _retract_sketches(self, replaced: JobColumns):
+        """Take a re-recorded job's previous values back out of the sketches"""
+        backends = replaced.vocabularies["backend"].values
+        for row in range(len(replaced)):
+            created_at = EPOCH + timedelta(microseconds=int(replaced.columns["created_at"][row]))
+            completed_at = int(replaced.columns["completed_at"][row])
+            duration = float(replaced.columns["duration"][row])
+            previous = JobMetrics(
+                job_id="",
+                script_id="",
+                backend=backends[replaced.columns["backend"][row]],
+                user_id="",
+                status="",
+                created_at=created_at,
+                completed_at=None if completed_at == NOT_SET else EPOCH + timedelta(microseconds=completed_at),
+                duration=None if np.isnan(duration) else duration,
+                retry_count=0,
+                retry_reasons=[],
+                resource_usage={},
+                quantum_score=float(replaced.columns["quantum_score"][row])
+            )
+            for metric, value in self._sketch_values(previous).items():
+                self.sketches.add(metric, previous.backend, created_at, value, count=-1)
+
     def _write_metrics_log(self, metrics: JobMetrics):
         """Write metrics log to file"""
-        log_file = self.logs_dir / f"metrics_{metrics.user_id}.json"
         log_entry = {
             "timestamp": datetime.now().isoformat(),
             "job_id": metrics.job_id,
@@ -247,23 +335,7 @@ class AnalyticsService:
             "quantum_score": metrics.quantum_score
         }
         
-        self._append_to_log(log_file, log_entry)
-
-    def _append_to_log(self, log_file: Path, entry: Dict):
-        """Append a log entry to a JSON log file"""
-        try:
-            if log_file.exists():
-                with open(log_file, 'r') as f:
-                    logs = json.load(f)
-            else:
-                logs = []
-            
-            logs.append(entry)
-            
-            with open(log_file, 'w') as f:
-                json.dump(logs, f, indent=2)
-        except Exception as e:
-            logger.error(f"Failed to write to log file {log_file}: {str(e)}")
+        self.log_sink.append(f"metrics_{metrics.user_id}", log_entry)
 
     async def get_user_metrics(self, user_id: str) -> Dict:
         """Get user's quantum score and rank."""
@@ -377,9 +449,10 @@ class AnalyticsService:
         pass
 
     async def _get_user_activity(self, user_id: str, date: datetime.date) -> bool:
-        """Internal method to check user activity for a specific date."""
-        # Implementation of activity check
-        pass
+        """Whether the user had a job recorded in their metrics log on a given date."""
+        since = datetime.combine(date, datetime.min.time())
+        entries = self.log_sink.read(f"metrics_{user_id}", since=since, until=since + timedelta(days=1))
+        return await asyncio.to_thread(next, entries, None) is not None
 
     async def _get_backend_stats(self, user_id: str) -> Dict:
         """Internal method to get user's backend usage statistics."""
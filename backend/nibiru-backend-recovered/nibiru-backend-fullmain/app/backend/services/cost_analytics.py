@@ -1,9 +1,9 @@
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 from dataclasses import dataclass
-import json
 from pathlib import Path
 import logging
+from ..utils.log_sink import get_log_sink
 
 logger = logging.getLogger(__name__)
 
@@ -32,9 +32,8 @@ class CostAnalyticsService:
             "rigetti": {"base": 0.18, "per_qubit": 0.018, "per_gate": 0.0018}
         }
         
-        # Create logs directory if it doesn't exist
         self.logs_dir = Path("logs/costs")
-        self.logs_dir.mkdir(parents=True, exist_ok=True)
+        self.log_sink = get_log_sink(self.logs_dir)
 
     def record_execution_cost(self, cost: ExecutionCost):
         """Record execution cost for a job"""
@@ -170,7 +169,6 @@ class CostAnalyticsService:
 
     def _write_cost_log(self, user_id: str, cost: ExecutionCost):
         """Write cost log to file"""
-        log_file = self.logs_dir / f"costs_{user_id}.json"
         log_entry = {
             "timestamp": cost.timestamp.isoformat(),
             "job_id": cost.job_id,
@@ -184,20 +182,4 @@ class CostAnalyticsService:
             "gate_count": cost.gate_count
         }
         
-        self._append_to_log(log_file, log_entry)
-
-    def _append_to_log(self, log_file: Path, entry: Dict):
-        """Append a log entry to a JSON log file"""
-        try:
-            if log_file.exists():
-                with open(log_file, 'r') as f:
-                    logs = json.load(f)
-            else:
-                logs = []
-            
-            logs.append(entry)
-            
-            with open(log_file, 'w') as f:
-                json.dump(logs, f, indent=2)
-        except Exception as e:
-            logger.error(f"Failed to write to log file {log_file}: {str(e)}") 
\ No newline at end of file
+        self.log_sink.append(f"costs_{user_id}", log_entry)
@@ -0,0 +1,600 @@
+from typing import Dict, Iterable, List, Optional
+from datetime import datetime, timedelta
+from dataclasses import dataclass, field
+from pathlib import Path
+import atexit
+import hashlib
+import logging
+import os
+import re
+import secrets
+import socket
+import threading
+import time
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# segment_<worker>_<seq>.npz; files from before workers were named have no worker
+SEGMENT_PATTERN = re.compile(r"^segment_(?:(?P<worker>.+)_)?(?P<seq>\d{6})\.npz$")
+DIMENSIONS = ("backend", "script_id", "user_id", "status")
+NUMERIC_COLUMNS = {
+    "created_at": np.int64,  # Microseconds since the epoch (naive local time)
+    "completed_at": np.int64,  # NOT_SET when missing
+    "duration": np.float64,  # NaN when missing
+    "retry_count": np.int32,
+    "quantum_score": np.float64,
+    "job_key": np.int64,  # Hash of job_id, for spotting re-recorded jobs
+    "recorded_at": np.int64  # Wall-clock microseconds when appended; NOT_SET in older segments
+}
+ALL_COLUMNS = tuple(NUMERIC_COLUMNS) + DIMENSIONS
+NOT_SET = np.iinfo(np.int64).min
+EPOCH = datetime(1970, 1, 1)
+MICROS_PER_HOUR = 3600 * 10**6
+MICROS_PER_DAY = 24 * MICROS_PER_HOUR
+
+@dataclass
+class JobMetrics:
+    job_id: str
+    script_id: str
+    backend: str
+    user_id: str
+    status: str
+    created_at: datetime
+    completed_at: Optional[datetime]
+    duration: Optional[float]
+    retry_count: int
+    retry_reasons: List[str]
+    resource_usage: Dict[str, float]
+    quantum_score: float
+
+class Vocabulary:
+    """Dictionary encoding for one string column; codes never change once given out."""
+
+    def __init__(self):
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+    def remap(self, values: np.ndarray) -> np.ndarray:
+        """Codes in this vocabulary for a saved segment's own value list."""
+        return np.array([self.code(str(v)) for v in values], dtype=np.int32)
+
+@dataclass
+class JobColumns:
+    """Live jobs in a time window, one array per column."""
+    columns: Dict[str, np.ndarray]
+    # One entry per (job, retry reason): row in `columns` and reason code
+    reason_rows: np.ndarray
+    reason_codes: np.ndarray
+    vocabularies: Dict[str, Vocabulary]
+
+    def __len__(self) -> int:
+        return len(self.columns["created_at"])
+
+@dataclass
+class _Segment:
+    name: str  # File name without extension
+    columns: Dict[str, np.ndarray]  # Sorted by created_at
+    reason_rows: np.ndarray  # Sorted
+    reason_codes: np.ndarray
+    dead: Optional[np.ndarray] = None  # Rows superseded by a later record of the same job
+    dead_dirty: bool = False
+
+    @property
+    def start(self) -> int:
+        return int(self.columns["created_at"][0])
+
+    @property
+    def end(self) -> int:
+        return int(self.columns["created_at"][-1])
+
+    def __len__(self) -> int:
+        return len(self.columns["created_at"])
+
+@dataclass
+class _Tail:
+    """Unsealed rows in arrival order, in preallocated arrays."""
+    capacity: int
+    size: int = 0
+    columns: Dict[str, np.ndarray] = field(default_factory=dict)
+    rows: Dict[int, int] = field(default_factory=dict)  # job_key -> row
+    reason_rows: List[int] = field(default_factory=list)
+    reason_codes: List[int] = field(default_factory=list)
+    seq: Optional[int] = None  # Segment file the rows were last saved to, if any
+    dirty: bool = False  # Changed since last saved
+
+    def __post_init__(self):
+        for name, dtype in NUMERIC_COLUMNS.items():
+            self.columns.setdefault(name, np.empty(self.capacity, dtype=dtype))
+        for name in DIMENSIONS:
+            self.columns.setdefault(name, np.empty(self.capacity, dtype=np.int32))
+
+class JobMetricsStore:
+    """
+    Column store for job metrics, queried by created_at window.
+
+    Jobs collect in a tail of preallocated arrays; once `segment_rows` have
+    arrived the tail is sorted by created_at and sealed into an immutable
+    segment, saved as `segment_<worker>_<seq>.npz` under `data_dir`. A
+    background thread also saves the unsealed tail to its segment file
+    every `flush_interval` seconds, so a crash loses at most that much.
+    Strings are dictionary encoded, so group-bys run on integer codes. A
+    window query binary searches each overlapping segment and concatenates
+    the slices.
+
+    Each worker process writes only files named after itself (see
+    worker_id()), so processes sharing `data_dir` never overwrite each
+    other's segments. Queries and the background thread reload the other
+    workers' segment files that are new or changed since last read, so a
+    worker sees its peers' jobs as of their last flush.
+
+    Recording a job again (e.g. a retry that finally completed) replaces
+    the earlier row. A worker marks its own superseded rows in
+    `<segment>.dead.<worker>.npy` beside the segment; when the earlier
+    record came from another worker, queries keep whichever record was
+    appended last. Segments wholly older than `retention` are dropped.
+    """
+
+    def __init__(
+        self,
+        data_dir: Path,
+        segment_rows: int = 1 << 18,
+        retention: Optional[timedelta] = None,
+        flush_interval: float = 30.0
+    ):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(parents=True, exist_ok=True)
+        self.segment_rows = segment_rows
+        self.retention = retention
+        self.flush_interval = flush_interval
+        self.vocabularies = {name: Vocabulary() for name in DIMENSIONS + ("retry_reason",)}
+        self._segments: List[_Segment] = []  # This worker's sealed segments
+        self._others: Dict[str, _Segment] = {}  # Other workers' segments by name
+        self._stamps: Dict[str, tuple] = {}  # Files and mtimes each of those was loaded from
+        self._tail = _Tail(segment_rows)
+        self._next_seq = 0
+        self._lock = threading.RLock()
+        self._closed = False
+        self._wakeup = threading.Event()
+        with self._lock:
+            self._start()
+            self._load()
+        atexit.register(self.close)
+
+    def append(self, metrics: JobMetrics) -> Optional[JobColumns]:
+        """
+        Add a job, replacing any earlier record of the same job_id; returns
+        the replaced record, if there was one.
+        """
+        created_at = to_micros(metrics.created_at)
+        job_key = _job_key(metrics.job_id)
+        with self._lock:
+            self._check_fork()
+            tail = self._tail
+            row = tail.rows.get(job_key)
+            if row is None:
+                replaced = self._supersede(created_at, job_key)
+                if tail.size == tail.capacity:
+                    self._seal()
+                    tail = self._tail
+                row = tail.rows[job_key] = tail.size
+                tail.size += 1
+            else:
+                old_reasons = [code for r, code in zip(tail.reason_rows, tail.reason_codes) if r == row]
+                replaced = self._row(tail.columns, row, old_reasons)
+                if old_reasons:
+                    keep = [i for i, r in enumerate(tail.reason_rows) if r != row]
+                    tail.reason_rows = [tail.reason_rows[i] for i in keep]
+                    tail.reason_codes = [tail.reason_codes[i] for i in keep]
+
+            columns = tail.columns
+            columns["created_at"][row] = created_at
+            columns["completed_at"][row] = to_micros(metrics.completed_at) if metrics.completed_at else NOT_SET
+            columns["duration"][row] = np.nan if metrics.duration is None else metrics.duration
+            columns["retry_count"][row] = metrics.retry_count
+            columns["quantum_score"][row] = metrics.quantum_score
+            columns["job_key"][row] = job_key
+            columns["recorded_at"][row] = time.time_ns() // 1000
+            for name in DIMENSIONS:
+                columns[name][row] = self.vocabularies[name].code(getattr(metrics, name))
+            reasons = self.vocabularies["retry_reason"]
+            for reason in metrics.retry_reasons:
+                tail.reason_rows.append(row)
+                tail.reason_codes.append(reasons.code(reason))
+            tail.dirty = True
+            return replaced
+
+    def select(
+        self,
+        since: datetime,
+        until: Optional[datetime] = None,
+        columns: Optional[Iterable[str]] = None
+    ) -> JobColumns:
+        """
+        Live jobs with since <= created_at < until, in created_at order per
+        segment. `columns` limits which columns are copied out.
+        """
+        wanted = set(columns or ALL_COLUMNS) | {"created_at"}
+        names = wanted | {"job_key", "recorded_at"}
+        lo_us = to_micros(since)
+        hi_us = to_micros(until) if until else None
+        parts, reason_rows, reason_codes = [], [], []
+        offset = 0
+        with self._lock:
+            self._check_fork()
+            self._refresh()
+            others = False
+            for segment in self._segments + list(self._others.values()):
+                if segment.end < lo_us or (hi_us is not None and segment.start >= hi_us):
+                    continue
+                created = segment.columns["created_at"]
+                lo = int(np.searchsorted(created, lo_us, "left"))
+                hi = len(segment) if hi_us is None else int(np.searchsorted(created, hi_us, "left"))
+                if lo == hi:
+                    continue
+                live = None if segment.dead is None else ~segment.dead[lo:hi]
+                r_lo, r_hi = np.searchsorted(segment.reason_rows, [lo, hi], "left")
+                rows = segment.reason_rows[r_lo:r_hi] - lo
+                codes = segment.reason_codes[r_lo:r_hi]
+                others = others or segment.name in self._others
+                offset = self._add_part(
+                    parts, reason_rows, reason_codes, offset,
+                    {name: segment.columns[name][lo:hi] for name in names},
+                    live, rows, codes
+                )
+
+            tail = self._tail
+            if tail.size:
+                created = tail.columns["created_at"][:tail.size]
+                live = created >= lo_us
+                if hi_us is not None:
+                    live &= created < hi_us
+                if live.any():
+                    offset = self._add_part(
+                        parts, reason_rows, reason_codes, offset,
+                        {name: tail.columns[name][:tail.size] for name in names},
+                        live,
+                        np.array(tail.reason_rows, dtype=np.int64),
+                        np.array(tail.reason_codes, dtype=np.int32)
+                    )
+
+        if parts:
+            selected = {name: np.concatenate([part[name] for part in parts]) for name in names}
+        else:
+            selected = {name: np.empty(0, dtype=NUMERIC_COLUMNS.get(name, np.int32)) for name in names}
+        jobs = JobColumns(
+            columns=selected,
+            reason_rows=np.concatenate(reason_rows) if reason_rows else np.empty(0, dtype=np.int64),
+            reason_codes=np.concatenate(reason_codes) if reason_codes else np.empty(0, dtype=np.int32),
+            vocabularies=self.vocabularies
+        )
+        if others:
+            jobs = self._latest(jobs)
+        for name in names - wanted:
+            del jobs.columns[name]
+        return jobs
+
+    def flush(self) -> None:
+        """Persist the tail and any changed superseded-row masks."""
+        with self._lock:
+            self._check_fork()
+            if self._tail.dirty:
+                self._seal(partial=True)
+            for segment in self._segments:
+                if segment.dead_dirty:
+                    self._save_dead(segment)
+
+    def close(self) -> None:
+        """Stop the background writer and save what is left."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wakeup.set()
+        if self._flusher.is_alive() and self._flusher is not threading.current_thread():
+            self._flusher.join()
+        self.flush()
+
+    def __len__(self) -> int:
+        return len(self.select(datetime.min, columns=["created_at"]))
+
+    def _start(self) -> None:
+        self._pid = os.getpid()
+        self.worker = worker_id()
+        self._flusher = threading.Thread(target=self._run, name=f"job-metrics:{self.data_dir}", daemon=True)
+        self._flusher.start()
+
+    def _check_fork(self) -> None:
+        """A forked child starts a new tail under its own name; the parent still saves its rows."""
+        if self._pid != os.getpid():
+            self._tail = _Tail(self.segment_rows)
+            self._next_seq = 0
+            # The parent's segments are another worker's now
+            self._segments = []
+            self._others.clear()
+            self._stamps.clear()
+            self._start()
+            self._refresh()
+
+    def _run(self) -> None:
+        pid = os.getpid()
+        while not self._closed and pid == os.getpid():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+                with self._lock:
+                    self._refresh()
+            except Exception as e:
+                logger.error(f"Failed to flush job metrics {self.data_dir}: {str(e)}")
+
+    @staticmethod
+    def _add_part(parts, reason_rows, reason_codes, offset, columns, live, rows, codes) -> int:
+        if live is not None and not live.all():
+            # Renumber surviving rows and drop the reasons of filtered ones
+            positions = np.cumsum(live) - 1
+            keep = live[rows]
+            rows, codes = positions[rows[keep]], codes[keep]
+            columns = {name: column[live] for name, column in columns.items()}
+        parts.append(columns)
+        reason_rows.append(rows + offset)
+        reason_codes.append(codes)
+        return offset + len(columns["created_at"])
+
+    def _row(self, columns: Dict[str, np.ndarray], row: int, reason_codes) -> JobColumns:
+        return JobColumns(
+            columns={name: column[row:row + 1].copy() for name, column in columns.items()},
+            reason_rows=np.zeros(len(reason_codes), dtype=np.int64),
+            reason_codes=np.array(reason_codes, dtype=np.int32),
+            vocabularies=self.vocabularies
+        )
+
+    def _supersede(self, created_at: int, job_key: int) -> Optional[JobColumns]:
+        """
+        Find the latest sealed record of the same job, in any worker's
+        segments, and return it; a job keeps its created_at. Only this
+        worker's rows are marked dead: queries drop another worker's record
+        because the new one was appended later.
+        """
+        latest = None
+        for segment in self._segments + list(self._others.values()):
+            if not segment.start <= created_at <= segment.end:
+                continue
+            created = segment.columns["created_at"]
+            lo, hi = np.searchsorted(created, [created_at, created_at + 1], "left")
+            matches = lo + np.flatnonzero(segment.columns["job_key"][lo:hi] == job_key)
+            if segment.dead is not None:
+                matches = matches[~segment.dead[matches]]
+            for row in matches.tolist():
+                recorded_at = int(segment.columns["recorded_at"][row])
+                if latest is None or recorded_at > latest[0]:
+                    latest = (recorded_at, segment, row)
+        if latest is None:
+            return None
+
+        _, segment, row = latest
+        if segment.name not in self._others:
+            if segment.dead is None:
+                segment.dead = np.zeros(len(segment), dtype=bool)
+            segment.dead[row] = True
+            segment.dead_dirty = True
+        r_lo, r_hi = np.searchsorted(segment.reason_rows, [row, row + 1], "left")
+        return self._row(segment.columns, row, segment.reason_codes[r_lo:r_hi])
+
+    def _latest(self, jobs: JobColumns) -> JobColumns:
+        """Drop all but the last appended record of jobs that more than one worker recorded."""
+        created = jobs.columns["created_at"]
+        # Records of one job share its created_at, so only tied rows can be duplicates
+        order = np.argsort(created, kind="stable")
+        ties = np.flatnonzero(created[order][1:] == created[order][:-1])
+        if not len(ties):
+            return jobs
+        rows = np.unique(order[np.concatenate([ties, ties + 1])])
+        rows = rows[np.lexsort((jobs.columns["recorded_at"][rows], jobs.columns["job_key"][rows]))]
+        keys = jobs.columns["job_key"][rows]
+        stale = rows[:-1][keys[:-1] == keys[1:]]
+        if not len(stale):
+            return jobs
+
+        live = np.ones(len(jobs), dtype=bool)
+        live[stale] = False
+        parts, reason_rows, reason_codes = [], [], []
+        self._add_part(parts, reason_rows, reason_codes, 0, jobs.columns, live, jobs.reason_rows, jobs.reason_codes)
+        return JobColumns(
+            columns=parts[0],
+            reason_rows=reason_rows[0],
+            reason_codes=reason_codes[0],
+            vocabularies=self.vocabularies
+        )
+
+    def _seal(self, partial: bool = False) -> None:
+        """Sort the tail into a segment and save it; `partial` keeps it reopenable as the tail."""
+        tail = self._tail
+        order = np.argsort(tail.columns["created_at"][:tail.size], kind="stable")
+        columns = {name: column[:tail.size][order] for name, column in tail.columns.items()}
+        position = np.empty(tail.size, dtype=np.int64)
+        position[order] = np.arange(tail.size)
+        reason_rows = position[np.array(tail.reason_rows, dtype=np.int64)]
+        reason_order = np.argsort(reason_rows, kind="stable")
+
+        seq = tail.seq if tail.seq is not None else self._next_seq
+        name = f"segment_{self.worker}_{seq:06d}"
+        if tail.seq is not None:
+            # Masks saved for the previous version do not apply to the rewritten rows
+            for path in self._dead_paths(name):
+                path.unlink(missing_ok=True)
+        segment = _Segment(
+            name=name,
+            columns=columns,
+            reason_rows=reason_rows[reason_order],
+            reason_codes=np.array(tail.reason_codes, dtype=np.int32)[reason_order]
+        )
+        self._save(segment)
+
+        if partial:
+            # Keep appending to these rows; the file is rewritten on the next seal
+            tail.seq = seq
+            tail.dirty = False
+            self._next_seq = max(self._next_seq, seq + 1)
+            return
+        self._segments.append(segment)
+        self._next_seq = max(self._next_seq, seq + 1)
+        self._tail = _Tail(self.segment_rows)
+        self._prune()
+
+    def _prune(self) -> None:
+        if self.retention is None:
+            return
+        cutoff = to_micros(datetime.now() - self.retention)
+        old = [s for s in self._segments if s.end < cutoff]
+        old += [s for s in self._others.values() if s.end < cutoff]
+        for segment in old:
+            if segment.name in self._others:
+                del self._others[segment.name]
+                del self._stamps[segment.name]
+            else:
+                self._segments.remove(segment)
+            # Every worker prunes the same old segments, so any of them may get there first
+            for path in [self._segment_path(segment.name)] + self._dead_paths(segment.name):
+                path.unlink(missing_ok=True)
+
+    def _segment_path(self, name: str) -> Path:
+        return self.data_dir / f"{name}.npz"
+
+    def _dead_path(self, name: str) -> Path:
+        return self.data_dir / f"{name}.dead.{self.worker}.npy"
+
+    def _dead_paths(self, name: str) -> List[Path]:
+        """Every worker's superseded-row masks for a segment."""
+        return list(self.data_dir.glob(f"{name}.dead*.npy"))
+
+    def _save(self, segment: _Segment) -> None:
+        arrays = dict(segment.columns)
+        # Each segment carries the values its codes refer to, so it loads into any process
+        for name in DIMENSIONS:
+            codes = segment.columns[name]
+            arrays[f"{name}_values"] = np.array(self.vocabularies[name].values[:int(codes.max()) + 1])
+        reasons = self.vocabularies["retry_reason"].values
+        used = int(segment.reason_codes.max()) + 1 if len(segment.reason_codes) else 0
+        arrays["retry_reason_values"] = np.array(reasons[:used], dtype=str)
+        arrays["reason_rows"] = segment.reason_rows
+        arrays["reason_codes"] = segment.reason_codes
+
+        path = self._segment_path(segment.name)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, path)
+
+    def _save_dead(self, segment: _Segment) -> None:
+        path = self._dead_path(segment.name)
+        tmp = path.with_name(path.name + ".tmp")
+        with open(tmp, "wb") as f:
+            np.save(f, segment.dead)
+        os.replace(tmp, path)
+        segment.dead_dirty = False
+
+    def _load(self) -> None:
+        # Segments left by earlier processes load like a live peer's: their
+        # names belong to those processes, so they are never appended to
+        self._refresh()
+        self._prune()
+
+    def _refresh(self) -> None:
+        """Load other workers' segments that are new or changed on disk and forget deleted ones."""
+        own = f"segment_{self.worker}_"
+        found: Dict[str, list] = {}
+        for entry in os.scandir(self.data_dir):
+            if entry.name.startswith(own):
+                continue
+            if SEGMENT_PATTERN.match(entry.name):
+                name = entry.name[:-len(".npz")]
+            elif entry.name.endswith(".npy") and ".dead." in entry.name:
+                name = entry.name[:entry.name.index(".dead.")]
+            else:
+                continue
+            try:
+                found.setdefault(name, []).append((entry.name, entry.stat().st_mtime_ns))
+            except FileNotFoundError:
+                continue
+
+        for name in [n for n in self._stamps if n not in found]:
+            self._others.pop(name, None)
+            del self._stamps[name]
+        for name, files in sorted(found.items()):
+            stamp = tuple(sorted(files))
+            if self._stamps.get(name) == stamp or not any(f == f"{name}.npz" for f, _ in files):
+                continue
+            path = self._segment_path(name)
+            try:
+                segment = self._load_segment(path)
+            except (OSError, ValueError, KeyError) as e:
+                # The owner may be mid-prune; a segment that loads shows up next refresh
+                logger.warning(f"Skipping metrics segment {path}: {str(e)}")
+                continue
+            self._stamps[name] = stamp
+            if len(segment):
+                self._others[name] = segment
+            else:
+                self._others.pop(name, None)
+
+    def _load_segment(self, path: Path) -> _Segment:
+        with np.load(path, allow_pickle=False) as data:
+            rows = len(data["created_at"])
+            columns = {
+                name: data[name].astype(dtype, copy=False) if name in data.files else np.full(rows, NOT_SET, dtype=dtype)
+                for name, dtype in NUMERIC_COLUMNS.items()
+            }
+            for name in DIMENSIONS:
+                mapping = self.vocabularies[name].remap(data[f"{name}_values"])
+                columns[name] = mapping[data[name]] if len(mapping) else data[name].astype(np.int32)
+            reason_mapping = self.vocabularies["retry_reason"].remap(data["retry_reason_values"])
+            reason_codes = data["reason_codes"]
+            segment = _Segment(
+                name=path.stem,
+                columns=columns,
+                reason_rows=data["reason_rows"].astype(np.int64, copy=False),
+                reason_codes=reason_mapping[reason_codes] if len(reason_codes) else reason_codes.astype(np.int32)
+            )
+        for dead_path in self._dead_paths(segment.name):
+            dead = np.load(dead_path, allow_pickle=False)
+            if len(dead) != len(segment):
+                # Saved against an earlier version of a segment its owner has since rewritten
+                logger.warning(f"Ignoring stale superseded-row mask {dead_path}")
+                continue
+            segment.dead = dead if segment.dead is None else segment.dead | dead
+        return segment
+
+def to_micros(value: datetime) -> int:
+    if value.tzinfo is not None:
+        value = value.astimezone().replace(tzinfo=None)
+    delta = value - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 10**6 + delta.microseconds
+
+def worker_id() -> str:
+    """
+    A name for this process's files: host and pid, plus a random token since
+    a restarted container can come back with the same hostname and pid.
+    """
+    return f"{socket.gethostname()}-{os.getpid()}-{secrets.token_hex(4)}"
+
+def _job_key(job_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(job_id.encode(), digest_size=8).digest(), "little", signed=True)
+
+_stores: Dict[str, JobMetricsStore] = {}
+_stores_lock = threading.Lock()
+
+def get_job_metrics_store(data_dir: Path, **options) -> JobMetricsStore:
+    """The process-wide store for a data directory; options apply when it is first created."""
+    key = str(Path(data_dir).resolve())
+    with _stores_lock:
+        if key not in _stores:
+            _stores[key] = JobMetricsStore(Path(data_dir), **options)
+        return _stores[key]
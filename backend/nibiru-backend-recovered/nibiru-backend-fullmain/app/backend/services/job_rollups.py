@@ -0,0 +1,365 @@
+from typing import Dict, Optional, Set, Tuple
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+import atexit
+import json
+import logging
+import os
+import shutil
+import threading
+import numpy as np
+from .job_metrics_store import (
+    EPOCH,
+    JobColumns,
+    JobMetrics,
+    JobMetricsStore,
+    MICROS_PER_DAY,
+    MICROS_PER_HOUR,
+    to_micros,
+    worker_id
+)
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_VERSION = 2
+ALL = "all"
+# Dashboard dimension -> store column; "all" puts every job in one group
+DIMENSIONS = {"backend": "backend", "script": "script_id", ALL: None}
+CUBES = ("status", "retries", "reasons")
+
+# day -> dimension -> (group, status | hour | reason) -> jobs, retries or occurrences
+Cube = Dict[int, Dict[str, Counter]]
+# One day of every cube: cube -> dimension -> counts
+DayCubes = Dict[str, Dict[str, Counter]]
+
+class JobRollups:
+    """
+    Per-day pre-aggregates behind the trend and retry heatmap dashboards.
+
+    For each dimension (backend, script, all) three cubes are kept by day:
+    job counts by (group, status), retry sums by (group, hour) and retry
+    reason counts by (group, reason). record() updates this process's
+    cubes as jobs come in, so a 30-day query merges about 31 days of
+    cells; only the partial first day of the window is read from the
+    metrics store.
+
+    As with MetricSketches, a background thread saves every day this
+    process touched to <directory>/<date>/<worker>.json each
+    `flush_interval` seconds, and queries add the files other workers
+    (and earlier processes) last saved. Nothing is rebuilt at start;
+    scripts/backfill_job_rollups.py seeds an empty directory from the
+    store. Days past `retention` are deleted on flush.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        store: JobMetricsStore,
+        retention: Optional[timedelta] = None,
+        flush_interval: float = 30.0
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.store = store
+        self.retention = retention
+        self.flush_interval = flush_interval
+
+        self._lock = threading.RLock()
+        self._cubes: Dict[str, Cube] = _new_cubes()
+        self._dirty: Set[int] = set()
+        self._files: Dict[Path, Tuple[int, DayCubes]] = {}  # Other workers' day files, with mtime_ns
+        self._merged: Dict[int, Tuple[tuple, DayCubes]] = {}  # Their sum per day, and the files it came from
+        self._closed = False
+        self._wakeup = threading.Event()
+        self._start()
+        atexit.register(self.close)
+
+    def record(self, metrics: JobMetrics, replaced: Optional[JobColumns] = None) -> None:
+        """Count a job, taking back the record it replaced if any."""
+        created_at = to_micros(metrics.created_at)
+        day = created_at // MICROS_PER_DAY
+        hour = created_at // MICROS_PER_HOUR % 24
+        with self._lock:
+            self._check_fork()
+            if replaced is not None:
+                # The replaced record may be another worker's; the sum over all files still balances
+                taken = self._cells_from_columns(replaced)
+                _merge(self._cubes, taken, -1)
+                self._dirty.update(taken["status"])
+            for dimension, group in (("backend", metrics.backend), ("script", metrics.script_id), (ALL, ALL)):
+                self._cubes["status"][day][dimension][(group, metrics.status)] += 1
+                if metrics.retry_count > 0:
+                    self._cubes["retries"][day][dimension][(group, hour)] += metrics.retry_count
+                    reasons = self._cubes["reasons"][day][dimension]
+                    for reason in metrics.retry_reasons:
+                        reasons[(group, reason)] += 1
+            self._dirty.add(day)
+
+    def cells(self, cube: str, dimension: str, since: datetime) -> Dict[int, Counter]:
+        """
+        A cube's cells per day from `since` on, across all workers; the first
+        day counts only jobs after `since`.
+        """
+        since_us = to_micros(since)
+        first_day = since_us // MICROS_PER_DAY
+        edge = None
+        if since_us % MICROS_PER_DAY:
+            edge_jobs = self.store.select(
+                since,
+                EPOCH + timedelta(days=first_day + 1),
+                columns=["backend", "script_id", "status", "retry_count"]
+            )
+            edge = self._cells_from_columns(edge_jobs)[cube]
+
+        cells = {}
+        with self._lock:
+            self._check_fork()
+            own = self._cubes[cube]
+            days = {day for day in own if day >= first_day} | self._saved_days(first_day)
+            for day in sorted(days):
+                if day == first_day and edge is not None:
+                    continue
+                counts = Counter(self._other_days(day).get(cube, {}).get(dimension, {}))
+                counts.update(own[day].get(dimension, {}) if day in own else {})
+                # A job one worker recorded again for another nets to zero across their files
+                counts = +counts
+                if counts:
+                    cells[day] = counts
+        if edge is not None and edge.get(first_day, {}).get(dimension):
+            cells[first_day] = edge[first_day][dimension]
+        return cells
+
+    def rebuild(self) -> None:
+        """
+        Recompute this process's cubes from every job in the metrics store.
+        Only for seeding a directory no worker has saved to yet: jobs in
+        other workers' files would be counted twice.
+        """
+        jobs = self.store.select(datetime.min, columns=["backend", "script_id", "status", "retry_count"])
+        cubes = self._cells_from_columns(jobs)
+        with self._lock:
+            self._check_fork()
+            self._dirty.update(self._cubes["status"])
+            self._cubes = _new_cubes()
+            _merge(self._cubes, cubes, 1)
+            self._dirty.update(self._cubes["status"])
+        logger.info(f"Rebuilt job rollups from {len(jobs)} jobs")
+
+    def flush(self) -> None:
+        """Save the days this process touched since the last flush and prune old days."""
+        with self._lock:
+            self._check_fork()
+            dirty = {day: self._serialize(day) for day in self._dirty}
+            self._dirty.clear()
+            worker = self.worker
+        for day, cubes in dirty.items():
+            day_dir = self.directory / _day_name(day)
+            try:
+                day_dir.mkdir(exist_ok=True)
+                path = day_dir / f"{worker}.json"
+                tmp = day_dir / f"{worker}.json.tmp"
+                with open(tmp, "w") as f:
+                    json.dump({"version": ROLLUP_VERSION, "cubes": cubes}, f, separators=(",", ":"))
+                os.replace(tmp, path)
+            except OSError as e:
+                logger.error(f"Failed to save job rollups for {_day_name(day)}: {str(e)}")
+                with self._lock:
+                    self._dirty.add(day)
+        self._prune()
+
+    def close(self) -> None:
+        """Stop the background writer and save what is left."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wakeup.set()
+        if self._flusher.is_alive() and self._flusher is not threading.current_thread():
+            self._flusher.join()
+        self.flush()
+
+    def _start(self) -> None:
+        self._pid = os.getpid()
+        self.worker = worker_id()
+        self._flusher = threading.Thread(target=self._run, name=f"job-rollups:{self.directory}", daemon=True)
+        self._flusher.start()
+
+    def _check_fork(self) -> None:
+        """A forked child starts empty; the parent still owns and saves what it counted."""
+        if self._pid != os.getpid():
+            self._cubes = _new_cubes()
+            self._dirty.clear()
+            self._files.clear()
+            self._merged.clear()
+            self._start()
+
+    def _run(self) -> None:
+        pid = os.getpid()
+        while not self._closed and pid == os.getpid():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush job rollups {self.directory}: {str(e)}")
+
+    def _saved_days(self, first_day: int) -> Set[int]:
+        """Days from `first_day` on that some worker has saved."""
+        first = _day_name(first_day)
+        return {
+            (date.fromisoformat(entry.name) - EPOCH.date()).days
+            for entry in os.scandir(self.directory)
+            if entry.is_dir() and entry.name >= first
+        }
+
+    def _other_days(self, day: int) -> DayCubes:
+        """Other workers' saved cubes for a day, summed, reloading files that changed."""
+        day_dir = self.directory / _day_name(day)
+        own = f"{self.worker}.json"
+        try:
+            entries = [e for e in os.scandir(day_dir) if e.name.endswith(".json") and e.name != own]
+        except FileNotFoundError:
+            return {}
+
+        current = []
+        for entry in entries:
+            path = Path(entry.path)
+            try:
+                mtime_ns = entry.stat().st_mtime_ns
+                cached = self._files.get(path)
+                if cached is None or cached[0] != mtime_ns:
+                    with open(path) as f:
+                        data = json.load(f)
+                    if data.get("version") != ROLLUP_VERSION:
+                        continue
+                    cached = self._files[path] = (mtime_ns, _deserialize(data["cubes"]))
+                current.append((path, mtime_ns))
+            except (OSError, ValueError, KeyError) as e:
+                # A worker may be mid-replace or pruning; its cubes show up next query
+                logger.warning(f"Skipping job rollups {path}: {str(e)}")
+
+        current = tuple(sorted(current))
+        merged = self._merged.get(day)
+        if merged is None or merged[0] != current:
+            counts = defaultdict(lambda: defaultdict(Counter))
+            for path, _ in current:
+                for cube, by_dimension in self._files[path][1].items():
+                    for dimension, cells in by_dimension.items():
+                        counts[cube][dimension].update(cells)
+            merged = self._merged[day] = (current, counts)
+        return merged[1]
+
+    def _serialize(self, day: int):
+        return {
+            name: [
+                [dimension, group, key, count]
+                for dimension, counts in cube.get(day, {}).items()
+                for (group, key), count in counts.items()
+            ]
+            for name, cube in self._cubes.items()
+        }
+
+    def _prune(self) -> None:
+        if self.retention is None:
+            return
+        cutoff = (datetime.now() - self.retention - EPOCH).days
+        with self._lock:
+            for cube in self._cubes.values():
+                for day in [d for d in cube if d < cutoff]:
+                    del cube[day]
+            for day in [d for d in self._merged if d < cutoff]:
+                del self._merged[day]
+            for path in [p for p in self._files if p.parent.name < _day_name(cutoff)]:
+                del self._files[path]
+        for entry in os.scandir(self.directory):
+            if entry.is_dir() and entry.name < _day_name(cutoff):
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    @staticmethod
+    def _cells_from_columns(jobs: JobColumns) -> Dict[str, Cube]:
+        """Aggregate store columns into cubes with one group-by per dimension and cube."""
+        cubes = _new_cubes()
+        if not len(jobs):
+            return cubes
+
+        created = jobs.columns["created_at"]
+        days = created // MICROS_PER_DAY
+        first_day = int(days.min())
+        day_index = days - first_day
+        hours = (created // MICROS_PER_HOUR) % 24
+        retries = jobs.columns["retry_count"]
+        retried = retries > 0
+        statuses = list(jobs.vocabularies["status"].values)
+        reason_names = list(jobs.vocabularies["retry_reason"].values)
+        counted = retried[jobs.reason_rows]
+        reason_rows = jobs.reason_rows[counted]
+        reason_codes = jobs.reason_codes[counted].astype(np.int64)
+
+        for dimension, column in DIMENSIONS.items():
+            if column is None:
+                groups, names = np.zeros(len(jobs), dtype=np.int64), [ALL]
+            else:
+                groups, names = jobs.columns[column].astype(np.int64), list(jobs.vocabularies[column].values)
+
+            _count_cells(
+                cubes["status"], dimension, first_day, day_index, groups, names,
+                jobs.columns["status"].astype(np.int64), statuses
+            )
+            _count_cells(
+                cubes["retries"], dimension, first_day, day_index[retried], groups[retried], names,
+                hours[retried], list(range(24)), weights=retries[retried]
+            )
+            _count_cells(
+                cubes["reasons"], dimension, first_day, day_index[reason_rows], groups[reason_rows], names,
+                reason_codes, reason_names
+            )
+        return cubes
+
+def _count_cells(cube, dimension, first_day, day_index, groups, names, keys, key_names, weights=None) -> None:
+    if not len(day_index):
+        return
+    cells = (day_index * len(names) + groups) * len(key_names) + keys
+    unique, inverse = np.unique(cells, return_inverse=True)
+    counts = np.bincount(inverse, weights=weights).astype(np.int64)
+    days, rest = np.divmod(unique, len(names) * len(key_names))
+    groups, keys = np.divmod(rest, len(key_names))
+    for day, group, key, count in zip(days.tolist(), groups.tolist(), keys.tolist(), counts.tolist()):
+        cube[first_day + day][dimension][(names[group], key_names[key])] += count
+
+def _new_cube() -> Cube:
+    return defaultdict(lambda: defaultdict(Counter))
+
+def _new_cubes() -> Dict[str, Cube]:
+    return {name: _new_cube() for name in CUBES}
+
+def _merge(target: Dict[str, Cube], cubes: Dict[str, Cube], sign: int) -> None:
+    for name, cube in cubes.items():
+        for day, by_dimension in cube.items():
+            for dimension, counts in by_dimension.items():
+                cells = target[name][day][dimension]
+                for key, count in counts.items():
+                    cells[key] += sign * count
+                    if not cells[key]:
+                        del cells[key]
+
+def _deserialize(rows_by_cube) -> DayCubes:
+    cubes = defaultdict(lambda: defaultdict(Counter))
+    for name, rows in rows_by_cube.items():
+        for dimension, group, key, count in rows:
+            cubes[name][dimension][(group, key)] = count
+    return cubes
+
+def _day_name(day: int) -> str:
+    return (EPOCH + timedelta(days=day)).date().isoformat()
+
+_rollups: Dict[str, JobRollups] = {}
+_rollups_lock = threading.Lock()
+
+def get_job_rollups(directory: Path, store: JobMetricsStore, **options) -> JobRollups:
+    """The process-wide rollups saved under `directory`; options apply when first created."""
+    key = str(Path(directory).resolve())
+    with _rollups_lock:
+        if key not in _rollups:
+            _rollups[key] = JobRollups(Path(directory), store, **options)
+        return _rollups[key]
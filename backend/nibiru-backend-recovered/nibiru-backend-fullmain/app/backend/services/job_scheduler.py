@@ -1,14 +1,29 @@
-from typing import Dict, List, Optional
+from typing import AsyncIterator, Dict, List, Optional
+from collections import Counter
 from datetime import datetime, timedelta
 from dataclasses import dataclass
-import json
 from pathlib import Path
 import logging
 import asyncio
+import os
+import random
+import time
 from enum import Enum
+from .quantum_backend import QuantumBackendService
+from .sandbox_security import SandboxSecurityService
+from ..utils.log_sink import get_log_sink
 
 logger = logging.getLogger(__name__)
 
+# Jobs of one batch running at once; the user's tier limit applies on top
+MAX_BATCH_CONCURRENCY = int(os.getenv("SCHEDULER_MAX_BATCH_CONCURRENCY", "16"))
+# Backoff before retry n is base * 2^(n-1) seconds, capped, with jitter
+RETRY_BASE_DELAY = float(os.getenv("SCHEDULER_RETRY_BASE_DELAY", "1"))
+RETRY_MAX_DELAY = float(os.getenv("SCHEDULER_RETRY_MAX_DELAY", "60"))
+# How long backend latency percentiles are reused when balancing
+BACKEND_LATENCY_TTL = 30.0
+ACTIVE_STATUSES = ("pending", "running")
+
 class BatchStatus(Enum):
     PENDING = "pending"
     RUNNING = "running"
@@ -29,15 +44,72 @@ class JobBatch:
     delay_between_jobs: int  # seconds
     backend_balancing: bool
     error_message: Optional[str]
+    quantum_score: float = 0.0  # Picks the user's tier of resource limits
+    max_retries: int = 2
+    jobs_per_second: Optional[float] = None  # Overrides delay_between_jobs
+
+class TokenBucket:
+    """Lets `rate` jobs start per second on average, in bursts of up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = 1.0):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class ConcurrencyLimit:
+    """A semaphore whose limit can change; lowering it only holds back new jobs."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.active = 0
+        self._changed = asyncio.Condition()
+
+    async def set_limit(self, limit: int):
+        async with self._changed:
+            self.limit = limit
+            self._changed.notify_all()
+
+    async def __aenter__(self):
+        async with self._changed:
+            await self._changed.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+
+    async def __aexit__(self, *exc_info):
+        async with self._changed:
+            self.active -= 1
+            self._changed.notify_all()
 
 class JobSchedulerService:
-    def __init__(self):
+    def __init__(self, quantum_backends: QuantumBackendService, sandbox_security: SandboxSecurityService):
         self.batches: Dict[str, JobBatch] = {}
         self.scheduled_tasks: Dict[str, asyncio.Task] = {}
+        # Shared with the rest of the app, so backend balancing sees the
+        # same queue state and usage log as everything else
+        self.sandbox_security = sandbox_security
+        self.quantum_backends = quantum_backends
+        
+        # Shared by all of a user's batches, sized by their tier's max_concurrent_jobs
+        self.user_slots: Dict[str, ConcurrencyLimit] = {}
+        self.backend_in_flight: Counter = Counter()
+        self._backend_latency: Dict[str, float] = {}
+        self._backend_latency_checked = 0.0
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
         
-        # Create logs directory if it doesn't exist
         self.logs_dir = Path("logs/scheduler")
-        self.logs_dir.mkdir(parents=True, exist_ok=True)
+        self.log_sink = get_log_sink(self.logs_dir)
 
     async def create_batch(
         self,
@@ -45,7 +117,10 @@ class JobSchedulerService:
         script_id: str,
         jobs: List[Dict],
         delay_between_jobs: int = 0,
-        backend_balancing: bool = False
+        backend_balancing: bool = False,
+        quantum_score: float = 0.0,
+        max_retries: int = 2,
+        jobs_per_second: Optional[float] = None
     ) -> JobBatch:
         """Create a new job batch"""
         batch_id = f"{user_id}_{datetime.now().timestamp()}"
@@ -61,7 +136,10 @@ class JobSchedulerService:
             completed_at=None,
             delay_between_jobs=delay_between_jobs,
             backend_balancing=backend_balancing,
-            error_message=None
+            error_message=None,
+            quantum_score=quantum_score,
+            max_retries=max_retries,
+            jobs_per_second=jobs_per_second
         )
         
         self.batches[batch_id] = batch
@@ -93,6 +171,7 @@ class JobSchedulerService:
         batch.error_message = "Batch cancelled by user"
         
         self._write_batch_log(batch)
+        self._publish_batch(batch)
         return True
 
     async def retry_batch(self, batch_id: str) -> Optional[JobBatch]:
@@ -110,7 +189,10 @@ class JobSchedulerService:
             script_id=batch.script_id,
             jobs=batch.jobs,
             delay_between_jobs=batch.delay_between_jobs,
-            backend_balancing=batch.backend_balancing
+            backend_balancing=batch.backend_balancing,
+            quantum_score=batch.quantum_score,
+            max_retries=batch.max_retries,
+            jobs_per_second=batch.jobs_per_second
         )
         
         return new_batch
@@ -138,34 +220,60 @@ class JobSchedulerService:
             "job_statuses": job_statuses,
             "error_message": batch.error_message,
             "delay_between_jobs": batch.delay_between_jobs,
-            "backend_balancing": batch.backend_balancing
+            "jobs_per_second": batch.jobs_per_second,
+            "backend_balancing": batch.backend_balancing,
+            "max_retries": batch.max_retries
         }
 
+    async def stream_batch_status(self, batch_id: str) -> AsyncIterator[Dict]:
+        """Yield a batch's current status, then each job and batch update until it finishes"""
+        if batch_id not in self.batches:
+            return
+        
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(batch_id, []).append(queue)
+        try:
+            # Updates after the snapshot are already queued for us
+            snapshot = await self.get_batch_status(batch_id)
+            yield snapshot
+            if snapshot["status"] not in ACTIVE_STATUSES:
+                return
+            while True:
+                update = await queue.get()
+                yield update
+                if update["type"] == "batch" and update["status"] not in ACTIVE_STATUSES:
+                    return
+        finally:
+            self._subscribers[batch_id].remove(queue)
+            if not self._subscribers[batch_id]:
+                del self._subscribers[batch_id]
+
     async def _execute_batch(self, batch: JobBatch):
-        """Execute a batch of jobs"""
+        """Execute a batch of jobs concurrently within the batch's and user's limits"""
         try:
             batch.status = BatchStatus.RUNNING
             batch.started_at = datetime.now()
             self._write_batch_log(batch)
+            self._publish_batch(batch)
             
-            for i, job in enumerate(batch.jobs):
-                if batch.status != BatchStatus.RUNNING:
-                    break
-                
-                # Add delay between jobs if specified
-                if i > 0 and batch.delay_between_jobs > 0:
-                    await asyncio.sleep(batch.delay_between_jobs)
-                
-                # Execute job
-                try:
-                    # TODO: Implement actual job execution
-                    # This is a placeholder for the actual job execution logic
-                    await self._execute_job(job)
-                except Exception as e:
-                    logger.error(f"Error executing job in batch {batch.batch_id}: {str(e)}")
-                    job["status"] = "failed"
-                    job["error"] = str(e)
-                    continue
+            limits = self.sandbox_security.get_resource_limits(batch.user_id, batch.quantum_score)
+            user_slots = self.user_slots.get(batch.user_id)
+            if user_slots is None:
+                user_slots = self.user_slots[batch.user_id] = ConcurrencyLimit(limits.max_concurrent_jobs)
+            else:
+                await user_slots.set_limit(limits.max_concurrent_jobs)
+            batch_slots = asyncio.Semaphore(MAX_BATCH_CONCURRENCY)
+            
+            # A fixed delay between jobs becomes the equivalent start rate
+            rate = batch.jobs_per_second
+            if rate is None and batch.delay_between_jobs > 0:
+                rate = 1 / batch.delay_between_jobs
+            bucket = TokenBucket(rate) if rate else None
+            
+            await asyncio.gather(*(
+                self._run_job(batch, index, job, batch_slots, user_slots, bucket)
+                for index, job in enumerate(batch.jobs)
+            ))
             
             # Update batch status
             if batch.status == BatchStatus.RUNNING:
@@ -173,19 +281,143 @@ class JobSchedulerService:
                 batch.completed_at = datetime.now()
             
             self._write_batch_log(batch)
+            self._publish_batch(batch)
             
         except asyncio.CancelledError:
             batch.status = BatchStatus.CANCELLED
             batch.completed_at = datetime.now()
-            batch.error_message = "Batch execution cancelled"
+            batch.error_message = batch.error_message or "Batch execution cancelled"
             self._write_batch_log(batch)
+            self._publish_batch(batch)
         except Exception as e:
             batch.status = BatchStatus.FAILED
             batch.completed_at = datetime.now()
             batch.error_message = str(e)
             self._write_batch_log(batch)
+            self._publish_batch(batch)
             logger.error(f"Error executing batch {batch.batch_id}: {str(e)}")
 
+    async def _run_job(
+        self,
+        batch: JobBatch,
+        index: int,
+        job: Dict,
+        batch_slots: asyncio.Semaphore,
+        user_slots: ConcurrencyLimit,
+        bucket: Optional[TokenBucket]
+    ):
+        """Run one job of a batch, retrying failures with exponential backoff"""
+        job_id = job.setdefault("job_id", f"{batch.batch_id}_{index}")
+        queued = time.monotonic()
+        job["status"] = "pending"
+        
+        for attempt in range(1, batch.max_retries + 2):
+            if attempt > 1:
+                # Back off without holding a slot, so other jobs keep running
+                delay = min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * 2 ** (attempt - 2))
+                job["status"] = "retrying"
+                self._publish_job(batch, index, job)
+                await asyncio.sleep(delay * random.uniform(0.5, 1.0))
+            
+            # Wait for the start rate before taking slots, so a throttled job
+            # does not keep the user's other batches from running
+            if bucket is not None:
+                await bucket.acquire()
+            
+            async with batch_slots, user_slots:
+                backend = self._choose_backend(batch.user_id, job) if batch.backend_balancing else job.get("backend")
+                if backend:
+                    job["backend"] = backend
+                    self.backend_in_flight[backend] += 1
+                started = time.monotonic()
+                job["status"] = "running"
+                job["attempts"] = attempt
+                self._publish_job(batch, index, job)
+                
+                try:
+                    # TODO: Implement actual job execution
+                    # This is a placeholder for the actual job execution logic
+                    await self._execute_job(job)
+                except Exception as e:
+                    logger.error(f"Error executing job {job_id} in batch {batch.batch_id} (attempt {attempt}): {str(e)}")
+                    job["status"] = "failed"
+                    job["error"] = str(e)
+                    continue
+                finally:
+                    if backend:
+                        self.backend_in_flight[backend] -= 1
+            
+            job["status"] = "completed"
+            job.pop("error", None)
+            if backend:
+                self.quantum_backends.log_backend_usage(
+                    batch.user_id,
+                    backend,
+                    job_id,
+                    duration=time.monotonic() - started,
+                    wait_time=started - queued
+                )
+            self._publish_job(batch, index, job)
+            return
+        
+        self._publish_job(batch, index, job)
+
+    def _choose_backend(self, user_id: str, job: Dict) -> Optional[str]:
+        """Pick the usable backend expected to finish a new job soonest"""
+        latency = self._backend_latencies()
+        default_latency = sum(latency.values()) / len(latency) if latency else 1.0
+        
+        best, best_finish = job.get("backend"), None
+        for backend_id in self.quantum_backends.get_usable_backends(user_id, job.get("required_qubits", 0)):
+            metrics = self.quantum_backends.get_backend_status(backend_id)
+            # Reported wait, plus everything queued or running there ahead of this job
+            ahead = metrics.queue_length + self.backend_in_flight[backend_id]
+            finish = metrics.average_wait_time + (ahead + 1) * latency.get(backend_id, default_latency)
+            # Ties keep the user's preferred order
+            if best_finish is None or finish < best_finish:
+                best, best_finish = backend_id, finish
+        return best
+
+    def _backend_latencies(self) -> Dict[str, float]:
+        """Median job duration per backend over the last hour, refreshed every BACKEND_LATENCY_TTL seconds"""
+        now = time.monotonic()
+        if now - self._backend_latency_checked >= BACKEND_LATENCY_TTL:
+            latency = self.quantum_backends.get_backend_latency(time_range=timedelta(hours=1))
+            self._backend_latency = {
+                backend_id: metrics["duration"]["p50"]
+                for backend_id, metrics in latency.items()
+                if "duration" in metrics
+            }
+            self._backend_latency_checked = now
+        return self._backend_latency
+
+    def _publish_batch(self, batch: JobBatch):
+        self._publish(batch.batch_id, {
+            "type": "batch",
+            "batch_id": batch.batch_id,
+            "status": batch.status.value,
+            "timestamp": datetime.now().isoformat(),
+            "error_message": batch.error_message
+        })
+
+    def _publish_job(self, batch: JobBatch, index: int, job: Dict):
+        self._publish(batch.batch_id, {
+            "type": "job",
+            "batch_id": batch.batch_id,
+            "index": index,
+            "job_id": job.get("job_id"),
+            "status": job.get("status"),
+            "attempt": job.get("attempts", 0),
+            "backend": job.get("backend"),
+            "error": job.get("error"),
+            "timestamp": datetime.now().isoformat()
+        })
+
+    def _publish(self, batch_id: str, update: Dict):
+        """Hand a status update to everyone streaming the batch"""
+        for queue in self._subscribers.get(batch_id, []):
+            queue.put_nowait(update)
+
     async def _execute_job(self, job: Dict):
         """Execute a single job"""
         # TODO: Implement actual job execution
@@ -195,7 +427,6 @@ class JobSchedulerService:
 
     def _write_batch_log(self, batch: JobBatch):
         """Write batch log to file"""
-        log_file = self.logs_dir / f"batches_{batch.user_id}.json"
         log_entry = {
             "batch_id": batch.batch_id,
             "user_id": batch.user_id,
@@ -210,20 +441,4 @@ class JobSchedulerService:
             "jobs": batch.jobs
         }
         
-        self._append_to_log(log_file, log_entry)
-
-    def _append_to_log(self, log_file: Path, entry: Dict):
-        """Append a log entry to a JSON log file"""
-        try:
-            if log_file.exists():
-                with open(log_file, 'r') as f:
-                    logs = json.load(f)
-            else:
-                logs = []
-            
-            logs.append(entry)
-            
-            with open(log_file, 'w') as f:
-                json.dump(logs, f, indent=2)
-        except Exception as e:
-            logger.error(f"Failed to write to log file {log_file}: {str(e)}") 
\ No newline at end of file
+        self.log_sink.append(f"batches_{batch.user_id}", log_entry)
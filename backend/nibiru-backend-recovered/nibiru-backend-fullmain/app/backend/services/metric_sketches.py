@@ -0,0 +1,260 @@
+from typing import Dict, Optional, Set, Tuple
+from datetime import datetime, timedelta
+from pathlib import Path
+import atexit
+import json
+import logging
+import os
+import shutil
+import threading
+import numpy as np
+from .job_metrics_store import EPOCH, MICROS_PER_DAY, MICROS_PER_HOUR, to_micros, worker_id
+from ..utils.sketches import DDSketch
+
+logger = logging.getLogger(__name__)
+
+SKETCH_VERSION = 1
+
+# (metric, group, hour of day) -> sketch, for one day
+DaySketches = Dict[Tuple[str, str, int], DDSketch]
+
+class _DayFile:
+    """Another worker's saved sketches for one day, with per-day totals for whole-day queries."""
+
+    def __init__(self, mtime_ns: int, hours: DaySketches):
+        self.mtime_ns = mtime_ns
+        self.hours = hours
+        self.totals: Dict[Tuple[str, str], DDSketch] = {}
+        for (metric, group, _), sketch in hours.items():
+            if (metric, group) in self.totals:
+                self.totals[(metric, group)].merge(sketch)
+            else:
+                self.totals[(metric, group)] = sketch.copy()
+
+class MetricSketches:
+    """
+    Percentile sketches of job metrics by metric, group (e.g. backend) and hour.
+
+    add() updates this process's sketches in memory; a background thread
+    saves every day it touched to <directory>/<date>/<worker>.json each
+    `flush_interval` seconds. Each worker process has its own file, named
+    by worker_id() so a restarted container never overwrites the file of
+    the process it replaced, and queries merge this process's sketches with
+    the files the other workers last saved, so percentiles cover every
+    process. Windows are resolved to
+    the hour: the hours holding `since` and `until` count whole. Days past
+    `retention` are deleted on flush.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        retention: Optional[timedelta] = None,
+        relative_accuracy: float = 0.01,
+        flush_interval: float = 30.0
+    ):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.retention = retention
+        self.relative_accuracy = relative_accuracy
+        self.flush_interval = flush_interval
+
+        self._lock = threading.RLock()
+        self._days: Dict[int, DaySketches] = {}
+        self._dirty: Set[int] = set()
+        self._files: Dict[Path, _DayFile] = {}
+        self._closed = False
+        self._wakeup = threading.Event()
+        self._start()
+        atexit.register(self.close)
+
+    def add(self, metric: str, group: str, at: datetime, value: float, count: int = 1) -> None:
+        """Count one value for `metric` and `group` in the hour of `at` (count=-1 takes it back)."""
+        micros = to_micros(at)
+        day, hour = micros // MICROS_PER_DAY, micros // MICROS_PER_HOUR % 24
+        with self._lock:
+            self._check_fork()
+            sketches = self._days.setdefault(day, {})
+            sketch = sketches.get((metric, group, hour))
+            if sketch is None:
+                sketch = sketches[(metric, group, hour)] = DDSketch(self.relative_accuracy)
+            sketch.add(value, count)
+            self._dirty.add(day)
+
+    def add_many(self, metric: str, group: str, micros: np.ndarray, values: np.ndarray) -> None:
+        """Count arrays of values and their times (microseconds since the epoch) at once."""
+        if not len(values):
+            return
+        buckets = micros // MICROS_PER_HOUR
+        unique, inverse = np.unique(buckets, return_inverse=True)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.searchsorted(inverse[order], np.arange(len(unique) + 1))
+        with self._lock:
+            self._check_fork()
+            for i, bucket in enumerate(unique.tolist()):
+                day, hour = bucket // 24, bucket % 24
+                sketches = self._days.setdefault(day, {})
+                sketch = sketches.get((metric, group, hour))
+                if sketch is None:
+                    sketch = sketches[(metric, group, hour)] = DDSketch(self.relative_accuracy)
+                sketch.add_many(values[order[bounds[i]:bounds[i + 1]]])
+                self._dirty.add(day)
+
+    def query(
+        self,
+        metric: str,
+        since: datetime,
+        until: Optional[datetime] = None,
+        group: Optional[str] = None
+    ) -> Dict[str, DDSketch]:
+        """One merged sketch per group for `metric` over the window, across all workers."""
+        with self._lock:
+            self._check_fork()
+        since_hour = to_micros(since) // MICROS_PER_HOUR
+        until_hour = to_micros(until or datetime.now()) // MICROS_PER_HOUR
+        merged: Dict[str, DDSketch] = {}
+
+        def take(sketch_group: str, sketch: DDSketch) -> None:
+            if group is not None and sketch_group != group:
+                return
+            if sketch_group in merged:
+                merged[sketch_group].merge(sketch)
+            else:
+                merged[sketch_group] = sketch.copy()
+
+        for day in range(since_hour // 24, until_hour // 24 + 1):
+            first = max(since_hour - day * 24, 0)
+            last = min(until_hour - day * 24, 23)
+            whole_day = first == 0 and last == 23
+            for day_file in self._other_files(day):
+                if whole_day:
+                    for (sketch_metric, sketch_group), sketch in day_file.totals.items():
+                        if sketch_metric == metric:
+                            take(sketch_group, sketch)
+                    continue
+                for (sketch_metric, sketch_group, hour), sketch in day_file.hours.items():
+                    if sketch_metric == metric and first <= hour <= last:
+                        take(sketch_group, sketch)
+            with self._lock:
+                for (sketch_metric, sketch_group, hour), sketch in self._days.get(day, {}).items():
+                    if sketch_metric == metric and first <= hour <= last:
+                        take(sketch_group, sketch)
+        return merged
+
+    def flush(self) -> None:
+        """Save the days this process touched since the last flush and prune old days."""
+        with self._lock:
+            self._check_fork()
+            dirty = {day: self._serialize(self._days[day]) for day in self._dirty if day in self._days}
+            self._dirty.clear()
+            worker = self.worker
+        for day, sketches in dirty.items():
+            day_dir = self.directory / _day_name(day)
+            try:
+                day_dir.mkdir(exist_ok=True)
+                path = day_dir / f"{worker}.json"
+                tmp = day_dir / f"{worker}.json.tmp"
+                with open(tmp, "w") as f:
+                    json.dump({"version": SKETCH_VERSION, "sketches": sketches}, f, separators=(",", ":"))
+                os.replace(tmp, path)
+            except OSError as e:
+                logger.error(f"Failed to save metric sketches for {_day_name(day)}: {str(e)}")
+                with self._lock:
+                    self._dirty.add(day)
+        self._prune()
+
+    def close(self) -> None:
+        """Stop the background writer and save what is left."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wakeup.set()
+        if self._flusher.is_alive() and self._flusher is not threading.current_thread():
+            self._flusher.join()
+        self.flush()
+
+    def _start(self) -> None:
+        self._pid = os.getpid()
+        self.worker = worker_id()
+        self._flusher = threading.Thread(target=self._run, name=f"metric-sketches:{self.directory}", daemon=True)
+        self._flusher.start()
+
+    def _check_fork(self) -> None:
+        """A forked child starts empty; the parent still owns and saves what it counted."""
+        if self._pid != os.getpid():
+            self._days.clear()
+            self._dirty.clear()
+            self._files.clear()
+            self._start()
+
+    def _run(self) -> None:
+        pid = os.getpid()
+        while not self._closed and pid == os.getpid():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Failed to flush metric sketches {self.directory}: {str(e)}")
+
+    def _other_files(self, day: int):
+        """Other workers' saved sketches for a day, reloading files that changed."""
+        day_dir = self.directory / _day_name(day)
+        own = f"{self.worker}.json"
+        try:
+            entries = [e for e in os.scandir(day_dir) if e.name.endswith(".json") and e.name != own]
+        except FileNotFoundError:
+            return []
+
+        day_files = []
+        for entry in entries:
+            path = Path(entry.path)
+            try:
+                mtime_ns = entry.stat().st_mtime_ns
+                cached = self._files.get(path)
+                if cached is None or cached.mtime_ns != mtime_ns:
+                    with open(path) as f:
+                        data = json.load(f)
+                    if data.get("version") != SKETCH_VERSION:
+                        continue
+                    cached = self._files[path] = _DayFile(mtime_ns, {
+                        (metric, group, hour): DDSketch.from_dict(sketch)
+                        for metric, group, hour, sketch in data["sketches"]
+                    })
+                day_files.append(cached)
+            except (OSError, ValueError, KeyError) as e:
+                # A worker may be mid-replace or pruning; its sketches show up next query
+                logger.warning(f"Skipping metric sketches {path}: {str(e)}")
+        return day_files
+
+    def _prune(self) -> None:
+        if self.retention is None:
+            return
+        cutoff = (datetime.now() - self.retention - EPOCH).days
+        with self._lock:
+            for day in [d for d in self._days if d < cutoff]:
+                del self._days[day]
+            for path in [p for p in self._files if p.parent.name < _day_name(cutoff)]:
+                del self._files[path]
+        for entry in os.scandir(self.directory):
+            if entry.is_dir() and entry.name < _day_name(cutoff):
+                shutil.rmtree(entry.path, ignore_errors=True)
+
+    @staticmethod
+    def _serialize(sketches: DaySketches):
+        return [[metric, group, hour, sketch.to_dict()] for (metric, group, hour), sketch in sketches.items()]
+
+def _day_name(day: int) -> str:
+    return (EPOCH + timedelta(days=day)).date().isoformat()
+
+_sketches: Dict[str, MetricSketches] = {}
+_sketches_lock = threading.Lock()
+
+def get_metric_sketches(directory: Path, **options) -> MetricSketches:
+    """The process-wide sketches saved under `directory`; options apply when first created."""
+    key = str(Path(directory).resolve())
+    with _sketches_lock:
+        if key not in _sketches:
+            _sketches[key] = MetricSketches(Path(directory), **options)
+        return _sketches[key]
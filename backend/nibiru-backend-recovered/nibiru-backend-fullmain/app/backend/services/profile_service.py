@@ -7,10 +7,10 @@ import logging
 import asyncpg
 import json
 import os
-import aioredis
 from ..models.user import User, ProfileSettings, QRCodeData, ProfileUpdate
 from ..services.sigil_service import SigilService
 from ..services.sigil_image_service import SigilImageService
+from ..utils.redis_pool import get_redis
 from ..config import settings
 
 logger = logging.getLogger(__name__)
@@ -33,11 +33,7 @@ class ProfileService:
             await self._create_tables()
         
         if not self.redis:
-            self.redis = await aioredis.from_url(
-                settings.REDIS_URL,
-                encoding="utf-8",
-                decode_responses=True
-            )
+            self.redis = get_redis(settings.REDIS_URL)
 
     async def _create_tables(self):
         """Create necessary database tables if they don't exist."""
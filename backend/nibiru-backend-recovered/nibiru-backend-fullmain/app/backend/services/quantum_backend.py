@@ -3,11 +3,15 @@ import logging
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from enum import Enum
-import json
 from pathlib import Path
+from .metric_sketches import get_metric_sketches
+from ..utils.log_sink import get_log_sink
 
 logger = logging.getLogger(__name__)
 
+# Usage sketches older than this are dropped
+USAGE_SKETCH_RETENTION = timedelta(days=90)
+
 class BackendStatus(Enum):
     AVAILABLE = "available"
     BUSY = "busy"
@@ -122,9 +126,12 @@ class QuantumBackendService:
         self.user_preferences: Dict[str, List[str]] = {}
         self.backend_usage_logs: Dict[str, List[Dict]] = {}
         
-        # Create logs directory if it doesn't exist
         self.logs_dir = Path("logs/quantum_backends")
-        self.logs_dir.mkdir(parents=True, exist_ok=True)
+        self.log_sink = get_log_sink(self.logs_dir)
+        self.usage_sketches = get_metric_sketches(
+            Path("data/quantum_backends/sketches"),
+            retention=USAGE_SKETCH_RETENTION
+        )
 
     def get_backend_status(self, backend_id: str) -> Optional[BackendMetrics]:
         """Get current status of a quantum backend"""
@@ -165,9 +172,13 @@ class QuantumBackendService:
 
     def get_available_backend(self, user_id: str, required_qubits: int = 0) -> Optional[str]:
         """Get the best available backend for a user based on preferences and requirements"""
-        preferences = self.get_user_backend_preferences(user_id)
-        
-        for backend_id in preferences:
+        usable = self.get_usable_backends(user_id, required_qubits)
+        return usable[0] if usable else None
+
+    def get_usable_backends(self, user_id: str, required_qubits: int = 0) -> List[str]:
+        """Get every backend that can take a job now, in the user's preferred order"""
+        usable = []
+        for backend_id in self.get_user_backend_preferences(user_id):
             metrics = self.backend_metrics.get(backend_id)
             if not metrics:
                 continue
@@ -175,25 +186,50 @@ class QuantumBackendService:
             if (metrics.status == BackendStatus.AVAILABLE and
                 metrics.qubit_count >= required_qubits and
                 metrics.error_rate < 0.1):  # Less than 10% error rate
-                return backend_id
+                usable.append(backend_id)
         
-        return None
+        return usable
 
-    def log_backend_usage(self, user_id: str, backend_id: str, job_id: str, duration: float):
+    def log_backend_usage(
+        self,
+        user_id: str,
+        backend_id: str,
+        job_id: str,
+        duration: float,
+        wait_time: Optional[float] = None
+    ):
         """Log backend usage for a job"""
         if user_id not in self.backend_usage_logs:
             self.backend_usage_logs[user_id] = []
         
+        now = datetime.now()
         log_entry = {
-            "timestamp": datetime.now().isoformat(),
+            "timestamp": now.isoformat(),
             "backend_id": backend_id,
             "job_id": job_id,
             "duration": duration
         }
+        self.usage_sketches.add("duration", backend_id, now, duration)
+        if wait_time is not None:
+            log_entry["wait_time"] = wait_time
+            self.usage_sketches.add("wait_time", backend_id, now, wait_time)
         
         self.backend_usage_logs[user_id].append(log_entry)
         self._write_usage_log(user_id, log_entry)
 
+    def get_backend_latency(
+        self,
+        backend_id: Optional[str] = None,
+        time_range: timedelta = timedelta(hours=1)
+    ) -> Dict[str, Dict]:
+        """Get p50/p95/p99 of job duration and wait time per backend, across all workers"""
+        since = datetime.now() - time_range
+        latency: Dict[str, Dict] = {}
+        for metric in ("duration", "wait_time"):
+            for backend, sketch in self.usage_sketches.query(metric, since, group=backend_id).items():
+                latency.setdefault(backend, {})[metric] = sketch.summary()
+        return latency
+
     def get_backend_usage_stats(self, user_id: str) -> Dict:
         """Get backend usage statistics for a user"""
         if user_id not in self.backend_usage_logs:
@@ -224,43 +260,24 @@ class QuantumBackendService:
 
     def _log_backend_update(self, backend_id: str, metrics: Dict):
         """Log backend status update"""
-        log_file = self.logs_dir / "backend_updates.json"
         log_entry = {
             "timestamp": datetime.now().isoformat(),
             "backend_id": backend_id,
             "metrics": metrics
         }
         
-        self._append_to_log(log_file, log_entry)
+        self.log_sink.append("backend_updates", log_entry)
 
     def _log_preference_update(self, user_id: str, preferences: List[str]):
         """Log user preference update"""
-        log_file = self.logs_dir / "preference_updates.json"
         log_entry = {
             "timestamp": datetime.now().isoformat(),
             "user_id": user_id,
             "preferences": preferences
         }
         
-        self._append_to_log(log_file, log_entry)
+        self.log_sink.append("preference_updates", log_entry)
 
     def _write_usage_log(self, user_id: str, log_entry: Dict):
         """Write usage log to file"""
-        log_file = self.logs_dir / f"usage_{user_id}.json"
-        self._append_to_log(log_file, log_entry)
-
-    def _append_to_log(self, log_file: Path, entry: Dict):
-        """Append a log entry to a JSON log file"""
-        try:
-            if log_file.exists():
-                with open(log_file, 'r') as f:
-                    logs = json.load(f)
-            else:
-                logs = []
-            
-            logs.append(entry)
-            
-            with open(log_file, 'w') as f:
-                json.dump(logs, f, indent=2)
-        except Exception as e:
-            logger.error(f"Failed to write to log file {log_file}: {str(e)}") 
\ No newline at end of file
+        self.log_sink.append(f"usage_{user_id}", log_entry)
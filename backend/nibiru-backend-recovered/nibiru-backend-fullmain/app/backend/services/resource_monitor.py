@@ -1,12 +1,12 @@
 from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 from dataclasses import dataclass
-import json
 from pathlib import Path
 import logging
 import psutil
 import asyncio
 from enum import Enum
+from ..utils.log_sink import get_log_sink
 
 logger = logging.getLogger(__name__)
 
@@ -50,9 +50,8 @@ class ResourceMonitorService:
             "network_threshold": 1024 * 1024 * 50  # 50 MB/s
         }
         
-        # Create logs directory if it doesn't exist
         self.logs_dir = Path("logs/resources")
-        self.logs_dir.mkdir(parents=True, exist_ok=True)
+        self.log_sink = get_log_sink(self.logs_dir)
 
     async def start_monitoring(self, job_id: str, process: psutil.Process):
         """Start monitoring resources for a job"""
@@ -71,9 +70,9 @@ class ResourceMonitorService:
             self.monitoring_tasks[job_id].cancel()
             del self.monitoring_tasks[job_id]
             
-            # Write final metrics to log
-            self._write_metrics_log(job_id)
-            self._write_events_log(job_id)
+            # Samples and events were logged as they came in; make them durable
+            self.log_sink.flush(f"metrics_{job_id}")
+            self.log_sink.flush(f"events_{job_id}")
 
     async def get_job_metrics(self, job_id: str) -> Optional[Dict]:
         """Get resource metrics for a job"""
@@ -151,6 +150,7 @@ class ResourceMonitorService:
                     
                     # Store metrics
                     self.job_metrics[job_id].append(metrics)
+                    self._write_metrics_log(job_id, [metrics])
                     
                     # Check for events
                     await self._check_resource_events(job_id, metrics)
@@ -225,15 +225,11 @@ class ResourceMonitorService:
             if job_id not in self.job_events:
                 self.job_events[job_id] = []
             self.job_events[job_id].extend(events)
-            self._write_events_log(job_id)
+            self._write_events_log(job_id, events)
 
-    def _write_metrics_log(self, job_id: str):
-        """Write metrics log to file"""
-        if job_id not in self.job_metrics:
-            return
-        
-        log_file = self.logs_dir / f"metrics_{job_id}.json"
-        log_entries = [
+    def _write_metrics_log(self, job_id: str, metrics: List[ResourceMetrics]):
+        """Append new metric samples to the job's log"""
+        self.log_sink.append_many(f"metrics_{job_id}", (
             {
                 "timestamp": m.timestamp.isoformat(),
                 "cpu_percent": m.cpu_percent,
@@ -245,40 +241,16 @@ class ResourceMonitorService:
                 "network_sent_bytes": m.network_sent_bytes,
                 "network_recv_bytes": m.network_recv_bytes
             }
-            for m in self.job_metrics[job_id]
-        ]
-        
-        self._append_to_log(log_file, log_entries)
+            for m in metrics
+        ))
 
-    def _write_events_log(self, job_id: str):
-        """Write events log to file"""
-        if job_id not in self.job_events:
-            return
-        
-        log_file = self.logs_dir / f"events_{job_id}.json"
-        log_entries = [
+    def _write_events_log(self, job_id: str, events: List[ResourceEvent]):
+        """Append new events to the job's log"""
+        self.log_sink.append_many(f"events_{job_id}", (
             {
                 "type": event.event_type.value,
                 "timestamp": event.timestamp.isoformat(),
                 "details": event.details
             }
-            for event in self.job_events[job_id]
-        ]
-        
-        self._append_to_log(log_file, log_entries)
-
-    def _append_to_log(self, log_file: Path, entries: List[Dict]):
-        """Append log entries to a JSON log file"""
-        try:
-            if log_file.exists():
-                with open(log_file, 'r') as f:
-                    logs = json.load(f)
-            else:
-                logs = []
-            
-            logs.extend(entries)
-            
-            with open(log_file, 'w') as f:
-                json.dump(logs, f, indent=2)
-        except Exception as e:
-            logger.error(f"Failed to write to log file {log_file}: {str(e)}") 
\ No newline at end of file
+            for event in events
+        ))
\ No newline at end of file
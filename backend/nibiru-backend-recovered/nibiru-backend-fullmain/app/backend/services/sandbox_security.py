@@ -3,9 +3,9 @@ import logging
 from datetime import datetime, timedelta
 from dataclasses import dataclass
 from enum import Enum
-import json
 import os
 from pathlib import Path
+from ..utils.log_sink import get_log_sink
 
 logger = logging.getLogger(__name__)
 
@@ -80,9 +80,8 @@ class SandboxSecurityService:
         self.execution_logs: Dict[str, List[Dict]] = {}
         self.signature_mismatches: Dict[str, List[Dict]] = {}
         
-        # Create logs directory if it doesn't exist
         self.logs_dir = Path("logs/sandbox")
-        self.logs_dir.mkdir(parents=True, exist_ok=True)
+        self.log_sink = get_log_sink(self.logs_dir)
 
     def get_resource_limits(self, user_id: str, quantum_score: float) -> ResourceLimits:
         """Get resource limits based on user's quantum score"""
@@ -160,7 +159,6 @@ class SandboxSecurityService:
 
     def _log_cooldown_trigger(self, user_id: str, ip_address: str):
         """Log when a user is put in cooldown"""
-        log_file = self.logs_dir / "cooldowns.json"
         log_entry = {
             "timestamp": datetime.now().isoformat(),
             "user_id": user_id,
@@ -168,33 +166,15 @@ class SandboxSecurityService:
             "reason": "max_failed_attempts_reached"
         }
         
-        self._append_to_log(log_file, log_entry)
+        self.log_sink.append("cooldowns", log_entry)
 
     def _write_execution_log(self, user_id: str, log_entry: Dict):
         """Write execution log to file"""
-        log_file = self.logs_dir / f"executions_{user_id}.json"
-        self._append_to_log(log_file, log_entry)
+        self.log_sink.append(f"executions_{user_id}", log_entry)
 
     def _write_signature_log(self, user_id: str, log_entry: Dict):
         """Write signature mismatch log to file"""
-        log_file = self.logs_dir / f"signatures_{user_id}.json"
-        self._append_to_log(log_file, log_entry)
-
-    def _append_to_log(self, log_file: Path, entry: Dict):
-        """Append a log entry to a JSON log file"""
-        try:
-            if log_file.exists():
-                with open(log_file, 'r') as f:
-                    logs = json.load(f)
-            else:
-                logs = []
-            
-            logs.append(entry)
-            
-            with open(log_file, 'w') as f:
-                json.dump(logs, f, indent=2)
-        except Exception as e:
-            logger.error(f"Failed to write to log file {log_file}: {str(e)}")
+        self.log_sink.append(f"signatures_{user_id}", log_entry)
 
     def get_user_execution_stats(self, user_id: str) -> Dict:
         """Get execution statistics for a user"""
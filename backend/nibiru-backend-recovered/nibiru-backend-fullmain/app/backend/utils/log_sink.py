@@ -0,0 +1,335 @@
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from collections import OrderedDict
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+import atexit
+import json
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Segments are <stream>.<seq>.jsonl; seq 0 holds history migrated from the
+# old <stream>.json arrays, so it always reads back first
+SEGMENT_PATTERN = re.compile(r"^(?P<stream>.+)\.(?P<seq>\d{6})\.jsonl$")
+MIGRATED_SEQ = 0
+
+class FsyncPolicy(str, Enum):
+    NEVER = "never"  # Leave write-back to the OS
+    INTERVAL = "interval"  # fsync after each background flush
+    ALWAYS = "always"  # Write and fsync before append() returns
+
+class _Segment:
+    """The open, active segment of one stream."""
+
+    def __init__(self, path: Path, seq: int, opened_at: float):
+        self.path = path
+        self.seq = seq
+        self.fd = os.open(path, os.O_RDWR | os.O_APPEND | os.O_CREAT, 0o644)
+        self.size = os.fstat(self.fd).st_size
+        self.opened_at = opened_at
+
+    def torn(self) -> bool:
+        """Whether the segment ends mid-line (a crash during a write)."""
+        return self.size > 0 and os.pread(self.fd, 1, self.size - 1) != b"\n"
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+class LogSink:
+    """
+    Append-only JSON Lines logs, one stream of rotating segments per name.
+
+    append() only encodes the entry and buffers it; a background thread
+    writes each stream's buffer with a single O_APPEND write every
+    `flush_interval` seconds, or sooner once `max_buffer_bytes` pile up.
+    Whole lines go out in one write, so several processes can share a
+    stream without interleaving. A segment is closed once it reaches
+    `max_segment_bytes` or has been open for `max_segment_age` seconds.
+    At most `max_open_segments` files stay open; the least recently
+    written are closed and reopened when needed, so per-user streams
+    cannot exhaust file descriptors.
+
+    Streams are read back in order with read(); a torn last line from a
+    crash mid-write is skipped, and writing resumes in a new segment.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        fsync: FsyncPolicy = FsyncPolicy.INTERVAL,
+        flush_interval: float = 1.0,
+        max_buffer_bytes: int = 1024 * 1024,
+        max_segment_bytes: int = 64 * 1024 * 1024,
+        max_segment_age: Optional[float] = 24 * 3600,
+        max_open_segments: int = 64
+    ):
+        # Absolute, so the background writer is unaffected by later chdir()
+        self.directory = Path(directory).resolve()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.fsync = fsync
+        self.flush_interval = flush_interval
+        self.max_buffer_bytes = max_buffer_bytes
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.max_open_segments = max_open_segments
+
+        self._lock = threading.Lock()
+        self._buffers: Dict[str, List[bytes]] = {}
+        self._buffered_bytes = 0
+        self._segments: "OrderedDict[str, _Segment]" = OrderedDict()
+        # When this process started each stream's current segment, kept across closes
+        self._started: Dict[str, Tuple[int, float]] = {}
+        self._latest: Optional[Dict[str, int]] = None  # Newest segment per stream
+        # Descriptors of segments closed since the last sync, still to be fsynced
+        self._retired: List[Tuple[str, int]] = []
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._flusher = threading.Thread(target=self._run, name=f"log-sink:{self.directory}", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def append(self, stream: str, entry: Dict) -> None:
+        """Queue one entry for a stream."""
+        self.append_many(stream, [entry])
+
+    def append_many(self, stream: str, entries: Iterable[Dict]) -> None:
+        """Queue several entries for a stream, in order."""
+        lines = [json.dumps(entry, separators=(",", ":"), default=str).encode() + b"\n" for entry in entries]
+        if not lines:
+            return
+        with self._lock:
+            if self._closed:
+                raise RuntimeError(f"Log sink {self.directory} is closed")
+            self._buffers.setdefault(stream, []).extend(lines)
+            self._buffered_bytes += sum(map(len, lines))
+            urgent = self.fsync == FsyncPolicy.ALWAYS or self._buffered_bytes >= self.max_buffer_bytes
+        if self.fsync == FsyncPolicy.ALWAYS:
+            self.flush(stream)
+        elif urgent:
+            self._wakeup.set()
+
+    def flush(self, stream: Optional[str] = None) -> None:
+        """Write buffered entries (for one stream, or all) now."""
+        with self._lock:
+            streams = [stream] if stream is not None else list(self._buffers)
+            pending = [(s, self._buffers.pop(s)) for s in streams if s in self._buffers]
+            self._buffered_bytes -= sum(len(line) for _, lines in pending for line in lines)
+            for name, lines in pending:
+                try:
+                    self._write(name, b"".join(lines))
+                except OSError as e:
+                    logger.error(f"Failed to write to log stream {name}: {str(e)}")
+            to_sync = self._claim_for_sync([name for name, _ in pending]) if self.fsync == FsyncPolicy.ALWAYS else []
+        self._sync(to_sync)
+
+    def read(
+        self,
+        stream: str,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        time_field: str = "timestamp"
+    ) -> Iterator[Dict]:
+        """
+        Stream a log's entries in write order, optionally limited to a time
+        window on `time_field` (ISO timestamps). Segments last modified
+        before `since` are skipped without being opened.
+        """
+        self.flush(stream)
+        since_ts = since.timestamp() if since else None
+        for _, path in self.segments(stream):
+            if since_ts is not None and path.stat().st_mtime < since_ts:
+                continue
+            with open(path, "rb") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        logger.warning(f"Skipping unreadable line in {path}")
+                        continue
+                    if since or until:
+                        value = entry.get(time_field)
+                        if value is None:
+                            continue
+                        at = datetime.fromisoformat(value)
+                        if (since and at < since) or (until and at >= until):
+                            continue
+                    yield entry
+
+    def segments(self, stream: str) -> List[Tuple[int, Path]]:
+        """A stream's segment files in order, as (sequence number, path)."""
+        found = []
+        for path in self.directory.glob(f"{glob_escape(stream)}.*.jsonl"):
+            match = SEGMENT_PATTERN.match(path.name)
+            if match and match.group("stream") == stream:
+                found.append((int(match.group("seq")), path))
+        return sorted(found)
+
+    def streams(self, prefix: str = "") -> List[str]:
+        """Names of the streams in this directory starting with `prefix`."""
+        self.flush()
+        names = set()
+        for path in self.directory.glob(f"{glob_escape(prefix)}*.jsonl"):
+            match = SEGMENT_PATTERN.match(path.name)
+            if match:
+                names.add(match.group("stream"))
+        return sorted(names)
+
+    def migrate_json(self, json_path: Path, keep: bool = True) -> int:
+        """
+        Convert a legacy `<stream>.json` array into the stream's first
+        segment; returns how many entries were moved. The original is
+        renamed to `.json.migrated` (or deleted with keep=False).
+        """
+        json_path = Path(json_path)
+        stream = json_path.stem
+        target = self.directory / segment_name(stream, MIGRATED_SEQ)
+        with open(json_path) as f:
+            entries = json.load(f)
+        if not isinstance(entries, list):
+            raise ValueError(f"{json_path} does not hold a JSON array")
+
+        tmp = target.with_name(target.name + ".tmp")
+        with open(tmp, "wb") as f:
+            for entry in entries:
+                f.write(json.dumps(entry, separators=(",", ":"), default=str).encode() + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, target)
+
+        if keep:
+            json_path.rename(json_path.with_name(json_path.name + ".migrated"))
+        else:
+            json_path.unlink()
+        return len(entries)
+
+    def close(self) -> None:
+        """Flush everything and stop the background writer."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wakeup.set()
+        self._flusher.join()
+        self.flush()
+        with self._lock:
+            to_sync = self._claim_for_sync(list(self._segments)) if self.fsync != FsyncPolicy.NEVER else []
+            for segment in self._segments.values():
+                segment.close()
+            self._segments.clear()
+        self._sync(to_sync)
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+            if self.fsync == FsyncPolicy.INTERVAL:
+                self._sync_all()
+
+    def _sync_all(self) -> None:
+        with self._lock:
+            to_sync = self._claim_for_sync(list(self._segments))
+        self._sync(to_sync)
+
+    def _claim_for_sync(self, streams: List[str]) -> List[Tuple[str, int]]:
+        """
+        Duplicate the descriptors of the streams' open segments and take over
+        the retired ones, so they can be fsynced after _lock is released
+        without racing a rotation or eviction that closes them. Holds _lock.
+        """
+        claimed, self._retired = self._retired, []
+        for name in streams:
+            segment = self._segments.get(name)
+            if segment is not None:
+                claimed.append((name, os.dup(segment.fd)))
+        return claimed
+
+    def _sync(self, fds: List[Tuple[str, int]]) -> None:
+        """fsync and close descriptors from _claim_for_sync; called without _lock."""
+        for name, fd in fds:
+            try:
+                os.fsync(fd)
+            except OSError as e:
+                logger.error(f"Failed to sync log stream {name}: {str(e)}")
+            finally:
+                os.close(fd)
+
+    def _retire(self, name: str, segment: _Segment) -> None:
+        """Stop writing to a segment; its data is fsynced at the next sync. Holds _lock."""
+        if self.fsync == FsyncPolicy.NEVER:
+            segment.close()
+        else:
+            self._retired.append((name, segment.fd))
+
+    def _write(self, stream: str, data: bytes) -> None:
+        """
+        Append to the stream's active segment, rotating first if it is full or
+        old. Holds _lock; fsync is left to the caller, outside the lock.
+        """
+        segment = self._segments.get(stream)
+        if segment is None:
+            while len(self._segments) >= self.max_open_segments:
+                evicted_name, evicted = self._segments.popitem(last=False)
+                self._retire(evicted_name, evicted)
+            segment = self._segments[stream] = self._open_latest(stream)
+        else:
+            self._segments.move_to_end(stream)
+            # Another process may have grown or rotated the segment
+            segment.size = os.fstat(segment.fd).st_size
+        if segment.size and (
+            segment.torn() or
+            segment.size + len(data) > self.max_segment_bytes or
+            (self.max_segment_age is not None and
+             time.monotonic() - segment.opened_at >= self.max_segment_age)
+        ):
+            self._retire(stream, segment)
+            segment = self._segments[stream] = self._open_segment(stream, self._latest_seq(stream, segment.seq) + 1)
+
+        os.write(segment.fd, data)
+        segment.size += len(data)
+
+    def _open_latest(self, stream: str) -> _Segment:
+        if self._latest is None:
+            # List the directory once rather than globbing for every new stream
+            self._latest = {}
+            for entry in os.scandir(self.directory):
+                match = SEGMENT_PATTERN.match(entry.name)
+                if match:
+                    name, seq = match.group("stream"), int(match.group("seq"))
+                    self._latest[name] = max(seq, self._latest.get(name, seq))
+        return self._open_segment(stream, max(MIGRATED_SEQ + 1, self._latest.get(stream, 0)))
+
+    def _latest_seq(self, stream: str, floor: int) -> int:
+        """Highest segment number on disk, and at least `floor` (new writes never go to seq 0)."""
+        existing = [seq for seq, _ in self.segments(stream)]
+        return max([floor] + existing)
+
+    def _open_segment(self, stream: str, seq: int) -> _Segment:
+        if self._latest is not None:
+            self._latest[stream] = seq
+        started = self._started.get(stream)
+        if started is None or started[0] != seq:
+            started = self._started[stream] = (seq, time.monotonic())
+        return _Segment(self.directory / segment_name(stream, seq), seq, started[1])
+
+def segment_name(stream: str, seq: int) -> str:
+    return f"{stream}.{seq:06d}.jsonl"
+
+def glob_escape(text: str) -> str:
+    return re.sub(r"([*?\[])", r"[\1]", text)
+
+_sinks: Dict[str, LogSink] = {}
+_sinks_lock = threading.Lock()
+
+def get_log_sink(directory: Path, **options) -> LogSink:
+    """The process-wide sink for a log directory; options apply when it is first created."""
+    key = str(Path(directory).resolve())
+    with _sinks_lock:
+        if key not in _sinks:
+            _sinks[key] = LogSink(Path(directory), **options)
+        return _sinks[key]
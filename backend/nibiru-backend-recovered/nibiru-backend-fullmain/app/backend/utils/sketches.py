@@ -0,0 +1,142 @@
+from typing import Dict, Optional, Sequence
+import math
+import numpy as np
+
+# Values at or below this go to the zero bucket (zero durations, unset scores)
+MIN_VALUE = 1e-9
+DEFAULT_QUANTILES = (0.5, 0.95, 0.99)
+
+class DDSketch:
+    """
+    Streaming quantile sketch with relative error guarantees (DDSketch).
+
+    Values are counted in logarithmic buckets, so any quantile is returned
+    within `relative_accuracy` of the true value, and memory depends only
+    on the range of values, not how many were added. Two sketches with
+    the same accuracy merge exactly by adding bucket counts, which is what
+    lets per-hour and per-process sketches be combined at query time.
+
+    Counts may be negative: adding a value with count=-1 takes it back,
+    for jobs recorded again. Buckets are read clipped at zero.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01):
+        if not 0 < relative_accuracy < 1:
+            raise ValueError("relative_accuracy must be between 0 and 1")
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.offset = 0  # Bucket key of counts[0]
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, value: float, count: int = 1) -> None:
+        """Count `value` `count` times (negative to take it back)."""
+        if value > MIN_VALUE:
+            key = math.ceil(math.log(value) / self._log_gamma)
+            self._extend(key, key)
+            self.counts[key - self.offset] += count
+        else:
+            self.zero_count += count
+        self.count += count
+        self.sum += value * count
+
+    def add_many(self, values: np.ndarray, counts: Optional[np.ndarray] = None) -> None:
+        """Count an array of values at once."""
+        values = np.asarray(values, dtype=np.float64)
+        counts = np.ones(len(values), dtype=np.int64) if counts is None else np.asarray(counts, dtype=np.int64)
+        if not len(values):
+            return
+        positive = values > MIN_VALUE
+        self.zero_count += int(counts[~positive].sum())
+        if positive.any():
+            keys = np.ceil(np.log(values[positive]) / self._log_gamma).astype(np.int64)
+            lo, hi = int(keys.min()), int(keys.max())
+            self._extend(lo, hi)
+            binned = np.bincount(keys - lo, weights=counts[positive], minlength=hi - lo + 1)
+            self.counts[lo - self.offset:hi - self.offset + 1] += binned.astype(np.int64)
+        self.count += int(counts.sum())
+        self.sum += float(np.dot(values, counts))
+
+    def merge(self, other: "DDSketch") -> None:
+        """Add another sketch's counts into this one."""
+        if other.relative_accuracy != self.relative_accuracy:
+            raise ValueError("Cannot merge sketches with different relative accuracy")
+        if len(other.counts):
+            self._extend(other.offset, other.offset + len(other.counts) - 1)
+            start = other.offset - self.offset
+            self.counts[start:start + len(other.counts)] += other.counts
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+
+    def quantiles(self, qs: Sequence[float]) -> Optional[np.ndarray]:
+        """Approximate values at quantiles `qs` (0..1), or None when empty."""
+        buckets = np.maximum(self.counts, 0)
+        zero = max(self.zero_count, 0)
+        total = zero + int(buckets.sum())
+        if total <= 0:
+            return None
+        ranks = np.asarray(qs, dtype=np.float64) * (total - 1)
+        index = np.searchsorted(np.cumsum(buckets), ranks - zero, side="right")
+        # Report the middle of a bucket, which is within relative_accuracy of anything in it
+        values = 2 * self.gamma ** (self.offset + index.astype(np.float64)) / (self.gamma + 1)
+        return np.where(ranks < zero, 0.0, values)
+
+    def quantile(self, q: float) -> Optional[float]:
+        values = self.quantiles([q])
+        return None if values is None else float(values[0])
+
+    def summary(self, qs: Sequence[float] = DEFAULT_QUANTILES) -> Dict[str, float]:
+        """Count, average and the requested percentiles, keyed p50, p95, ..."""
+        values = self.quantiles(qs)
+        summary = {
+            "count": self.count,
+            "average": self.sum / self.count if self.count > 0 else 0
+        }
+        for q, value in zip(qs, values if values is not None else [0.0] * len(qs)):
+            summary[f"p{q * 100:g}"] = float(value)
+        return summary
+
+    def copy(self) -> "DDSketch":
+        sketch = DDSketch(self.relative_accuracy)
+        sketch.merge(self)
+        return sketch
+
+    def to_dict(self) -> Dict:
+        nonzero = np.flatnonzero(self.counts)
+        counts = self.counts[nonzero[0]:nonzero[-1] + 1] if len(nonzero) else self.counts[:0]
+        return {
+            "relative_accuracy": self.relative_accuracy,
+            "offset": self.offset + (int(nonzero[0]) if len(nonzero) else 0),
+            "counts": counts.tolist(),
+            "zero_count": self.zero_count,
+            "count": self.count,
+            "sum": self.sum
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "DDSketch":
+        sketch = cls(data["relative_accuracy"])
+        sketch.offset = data["offset"]
+        sketch.counts = np.array(data["counts"], dtype=np.int64)
+        sketch.zero_count = data["zero_count"]
+        sketch.count = data["count"]
+        sketch.sum = data["sum"]
+        return sketch
+
+    def _extend(self, lo: int, hi: int) -> None:
+        """Grow the bucket array to cover keys lo..hi."""
+        if not len(self.counts):
+            self.offset = lo
+            self.counts = np.zeros(hi - lo + 1, dtype=np.int64)
+            return
+        end = self.offset + len(self.counts) - 1
+        if lo >= self.offset and hi <= end:
+            return
+        start = min(lo, self.offset)
+        counts = np.zeros(max(hi, end) - start + 1, dtype=np.int64)
+        counts[self.offset - start:self.offset - start + len(self.counts)] = self.counts
+        self.offset, self.counts = start, counts
@@ -0,0 +1,43 @@
+"""
+Seed the analytics trend and heatmap rollups from the job metrics store.
+
+Each worker saves only the jobs it recorded itself, so rollups start empty
+in a new directory; this counts every job already in the store and saves
+it as one more worker's file under data/analytics/job_rollups. Run it
+once, before the rollups hold anything: jobs the services have already
+counted would be counted twice, so a non-empty directory is refused
+unless --force is given.
+
+Usage (from the nibiru-backend-fullmain directory):
+    python -m scripts.backfill_job_rollups
+"""
+import argparse
+from pathlib import Path
+
+from app.backend.services.analytics_service import METRICS_RETENTION
+from app.backend.services.job_metrics_store import get_job_metrics_store
+from app.backend.services.job_rollups import JobRollups
+
+STORE_DIR = Path("data/analytics/job_metrics")
+ROLLUP_DIR = Path("data/analytics/job_rollups")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--force", action="store_true", help="Backfill even if rollups already exist")
+    args = parser.parse_args()
+
+    if ROLLUP_DIR.is_dir() and any(ROLLUP_DIR.iterdir()) and not args.force:
+        parser.error(f"{ROLLUP_DIR} already holds rollups; pass --force to add the store's jobs anyway")
+
+    store = get_job_metrics_store(STORE_DIR, retention=METRICS_RETENTION)
+    rollups = JobRollups(ROLLUP_DIR, store, retention=METRICS_RETENTION)
+    try:
+        rollups.rebuild()
+    finally:
+        rollups.close()
+    print(f"Counted {len(store)} jobs into {ROLLUP_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+"""
+Seed the analytics percentile sketches from the job metrics store.
+
+The sketches only see jobs recorded after they were introduced; this
+sketches every job already in the store, by backend and hour, and saves
+them as one more worker's files under data/analytics/sketches. Run it
+once, before the sketches hold anything: jobs the services have already
+sketched would be counted twice, so a non-empty directory is refused
+unless --force is given.
+
+Usage (from the nibiru-backend-fullmain directory):
+    python -m scripts.backfill_metric_sketches
+"""
+import argparse
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+from app.backend.services.analytics_service import METRICS_RETENTION
+from app.backend.services.job_metrics_store import NOT_SET, get_job_metrics_store
+from app.backend.services.metric_sketches import MetricSketches
+
+STORE_DIR = Path("data/analytics/job_metrics")
+SKETCH_DIR = Path("data/analytics/sketches")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--force", action="store_true", help="Backfill even if sketches already exist")
+    args = parser.parse_args()
+
+    if SKETCH_DIR.is_dir() and any(SKETCH_DIR.iterdir()) and not args.force:
+        parser.error(f"{SKETCH_DIR} already holds sketches; pass --force to add the store's jobs anyway")
+
+    store = get_job_metrics_store(STORE_DIR, retention=METRICS_RETENTION)
+    jobs = store.select(datetime.min, columns=["backend", "duration", "completed_at", "quantum_score"])
+    sketches = MetricSketches(SKETCH_DIR, retention=METRICS_RETENTION)
+    try:
+        created = jobs.columns["created_at"]
+        duration = jobs.columns["duration"]
+        completed = jobs.columns["completed_at"]
+        score = jobs.columns["quantum_score"]
+        has_duration = ~np.isnan(duration)
+        has_wait = has_duration & (completed != NOT_SET)
+        wait = np.maximum((completed - created) / 1e6 - duration, 0.0)
+
+        backends = jobs.vocabularies["backend"].values
+        for code in np.unique(jobs.columns["backend"]).tolist():
+            rows = jobs.columns["backend"] == code
+            for metric, mask, values in (
+                ("duration", has_duration, duration),
+                ("wait_time", has_wait, wait),
+                ("quantum_score", score > 0, score)
+            ):
+                selected = rows & mask
+                sketches.add_many(metric, backends[code], created[selected], values[selected])
+            print(f"Sketched {int(rows.sum())} jobs on {backends[code]}")
+    finally:
+        sketches.close()
+
+
+if __name__ == "__main__":
+    main()
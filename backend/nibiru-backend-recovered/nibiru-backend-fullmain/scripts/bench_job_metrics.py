@@ -0,0 +1,191 @@
+"""
+Benchmark the analytics trend, retry heatmap and aggregate queries.
+
+Loads synthetic jobs spread over --days into the columnar job metrics
+store and its rollups, then times the three dashboard queries over a
+30-day window (trends by backend and the heatmap read the rollups, trends
+by user and the aggregate read the store) and a full rollup rebuild. The
+old dict-of-dataclasses loops are timed on the same number of jobs for
+comparison, unless --legacy-jobs says otherwise (0 skips them; holding
+10M dataclasses needs several GB).
+Runs in a scratch directory, so nothing is written under logs/ or data/.
+
+Usage (from the nibiru-backend-fullmain directory):
+    python -m scripts.bench_job_metrics --jobs 1000000
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from app.backend.services.analytics_service import AnalyticsService
+from app.backend.services.job_metrics_store import JobMetrics
+
+BACKENDS = ["ibmq_qasm", "ibmq_lima", "ionq_harmony", "rigetti_aspen", "local_sim"]
+STATUSES = ["completed"] * 8 + ["failed", "cancelled"]
+REASONS = ["timeout", "queue_full", "calibration", "network"]
+
+
+def generate(count: int, days: int, seed: int = 7):
+    """Yield synthetic jobs in roughly (not strictly) created_at order."""
+    rng = np.random.default_rng(seed)
+    now = datetime.now()
+    span = days * 86400
+    chunk = 100_000
+    for start in range(0, count, chunk):
+        n = min(chunk, count - start)
+        offsets = np.sort(rng.uniform(span * start / count, span * (start + n) / count, n))
+        offsets += rng.normal(0, 600, n)  # Arrival jitter
+        backends = rng.integers(0, len(BACKENDS), n)
+        scripts = rng.integers(0, 2000, n)
+        users = rng.integers(0, 50000, n)
+        statuses = rng.integers(0, len(STATUSES), n)
+        retries = rng.choice([0, 0, 0, 0, 1, 2, 3], n)
+        durations = rng.exponential(30, n)
+        scores = rng.uniform(0, 1, n)
+        for i in range(n):
+            created_at = now - timedelta(seconds=span - float(offsets[i]))
+            retry_count = int(retries[i])
+            yield JobMetrics(
+                job_id=f"job-{start + i}",
+                script_id=f"script-{scripts[i]}",
+                backend=BACKENDS[backends[i]],
+                user_id=f"user-{users[i]}",
+                status=STATUSES[statuses[i]],
+                created_at=created_at,
+                completed_at=created_at + timedelta(seconds=float(durations[i])),
+                duration=float(durations[i]),
+                retry_count=retry_count,
+                retry_reasons=[REASONS[(start + i + k) % len(REASONS)] for k in range(retry_count)],
+                resource_usage={},
+                quantum_score=float(scores[i])
+            )
+
+
+def legacy_trends(jobs, time_range, group_by):
+    cutoff = datetime.now() - time_range
+    grouped = defaultdict(list)
+    for job in jobs.values():
+        if job.created_at >= cutoff:
+            grouped[getattr(job, {"backend": "backend", "script": "script_id", "user": "user_id"}[group_by])].append(job)
+    trends = {}
+    for group, group_jobs in grouped.items():
+        group_jobs.sort(key=lambda x: x.created_at)
+        daily = defaultdict(lambda: {"success": 0, "total": 0})
+        for job in group_jobs:
+            date = job.created_at.date()
+            daily[date]["total"] += 1
+            if job.status == "completed":
+                daily[date]["success"] += 1
+        dates = sorted(daily)
+        trends[group] = {
+            "dates": [d.isoformat() for d in dates],
+            "success_rates": [daily[d]["success"] / daily[d]["total"] * 100 for d in dates],
+            "total_jobs": len(group_jobs),
+            "success_count": sum(1 for j in group_jobs if j.status == "completed"),
+            "failure_count": sum(1 for j in group_jobs if j.status == "failed")
+        }
+    return trends
+
+
+def legacy_heatmap(jobs, time_range):
+    cutoff = datetime.now() - time_range
+    grouped = defaultdict(list)
+    for job in jobs.values():
+        if job.created_at >= cutoff and job.retry_count > 0:
+            grouped[job.backend].append(job)
+    heatmap = {}
+    for group, group_jobs in grouped.items():
+        matrix = np.zeros((24, 7))
+        reasons = defaultdict(int)
+        for job in group_jobs:
+            matrix[job.created_at.hour, job.created_at.weekday()] += job.retry_count
+            for reason in job.retry_reasons:
+                reasons[reason] += 1
+        heatmap[group] = {
+            "matrix": (matrix / matrix.max()).tolist(),
+            "total_retries": sum(j.retry_count for j in group_jobs),
+            "retry_reasons": dict(reasons)
+        }
+    return heatmap
+
+
+def legacy_aggregate(jobs, time_range):
+    cutoff = datetime.now() - time_range
+    relevant = [job for job in jobs.values() if job.created_at >= cutoff]
+    backend_usage = defaultdict(int)
+    for job in relevant:
+        backend_usage[job.backend] += 1
+    scores = [job.quantum_score for job in relevant if job.quantum_score > 0]
+    return {
+        "total_jobs": len(relevant),
+        "success_count": sum(1 for j in relevant if j.status == "completed"),
+        "backend_usage": dict(backend_usage),
+        "average": sum(scores) / len(scores) if scores else 0,
+        "excellent": sum(1 for s in scores if s >= 0.9)
+    }
+
+
+def timed(fn, repeat: int) -> float:
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--jobs", type=int, default=1_000_000)
+    parser.add_argument("--legacy-jobs", type=int, default=None)
+    parser.add_argument("--days", type=int, default=90)
+    parser.add_argument("--window-days", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    window = timedelta(days=args.window_days)
+
+    os.chdir(tempfile.mkdtemp(prefix="bench-job-metrics-"))
+    service = AnalyticsService()
+    store, rollups = service.metrics_store, service.rollups
+
+    started = time.perf_counter()
+    for metrics in generate(args.jobs, args.days):
+        # record_job_metrics minus the per-job JSONL log line
+        rollups.record(metrics, store.append(metrics))
+    elapsed = time.perf_counter() - started
+    print(f"Loaded {len(store):,} jobs in {elapsed:.1f}s ({args.jobs / elapsed:,.0f} jobs/s)")
+
+    queries = {
+        "trends (backend)": lambda: service.get_success_failure_trends(window, "backend"),
+        "trends (user)": lambda: service.get_success_failure_trends(window, "user"),
+        "retry heatmap": lambda: service.get_retry_heatmap(window, "backend"),
+        "aggregate": lambda: service.get_aggregate_metrics(window)
+    }
+    print(f"Columnar store, {args.jobs:,} jobs, {args.window_days}-day window (median of {args.repeat}):")
+    for name, query in queries.items():
+        print(f"  {name:<18} {timed(query, args.repeat) * 1000:10.1f} ms")
+    print(f"  {'rollup rebuild':<18} {timed(rollups.rebuild, 1) * 1000:10.1f} ms")
+
+    if args.legacy_jobs is None:
+        args.legacy_jobs = args.jobs
+    if args.legacy_jobs:
+        legacy = {job.job_id: job for job in generate(args.legacy_jobs, args.days)}
+        legacy_queries = {
+            "trends (backend)": lambda: legacy_trends(legacy, window, "backend"),
+            "trends (user)": lambda: legacy_trends(legacy, window, "user"),
+            "retry heatmap": lambda: legacy_heatmap(legacy, window),
+            "aggregate": lambda: legacy_aggregate(legacy, window)
+        }
+        print(f"Legacy loops, {args.legacy_jobs:,} jobs:")
+        for name, query in legacy_queries.items():
+            print(f"  {name:<18} {timed(query, min(args.repeat, 3)) * 1000:10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Convert the old JSON-array service logs into append-only JSONL streams.
+
+Every <stream>.json array under the given log directories becomes the
+stream's first segment (<stream>.000000.jsonl), so its history reads back
+ahead of anything the services have appended since. Originals are renamed
+to .json.migrated unless --delete is given. Safe to rerun, and to run
+while the services are up: they no longer write the .json files.
+
+Usage (from the nibiru-backend-fullmain directory):
+    python -m scripts.migrate_json_logs logs/analytics logs/costs
+"""
+import argparse
+from pathlib import Path
+
+from app.backend.utils.log_sink import LogSink
+
+LOG_DIRS = [
+    "logs/analytics",
+    "logs/costs",
+    "logs/quantum_backends",
+    "logs/resources",
+    "logs/sandbox",
+    "logs/scheduler"
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("directories", nargs="*", default=LOG_DIRS)
+    parser.add_argument("--delete", action="store_true", help="Remove the .json files instead of keeping them")
+    args = parser.parse_args()
+
+    for directory in map(Path, args.directories):
+        if not directory.is_dir():
+            continue
+        sink = LogSink(directory)
+        try:
+            for json_path in sorted(directory.glob("*.json")):
+                try:
+                    count = sink.migrate_json(json_path, keep=not args.delete)
+                except ValueError as e:
+                    print(f"Skipped {json_path}: {str(e)}")
+                    continue
+                print(f"Migrated {count} entries from {json_path}")
+        finally:
+            sink.close()
+
+
+if __name__ == "__main__":
+    main()
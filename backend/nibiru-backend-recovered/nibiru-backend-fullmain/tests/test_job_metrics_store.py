@@ -0,0 +1,166 @@
+import time
+import pytest
+from datetime import datetime, timedelta
+from app.backend.services.job_metrics_store import JobMetrics, JobMetricsStore
+
+START = datetime(2026, 1, 5)
+BACKENDS = ("qiskit", "cirq", "braket")
+STATUSES = ("completed", "failed")
+REASONS = ("timeout", "queue_full", "calibration")
+
+def make_job(i: int, status: str = None, retry_count: int = None) -> JobMetrics:
+    retries = i % 3 if retry_count is None else retry_count
+    return JobMetrics(
+        job_id=f"job_{i}",
+        script_id=f"script_{i % 4}",
+        backend=BACKENDS[i % len(BACKENDS)],
+        user_id=f"user_{i % 5}",
+        status=status or STATUSES[i % 7 == 0],
+        created_at=START + timedelta(minutes=37 * i),
+        completed_at=START + timedelta(minutes=37 * i + 5),
+        duration=float(i % 11) + 0.5,
+        retry_count=retries,
+        retry_reasons=[REASONS[(i + n) % len(REASONS)] for n in range(retries)],
+        resource_usage={},
+        quantum_score=(i % 10) / 10
+    )
+
+def rows_by_job(store: JobMetricsStore) -> dict:
+    """Each live job as (status, duration, retry reasons), keyed by job_key."""
+    jobs = store.select(datetime.min)
+    statuses = jobs.vocabularies["status"].values
+    reasons = jobs.vocabularies["retry_reason"].values
+    rows = {}
+    for row, key in enumerate(jobs.columns["job_key"].tolist()):
+        row_reasons = sorted(reasons[c] for c in jobs.reason_codes[jobs.reason_rows == row].tolist())
+        rows[key] = (statuses[jobs.columns["status"][row]], float(jobs.columns["duration"][row]), row_reasons)
+    return rows
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobMetricsStore(tmp_path / "metrics", segment_rows=16, flush_interval=3600)
+    yield store
+    store.close()
+
+class TestJobMetricsStore:
+    def test_select_window(self, store):
+        """Test a window query returns exactly the jobs created inside it, across segments."""
+        for i in range(100):
+            store.append(make_job(i))
+
+        since, until = START + timedelta(hours=10), START + timedelta(hours=40)
+        jobs = store.select(since, until)
+        expected = [i for i in range(100) if since <= make_job(i).created_at < until]
+        assert len(jobs) == len(expected)
+        assert len(jobs.reason_rows) == sum(i % 3 for i in expected)
+
+    def test_supersede_in_tail(self, store):
+        """Test recording a job again while it is in the tail replaces its row."""
+        store.append(make_job(1, status="failed", retry_count=2))
+        replaced = store.append(make_job(1, status="completed", retry_count=0))
+
+        assert len(store) == 1
+        assert replaced.vocabularies["status"].values[replaced.columns["status"][0]] == "failed"
+        assert len(replaced.reason_codes) == 2
+        assert [row[0] for row in rows_by_job(store).values()] == ["completed"]
+
+    def test_supersede_in_sealed_segment(self, store):
+        """Test recording a job again after its segment sealed hides the old row."""
+        for i in range(40):
+            store.append(make_job(i))
+        replaced = store.append(make_job(3, status="failed", retry_count=1))
+
+        assert replaced is not None and len(replaced) == 1
+        assert len(store) == 40
+        jobs = store.select(START, START + timedelta(minutes=37 * 3 + 1))
+        assert len(jobs) == 4
+        assert jobs.vocabularies["status"].values[jobs.columns["status"][-1]] == "failed"
+
+    def test_reload_round_trip(self, store, tmp_path):
+        """Test a new store reads back every job, superseded rows and retry reasons included."""
+        for i in range(40):
+            store.append(make_job(i))
+        store.append(make_job(5, status="failed", retry_count=2))
+        store.append(make_job(38, status="failed", retry_count=1))
+        before = rows_by_job(store)
+        store.close()
+
+        reloaded = JobMetricsStore(tmp_path / "metrics", segment_rows=16, flush_interval=3600)
+        try:
+            assert len(reloaded) == 40
+            assert rows_by_job(reloaded) == before
+        finally:
+            reloaded.close()
+
+    def test_background_flush(self, tmp_path):
+        """Test the tail reaches disk without a seal or close."""
+        store = JobMetricsStore(tmp_path / "metrics", segment_rows=1024, flush_interval=0.05)
+        try:
+            for i in range(10):
+                store.append(make_job(i))
+            for _ in range(100):
+                if list((tmp_path / "metrics").glob("segment_*.npz")):
+                    break
+                time.sleep(0.05)
+
+            reader = JobMetricsStore(tmp_path / "metrics", flush_interval=3600)
+            try:
+                assert len(reader) == 10
+            finally:
+                reader.close()
+        finally:
+            store.close()
+
+    def test_workers_share_directory(self, tmp_path):
+        """Test two processes' stores in one directory never overwrite each other's segments."""
+        first = JobMetricsStore(tmp_path / "metrics", segment_rows=16, flush_interval=3600)
+        second = JobMetricsStore(tmp_path / "metrics", segment_rows=16, flush_interval=3600)
+        assert first.worker != second.worker
+        for i in range(30):
+            (first if i % 2 else second).append(make_job(i))
+        first.close()
+        second.close()
+
+        reader = JobMetricsStore(tmp_path / "metrics", flush_interval=3600)
+        try:
+            assert len(reader) == 30
+        finally:
+            reader.close()
+
+    def test_sees_peer_jobs(self, tmp_path):
+        """Test a store picks up jobs another worker flushed after it started."""
+        first = JobMetricsStore(tmp_path / "metrics", segment_rows=16, flush_interval=3600)
+        second = JobMetricsStore(tmp_path / "metrics", segment_rows=16, flush_interval=3600)
+        try:
+            for i in range(20):
+                second.append(make_job(i))
+            assert len(first) == 16
+            second.flush()
+            assert len(first) == 20
+        finally:
+            first.close()
+            second.close()
+
+    def test_supersede_across_workers(self, tmp_path):
+        """Test recording a job again on another worker replaces the peer's record."""
+        first = JobMetricsStore(tmp_path / "metrics", segment_rows=16, flush_interval=3600)
+        second = JobMetricsStore(tmp_path / "metrics", segment_rows=16, flush_interval=3600)
+        try:
+            first.append(make_job(1, status="failed", retry_count=2))
+            first.flush()
+            second.select(START)
+            replaced = second.append(make_job(1, status="completed", retry_count=0))
+            second.flush()
+
+            assert replaced is not None and len(replaced.reason_codes) == 2
+            for store in (first, second):
+                assert list(rows_by_job(store).values()) == [("completed", 1.5, [])]
+        finally:
+            first.close()
+            second.close()
+
+        reader = JobMetricsStore(tmp_path / "metrics", flush_interval=3600)
+        try:
+            assert [row[0] for row in rows_by_job(reader).values()] == ["completed"]
+        finally:
+            reader.close()
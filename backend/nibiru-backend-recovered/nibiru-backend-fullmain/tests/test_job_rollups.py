@@ -0,0 +1,123 @@
+import time
+import pytest
+from datetime import datetime, timedelta
+from app.backend.services.job_metrics_store import JobMetrics, JobMetricsStore
+from app.backend.services.job_rollups import ALL, CUBES, DIMENSIONS, JobRollups
+
+START = datetime(2026, 1, 5)
+BACKENDS = ("qiskit", "cirq", "braket")
+REASONS = ("timeout", "queue_full", "calibration")
+
+def make_job(i: int, status: str = None, retry_count: int = None) -> JobMetrics:
+    retries = i % 3 if retry_count is None else retry_count
+    return JobMetrics(
+        job_id=f"job_{i}",
+        script_id=f"script_{i % 4}",
+        backend=BACKENDS[i % len(BACKENDS)],
+        user_id=f"user_{i % 5}",
+        status=status or ("failed" if i % 7 == 0 else "completed"),
+        created_at=START + timedelta(minutes=37 * i),
+        completed_at=START + timedelta(minutes=37 * i + 5),
+        duration=float(i % 11) + 0.5,
+        retry_count=retries,
+        retry_reasons=[REASONS[(i + n) % len(REASONS)] for n in range(retries)],
+        resource_usage={},
+        quantum_score=(i % 10) / 10
+    )
+
+@pytest.fixture
+def store(tmp_path):
+    store = JobMetricsStore(tmp_path / "metrics", segment_rows=16, flush_interval=3600)
+    yield store
+    store.close()
+
+def assert_same_cells(rollups: JobRollups, reference: JobRollups) -> None:
+    for cube in CUBES:
+        for dimension in DIMENSIONS:
+            assert rollups.cells(cube, dimension, START) == reference.cells(cube, dimension, START)
+
+@pytest.fixture
+def rebuilt(tmp_path, store):
+    rebuilt = JobRollups(tmp_path / "rebuilt", store, flush_interval=3600)
+    yield rebuilt
+    rebuilt.close()
+
+class TestJobRollups:
+    def test_record_matches_rebuild(self, tmp_path, store, rebuilt):
+        """Test rollups kept up job by job equal a rebuild from the store."""
+        live = JobRollups(tmp_path / "rollups", store, flush_interval=3600)
+        try:
+            for i in range(200):
+                metrics = make_job(i)
+                live.record(metrics, store.append(metrics))
+            for i in range(0, 200, 9):
+                metrics = make_job(i, status="completed", retry_count=(i + 1) % 4)
+                live.record(metrics, store.append(metrics))
+
+            rebuilt.rebuild()
+            assert_same_cells(live, rebuilt)
+        finally:
+            live.close()
+
+    def test_partial_first_day(self, tmp_path, store):
+        """Test a window starting mid-day only counts that day's jobs after the start."""
+        rollups = JobRollups(tmp_path / "rollups", store, flush_interval=3600)
+        try:
+            for i in range(100):
+                metrics = make_job(i)
+                rollups.record(metrics, store.append(metrics))
+
+            since = START + timedelta(hours=13)
+            cells = rollups.cells("status", ALL, since)
+            expected = sum(1 for i in range(100) if make_job(i).created_at >= since)
+            assert sum(sum(day.values()) for day in cells.values()) == expected
+        finally:
+            rollups.close()
+
+    def test_workers_merge(self, tmp_path, store, rebuilt):
+        """Test a query covers every worker's saved jobs, including a job one worker recorded again."""
+        first = JobRollups(tmp_path / "rollups", store, flush_interval=3600)
+        second = JobRollups(tmp_path / "rollups", store, flush_interval=3600)
+        try:
+            assert first.worker != second.worker
+            for i in range(60):
+                metrics = make_job(i)
+                (first if i % 2 else second).record(metrics, store.append(metrics))
+            metrics = make_job(4, status="failed", retry_count=2)
+            first.record(metrics, store.append(metrics))
+            second.flush()
+
+            rebuilt.rebuild()
+            assert_same_cells(first, rebuilt)
+            assert {path.stem for path in (tmp_path / "rollups").glob("*/*.json")} == {second.worker}
+        finally:
+            first.close()
+            second.close()
+
+    def test_restart_reads_saved_files(self, tmp_path, store, rebuilt):
+        """Test a new process sees what earlier processes saved, without a rebuild."""
+        rollups = JobRollups(tmp_path / "rollups", store, flush_interval=3600)
+        for i in range(50):
+            metrics = make_job(i)
+            rollups.record(metrics, store.append(metrics))
+        rollups.close()
+
+        restarted = JobRollups(tmp_path / "rollups", store, flush_interval=3600)
+        try:
+            rebuilt.rebuild()
+            assert_same_cells(restarted, rebuilt)
+        finally:
+            restarted.close()
+
+    def test_background_flush(self, tmp_path, store):
+        """Test the cubes reach disk without a flush() or close()."""
+        rollups = JobRollups(tmp_path / "rollups", store, flush_interval=0.05)
+        try:
+            rollups.record(make_job(1))
+            for _ in range(100):
+                if list((tmp_path / "rollups").glob("*/*.json")):
+                    break
+                time.sleep(0.05)
+            assert [path.stem for path in (tmp_path / "rollups").glob("*/*.json")] == [rollups.worker]
+        finally:
+            rollups.close()
@@ -0,0 +1,197 @@
+import asyncio
+import os
+import time
+import pytest
+from types import SimpleNamespace
+from app.backend.services import job_scheduler
+from app.backend.services.job_scheduler import BatchStatus, JobSchedulerService
+
+class FakeSandboxSecurity:
+    def __init__(self, max_concurrent_jobs: int):
+        self.max_concurrent_jobs = max_concurrent_jobs
+
+    def get_resource_limits(self, user_id, quantum_score):
+        return SimpleNamespace(max_concurrent_jobs=self.max_concurrent_jobs)
+
+class FakeQuantumBackends:
+    def __init__(self):
+        self.usage = []
+
+    def log_backend_usage(self, user_id, backend, job_id, duration, wait_time):
+        self.usage.append((user_id, backend, job_id))
+
+class JobRunner:
+    """Stands in for _execute_job: tracks how many jobs run at once and fails on request."""
+
+    def __init__(self, duration: float = 0.01, failures: dict = None):
+        self.duration = duration
+        self.failures = dict(failures or {})
+        self.running = 0
+        self.peak = 0
+        self.calls = 0
+
+    async def __call__(self, job):
+        self.calls += 1
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(self.duration)
+            if self.failures.get(job["job_id"], 0) > 0:
+                self.failures[job["job_id"]] -= 1
+                raise RuntimeError("backend error")
+        finally:
+            self.running -= 1
+
+@pytest.fixture(scope="module", autouse=True)
+def log_dir(tmp_path_factory):
+    # The scheduler logs under ./logs, through a sink shared by every test
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("scheduler"))
+    yield
+    os.chdir(cwd)
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    monkeypatch.setattr(job_scheduler, "RETRY_BASE_DELAY", 0.001)
+
+def make_scheduler(max_concurrent_jobs: int, runner: JobRunner) -> JobSchedulerService:
+    scheduler = JobSchedulerService(FakeQuantumBackends(), FakeSandboxSecurity(max_concurrent_jobs))
+    scheduler._execute_job = runner
+    return scheduler
+
+def jobs(count: int, backend: str = None):
+    return [{"backend": backend} if backend else {} for _ in range(count)]
+
+async def create_batches(scheduler: JobSchedulerService, count: int, **options):
+    batches = []
+    for _ in range(count):
+        batches.append(await scheduler.create_batch(**options))
+        # Batch ids are timestamped
+        await asyncio.sleep(0.001)
+    return batches
+
+class TestJobScheduler:
+    def test_user_concurrency_limit(self):
+        """Test a batch runs as many jobs at once as the user's tier allows, and no more."""
+        runner = JobRunner()
+        scheduler = make_scheduler(3, runner)
+
+        async def run():
+            batch = await scheduler.create_batch("user_1", "script_1", jobs(12, backend="qiskit"))
+            await scheduler.scheduled_tasks[batch.batch_id]
+            return batch
+
+        batch = asyncio.run(run())
+        assert batch.status == BatchStatus.COMPLETED
+        assert runner.peak == 3
+        assert all(job["status"] == "completed" for job in batch.jobs)
+        assert len(scheduler.quantum_backends.usage) == 12
+
+    def test_limit_shared_across_batches(self):
+        """Test a user's batches share one concurrency limit."""
+        runner = JobRunner()
+        scheduler = make_scheduler(2, runner)
+
+        async def run():
+            batches = await create_batches(scheduler, 3, user_id="user_1", script_id="script_1", jobs=jobs(4))
+            await asyncio.gather(*(scheduler.scheduled_tasks[batch.batch_id] for batch in batches))
+            return batches
+
+        batches = asyncio.run(run())
+        assert all(batch.status == BatchStatus.COMPLETED for batch in batches)
+        assert runner.peak == 2
+        assert runner.calls == 12
+
+    def test_batch_concurrency_limit(self, monkeypatch):
+        """Test one batch never runs more than MAX_BATCH_CONCURRENCY jobs at once."""
+        monkeypatch.setattr(job_scheduler, "MAX_BATCH_CONCURRENCY", 2)
+        runner = JobRunner()
+        scheduler = make_scheduler(10, runner)
+
+        async def run():
+            batch = await scheduler.create_batch("user_1", "script_1", jobs(8))
+            await scheduler.scheduled_tasks[batch.batch_id]
+
+        asyncio.run(run())
+        assert runner.peak == 2
+
+    def test_retries(self):
+        """Test failed jobs are retried up to max_retries and then left failed."""
+        runner = JobRunner(failures={"flaky": 2, "broken": 10})
+        scheduler = make_scheduler(4, runner)
+
+        async def run():
+            batch = await scheduler.create_batch(
+                "user_1", "script_1",
+                [{"job_id": "flaky"}, {"job_id": "broken"}, {"job_id": "fine"}],
+                max_retries=2
+            )
+            await scheduler.scheduled_tasks[batch.batch_id]
+            return batch
+
+        batch = asyncio.run(run())
+        by_id = {job["job_id"]: job for job in batch.jobs}
+        assert by_id["flaky"]["status"] == "completed"
+        assert by_id["flaky"]["attempts"] == 3
+        assert "error" not in by_id["flaky"]
+        assert by_id["broken"]["status"] == "failed"
+        assert by_id["broken"]["attempts"] == 3
+        assert by_id["fine"]["attempts"] == 1
+        assert runner.calls == 7
+
+    def test_cancel_releases_slots(self):
+        """Test cancelling a running batch stops its jobs and frees the user's slots."""
+        runner = JobRunner(duration=30)
+        scheduler = make_scheduler(2, runner)
+
+        async def run():
+            batch = await scheduler.create_batch("user_1", "script_1", jobs(5))
+            task = scheduler.scheduled_tasks[batch.batch_id]
+            while runner.running < 2:
+                await asyncio.sleep(0.001)
+            assert await scheduler.cancel_batch(batch.batch_id)
+            await task
+            return batch, await scheduler.get_batch_status(batch.batch_id)
+
+        batch, status = asyncio.run(run())
+        assert batch.status == BatchStatus.CANCELLED
+        assert status["status"] == "cancelled"
+        assert runner.running == 0
+        assert scheduler.user_slots["user_1"].active == 0
+        assert not asyncio.run(scheduler.cancel_batch(batch.batch_id))
+
+    def test_throttled_batch_does_not_hold_slots(self):
+        """Test a batch waiting on its start rate leaves the user's slots to other batches."""
+        runner = JobRunner(duration=0.001)
+        scheduler = make_scheduler(1, runner)
+
+        async def run():
+            throttled = await scheduler.create_batch("user_1", "script_1", jobs(3), jobs_per_second=0.5)
+            while runner.calls < 1:
+                await asyncio.sleep(0.001)
+            await asyncio.sleep(0.01)
+            other = (await create_batches(scheduler, 1, user_id="user_1", script_id="script_2", jobs=jobs(1)))[0]
+            started = time.monotonic()
+            await scheduler.scheduled_tasks[other.batch_id]
+            waited = time.monotonic() - started
+            await scheduler.cancel_batch(throttled.batch_id)
+            return other, waited
+
+        other, waited = asyncio.run(run())
+        assert other.status == BatchStatus.COMPLETED
+        assert waited < 0.5
+
+    def test_stream_batch_status(self):
+        """Test streaming yields a snapshot, job updates and the final batch status."""
+        runner = JobRunner()
+        scheduler = make_scheduler(2, runner)
+
+        async def run():
+            batch = await scheduler.create_batch("user_1", "script_1", jobs(2))
+            return [update async for update in scheduler.stream_batch_status(batch.batch_id)]
+
+        updates = asyncio.run(run())
+        assert updates[0]["batch_id"] == updates[-1]["batch_id"]
+        assert updates[-1] == {**updates[-1], "type": "batch", "status": "completed"}
+        assert sum(1 for u in updates[1:] if u["type"] == "job" and u["status"] == "completed") == 2
+        assert not scheduler._subscribers
@@ -0,0 +1,95 @@
+import json
+import pytest
+from datetime import datetime, timedelta
+from app.backend.utils.log_sink import FsyncPolicy, LogSink, segment_name
+
+@pytest.fixture
+def sink(tmp_path):
+    sink = LogSink(tmp_path, max_segment_bytes=256)
+    yield sink
+    sink.close()
+
+class TestLogSink:
+    def test_read_back_in_order(self, sink):
+        """Test entries read back in write order across flushes."""
+        for i in range(10):
+            sink.append("jobs", {"i": i})
+            if i % 3 == 0:
+                sink.flush()
+
+        assert [entry["i"] for entry in sink.read("jobs")] == list(range(10))
+
+    def test_segment_rotation(self, sink):
+        """Test a full segment rotates into the next one without losing entries."""
+        for i in range(50):
+            sink.append("jobs", {"i": i, "padding": "x" * 20})
+            sink.flush()
+
+        segments = sink.segments("jobs")
+        assert len(segments) > 1
+        assert [seq for seq, _ in segments] == list(range(1, len(segments) + 1))
+        for _, path in segments[:-1]:
+            assert path.stat().st_size <= 256
+        assert [entry["i"] for entry in sink.read("jobs")] == list(range(50))
+
+    def test_torn_line_recovery(self, tmp_path):
+        """Test a line torn by a crash is skipped and writing resumes in a new segment."""
+        torn = tmp_path / segment_name("jobs", 1)
+        torn.write_bytes(b'{"i":0}\n{"i":1}\n{"i":')
+
+        sink = LogSink(tmp_path)
+        try:
+            sink.append("jobs", {"i": 2})
+            sink.flush()
+
+            assert [seq for seq, _ in sink.segments("jobs")] == [1, 2]
+            assert torn.read_bytes().endswith(b'{"i":')
+            assert [entry["i"] for entry in sink.read("jobs")] == [0, 1, 2]
+        finally:
+            sink.close()
+
+    def test_migrated_history_reads_first(self, tmp_path):
+        """Test a migrated JSON array becomes segment 0 ahead of new entries."""
+        legacy = tmp_path / "jobs.json"
+        legacy.write_text(json.dumps([{"i": 0}, {"i": 1}]))
+
+        sink = LogSink(tmp_path)
+        try:
+            sink.append("jobs", {"i": 2})
+            assert sink.migrate_json(legacy) == 2
+            assert not legacy.exists()
+            assert [entry["i"] for entry in sink.read("jobs")] == [0, 1, 2]
+        finally:
+            sink.close()
+
+    def test_read_time_window(self, sink):
+        """Test reading only the entries inside a timestamp window."""
+        start = datetime(2026, 1, 1)
+        for hours in range(5):
+            sink.append("jobs", {"timestamp": (start + timedelta(hours=hours)).isoformat(), "hour": hours})
+
+        entries = sink.read("jobs", since=start + timedelta(hours=1), until=start + timedelta(hours=3))
+        assert [entry["hour"] for entry in entries] == [1, 2]
+
+    @pytest.mark.parametrize("policy", list(FsyncPolicy))
+    def test_close_flushes_every_policy(self, tmp_path, policy):
+        """Test close() writes buffered entries whatever the fsync policy."""
+        sink = LogSink(tmp_path, fsync=policy, max_segment_bytes=64, max_open_segments=2)
+        for i in range(30):
+            sink.append(f"stream_{i % 3}", {"i": i})
+            sink.flush()
+        sink.close()
+
+        reader = LogSink(tmp_path)
+        try:
+            for stream in range(3):
+                assert [entry["i"] for entry in reader.read(f"stream_{stream}")] == list(range(stream, 30, 3))
+        finally:
+            reader.close()
+
+    def test_append_after_close(self, sink):
+        """Test appending to a closed sink fails."""
+        sink.close()
+
+        with pytest.raises(RuntimeError):
+            sink.append("jobs", {"i": 0})
@@ -0,0 +1,115 @@
+import numpy as np
+import pytest
+from datetime import datetime, timedelta
+from app.backend.services.job_metrics_store import to_micros
+from app.backend.services.metric_sketches import MetricSketches
+from app.backend.utils.sketches import DDSketch
+
+QUANTILES = [0.01, 0.25, 0.5, 0.75, 0.95, 0.99]
+
+@pytest.fixture
+def values():
+    return np.random.default_rng(7).lognormal(mean=1.0, sigma=1.5, size=20000)
+
+def exact_quantiles(values: np.ndarray) -> np.ndarray:
+    """The value at rank q * (n - 1), the rank DDSketch.quantiles() reports."""
+    ordered = np.sort(values)
+    return ordered[(np.asarray(QUANTILES) * (len(values) - 1)).astype(int)]
+
+class TestDDSketch:
+    @pytest.mark.parametrize("accuracy", [0.01, 0.05])
+    def test_relative_accuracy(self, values, accuracy):
+        """Test every quantile is within the sketch's relative accuracy of the exact value."""
+        sketch = DDSketch(accuracy)
+        sketch.add_many(values)
+
+        estimates = sketch.quantiles(QUANTILES)
+        exact = exact_quantiles(values)
+        assert np.all(np.abs(estimates - exact) <= accuracy * exact * (1 + 1e-9))
+        assert sketch.count == len(values)
+        assert sketch.sum == pytest.approx(values.sum())
+
+    def test_add_matches_add_many(self, values):
+        """Test adding values one at a time gives the same buckets as adding them at once."""
+        one_by_one, at_once = DDSketch(), DDSketch()
+        for value in values[:2000]:
+            one_by_one.add(float(value))
+        at_once.add_many(values[:2000])
+
+        assert one_by_one.to_dict()["counts"] == at_once.to_dict()["counts"]
+        assert one_by_one.sum == pytest.approx(at_once.sum)
+
+    def test_merge_equals_single_sketch(self, values):
+        """Test merging sketches of parts equals one sketch of the whole."""
+        whole = DDSketch()
+        whole.add_many(values)
+        merged = DDSketch()
+        for part in np.array_split(values, 7):
+            sketch = DDSketch()
+            sketch.add_many(part)
+            merged.merge(sketch)
+
+        assert merged.to_dict()["counts"] == whole.to_dict()["counts"]
+        assert merged.count == whole.count
+        assert np.array_equal(merged.quantiles(QUANTILES), whole.quantiles(QUANTILES))
+
+    def test_merge_different_accuracy(self):
+        """Test sketches with different accuracy refuse to merge."""
+        with pytest.raises(ValueError):
+            DDSketch(0.01).merge(DDSketch(0.02))
+
+    def test_take_back(self, values):
+        """Test a negative count removes a value added earlier."""
+        sketch = DDSketch()
+        sketch.add_many(values[:1000])
+        sketch.add(1e6)
+        sketch.add(1e6, count=-1)
+
+        reference = DDSketch()
+        reference.add_many(values[:1000])
+        assert np.array_equal(sketch.quantiles(QUANTILES), reference.quantiles(QUANTILES))
+        assert sketch.count == 1000
+
+    def test_zero_values(self):
+        """Test zeros land in the zero bucket and are reported as 0."""
+        sketch = DDSketch()
+        sketch.add_many(np.array([0.0, 0.0, 0.0, 5.0]))
+
+        assert sketch.quantile(0.5) == 0.0
+        assert sketch.quantile(1.0) == pytest.approx(5.0, rel=0.01)
+
+    def test_dict_round_trip(self, values):
+        """Test a sketch survives to_dict() and from_dict() unchanged."""
+        sketch = DDSketch()
+        sketch.add_many(values)
+        restored = DDSketch.from_dict(sketch.to_dict())
+
+        assert np.array_equal(restored.quantiles(QUANTILES), sketch.quantiles(QUANTILES))
+        assert restored.summary() == sketch.summary()
+
+    def test_empty(self):
+        """Test an empty sketch has no quantiles and a zero summary."""
+        sketch = DDSketch()
+
+        assert sketch.quantiles([0.5]) is None
+        assert sketch.summary() == {"count": 0, "average": 0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+
+class TestMetricSketches:
+    def test_workers_merge(self, tmp_path, values):
+        """Test a query covers the values every worker saved, each in its own file."""
+        at = datetime(2026, 1, 5, 10, 30)
+        first = MetricSketches(tmp_path, flush_interval=3600)
+        second = MetricSketches(tmp_path, flush_interval=3600)
+        try:
+            assert first.worker != second.worker
+            times = np.full(1000, to_micros(at), dtype=np.int64)
+            first.add_many("duration", "qiskit", times, values[:1000])
+            second.add_many("duration", "qiskit", times, values[1000:2000])
+            second.flush()
+
+            merged = first.query("duration", at - timedelta(hours=1), at + timedelta(hours=1))
+            assert merged["qiskit"].count == 2000
+            assert len(list((tmp_path / "2026-01-05").glob("*.json"))) == 1
+        finally:
+            first.close()
+            second.close()
@@ -0,0 +1,39 @@
+"""
+Abort multipart uploads that were interrupted and never resumed.
+
+A failed streaming upload keeps its parts so the client can resume it with
+the returned token. Parts of uploads nobody resumes are billed until the
+upload is aborted; this aborts every upload older than the resume window
+(UPLOAD_RESUME_TTL, after which the token is rejected anyway). Safe to run
+repeatedly, e.g. from cron daily. On S3 a bucket lifecycle rule with
+AbortIncompleteMultipartUpload does the same server-side.
+
+Usage (from the backend directory):
+    python -m scripts.abort_stale_uploads
+    python -m scripts.abort_stale_uploads --max-age-hours 48 --dry-run
+"""
+import argparse
+import asyncio
+
+from app.utils.object_store import UPLOAD_RESUME_TTL, abort_stale_uploads
+from app.utils.storage import object_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--max-age-hours", type=float, default=UPLOAD_RESUME_TTL / 3600)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be aborted")
+    args = parser.parse_args()
+
+    aborted = asyncio.run(abort_stale_uploads(
+        object_store,
+        max_age=args.max_age_hours * 3600,
+        dry_run=args.dry_run
+    ))
+
+    verb = "Would abort" if args.dry_run else "Aborted"
+    print(f"{verb} {aborted} stale multipart uploads")
+
+
+if __name__ == "__main__":
+    main()
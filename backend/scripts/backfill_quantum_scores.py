@@ -0,0 +1,80 @@
+"""
+Backfill the decayed score accumulator from existing event counters.
+
+Listings recorded before the incremental scoring engine only have a
+`listing:{id}:counts` hash and a `last_interaction` timestamp. Seeding
+`score_acc` with the weighted total and `score_ref` with the last
+interaction reproduces the old "90% per month since last interaction"
+score exactly, and new events then decay it forward from there.
+
+Listings that receive an event before the backfill reaches them are seeded
+the same way by the event script itself, and the backfill skips any listing
+that already has an accumulator, so it is safe to run after the new event
+path is live and to rerun.
+
+Usage (from the backend directory):
+    python -m scripts.backfill_quantum_scores --redis-url redis://localhost:6379
+"""
+import argparse
+import json
+from datetime import datetime
+
+import redis
+
+from app.services.quantum_score import BACKFILL_SCORE_SCRIPT, QuantumScoreService
+
+
+def backfill(client: redis.Redis, weights: dict, batch_size: int = 500, dry_run: bool = False) -> int:
+    """Seed score accumulators for every listing with counters. Returns the number of listings updated."""
+    now = datetime.utcnow().timestamp()
+    seed_score = client.register_script(BACKFILL_SCORE_SCRIPT)
+    weights_json = json.dumps(weights)
+    updated = 0
+    batch = []
+
+    def flush(batch):
+        if dry_run:
+            read = client.pipeline(transaction=False)
+            for listing_id in batch:
+                read.hexists(f"listing:{listing_id}:meta", "score_acc")
+            return sum(not seeded for seeded in read.execute())
+
+        # Seeding runs server-side, one script call per listing in a single
+        # round trip, so it can't race a concurrent first event
+        write = client.pipeline(transaction=False)
+        for listing_id in batch:
+            seed_score(
+                keys=[f"listing:{listing_id}:counts", f"listing:{listing_id}:meta"],
+                args=[weights_json, now],
+                client=write
+            )
+        return sum(int(seeded) for seeded in write.execute())
+
+    for key in client.scan_iter(match="listing:*:counts", count=batch_size):
+        batch.append(key.split(":")[1])
+        if len(batch) >= batch_size:
+            updated += flush(batch)
+            batch = []
+    if batch:
+        updated += flush(batch)
+
+    return updated
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+
+    client = redis.Redis.from_url(args.redis_url, decode_responses=True)
+    weights = QuantumScoreService(args.redis_url).EVENT_WEIGHTS
+    updated = backfill(client, weights, batch_size=args.batch_size, dry_run=args.dry_run)
+
+    action = "Would backfill" if args.dry_run else "Backfilled"
+    print(f"{action} {updated} listing score accumulators")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Benchmark listing page queries against a 1M-listing fixture.
+
+Builds a `bench_listings` table shaped like `listings` (with the indexes
+from migration 002), fills it with generate_series, and times a category
+page three ways:
+
+    full      the old behaviour: every matching row, every column
+    offset    LIMIT/OFFSET at the same depth, every column
+    keyset    the row-value cursor used by the listing routes, projected
+
+Usage (from the backend directory, against PostgreSQL):
+    python -m scripts.bench_listing_queries --rows 1000000 --depth 50000
+"""
+import argparse
+import statistics
+import time
+
+from sqlalchemy import create_engine, text
+
+from app.core.config import settings
+
+SETUP = [
+    "DROP TABLE IF EXISTS bench_listings",
+    """
+    CREATE TABLE bench_listings (
+        id TEXT PRIMARY KEY,
+        title TEXT NOT NULL,
+        description TEXT NOT NULL,
+        category TEXT NOT NULL,
+        status TEXT NOT NULL,
+        tier INTEGER NOT NULL,
+        price DOUBLE PRECISION NOT NULL,
+        creator_id TEXT NOT NULL,
+        quantum_score DOUBLE PRECISION NOT NULL,
+        created_at TIMESTAMP NOT NULL
+    )
+    """,
+    """
+    INSERT INTO bench_listings
+    SELECT
+        'lst_' || lpad(g::text, 8, '0'),
+        'Listing ' || g,
+        repeat('Quantum listing description. ', 20),
+        (ARRAY['script', 'model', 'dataset', 'template', 'plugin', 'other'])[1 + g % 6],
+        CASE WHEN g % 10 = 0 THEN 'archived' ELSE 'published' END,
+        1 + g % 3,
+        (g % 500) + 0.99,
+        'usr_' || (g % 20000),
+        random() * 1000,
+        now() - (g || ' seconds')::interval
+    FROM generate_series(1, :rows) AS g
+    """,
+    "CREATE INDEX ON bench_listings (status, category, quantum_score, id)",
+    "ANALYZE bench_listings",
+]
+
+FULL = """
+    SELECT * FROM bench_listings
+    WHERE category = 'model' AND status = 'published'
+"""
+OFFSET = FULL + " ORDER BY quantum_score DESC, id DESC LIMIT :limit OFFSET :depth"
+KEYSET = """
+    SELECT id, title, price, quantum_score FROM bench_listings
+    WHERE category = 'model' AND status = 'published'
+      AND (quantum_score, id) < (:score, :id)
+    ORDER BY quantum_score DESC, id DESC
+    LIMIT :limit
+"""
+
+
+def timed(conn, sql: str, params: dict, repeat: int) -> float:
+    """Median wall time in ms to fetch every row of a query."""
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        conn.execute(text(sql), params).fetchall()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default=settings.SQLALCHEMY_DATABASE_URI)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--depth", type=int, default=50_000, help="Rows skipped before the page")
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--keep", action="store_true", help="Keep the fixture table afterwards")
+    args = parser.parse_args()
+
+    engine = create_engine(args.database_url)
+    with engine.begin() as conn:
+        for statement in SETUP:
+            conn.execute(text(statement), {"rows": args.rows})
+
+    with engine.connect() as conn:
+        # The row a client would hold a cursor for after `depth` rows
+        score, row_id = conn.execute(
+            text(
+                "SELECT quantum_score, id FROM bench_listings"
+                " WHERE category = 'model' AND status = 'published'"
+                " ORDER BY quantum_score DESC, id DESC LIMIT 1 OFFSET :depth"
+            ),
+            {"depth": args.depth}
+        ).one()
+
+        params = {"limit": args.limit, "depth": args.depth, "score": score, "id": row_id}
+        results = {
+            "full": timed(conn, FULL, params, args.repeat),
+            "offset": timed(conn, OFFSET, params, args.repeat),
+            "keyset": timed(conn, KEYSET, params, args.repeat),
+        }
+
+    if not args.keep:
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE bench_listings"))
+
+    print(f"{args.rows} listings, page of {args.limit} at depth {args.depth}:")
+    for name, ms in results.items():
+        print(f"  {name:7} {ms:10.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark listing text search latency on the embedded index.
+
+Fills an InvertedIndex with synthetic listings and times a mix of exact,
+prefix (as-you-type) and one-typo queries, with and without a category
+filter, reporting p50/p99 against the 50 ms budget.
+
+Usage (from the backend directory):
+    python -m scripts.bench_listing_search --rows 200000 --queries 2000
+"""
+import argparse
+import random
+import statistics
+import string
+import time
+
+from app.models.listing import ListingCategory
+from app.services.listing_search import InvertedIndex
+
+CATEGORIES = [c.value for c in ListingCategory]
+
+
+def make_vocabulary(size: int, rng: random.Random) -> list:
+    return [
+        "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 10)))
+        for _ in range(size)
+    ]
+
+
+def make_query(vocabulary: list, rng: random.Random) -> str:
+    words = rng.sample(vocabulary, rng.randint(1, 3))
+    kind = rng.random()
+    if kind < 0.4:
+        # Still typing the last word
+        words[-1] = words[-1][:rng.randint(2, len(words[-1]))]
+    elif kind < 0.6:
+        # One dropped character
+        w = words[-1]
+        i = rng.randrange(len(w))
+        words[-1] = w[:i] + w[i + 1:]
+    return " ".join(words)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--vocabulary", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    vocabulary = make_vocabulary(args.vocabulary, rng)
+
+    index = InvertedIndex()
+    start = time.perf_counter()
+    for i in range(args.rows):
+        index.upsert(
+            f"lst_{i}",
+            " ".join(rng.sample(vocabulary, 4)),
+            " ".join(rng.sample(vocabulary, 30)),
+            rng.choice(CATEGORIES),
+            rng.randint(1, 3),
+            rng.random() * 1000
+        )
+    build_s = time.perf_counter() - start
+
+    samples = []
+    for _ in range(args.queries):
+        q = make_query(vocabulary, rng)
+        filters = {"category": rng.choice([None, *CATEGORIES]), "tier": None}
+        start = time.perf_counter()
+        index.search(q, filters, None, None, args.limit, 0)
+        samples.append((time.perf_counter() - start) * 1000)
+
+    samples.sort()
+    p99 = samples[int(len(samples) * 0.99) - 1]
+    print(f"{args.rows} listings indexed in {build_s:.1f} s")
+    print(f"{args.queries} queries:")
+    print(f"  p50 {statistics.median(samples):8.2f} ms")
+    print(f"  p99 {p99:8.2f} ms ({'within' if p99 < 50 else 'over'} 50 ms budget)")
+
+
+if __name__ == "__main__":
+    main()
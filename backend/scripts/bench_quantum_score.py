@@ -0,0 +1,85 @@
+"""
+Benchmark interaction recording throughput, before and after incremental scoring.
+
+"legacy" replays the old write path (pipeline, then HGETALL + HGET + HSET to
+recompute the score); "incremental" calls QuantumScoreService.record_event.
+Runs against a real Redis and cleans up its own `listing:bench-*` keys.
+
+Usage (from the backend directory):
+    python -m scripts.bench_quantum_score --events 20000 --listings 200
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from datetime import datetime
+
+import redis
+
+from app.services.quantum_score import QuantumScoreService
+
+
+def legacy_record_event(client: redis.Redis, weights: dict, listing_id: str, event_type: str) -> None:
+    """The pre-incremental record_event + calculate_score sequence."""
+    timestamp = datetime.utcnow().timestamp()
+    pipe = client.pipeline()
+    pipe.zadd(f"listing:{listing_id}:events", {
+        json.dumps({'type': event_type, 'timestamp': timestamp, 'user_id': None}): timestamp
+    })
+    pipe.hincrby(f"listing:{listing_id}:counts", event_type, 1)
+    pipe.hset(f"listing:{listing_id}:meta", "last_interaction", timestamp)
+    pipe.execute()
+
+    counts = client.hgetall(f"listing:{listing_id}:counts")
+    base_score = sum(int(c) * weights.get(t, 1) for t, c in counts.items())
+    last_interaction = float(client.hget(f"listing:{listing_id}:meta", "last_interaction") or 0)
+    if last_interaction:
+        months_since = (datetime.utcnow().timestamp() - last_interaction) / (30 * 24 * 3600)
+        base_score *= 0.9 ** months_since
+    client.hset(f"listing:{listing_id}:meta", "quantum_score", base_score)
+
+
+def cleanup(client: redis.Redis) -> None:
+    keys = list(client.scan_iter(match="listing:bench-*"))
+    if keys:
+        client.delete(*keys)
+
+
+async def run(args) -> None:
+    service = QuantumScoreService(args.redis_url)
+    client = redis.Redis.from_url(args.redis_url, decode_responses=True)
+    event_types = list(service.EVENT_WEIGHTS)
+    rng = random.Random(42)
+    workload = [
+        (f"bench-{rng.randrange(args.listings)}", rng.choice(event_types))
+        for _ in range(args.events)
+    ]
+
+    cleanup(client)
+    start = time.perf_counter()
+    for listing_id, event_type in workload:
+        legacy_record_event(client, service.EVENT_WEIGHTS, listing_id, event_type)
+    legacy = args.events / (time.perf_counter() - start)
+
+    cleanup(client)
+    start = time.perf_counter()
+    for listing_id, event_type in workload:
+        await service.record_event(listing_id, event_type)
+    incremental = args.events / (time.perf_counter() - start)
+    cleanup(client)
+
+    print(f"legacy:      {legacy:10.0f} events/sec")
+    print(f"incremental: {incremental:10.0f} events/sec ({incremental / legacy:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--events", type=int, default=20000)
+    parser.add_argument("--listings", type=int, default=200)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Benchmark listing suggestions on 5 KB descriptions.
+
+Times SuggestionEngine.suggest (one tokenizing pass over a compiled
+keyword index) against the previous implementation (a technical-term
+regex plus a substring scan per tag keyword) on the same synthetic
+descriptions, and reports per-call percentiles in microseconds.
+
+With --batch N, instead times one N-item batch through suggest_batch (a
+single thread) against the same items split into chunks over a process
+pool, both freshly started and already warm.
+
+Usage (from the backend directory):
+    python -m scripts.bench_suggestions --size 5120 --iterations 2000
+    python -m scripts.bench_suggestions --batch 1000 --workers 4
+"""
+import argparse
+import asyncio
+import os
+import random
+import re
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from app.models.suggestion import BatchSuggestionItem
+from app.services.suggestions import TAG_KEYWORDS, SuggestionEngine
+
+_pool_engine = None
+
+FILLER = (
+    "framework pipeline service library runtime interface workflow dashboard "
+    "latency throughput integration deployment container schema storage "
+    "quantum neural compiler algorithm optimization encryption privacy model "
+    "plugin extension processing analysis solver qubit superposition data"
+).split()
+
+
+def build_description(size: int, rng: random.Random) -> str:
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(FILLER)
+        words.append(word.capitalize() if rng.random() < 0.1 else word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+
+def legacy_suggest(text: str) -> tuple:
+    """The previous endpoint's per-request work."""
+    words = text.split()
+    avg_word_length = sum(len(word) for word in words) / len(words) if words else 0
+    technical_terms = len(re.findall(r'\b(quantum|algorithm|neural|optimization|compiler)\b', text.lower()))
+    complexity = min(max(((avg_word_length * 0.3) + (technical_terms * 0.7)) / 10, 0), 1)
+
+    found_tags = set()
+    text_lower = text.lower()
+    for category, keywords in TAG_KEYWORDS.items():
+        if any(keyword in text_lower for keyword in keywords):
+            found_tags.add(category)
+    return complexity, found_tags
+
+
+def timed(fn, texts, iterations: int) -> list:
+    samples = []
+    for i in range(iterations):
+        text = texts[i % len(texts)]
+        start = time.perf_counter()
+        fn(text)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return sorted(samples)
+
+
+def pool_chunk(chunk: list) -> list:
+    """Process-pool task: suggestions for a chunk, with one engine per worker."""
+    global _pool_engine
+    if _pool_engine is None:
+        _pool_engine = SuggestionEngine(reload_interval=float("inf"))
+    return _pool_engine.suggest_many(chunk)
+
+
+async def time_batch(engine: SuggestionEngine, texts: list, size: int, workers: int,
+                     chunk_size: int = 100) -> dict:
+    items = [BatchSuggestionItem(description=texts[i % len(texts)], template="ai_model") for i in range(size)]
+    work = [(i, item.description, item.template) for i, item in enumerate(items)]
+    chunks = [work[i:i + chunk_size] for i in range(0, len(work), chunk_size)]
+    loop = asyncio.get_running_loop()
+
+    async def run_pool(pool):
+        await asyncio.gather(*(loop.run_in_executor(pool, pool_chunk, chunk) for chunk in chunks))
+
+    timings = {}
+    start = time.perf_counter()
+    await engine.suggest_batch(items)
+    timings["thread"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        await run_pool(pool)
+    timings["fresh pool"] = time.perf_counter() - start
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        await run_pool(pool)
+        start = time.perf_counter()
+        await run_pool(pool)
+        timings["warm pool"] = time.perf_counter() - start
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--size", type=int, default=5120, help="Description length in characters")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--batch", type=int, default=0, help="Time one batch of this many items instead")
+    parser.add_argument("--workers", type=int, default=min(8, os.cpu_count() or 1))
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    texts = [build_description(args.size, rng) for _ in range(64)]
+    engine = SuggestionEngine(reload_interval=float("inf"))
+
+    # Warm up both paths (regex caches, allocator)
+    for text in texts:
+        engine.suggest(text, "ai_model")
+        legacy_suggest(text)
+
+    if args.batch:
+        timings = asyncio.run(time_batch(engine, texts, args.batch, args.workers))
+        print(f"One batch of {args.batch} {args.size}-character descriptions ({args.workers} pool workers):")
+        for name, seconds in timings.items():
+            print(f"  {name:10} {seconds * 1000:8.1f} ms")
+        return
+
+    results = {
+        "engine": timed(lambda text: engine.suggest(text, "ai_model"), texts, args.iterations),
+        "legacy": timed(legacy_suggest, texts, args.iterations),
+    }
+
+    print(f"{args.iterations} calls on {args.size}-character descriptions:")
+    for name, samples in results.items():
+        p50 = statistics.median(samples)
+        p99 = samples[int(len(samples) * 0.99) - 1]
+        print(f"  {name:7} p50 {p50:8.1f} us   p99 {p99:8.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+"""
+Apply event retention to every listing's interaction history.
+
+Trims raw events and minute/hour/day rollup buckets older than their
+retention windows, and converts legacy `listing:{id}:events` sorted sets
+to the tiered layout. Safe to run repeatedly, e.g. from cron every hour.
+
+The windows come from the EVENT_RETENTION_*_SECONDS environment variables,
+the same ones the API workers trim with, so run this with their environment.
+
+Usage (from the backend directory):
+    EVENT_RETENTION_RAW_SECONDS=86400 python -m scripts.compact_listing_events
+"""
+import argparse
+import asyncio
+
+from app.services.quantum_score import EVENT_RETENTION, QuantumScoreService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    service = QuantumScoreService(args.redis_url, retention=EVENT_RETENTION)
+    totals = asyncio.run(service.compact_all(batch_size=args.batch_size))
+
+    listings = totals.pop("listings")
+    removed = ", ".join(f"{tier}={count}" for tier, count in totals.items())
+    print(f"Compacted {listings} listings (removed {removed})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""
+Convert listings that meet the custodianship criteria.
+
+Walks active listings in id order, one chunk per query, and converts the
+eligible ones in batched updates. Progress is checkpointed after every
+chunk, so an interrupted sweep (or one stopped by --max-batches) resumes
+where it left off on the next run. --dry-run reports counts and timings
+without changing anything.
+
+Usage (from the backend directory):
+    python -m scripts.custodian_sweep --batch-size 1000
+    python -m scripts.custodian_sweep --dry-run --restart
+"""
+import argparse
+import asyncio
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.custodian import CustodianService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default=settings.SQLALCHEMY_DATABASE_URI)
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--max-batches", type=int, default=None, help="Stop after this many chunks")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start over")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be converted")
+    args = parser.parse_args()
+
+    service = CustodianService(args.redis_url, batch_size=args.batch_size)
+    with Session(create_engine(args.database_url)) as db:
+        result = asyncio.run(service.sweep(
+            db,
+            dry_run=args.dry_run,
+            resume=not args.restart,
+            max_batches=args.max_batches
+        ))
+
+    verb = "Would convert" if args.dry_run else "Converted"
+    count = result.eligible if args.dry_run else result.converted
+    print(
+        f"{verb} {count} of {result.scanned} active listings in {result.batches} chunks"
+        f"{' (resumed)' if result.resumed else ''}"
+    )
+    print("  " + ", ".join(f"{phase} {seconds:.3f}s" for phase, seconds in result.timings.items()))
+    if not result.completed:
+        print(f"Stopped after {result.last_listing_id}; run again to continue")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Reclaim listing file blobs that no listing references any more.
+
+Blobs whose reference count dropped to zero are queued with the time it
+happened; this deletes those that have stayed unreferenced for longer
+than the grace period. A blob re-published before the sweep reaches it
+is kept. Safe to run repeatedly, e.g. from cron daily.
+
+Usage (from the backend directory):
+    python -m scripts.gc_blobs --grace-hours 24
+    python -m scripts.gc_blobs --dry-run
+"""
+import argparse
+import asyncio
+
+from app.services.blob_store import BlobStoreService
+from app.utils.storage import object_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--grace-hours", type=float, default=24.0)
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would be deleted")
+    args = parser.parse_args()
+
+    service = BlobStoreService(object_store, args.redis_url)
+    result = asyncio.run(service.gc(
+        grace_seconds=args.grace_hours * 3600,
+        batch_size=args.batch_size,
+        dry_run=args.dry_run
+    ))
+
+    verb = "Would delete" if args.dry_run else "Deleted"
+    count = result.scanned if args.dry_run else result.deleted
+    print(
+        f"{verb} {count} of {result.scanned} orphaned blobs "
+        f"({result.bytes_reclaimed / 1024 / 1024:.1f} MiB), {result.revived} revived, "
+        f"{result.failed} failed"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+"""
+Load test Redis-backed request throughput on a single uvicorn worker.
+
+Starts one uvicorn worker serving two equivalent endpoints that record a
+listing interaction:
+
+    /blocking  the old pattern, a synchronous redis.Redis client called
+               from inside an async route (blocks the event loop)
+    /pooled    QuantumScoreService.record_event on the shared pooled
+               redis.asyncio client from app.core.redis
+
+and fires the same number of concurrent requests at each.
+
+Usage (from the backend directory):
+    python -m scripts.load_test_redis --requests 5000 --concurrency 100
+"""
+import argparse
+import asyncio
+import json
+import subprocess
+import sys
+import time
+
+import httpx
+import redis
+from fastapi import FastAPI
+
+from app.services.quantum_score import (
+    LEADERBOARD_EPOCH,
+    LEADERBOARD_KEY,
+    RECORD_EVENT_SCRIPT,
+    ROLLUP_RESOLUTIONS,
+    SCORE_DECAY_PER_SECOND,
+    QuantumScoreService,
+)
+
+app = FastAPI()
+service = QuantumScoreService()
+blocking_client = redis.Redis.from_url("redis://localhost:6379", decode_responses=True)
+blocking_script = blocking_client.register_script(RECORD_EVENT_SCRIPT)
+
+
+@app.post("/blocking/{listing_id}")
+async def record_blocking(listing_id: str):
+    now = time.time()
+    blocking_script(
+        keys=[
+            service._raw_events_key(listing_id, "view"),
+            f"listing:{listing_id}:counts",
+            f"listing:{listing_id}:meta",
+            LEADERBOARD_KEY,
+            *(service._rollup_key(listing_id, r, "view") for r in ROLLUP_RESOLUTIONS),
+            f"listing:{listing_id}:event_types",
+        ],
+        args=[
+            f'{{"type": "view", "timestamp": {now}}}', now, "view", 1,
+            SCORE_DECAY_PER_SECOND, LEADERBOARD_EPOCH, listing_id,
+            *(service._bucket(now, r) for r in ROLLUP_RESOLUTIONS),
+            now - service.retention.raw_seconds,
+            json.dumps(service.EVENT_WEIGHTS),
+        ],
+    )
+    return {"status": "success"}
+
+
+@app.post("/pooled/{listing_id}")
+async def record_pooled(listing_id: str):
+    await service.record_event(listing_id, "view")
+    return {"status": "success"}
+
+
+async def hammer(base_url: str, path: str, requests: int, concurrency: int) -> float:
+    """Send `requests` POSTs with at most `concurrency` in flight. Returns requests/sec."""
+    limits = httpx.Limits(max_connections=concurrency)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=30) as client:
+        async def one(i: int):
+            async with semaphore:
+                response = await client.post(f"{path}/bench-{i % 100}")
+                response.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        return requests / (time.perf_counter() - start)
+
+
+async def run(args) -> None:
+    base_url = f"http://127.0.0.1:{args.port}"
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        for _ in range(50):
+            try:
+                await client.post("/pooled/bench-warmup")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+
+    blocking = await hammer(base_url, "/blocking", args.requests, args.concurrency)
+    pooled = await hammer(base_url, "/pooled", args.requests, args.concurrency)
+    print(f"blocking client: {blocking:10.0f} req/s")
+    print(f"pooled async:    {pooled:10.0f} req/s ({pooled / blocking:.2f}x)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "scripts.load_test_redis:app",
+        "--port", str(args.port), "--workers", "1", "--log-level", "warning",
+    ])
+    try:
+        asyncio.run(run(args))
+    finally:
+        server.terminate()
+        server.wait()
+        keys = list(blocking_client.scan_iter(match="*bench-*"))
+        if keys:
+            blocking_client.delete(*keys)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Convert invocation keys stored as JSON strings to Redis hashes.
+
+Key validation now runs as a server-side script over hash fields, so keys
+written by the previous InvocationService (one JSON string per key) must be
+converted before they can be validated. Already-converted keys are skipped.
+
+Usage (from the backend directory):
+    python -m scripts.migrate_invocation_keys --redis-url redis://localhost:6379
+"""
+import argparse
+import json
+
+import redis
+
+from app.models.listing import InvocationKey
+from app.services.invocation import InvocationService
+
+
+def migrate(client: redis.Redis, dry_run: bool = False) -> int:
+    """Rewrite every JSON-string key as a hash. Returns the number converted."""
+    converted = 0
+    for redis_key in client.scan_iter(match="invocation_key:*", count=500):
+        if client.type(redis_key) != "string":
+            continue
+        key = InvocationKey(**json.loads(client.get(redis_key)))
+        if not dry_run:
+            pipe = client.pipeline()
+            pipe.delete(redis_key)
+            pipe.hset(redis_key, mapping=InvocationService._serialize_key(key))
+            pipe.execute()
+        converted += 1
+    return converted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    args = parser.parse_args()
+
+    client = redis.Redis.from_url(args.redis_url, decode_responses=True)
+    converted = migrate(client, dry_run=args.dry_run)
+    action = "Would convert" if args.dry_run else "Converted"
+    print(f"{action} {converted} invocation keys")
+
+
+if __name__ == "__main__":
+    main()
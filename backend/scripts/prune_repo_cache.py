@@ -0,0 +1,27 @@
+"""
+Remove cached repository clones that have not been scanned recently.
+
+Each cached repository (bare clone, worktree and saved per-file stats) is
+dropped once it has gone unscanned for --max-age-days; repositories being
+scanned at that moment are skipped. Safe to run from cron.
+
+Usage (from the backend directory):
+    python -m scripts.prune_repo_cache --max-age-days 14
+"""
+import argparse
+
+from app.services.repo_cache import RepoCache
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--cache-dir", default=None, help="Defaults to REPO_CACHE_DIR")
+    parser.add_argument("--max-age-days", type=float, default=14.0)
+    args = parser.parse_args()
+
+    removed = RepoCache(args.cache_dir).prune(args.max_age_days * 24 * 3600)
+    print(f"Removed {removed} cached repositories")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Rebuild the quantum score leaderboards from the listing meta hashes.
+
+Each leaderboard is built into a temporary key and swapped in with RENAME,
+so readers never see a half-built ranking. Run after
+`scripts.backfill_quantum_scores` when migrating existing data, or any time
+the sorted sets are suspected to have drifted from the meta hashes.
+
+Usage (from the backend directory):
+    python -m scripts.rebuild_leaderboards --redis-url redis://localhost:6379
+"""
+import argparse
+from collections import defaultdict
+
+import redis
+
+from app.services.quantum_score import LEADERBOARD_KEY, QuantumScoreService
+
+
+def rebuild(client: redis.Redis, batch_size: int = 500) -> dict:
+    """Rebuild every leaderboard. Returns the member count per leaderboard key."""
+    boards = defaultdict(dict)
+    batch = []
+
+    def flush(batch):
+        pipe = client.pipeline(transaction=False)
+        for key in batch:
+            pipe.hmget(key, "score_acc", "score_ref", "category", "tier", "ranked")
+        for key, (acc, ref, category, tier, ranked) in zip(batch, pipe.execute()):
+            # Only published listings that haven't been archived or deleted
+            if not acc or not ref or ranked != "1":
+                continue
+            listing_id = key.split(":")[1]
+            ranked = QuantumScoreService._ranked_score(float(acc), float(ref))
+            boards[LEADERBOARD_KEY][listing_id] = ranked
+            if category:
+                boards[QuantumScoreService._leaderboard_key(category=category)][listing_id] = ranked
+            if tier:
+                boards[QuantumScoreService._leaderboard_key(tier=tier)][listing_id] = ranked
+
+    for key in client.scan_iter(match="listing:*:meta", count=batch_size):
+        batch.append(key)
+        if len(batch) >= batch_size:
+            flush(batch)
+            batch = []
+    if batch:
+        flush(batch)
+
+    # Drop filtered leaderboards that no longer have any members
+    stale = set(client.scan_iter(match=f"{LEADERBOARD_KEY}:*")) - set(boards)
+
+    for key, members in boards.items():
+        tmp_key = f"{key}:rebuild"
+        pipe = client.pipeline()
+        pipe.delete(tmp_key)
+        items = list(members.items())
+        for i in range(0, len(items), batch_size):
+            pipe.zadd(tmp_key, dict(items[i:i + batch_size]))
+        pipe.rename(tmp_key, key)
+        pipe.execute()
+
+    if stale:
+        client.delete(*stale)
+
+    return {key: len(members) for key, members in boards.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--redis-url", default="redis://localhost:6379")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+
+    client = redis.Redis.from_url(args.redis_url, decode_responses=True)
+    for key, count in sorted(rebuild(client, batch_size=args.batch_size).items()):
+        print(f"{key}: {count} listings")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+"""
+Refresh the precomputed owner activity and listing sales stats.
+
+Rebuilds the owner_activity_stats and listing_sales_stats materialized
+views concurrently, so readers (the custodial status endpoint, the
+custodianship sweep and dashboards) are never blocked. Run from cron,
+e.g. hourly; a fresh custodianship sweep also refreshes them first.
+
+Usage (from the backend directory):
+    python -m scripts.refresh_custodial_stats
+"""
+import argparse
+import time
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.services.custodian import CustodianService
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--database-url", default=settings.SQLALCHEMY_DATABASE_URI)
+    args = parser.parse_args()
+
+    started = time.monotonic()
+    with Session(create_engine(args.database_url)) as db:
+        CustodianService.refresh_stats(db)
+    print(f"Refreshed custodial stats in {time.monotonic() - started:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""
+Keep payload manifests in sync with secure storage.
+
+Rebuilds every missing or stale manifest on start, then polls for listing
+directories that changed. Run one instance per secure storage mount;
+API workers pick up rebuilt manifests from Redis. With --mirror, new or
+changed payloads are also copied to object storage so invocations can
+return signed download URLs.
+
+Usage (from the backend directory):
+    python -m scripts.watch_payload_manifests --interval 30
+    python -m scripts.watch_payload_manifests --once
+    python -m scripts.watch_payload_manifests --mirror
+"""
+import argparse
+import asyncio
+import logging
+
+from app.services.payload_manifest import PayloadManifestService
+from app.utils.storage import object_store
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--redis-url", default=None)
+    parser.add_argument("--storage-path", default=None, help="Defaults to SECURE_STORAGE_PATH")
+    parser.add_argument("--interval", type=float, default=30.0)
+    parser.add_argument("--once", action="store_true", help="Rebuild stale manifests and exit")
+    parser.add_argument("--mirror", action="store_true", help="Copy payloads to object storage")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    service = PayloadManifestService(
+        args.redis_url,
+        storage_path=args.storage_path,
+        object_store=object_store if args.mirror else None
+    )
+
+    if args.once:
+        rebuilt = asyncio.run(service.refresh_changed())
+        print(f"Rebuilt {len(rebuilt)} payload manifests")
+    else:
+        asyncio.run(service.watch(interval=args.interval))
+
+
+if __name__ == "__main__":
+    main()